@@ -0,0 +1,103 @@
+"""Recall@k vs latency harness for the IVF-PQ index of the NumPy vector store."""
+
+import argparse
+import tempfile
+import time
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from config import settings
+from models import ChunkMetadata, DocumentChunk
+from numpy_store import NumpyVectorStore
+
+
+def synthetic_corpus(num_vectors: int, dimension: int, num_clusters: int = 100, seed: int = 0) -> np.ndarray:
+    """Clustered Gaussian vectors, closer to real embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(num_clusters, dimension)).astype(np.float32)
+    labels = rng.integers(num_clusters, size=num_vectors)
+    return centers[labels] + 0.5 * rng.normal(size=(num_vectors, dimension)).astype(np.float32)
+
+
+def build_store(directory: str, vectors: np.ndarray, batch_size: int = 10000) -> NumpyVectorStore:
+    """Load vectors into an IVF-PQ NumPy store and train its index."""
+    store = NumpyVectorStore(directory, index="ivfpq", keyword_index=False)
+    for start in range(0, len(vectors), batch_size):
+        batch = vectors[start:start + batch_size]
+        chunks = [
+            DocumentChunk(
+                chunk_id=str(start + i),
+                text="",
+                metadata=ChunkMetadata(source="benchmark", chunk_id=str(start + i))
+            )
+            for i in range(len(batch))
+        ]
+        store.upsert_chunks(chunks, batch)
+    
+    if not store.ann_index.trained:
+        store.rebuild_index()
+    return store
+
+
+def measure(
+    store: NumpyVectorStore,
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    k: int,
+    nprobes: Sequence[int]
+) -> List[Dict]:
+    """
+    Measure recall@k and per-query latency for each nprobe.
+    
+    Args:
+        store: Store with a trained IVF-PQ index over ``vectors``
+        vectors: Indexed vectors, in row order (chunk id = row)
+        queries: Query vectors
+        k: Number of neighbours
+        nprobes: nprobe values to try
+        
+    Returns:
+        One dict per operating point, plus an "exact" baseline first
+    """
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    unit_queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    truth = [set(np.argsort(-(normalized @ q))[:k]) for q in unit_queries]
+    
+    def run(search) -> Dict:
+        start = time.perf_counter()
+        found = [[int(r['chunk_id']) for r in search(q.tolist())] for q in queries]
+        latency_ms = (time.perf_counter() - start) / len(queries) * 1000
+        recall = np.mean([len(truth[i] & set(ids)) / k for i, ids in enumerate(found)])
+        return {'recall_at_k': round(float(recall), 4), 'latency_ms': round(latency_ms, 3)}
+    
+    index = store.ann_index
+    store.ann_index = None
+    points = [{'nprobe': 'exact', **run(lambda q: store.similarity_search(q, top_k=k))}]
+    store.ann_index = index
+    
+    for nprobe in nprobes:
+        points.append({
+            'nprobe': nprobe,
+            **run(lambda q: store.similarity_search_batch([q], top_k=k, nprobe=nprobe)[0])
+        })
+    return points
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure IVF-PQ recall@k against latency on synthetic data.")
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--dimension", type=int, default=settings.embedding_dimension)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64])
+    args = parser.parse_args()
+    
+    vectors = synthetic_corpus(args.vectors, args.dimension)
+    queries = synthetic_corpus(args.queries, args.dimension, seed=1)
+    
+    with tempfile.TemporaryDirectory() as directory:
+        store = build_store(directory, vectors)
+        print(f"{'nprobe':>8} {'recall@' + str(args.k):>10} {'ms/query':>10}")
+        for point in measure(store, vectors, queries, args.k, args.nprobe):
+            print(f"{point['nprobe']:>8} {point['recall_at_k']:>10.3f} {point['latency_ms']:>10.2f}")
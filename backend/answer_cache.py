@@ -0,0 +1,192 @@
+"""Semantic answer cache for repeated and near-duplicate questions."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from config import settings
+from models import ChatResponse
+
+
+class SemanticAnswerCache:
+    """
+    Cache of generated answers keyed on the query embedding.
+    
+    A stored answer is reused when a new query embedding is within the cosine
+    similarity threshold of a cached query and retrieval returned exactly the
+    same chunk ids. Entries expire after a TTL, are bounded in number (LRU),
+    and are invalidated when any source they cite changes.
+    """
+    
+    def __init__(
+        self,
+        similarity_threshold: float = None,
+        ttl_seconds: float = None,
+        max_entries: int = None
+    ):
+        """
+        Initialize the answer cache.
+        
+        Args:
+            similarity_threshold: Minimum cosine similarity for a hit (default from settings)
+            ttl_seconds: Entry lifetime in seconds (default from settings)
+            max_entries: Maximum number of cached answers (default from settings)
+        """
+        self.similarity_threshold = (
+            similarity_threshold if similarity_threshold is not None
+            else settings.answer_cache_similarity_threshold
+        )
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.answer_cache_ttl_seconds
+        self.max_entries = max_entries if max_entries is not None else settings.answer_cache_max_entries
+        
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, Dict]" = OrderedDict()
+        self._next_id = 0
+        
+        # Query matrix over live entries, rebuilt lazily after changes
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_ids: List[int] = []
+        
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        """Convert an embedding to a unit-length float32 vector."""
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+    
+    def lookup(self, query_embedding: List[float], chunk_ids: Iterable[str]) -> Optional[Dict]:
+        """
+        Find a cached answer for a query.
+        
+        Args:
+            query_embedding: Embedding of the incoming query
+            chunk_ids: Ids of the chunks retrieved for the incoming query
+            
+        Returns:
+            Cached entry with ``response`` and ``prompt`` keys, or None on a miss
+        """
+        chunk_ids = frozenset(chunk_ids)
+        query = self._normalize(query_embedding)
+        
+        with self._lock:
+            self._expire()
+            
+            if self._entries:
+                if self._matrix is None:
+                    self._matrix_ids = list(self._entries)
+                    self._matrix = np.stack([
+                        self._entries[entry_id]['embedding'] for entry_id in self._matrix_ids
+                    ])
+                
+                scores = self._matrix @ query
+                # Try candidates from most to least similar above the threshold
+                for index in np.argsort(-scores):
+                    if scores[index] < self.similarity_threshold:
+                        break
+                    entry_id = self._matrix_ids[index]
+                    entry = self._entries[entry_id]
+                    if entry['chunk_ids'] == chunk_ids:
+                        self._entries.move_to_end(entry_id)
+                        self.hits += 1
+                        return entry
+            
+            self.misses += 1
+            return None
+    
+    def store(
+        self,
+        query_embedding: List[float],
+        chunk_ids: Iterable[str],
+        sources: Iterable[str],
+        response: ChatResponse,
+        prompt: Optional[str] = None
+    ):
+        """
+        Cache a generated answer.
+        
+        Args:
+            query_embedding: Embedding of the query that produced the answer
+            chunk_ids: Ids of the chunks used as context
+            sources: Source filenames cited by the answer
+            response: Generated response (stored without the prompt)
+            prompt: Display form of the prompt, returned in developer mode
+        """
+        entry = {
+            'embedding': self._normalize(query_embedding),
+            'chunk_ids': frozenset(chunk_ids),
+            'sources': frozenset(sources),
+            'response': response.model_copy(update={'prompt_used': None}),
+            'prompt': prompt,
+            'created_at': time.monotonic()
+        }
+        
+        with self._lock:
+            self._entries[self._next_id] = entry
+            self._next_id += 1
+            
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            
+            self._matrix = None
+    
+    def invalidate_sources(self, sources: Optional[Iterable[str]] = None):
+        """
+        Drop entries that cite any of the given sources.
+        
+        Args:
+            sources: Changed source filenames; None drops every entry
+        """
+        with self._lock:
+            if sources is None:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+            else:
+                sources = set(sources)
+                stale = [
+                    entry_id for entry_id, entry in self._entries.items()
+                    if entry['sources'] & sources
+                ]
+                for entry_id in stale:
+                    del self._entries[entry_id]
+                self.invalidations += len(stale)
+            
+            self._matrix = None
+    
+    def _expire(self):
+        """Drop entries older than the TTL. Caller holds the lock."""
+        deadline = time.monotonic() - self.ttl_seconds
+        expired = [
+            entry_id for entry_id, entry in self._entries.items()
+            if entry['created_at'] < deadline
+        ]
+        for entry_id in expired:
+            del self._entries[entry_id]
+        if expired:
+            self.evictions += len(expired)
+            self._matrix = None
+    
+    def get_stats(self) -> dict:
+        """Get hit-rate metrics and cache size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'similarity_threshold': self.similarity_threshold,
+                'ttl_seconds': self.ttl_seconds
+            }
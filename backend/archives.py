@@ -0,0 +1,106 @@
+"""Reading documents out of bulk uploads: plain files and zip/tar archives."""
+
+import tarfile
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+
+# Archive suffixes accepted by the bulk upload, longest first
+ARCHIVE_SUFFIXES = (".tar.gz", ".tar.bz2", ".tar.xz", ".tgz", ".zip", ".tar")
+
+# (member filename, contents or None, error or None)
+UploadDocument = Tuple[str, Optional[bytes], Optional[str]]
+
+
+def is_archive(filename: str) -> bool:
+    """Whether a filename names a supported zip or tar archive."""
+    return filename.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def _member_name(name: str) -> Optional[str]:
+    """
+    Filename a document inside an archive is indexed under.
+    
+    Directories inside the archive are dropped, so ``reports/q1.pdf`` is
+    indexed as ``q1.pdf``. Hidden files and macOS resource forks are skipped.
+    
+    Returns:
+        The base filename, or None if the member should be skipped
+    """
+    path = PurePosixPath(name.replace("\\", "/"))
+    if not path.name or path.name.startswith(".") or "__MACOSX" in path.parts:
+        return None
+    return path.name
+
+
+def _read_limited(stream: BinaryIO, name: str, max_bytes: int) -> Tuple[Optional[bytes], Optional[str]]:
+    """Read a member, refusing to hold more than ``max_bytes`` of it in memory."""
+    data = stream.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        return None, f"{name} is larger than {max_bytes} bytes"
+    return data, None
+
+
+def _iter_zip(path: Path, max_bytes: int) -> Iterator[UploadDocument]:
+    """Yield the files of a zip archive, decompressing one at a time."""
+    with zipfile.ZipFile(path) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            name = _member_name(info.filename)
+            if name is None:
+                continue
+            if info.file_size > max_bytes:
+                yield name, None, f"{name} is larger than {max_bytes} bytes"
+                continue
+            with archive.open(info) as member:
+                data, error = _read_limited(member, name, max_bytes)
+            yield name, data, error
+
+
+def _iter_tar(path: Path, max_bytes: int) -> Iterator[UploadDocument]:
+    """Yield the regular files of a (possibly compressed) tar archive in one streaming pass."""
+    with tarfile.open(path, "r|*") as archive:
+        for info in archive:
+            if not info.isfile():
+                continue
+            name = _member_name(info.name)
+            if name is None:
+                continue
+            if info.size > max_bytes:
+                yield name, None, f"{name} is larger than {max_bytes} bytes"
+                continue
+            member = archive.extractfile(info)
+            data, error = _read_limited(member, name, max_bytes)
+            yield name, data, error
+
+
+def iter_upload_documents(path: Path, filename: str, max_bytes: int) -> Iterator[UploadDocument]:
+    """
+    Yield the documents in one part of a bulk upload.
+    
+    Archives are decompressed lazily, one member at a time, so only the
+    member being read is held in memory; other parts are yielded whole.
+    
+    Args:
+        path: Stored upload part
+        filename: Original filename of the part
+        max_bytes: Largest document read into memory; bigger ones are
+            reported as errors
+    
+    Yields:
+        Tuples of (filename, contents, error); on error contents is None
+    
+    Raises:
+        zipfile.BadZipFile, tarfile.TarError: If an archive is corrupt
+    """
+    lowered = filename.lower()
+    if lowered.endswith(".zip"):
+        yield from _iter_zip(path, max_bytes)
+    elif is_archive(lowered):
+        yield from _iter_tar(path, max_bytes)
+    else:
+        with open(path, "rb") as f:
+            data, error = _read_limited(f, filename, max_bytes)
+        yield filename, data, error
@@ -0,0 +1,266 @@
+"""Concurrent, rate-limit-aware batch embedding."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence
+
+import openai
+from tenacity import Retrying, retry_if_exception_type, stop_after_attempt, wait_exponential
+
+from config import settings
+from metrics import RETRIES
+
+
+# Errors worth retrying for a single batch
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) used to size batches."""
+    return len(text) // 4 + 1
+
+
+def plan_batches(
+    texts: Sequence[str],
+    max_tokens: int,
+    max_items: int
+) -> List[List[int]]:
+    """
+    Group texts into batches bounded by a token budget and an item count.
+    
+    Args:
+        texts: Texts to embed
+        max_tokens: Maximum estimated tokens per batch
+        max_items: Maximum number of texts per batch
+        
+    Returns:
+        Batches as lists of indices into ``texts``, in input order
+    """
+    batches = []
+    current: List[int] = []
+    current_tokens = 0
+    
+    for i, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if current and (current_tokens + tokens > max_tokens or len(current) >= max_items):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    
+    if current:
+        batches.append(current)
+    return batches
+
+
+def get_retry_after(error: BaseException) -> Optional[float]:
+    """Extract the server's Retry-After delay in seconds, if any."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    
+    headers = response.headers
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD concurrency limit shared by embedding workers.
+    
+    The limit grows additively (about +1 per window of successful calls) and
+    is cut multiplicatively on a 429; a Retry-After pauses every worker.
+    """
+    
+    def __init__(self, max_limit: int, min_limit: int = 1, decrease_factor: float = 0.5):
+        """
+        Initialize the limiter at its maximum concurrency.
+        
+        Args:
+            max_limit: Upper bound on concurrent requests
+            min_limit: Lower bound on concurrent requests
+            decrease_factor: Multiplier applied to the limit on a rate limit
+        """
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.decrease_factor = decrease_factor
+        self.limit = float(max_limit)
+        
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._condition = threading.Condition()
+    
+    def acquire(self):
+        """Block until a request slot is available and no pause is active."""
+        with self._condition:
+            while True:
+                wait = self._paused_until - time.monotonic()
+                if wait > 0:
+                    self._condition.wait(timeout=wait)
+                elif self._in_flight >= int(self.limit):
+                    self._condition.wait()
+                else:
+                    self._in_flight += 1
+                    return
+    
+    def release(self):
+        """Return a request slot."""
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+    
+    def on_success(self):
+        """Additive increase after a successful request."""
+        with self._condition:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+    
+    def on_rate_limit(self, retry_after: Optional[float] = None):
+        """Multiplicative decrease, optionally pausing all workers."""
+        with self._condition:
+            self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+            if retry_after:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+
+
+class BatchEmbedder:
+    """
+    Embeds many texts with concurrent, independently retried batches.
+    
+    All workers share one API client (and so one HTTP connection pool);
+    concurrency adapts to 429 responses through an AIMD limiter.
+    """
+    
+    def __init__(
+        self,
+        request_fn: Callable[[List[str]], List[List[float]]],
+        max_concurrency: int = None,
+        max_tokens_per_batch: int = None,
+        max_attempts: int = None
+    ):
+        """
+        Initialize the batch embedder.
+        
+        Args:
+            request_fn: Performs a single embeddings API call for a list of texts
+            max_concurrency: Maximum concurrent batches (default from settings)
+            max_tokens_per_batch: Estimated token budget per batch (default from settings)
+            max_attempts: Attempts per batch before giving up (default from settings)
+        """
+        self.request_fn = request_fn
+        self.max_concurrency = max_concurrency or settings.embedding_max_concurrency
+        self.max_tokens_per_batch = max_tokens_per_batch or settings.embedding_batch_max_tokens
+        self.max_attempts = max_attempts or settings.embedding_max_attempts
+        self.limiter = AdaptiveConcurrencyLimiter(self.max_concurrency)
+        
+        # Counters, updated from the worker threads
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.rate_limited = 0
+    
+    def _wait(self, retry_state) -> float:
+        """Honour Retry-After when given, otherwise back off exponentially."""
+        retry_after = get_retry_after(retry_state.outcome.exception())
+        if retry_after is not None:
+            return retry_after
+        return wait_exponential(multiplier=1, min=2, max=10)(retry_state)
+    
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        """Embed one batch, retrying only this batch on failure."""
+        for attempt in Retrying(
+            stop=stop_after_attempt(self.max_attempts),
+            wait=self._wait,
+            retry=retry_if_exception_type(RETRYABLE_ERRORS),
+            reraise=True
+        ):
+            with attempt:
+                if attempt.retry_state.attempt_number > 1:
+                    with self._lock:
+                        self.retries += 1
+                    RETRIES.inc(operation="embedding_batch")
+                
+                self.limiter.acquire()
+                try:
+                    embeddings = self.request_fn(batch)
+                except openai.RateLimitError as e:
+                    with self._lock:
+                        self.rate_limited += 1
+                    # The pause is enforced by the limiter for every worker
+                    self.limiter.on_rate_limit(get_retry_after(e))
+                    raise
+                finally:
+                    self.limiter.release()
+                
+                self.limiter.on_success()
+                return embeddings
+    
+    def embed(
+        self,
+        texts: Sequence[str],
+        max_batch_size: int = None,
+        on_batch: Optional[Callable[[List[str], List[List[float]]], None]] = None
+    ) -> List[List[float]]:
+        """
+        Embed texts concurrently, returning vectors in input order.
+        
+        Args:
+            texts: Texts to embed
+            max_batch_size: Maximum texts per API call (default from settings)
+            on_batch: Optional callback invoked with each completed batch
+            
+        Returns:
+            List of embedding vectors aligned with ``texts``
+        """
+        if not texts:
+            return []
+        
+        batches = plan_batches(
+            texts,
+            max_tokens=self.max_tokens_per_batch,
+            max_items=max_batch_size or settings.embedding_batch_max_size
+        )
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        
+        def run(indices: List[int]):
+            batch = [texts[i] for i in indices]
+            embeddings = self._embed_batch(batch)
+            if on_batch is not None:
+                on_batch(batch, embeddings)
+            for i, embedding in zip(indices, embeddings):
+                results[i] = embedding
+        
+        with ThreadPoolExecutor(
+            max_workers=min(self.max_concurrency, len(batches)),
+            thread_name_prefix="embed-batch"
+        ) as executor:
+            futures = [executor.submit(run, indices) for indices in batches]
+            try:
+                for future in futures:
+                    future.result()
+            except Exception:
+                # Drop batches that have not started and let in-flight ones finish
+                executor.shutdown(wait=True, cancel_futures=True)
+                raise
+        
+        return results
+    
+    def get_stats(self) -> dict:
+        """Get retry counters and the current concurrency limit."""
+        return {
+            'concurrency_limit': round(self.limiter.limit, 2),
+            'max_concurrency': self.max_concurrency,
+            'retries': self.retries,
+            'rate_limited': self.rate_limited
+        }
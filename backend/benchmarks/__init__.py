@@ -0,0 +1,12 @@
+"""
+Offline, deterministic performance benchmarks.
+
+Run from the backend directory::
+    
+    python -m benchmarks run --output results.json
+    python -m benchmarks compare baseline.json results.json
+
+Upstream APIs are replaced by a local OpenAI-compatible server
+(``fake_openai``) and documents by a seeded synthetic corpus (``corpus``),
+so two runs on the same machine differ only by the code under test.
+"""
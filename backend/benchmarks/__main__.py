@@ -0,0 +1,195 @@
+"""Command-line entry point: ``python -m benchmarks run|compare``."""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from config import settings
+from numpy_store import NumpyVectorStore
+
+from benchmarks.corpus import SUPPORTED_FORMATS, CorpusGenerator
+from benchmarks.fake_openai import FakeOpenAIServer
+from benchmarks.scenarios import offline_settings, override_settings, run_catalog, run_chat, run_ingest
+
+
+SCENARIOS = ("ingest", "chat", "catalog")
+
+# Result format version, bumped when keys change meaning
+SCHEMA_VERSION = 1
+
+# Metrics checked for regressions; counts such as chunks or documents are only reported
+COMPARED_UNITS = ("_ms", "seconds", "per_second", "errors", "failed")
+
+
+def git_commit() -> str:
+    """Current commit hash, or "unknown" outside a git checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_suite(args: argparse.Namespace) -> Dict:
+    """
+    Run the selected scenarios against the local stand-in API.
+    
+    Returns:
+        JSON-serializable report with environment, configuration and results
+    """
+    results: Dict[str, Dict] = {}
+    server = FakeOpenAIServer(
+        dimension=args.dimension,
+        embedding_latency_ms=args.embedding_latency_ms,
+        ttft_ms=args.ttft_ms,
+        token_ms=args.token_ms,
+        completion_tokens=args.completion_tokens
+    )
+    
+    with tempfile.TemporaryDirectory() as work_dir, server, override_settings(**offline_settings(server)):
+        work = Path(work_dir)
+        generator = CorpusGenerator(seed=args.seed)
+        
+        if "ingest" in args.scenarios or "chat" in args.scenarios:
+            paths = generator.generate(str(work / "corpus"), args.documents, args.pages, args.formats)
+            store = NumpyVectorStore(str(work / "store"))
+            ingest = run_ingest(server, paths, str(work / "ingest"), store)
+            if "ingest" in args.scenarios:
+                results["ingest"] = ingest
+            
+            if "chat" in args.scenarios:
+                questions = generator.questions(args.clients * args.requests)
+                results["chat"] = run_chat(
+                    store, questions, str(work / "chat"), args.clients, args.requests, stream=False
+                )
+                if args.stream:
+                    results["chat_stream"] = run_chat(
+                        store, questions, str(work / "chat_stream"), args.clients, args.requests, stream=True
+                    )
+        
+        if "catalog" in args.scenarios:
+            for num_chunks in args.catalog_chunks:
+                results[f"catalog_{num_chunks}"] = run_catalog(
+                    str(work / f"catalog_{num_chunks}"),
+                    num_chunks,
+                    keyword_index=args.catalog_keyword_index,
+                    seed=args.seed
+                )
+    
+    return {
+        'schema': SCHEMA_VERSION,
+        'commit': git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'processor': platform.processor() or platform.machine(),
+            'retrieval_mode': settings.retrieval_mode,
+            'rerank_method': settings.rerank_method
+        },
+        'config': {key: value for key, value in vars(args).items() if key not in ("command", "output")},
+        'results': results
+    }
+
+
+def flatten(results: Dict, prefix: str = "") -> Dict[str, float]:
+    """Numeric leaves of a nested result dict, keyed by dotted path."""
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, path + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = float(value)
+    return flat
+
+
+def lower_is_better(metric: str) -> bool:
+    """Whether a metric is a cost (latency, time, errors) rather than a rate."""
+    return not metric.endswith("per_second")
+
+
+def compare(baseline: Dict, candidate: Dict, threshold: float) -> Tuple[List[Tuple], List[str]]:
+    """
+    Compare two reports metric by metric.
+    
+    Args:
+        baseline: Report of the reference commit
+        candidate: Report of the commit under test
+        threshold: Relative change counted as a regression (0.1 = 10%)
+    
+    Returns:
+        Rows of (metric, baseline, candidate, relative change) and the
+        metrics that regressed
+    """
+    old, new = flatten(baseline['results']), flatten(candidate['results'])
+    rows, regressions = [], []
+    for metric in sorted(old.keys() & new.keys()):
+        if old[metric]:
+            change = (new[metric] - old[metric]) / old[metric]
+        else:
+            change = float("inf") if new[metric] > 0 else 0.0
+        rows.append((metric, old[metric], new[metric], change))
+        worse = change > threshold if lower_is_better(metric) else change < -threshold
+        if worse and any(unit in metric for unit in COMPARED_UNITS):
+            regressions.append(metric)
+    return rows, regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    run = commands.add_parser("run", help="Run scenarios and write a JSON report")
+    run.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    run.add_argument("--output", help="Report file (default: stdout)")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--documents", type=int, default=30, help="Documents in the ingest corpus")
+    run.add_argument("--pages", type=int, default=10, help="Pages per document")
+    run.add_argument("--formats", nargs="+", choices=SUPPORTED_FORMATS, default=list(SUPPORTED_FORMATS))
+    run.add_argument("--dimension", type=int, default=settings.embedding_dimension)
+    run.add_argument("--embedding-latency-ms", type=float, default=20.0)
+    run.add_argument("--ttft-ms", type=float, default=200.0, help="Stand-in LLM time to first token")
+    run.add_argument("--token-ms", type=float, default=10.0, help="Stand-in LLM time per further token")
+    run.add_argument("--completion-tokens", type=int, default=50)
+    run.add_argument("--clients", type=int, default=8, help="Concurrent chat clients")
+    run.add_argument("--requests", type=int, default=20, help="Chat requests per client")
+    run.add_argument("--stream", action="store_true", help="Also measure the streaming chat endpoint")
+    run.add_argument("--catalog-chunks", type=int, nargs="+", default=[100000])
+    run.add_argument("--catalog-keyword-index", action="store_true")
+    
+    diff = commands.add_parser("compare", help="Compare two reports and flag regressions")
+    diff.add_argument("baseline")
+    diff.add_argument("candidate")
+    diff.add_argument("--threshold", type=float, default=0.1, help="Relative change flagged as a regression")
+    
+    args = parser.parse_args(argv)
+    
+    if args.command == "run":
+        report = json.dumps(run_suite(args), indent=2)
+        if args.output:
+            Path(args.output).write_text(report + "\n")
+        else:
+            print(report)
+        return 0
+    
+    baseline = json.loads(Path(args.baseline).read_text())
+    candidate = json.loads(Path(args.candidate).read_text())
+    rows, regressions = compare(baseline, candidate, args.threshold)
+    print(f"{baseline['commit'][:12]} -> {candidate['commit'][:12]}")
+    print(f"{'metric':<52} {'baseline':>12} {'candidate':>12} {'change':>8}")
+    for metric, old, new, change in rows:
+        flag = "  REGRESSION" if metric in regressions else ""
+        print(f"{metric:<52} {old:>12.3f} {new:>12.3f} {change:>+8.1%}{flag}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
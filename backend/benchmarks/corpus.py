@@ -0,0 +1,191 @@
+"""Seeded synthetic documents (PDF, DOCX and TXT) and questions about them."""
+
+from pathlib import Path
+from typing import List, Sequence
+
+import numpy as np
+
+
+SUPPORTED_FORMATS = ("pdf", "docx", "txt")
+
+_CONSONANTS = "bcdfghklmnprstvz"
+_VOWELS = "aeiou"
+
+
+def vocabulary(size: int = 5000, seed: int = 0) -> List[str]:
+    """Distinct pronounceable words, most frequent first."""
+    rng = np.random.default_rng(seed)
+    words: List[str] = []
+    seen = set()
+    while len(words) < size:
+        syllables = int(rng.integers(1, 4))
+        word = "".join(
+            _CONSONANTS[rng.integers(len(_CONSONANTS))] + _VOWELS[rng.integers(len(_VOWELS))]
+            for _ in range(syllables)
+        )
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+
+class CorpusGenerator:
+    """
+    Generates text with a Zipf-like word distribution.
+    
+    The same seed always yields the same documents and questions, so
+    benchmark runs on different commits index and query identical data.
+    """
+    
+    def __init__(self, seed: int = 0, vocabulary_size: int = 5000):
+        """
+        Initialize the generator.
+        
+        Args:
+            seed: Random seed
+            vocabulary_size: Number of distinct words
+        """
+        self.seed = seed
+        self.words = np.array(vocabulary(vocabulary_size, seed))
+        weights = 1.0 / np.arange(1, vocabulary_size + 1)
+        self.weights = weights / weights.sum()
+    
+    def paragraphs(self, rng: np.random.Generator, count: int) -> List[str]:
+        """Paragraphs of 3-7 sentences of 8-20 words."""
+        paragraphs = []
+        for _ in range(count):
+            sentences = []
+            for _ in range(int(rng.integers(3, 8))):
+                words = rng.choice(self.words, size=int(rng.integers(8, 21)), p=self.weights)
+                sentences.append(" ".join(words).capitalize() + ".")
+            paragraphs.append(" ".join(sentences))
+        return paragraphs
+    
+    def pages(self, rng: np.random.Generator, num_pages: int, paragraphs_per_page: int = 4) -> List[List[str]]:
+        """Paragraphs grouped into pages."""
+        return [self.paragraphs(rng, paragraphs_per_page) for _ in range(num_pages)]
+    
+    def questions(self, count: int) -> List[str]:
+        """Questions mixing common and rare vocabulary words."""
+        rng = np.random.default_rng(self.seed + 1)
+        questions = []
+        for _ in range(count):
+            common = rng.choice(self.words[:200], size=2)
+            rare = rng.choice(self.words[200:2000], size=2)
+            questions.append(f"What do the documents say about {rare[0]} {common[0]} and {rare[1]} {common[1]}?")
+        return questions
+    
+    def generate(
+        self,
+        directory: str,
+        num_documents: int,
+        pages_per_document: int = 5,
+        formats: Sequence[str] = SUPPORTED_FORMATS
+    ) -> List[Path]:
+        """
+        Write a corpus of documents, cycling through the given formats.
+        
+        Args:
+            directory: Output directory (created if missing)
+            num_documents: Number of documents
+            pages_per_document: Pages per document (DOCX and TXT have no
+                real pages; their "pages" are separated by page breaks or blank lines)
+            formats: File formats to cycle through
+        
+        Returns:
+            Paths of the written files
+        """
+        writers = {"pdf": write_pdf, "docx": write_docx, "txt": write_txt}
+        unknown = set(formats) - set(writers)
+        if unknown:
+            raise ValueError(f"Unknown formats: {', '.join(sorted(unknown))}. Supported: {', '.join(SUPPORTED_FORMATS)}")
+        
+        output = Path(directory)
+        output.mkdir(parents=True, exist_ok=True)
+        paths = []
+        for i in range(num_documents):
+            rng = np.random.default_rng([self.seed, i])
+            file_format = formats[i % len(formats)]
+            path = output / f"document_{i:05d}.{file_format}"
+            writers[file_format](path, self.pages(rng, pages_per_document))
+            paths.append(path)
+        return paths
+
+
+def write_txt(path: Path, pages: List[List[str]]):
+    """Write pages as blank-line separated paragraphs."""
+    path.write_text("\n\n".join("\n\n".join(page) for page in pages), encoding="utf-8")
+
+
+def write_docx(path: Path, pages: List[List[str]]):
+    """Write pages as DOCX paragraphs with page breaks in between."""
+    from docx import Document
+    from docx.enum.text import WD_BREAK
+    
+    document = Document()
+    for number, page in enumerate(pages):
+        if number:
+            document.add_paragraph().add_run().add_break(WD_BREAK.PAGE)
+        for paragraph in page:
+            document.add_paragraph(paragraph)
+    document.save(str(path))
+
+
+def _pdf_escape(text: str) -> str:
+    """Escape a string for a PDF literal."""
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _wrap(text: str, width: int) -> List[str]:
+    """Greedy word wrap."""
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + 1 + len(word) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    if line:
+        lines.append(line)
+    return lines
+
+
+def write_pdf(path: Path, pages: List[List[str]], line_width: int = 90):
+    """
+    Write a minimal text PDF with one Helvetica text block per page.
+    
+    Args:
+        path: Output file
+        pages: Paragraphs per page
+        line_width: Characters per line
+    """
+    objects: List[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"",  # page tree, filled in once the page objects are numbered
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for page in pages:
+        lines = [line for paragraph in page for line in _wrap(paragraph, line_width) + [""]]
+        content = "BT /F1 9 Tf 11 TL 40 800 Td " + " ".join(f"({_pdf_escape(line)}) '" for line in lines) + " ET"
+        stream = content.encode("latin-1", errors="replace")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids).encode("ascii")
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+    
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(bytes(output))
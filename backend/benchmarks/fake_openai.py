@@ -0,0 +1,239 @@
+"""Local OpenAI-compatible stand-in for the embeddings and chat completions APIs."""
+
+import asyncio
+import base64
+import hashlib
+import json
+import threading
+import time
+from functools import lru_cache
+from typing import List, Optional
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from keyword_index import tokenize
+
+
+@lru_cache(maxsize=100000)
+def _token_vector(token: str, dimension: int) -> np.ndarray:
+    """Pseudo-random unit-variance vector seeded by a token's hash."""
+    seed = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+    return np.random.default_rng(seed).standard_normal(dimension).astype(np.float32)
+
+
+def hash_embedding(text: str, dimension: int) -> np.ndarray:
+    """
+    Deterministic embedding of a text by feature hashing its tokens.
+    
+    Texts sharing words get similar vectors, so retrieval over the synthetic
+    corpus behaves like retrieval over real embeddings: a query finds the
+    chunks that use its terms.
+    
+    Args:
+        text: Text to embed
+        dimension: Embedding dimension
+    
+    Returns:
+        Unit-length float32 vector
+    """
+    tokens = tokenize(text) or [text]
+    vector = np.zeros(dimension, dtype=np.float32)
+    for token in tokens:
+        vector += _token_vector(token, dimension)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class ServerThread:
+    """Runs an ASGI app with uvicorn on a background thread."""
+    
+    def __init__(self, app, host: str = "127.0.0.1", port: int = 0):
+        """
+        Prepare the server.
+        
+        Args:
+            app: ASGI application
+            host: Interface to bind
+            port: Port to bind (0 picks a free one)
+        """
+        self.host = host
+        self.server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def port(self) -> int:
+        """Port the server is listening on."""
+        return self.server.servers[0].sockets[0].getsockname()[1]
+    
+    @property
+    def url(self) -> str:
+        """Base URL of the server."""
+        return f"http://{self.host}:{self.port}"
+    
+    def start(self, timeout: float = 10.0):
+        """Start serving and wait until the socket is bound."""
+        self._thread = threading.Thread(target=self.server.run, daemon=True)
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if not self._thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError("Server failed to start")
+            time.sleep(0.01)
+    
+    def stop(self):
+        """Shut the server down (running the app's lifespan shutdown)."""
+        self.server.should_exit = True
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+    
+    def __enter__(self):
+        self.start()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class FakeOpenAIServer(ServerThread):
+    """
+    OpenAI-compatible server with deterministic outputs and simulated latency.
+    
+    ``POST /v1/embeddings`` returns ``hash_embedding`` vectors (float or
+    base64) after ``embedding_latency_ms``. ``POST /v1/chat/completions``
+    answers with ``completion_tokens`` words chosen from the prompt by a hash
+    of it; the first word arrives after ``ttft_ms`` and each further word
+    after ``token_ms``, streamed as server-sent events when ``stream`` is set.
+    """
+    
+    def __init__(
+        self,
+        dimension: int,
+        embedding_latency_ms: float = 0.0,
+        ttft_ms: float = 200.0,
+        token_ms: float = 10.0,
+        completion_tokens: int = 50,
+        port: int = 0
+    ):
+        """
+        Configure the stand-in.
+        
+        Args:
+            dimension: Embedding dimension
+            embedding_latency_ms: Delay per embeddings request
+            ttft_ms: Delay before the first completion token
+            token_ms: Delay between completion tokens
+            completion_tokens: Words per completion
+            port: Port to bind (0 picks a free one)
+        """
+        self.dimension = dimension
+        self.embedding_latency_ms = embedding_latency_ms
+        self.ttft_ms = ttft_ms
+        self.token_ms = token_ms
+        self.completion_tokens = completion_tokens
+        
+        # Counters
+        self.embedding_requests = 0
+        self.embedded_inputs = 0
+        self.completion_requests = 0
+        
+        super().__init__(self._build_app(), port=port)
+    
+    @property
+    def base_url(self) -> str:
+        """OpenAI client base URL (with the ``/v1`` prefix)."""
+        return f"{self.url}/v1"
+    
+    def answer_words(self, messages: List[dict]) -> List[str]:
+        """Deterministic completion for a prompt: words drawn from the prompt itself."""
+        prompt = "\n".join(str(message.get("content", "")) for message in messages)
+        words = prompt.split() or ["answer"]
+        seed = int.from_bytes(hashlib.blake2b(prompt.encode("utf-8"), digest_size=8).digest(), "big")
+        rng = np.random.default_rng(seed)
+        return [words[i] for i in rng.integers(len(words), size=self.completion_tokens)]
+    
+    def _build_app(self) -> FastAPI:
+        """Routes of the stand-in API."""
+        app = FastAPI()
+        
+        @app.post("/v1/embeddings")
+        async def embeddings(request: Request):
+            body = await request.json()
+            inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+            self.embedding_requests += 1
+            self.embedded_inputs += len(inputs)
+            if self.embedding_latency_ms:
+                await asyncio.sleep(self.embedding_latency_ms / 1000)
+            
+            data = []
+            for index, text in enumerate(inputs):
+                vector = hash_embedding(text, self.dimension)
+                if body.get("encoding_format") == "base64":
+                    embedding = base64.b64encode(vector.astype("<f4").tobytes()).decode("ascii")
+                else:
+                    embedding = vector.tolist()
+                data.append({"object": "embedding", "index": index, "embedding": embedding})
+            
+            tokens = sum(len(text) // 4 + 1 for text in inputs)
+            return {
+                "object": "list",
+                "data": data,
+                "model": body.get("model", "fake-embedding"),
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens}
+            }
+        
+        @app.post("/v1/chat/completions")
+        async def chat_completions(request: Request):
+            body = await request.json()
+            self.completion_requests += 1
+            words = self.answer_words(body["messages"])
+            model = body.get("model", "fake-llm")
+            created = int(time.time())
+            
+            if body.get("stream"):
+                async def events():
+                    await asyncio.sleep(self.ttft_ms / 1000)
+                    for i, word in enumerate(words):
+                        if i:
+                            await asyncio.sleep(self.token_ms / 1000)
+                        delta = {"content": word if i == 0 else " " + word}
+                        yield self._chunk(model, created, delta, None)
+                    yield self._chunk(model, created, {}, "stop")
+                    yield "data: [DONE]\n\n"
+                
+                return StreamingResponse(events(), media_type="text/event-stream")
+            
+            await asyncio.sleep((self.ttft_ms + self.token_ms * max(0, len(words) - 1)) / 1000)
+            prompt_tokens = sum(len(str(message.get("content", ""))) // 4 + 1 for message in body["messages"])
+            return {
+                "id": "chatcmpl-benchmark",
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": " ".join(words)},
+                    "finish_reason": "stop"
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": len(words),
+                    "total_tokens": prompt_tokens + len(words)
+                }
+            }
+        
+        return app
+    
+    @staticmethod
+    def _chunk(model: str, created: int, delta: dict, finish_reason: Optional[str]) -> str:
+        """One streamed completion chunk as a server-sent event."""
+        chunk = {
+            "id": "chatcmpl-benchmark",
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        }
+        return f"data: {json.dumps(chunk)}\n\n"
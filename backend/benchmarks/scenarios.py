@@ -0,0 +1,320 @@
+"""Benchmark scenarios: ingest throughput, chat latency under load, and catalog scale."""
+
+import asyncio
+import shutil
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Sequence
+
+import httpx
+import numpy as np
+
+from config import settings
+from document_processor import DocumentProcessor
+from embeddings import EmbeddingService
+from jobs import IngestionJobQueue
+from models import ChunkMetadata, DocumentChunk
+from numpy_store import NumpyVectorStore
+from services import ServiceContainer
+
+from benchmarks.fake_openai import FakeOpenAIServer, ServerThread
+
+
+@contextmanager
+def override_settings(**values) -> Iterator[None]:
+    """Temporarily replace settings fields, restoring them on exit."""
+    original = {name: getattr(settings, name) for name in values}
+    for name, value in values.items():
+        setattr(settings, name, value)
+    try:
+        yield
+    finally:
+        for name, value in original.items():
+            setattr(settings, name, value)
+
+
+def offline_settings(server: FakeOpenAIServer) -> Dict:
+    """
+    Settings that point every upstream call at the local stand-in.
+    
+    Caches are disabled so each run measures the full pipeline rather than
+    hits left over from an earlier run.
+    """
+    return {
+        'openrouter_base_url': server.base_url,
+        'openrouter_api_key': "benchmark",
+        'embedding_dimension': server.dimension,
+        'embedding_cache_enabled': False,
+        'answer_cache_enabled': False,
+    }
+
+
+def percentiles(values_ms: Sequence[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds."""
+    if not len(values_ms):
+        return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'mean': 0.0, 'max': 0.0}
+    values = np.asarray(values_ms, dtype=np.float64)
+    return {
+        'p50': round(float(np.percentile(values, 50)), 3),
+        'p95': round(float(np.percentile(values, 95)), 3),
+        'p99': round(float(np.percentile(values, 99)), 3),
+        'mean': round(float(values.mean()), 3),
+        'max': round(float(values.max()), 3)
+    }
+
+
+def run_ingest(
+    server: FakeOpenAIServer,
+    paths: Sequence[Path],
+    work_dir: str,
+    store: NumpyVectorStore
+) -> Dict:
+    """
+    Ingest files through the background job queue, as uploads are.
+    
+    Args:
+        server: Running stand-in API (settings must point at it)
+        paths: Files to ingest
+        work_dir: Scratch directory for job state and uploads
+        store: Store receiving the chunks
+    
+    Returns:
+        Documents, chunks, wall time and throughput
+    """
+    work = Path(work_dir)
+    job_queue = IngestionJobQueue(
+        DocumentProcessor(),
+        EmbeddingService(),
+        store,
+        jobs_dir=str(work / "jobs"),
+        upload_dir=str(work / "uploads"),
+        manifest_path=str(work / "manifest.sqlite3")
+    )
+    requests_before = server.embedding_requests
+    total_bytes = sum(path.stat().st_size for path in paths)
+    
+    job_queue.start()
+    start = time.perf_counter()
+    try:
+        job_ids = []
+        for path in paths:
+            job_id = job_queue.new_job_id()
+            upload_path = job_queue.upload_path(job_id, path.name)
+            upload_path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(path, upload_path)
+            job_queue.submit(job_id, path.name)
+            job_ids.append(job_id)
+        
+        jobs = []
+        for job_id in job_ids:
+            while True:
+                job = job_queue.get(job_id)
+                if job.status in ("completed", "failed"):
+                    jobs.append(job)
+                    break
+                time.sleep(0.01)
+        seconds = time.perf_counter() - start
+    finally:
+        job_queue.close()
+    
+    chunks = sum(job.chunks_stored for job in jobs)
+    return {
+        'documents': len(jobs),
+        'failed': sum(job.status == "failed" for job in jobs),
+        'chunks': chunks,
+        'megabytes': round(total_bytes / 1e6, 3),
+        'seconds': round(seconds, 3),
+        'chunks_per_second': round(chunks / seconds, 2),
+        'documents_per_second': round(len(jobs) / seconds, 2),
+        'embedding_requests': server.embedding_requests - requests_before
+    }
+
+
+def _parse_server_timing(header: str) -> Dict[str, float]:
+    """Stage durations in milliseconds from a Server-Timing header."""
+    stages = {}
+    for entry in filter(None, (part.strip() for part in header.split(","))):
+        name, _, duration = entry.partition(";dur=")
+        if duration:
+            stages[name] = float(duration)
+    return stages
+
+
+async def _chat_load(
+    base_url: str,
+    questions: Sequence[str],
+    clients: int,
+    requests_per_client: int,
+    stream: bool
+) -> Dict:
+    """Closed-loop load: each client sends its next question when the previous answer is complete."""
+    latencies: List[float] = []
+    first_tokens: List[float] = []
+    stages: Dict[str, List[float]] = {}
+    errors = 0
+    
+    async def client_loop(client: httpx.AsyncClient, index: int):
+        nonlocal errors
+        for j in range(requests_per_client):
+            question = questions[(index * requests_per_client + j) % len(questions)]
+            start = time.perf_counter()
+            try:
+                if stream:
+                    first_token = None
+                    async with client.stream("POST", "/api/chat/stream", json={"query": question}) as response:
+                        response.raise_for_status()
+                        async for line in response.aiter_lines():
+                            if first_token is None and line == "event: token":
+                                first_token = (time.perf_counter() - start) * 1000
+                            if line == "event: error":
+                                raise RuntimeError("stream reported an error")
+                    if first_token is not None:
+                        first_tokens.append(first_token)
+                else:
+                    response = await client.post("/api/chat/", json={"query": question})
+                    response.raise_for_status()
+                    for stage, duration in _parse_server_timing(response.headers.get("server-timing", "")).items():
+                        stages.setdefault(stage, []).append(duration)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+    
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client, index) for index in range(clients)))
+        seconds = time.perf_counter() - start
+    
+    result = {
+        'clients': clients,
+        'requests': clients * requests_per_client,
+        'errors': errors,
+        'seconds': round(seconds, 3),
+        'requests_per_second': round(len(latencies) / seconds, 2),
+        'latency_ms': percentiles(latencies)
+    }
+    if stream:
+        result['first_token_ms'] = percentiles(first_tokens)
+    else:
+        result['stages_ms'] = {stage: percentiles(values) for stage, values in sorted(stages.items())}
+    return result
+
+
+def run_chat(
+    store: NumpyVectorStore,
+    questions: Sequence[str],
+    work_dir: str,
+    clients: int = 8,
+    requests_per_client: int = 20,
+    stream: bool = False
+) -> Dict:
+    """
+    Serve the real app over HTTP and measure chat latency under concurrent clients.
+    
+    Args:
+        store: Indexed store to answer from
+        questions: Questions, cycled across clients
+        work_dir: Scratch directory for the app's job queue
+        clients: Concurrent clients
+        requests_per_client: Questions each client asks in turn
+        stream: Use the streaming endpoint (reports time to first token)
+    
+    Returns:
+        Throughput, error count and latency percentiles (plus per-stage
+        percentiles from Server-Timing, or time to first token when streaming)
+    """
+    from main import app
+    
+    work = Path(work_dir)
+    processor = DocumentProcessor()
+    embedding_service = EmbeddingService()
+    services = ServiceContainer(
+        vector_store=store,
+        embedding_service=embedding_service,
+        doc_processor=processor,
+        job_queue=IngestionJobQueue(
+            processor,
+            embedding_service,
+            store,
+            jobs_dir=str(work / "jobs"),
+            upload_dir=str(work / "uploads"),
+            manifest_path=str(work / "manifest.sqlite3")
+        )
+    )
+    app.state.services = services
+    
+    with ServerThread(app) as server:
+        return asyncio.run(_chat_load(server.url, questions, clients, requests_per_client, stream))
+
+
+def run_catalog(
+    work_dir: str,
+    num_chunks: int,
+    chunks_per_document: int = 100,
+    dimension: int = 64,
+    deletes: int = 10,
+    keyword_index: bool = False,
+    seed: int = 0
+) -> Dict:
+    """
+    Measure document listing and deletion in a large NumPy store.
+    
+    Args:
+        work_dir: Directory for the store
+        num_chunks: Chunks to load
+        chunks_per_document: Chunks per synthetic document
+        dimension: Vector dimension (small, since search is not measured)
+        deletes: Documents deleted one at a time
+        keyword_index: Also maintain the BM25 index (much slower to load)
+        seed: Random seed for the vectors
+    
+    Returns:
+        Load time and listing/deletion latencies
+    """
+    rng = np.random.default_rng(seed)
+    store = NumpyVectorStore(work_dir, keyword_index=keyword_index)
+    num_documents = -(-num_chunks // chunks_per_document)
+    
+    start = time.perf_counter()
+    for batch_start in range(0, num_chunks, 10000):
+        ids = range(batch_start, min(batch_start + 10000, num_chunks))
+        chunks = [
+            DocumentChunk(
+                chunk_id=f"c{i}",
+                text=f"Synthetic chunk {i} of document {i // chunks_per_document}.",
+                metadata=ChunkMetadata(source=f"document_{i // chunks_per_document:07d}.pdf", chunk_id=f"c{i}")
+            )
+            for i in ids
+        ]
+        store.upsert_chunks(chunks, rng.standard_normal((len(chunks), dimension)).astype(np.float32))
+    load_seconds = time.perf_counter() - start
+    
+    def timed_ms(operation) -> float:
+        start = time.perf_counter()
+        operation()
+        return (time.perf_counter() - start) * 1000
+    
+    first_page = [timed_ms(lambda: store.get_documents(offset=0, limit=100)) for _ in range(5)]
+    last_page = [
+        timed_ms(lambda: store.get_documents(offset=max(0, num_documents - 100), limit=100))
+        for _ in range(5)
+    ]
+    info = [timed_ms(store.get_collection_info) for _ in range(5)]
+    
+    victims = rng.choice(num_documents, size=min(deletes, num_documents), replace=False)
+    delete_ms = [timed_ms(lambda: store.delete_document(f"document_{victim:07d}.pdf")) for victim in victims]
+    remaining = store.get_collection_info()['total_chunks']
+    
+    return {
+        'chunks': num_chunks,
+        'documents': num_documents,
+        'load_seconds': round(load_seconds, 3),
+        'load_chunks_per_second': round(num_chunks / load_seconds, 2),
+        'list_first_page_ms': percentiles(first_page),
+        'list_last_page_ms': percentiles(last_page),
+        'collection_info_ms': percentiles(info),
+        'delete_document_ms': percentiles(delete_ms),
+        'chunks_after_deletes': remaining
+    }
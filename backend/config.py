@@ -22,23 +22,162 @@ class Settings(BaseSettings):
     embedding_model: str = "thenlper/gte-large:free"
     embedding_dimension: int = 1024
     
+    # Embedding cache (keyed by model + sha256 of the text)
+    embedding_cache_enabled: bool = True
+    embedding_cache_path: str = "./embedding_cache/embeddings.sqlite3"
+    embedding_cache_memory_bytes: int = 64 * 1024 * 1024
+    
+    # Batch embedding: concurrent batches sized by estimated tokens
+    embedding_max_concurrency: int = 4
+    embedding_batch_max_tokens: int = 8000
+    embedding_batch_max_size: int = 20
+    embedding_max_attempts: int = 5
+    
     # OpenRouter API endpoint
     openrouter_base_url: str = "https://openrouter.ai/api/v1"
     
     # Vector Database
+    # Backend: "chroma" (ChromaDB) or "numpy" (in-process memory-mapped matrix)
+    vector_store_backend: str = "chroma"
+    numpy_store_directory: str = "./vector_index"
+    numpy_store_dtype: str = "float32"  # or "float16" to halve index memory
+    # Dead rows are compacted away on open once they exceed this share of the sidecar
+    numpy_store_compact_fraction: float = 0.5
+    # NumPy backend search: "exact", or "ivfpq" (IVF lists + PQ codes, exact re-rank)
+    numpy_store_index: str = "exact"
+    ivf_nlist: int = 1024
+    ivf_nprobe: int = 16
+    pq_num_subvectors: int = 64  # must divide embedding_dimension
+    ivf_rerank_candidates: int = 200
+    ivf_train_min_rows: int = 50000
+    ivf_train_sample: int = 100000
+    # Exact search over compact codes: "none", "int8" (4x smaller) or "binary"
+    # (32x smaller), with the best candidates rescored against float vectors
+    numpy_store_quantization: str = "none"
+    quantization_rescore_candidates: int = 200
     chroma_persist_directory: str = "./chroma_db"
     chroma_collection_name: str = "documents"
     anonymized_telemetry: bool = False
+    # Bound on HNSW segments loaded in the Chroma client shared by all tenants,
+    # least recently used evicted first (0: segments stay loaded until exit)
+    chroma_memory_limit_bytes: int = 0
+    # Chroma searches whose metadata filter matches at most this many chunks
+    # score those chunks exactly instead of using Chroma's filtered HNSW search
+    filter_exact_max_candidates: int = 2000
+    
+    # Multi-tenancy: requests carrying tenant_header are served from that
+    # tenant's own collection (Chroma) or directory (NumPy), manifest and
+    # answer cache; requests without it use the default tenant's store above.
+    # Tenant stores are opened on first use and kept in an LRU of at most
+    # max_open_tenants handles; handles idle for tenant_idle_seconds are closed.
+    # Closing a Chroma tenant leaves its collection loaded in the shared
+    # client, so with Chroma memory is bounded by chroma_memory_limit_bytes.
+    # An empty tenant_header disables tenant routing.
+    tenant_header: str = "X-Tenant-ID"
+    default_tenant: str = "default"
+    tenants_directory: str = "./tenants"
+    max_open_tenants: int = 32
+    tenant_idle_seconds: float = 600
     
     # Chunking Configuration
     chunk_size: int = 1000
     chunk_overlap: int = 200
     
+    # Parallel extraction (0 workers means one per CPU)
+    extraction_workers: int = 0
+    extraction_pages_per_task: int = 25
+    parallel_extraction_min_pages: int = 50
+    
+    # Background ingestion
+    upload_directory: str = "./uploads"
+    jobs_directory: str = "./jobs"
+    max_concurrent_jobs: int = 2
+    max_queue_depth: int = 20
+    # Finished jobs (and their state files) are dropped after this many
+    # seconds, or once max_finished_jobs newer ones have finished (0 disables)
+    job_retention_seconds: int = 7 * 24 * 3600
+    max_finished_jobs: int = 1000
+    # Largest accepted upload request, checked while the body streams in;
+    # TXT/DOCX uploads up to in_memory_upload_max_bytes are indexed from
+    # memory without being written to upload_directory
+    max_upload_bytes: int = 200 * 1024 * 1024
+    in_memory_upload_max_bytes: int = 8 * 1024 * 1024
+    # Streaming pipeline: chunks per embed/store batch, batches read ahead
+    ingest_batch_size: int = 64
+    ingest_prefetch_batches: int = 2
+    # Incremental re-indexing: per-document manifests of chunk ids, so a
+    # re-upload only embeds changed chunks and deletes stale ones
+    incremental_indexing_enabled: bool = True
+    manifest_path: str = "./manifests/manifest.sqlite3"
+    # Bulk uploads (several files or zip/tar archives as one job): documents
+    # per job, largest document read into memory, chunks per merged
+    # embed/store batch
+    bulk_max_documents: int = 1000
+    bulk_max_document_bytes: int = 100 * 1024 * 1024
+    bulk_batch_size: int = 512
+    
+    # Keyword (BM25) index, kept next to the vector store; the NumPy backend
+    # stores it in its own directory
+    keyword_index_enabled: bool = True
+    keyword_index_directory: str = "./keyword_index"
+    bm25_k1: float = 1.2
+    bm25_b: float = 0.75
+    
+    # Document catalog (per-document totals for listing); the NumPy backend
+    # stores it in its own directory
+    document_catalog_directory: str = "./document_catalog"
+    
+    # Retrieval: "dense" (embeddings), "sparse" (BM25, no embedding call) or
+    # "hybrid" (both, fused with reciprocal rank fusion). Without a keyword
+    # index retrieval is always dense.
+    retrieval_mode: str = "hybrid"
+    rrf_k: int = 60
+    # Candidates fetched from each retriever before fusion
+    hybrid_candidates: int = 20
+    
+    # Reranking of over-fetched candidates: "none", "lexical" (query-term
+    # coverage blended with retrieval rank) or "cross-encoder" (local CPU
+    # model, needs sentence-transformers). Over budget, retrieval order is kept.
+    rerank_method: str = "none"
+    rerank_candidates: int = 50
+    rerank_budget_ms: float = 150
+    rerank_workers: int = 2
+    rerank_lexical_weight: float = 0.5
+    rerank_model: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    
     # RAG Configuration
     top_k: int = 5
     temperature: float = 0.7
     max_tokens: int = 1000
     
+    # Prompt packing: overlapping chunks of a source are merged, near-duplicate
+    # blocks (share of shared word 3-grams >= threshold) dropped, and history
+    # then context trimmed to the budget. Tokens are counted with tiktoken's
+    # prompt_tokenizer encoding, loaded at startup; if it cannot be loaded a
+    # warning is logged and ~4 characters per token are assumed.
+    max_prompt_tokens: int = 3000
+    max_history_tokens: int = 800
+    context_dedup_threshold: float = 0.8
+    prompt_tokenizer: str = "cl100k_base"
+    
+    # Batch queries: largest accepted batch and concurrent LLM calls per batch
+    max_batch_queries: int = 10000
+    batch_llm_concurrency: int = 8
+    
+    # Semantic answer cache
+    answer_cache_enabled: bool = True
+    answer_cache_similarity_threshold: float = 0.97
+    answer_cache_ttl_seconds: int = 3600
+    answer_cache_max_entries: int = 1000
+    
+    # Shared HTTP connection pool for LLM and embedding calls
+    http_max_connections: int = 20
+    http_max_keepalive_connections: int = 10
+    
+    # Concurrency Configuration
+    # Worker threads used to run blocking vector searches off the event loop
+    search_executor_workers: int = 4
+    
     # API Configuration
     api_host: str = "0.0.0.0"
     api_port: int = 8000
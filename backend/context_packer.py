@@ -0,0 +1,309 @@
+"""Fit retrieved chunks and chat history into a prompt-token budget."""
+
+import logging
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+
+from config import settings
+from batch_embedder import estimate_tokens
+
+
+logger = logging.getLogger(__name__)
+
+
+# Tokens a chat message costs beyond its content (role and separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# A chunk cut shorter than this is left out rather than truncated
+MIN_TRUNCATED_TOKENS = 64
+
+# Characters of a chunk's start searched for in its neighbour's end
+OVERLAP_PROBE_CHARS = 32
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+@lru_cache(maxsize=4)
+def _encoding(name: str):
+    """tiktoken encoding, or None (logged once) when it cannot be loaded."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(name)
+    except ImportError:
+        logger.warning("tiktoken is not installed; estimating ~4 characters per prompt token")
+    except Exception as e:
+        logger.warning("Could not load tiktoken encoding %r (%s); estimating ~4 characters per prompt token", name, e)
+    return None
+
+
+def load_tokenizer():
+    """
+    Load the ``settings.prompt_tokenizer`` encoding ahead of the first request.
+    
+    Loading reads (and on a cold tiktoken cache downloads) the BPE ranks, so
+    the app does it once at startup rather than inside a query.
+    """
+    _encoding(settings.prompt_tokenizer)
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count the tokens of a text.
+    
+    Uses the ``tiktoken`` encoding named by ``settings.prompt_tokenizer``;
+    if it cannot be loaded, ~4 characters per token.
+    
+    Args:
+        text: Text to measure
+    
+    Returns:
+        Token count
+    """
+    encoding = _encoding(settings.prompt_tokenizer)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cut a text to at most ``max_tokens`` tokens, at a sentence or word boundary.
+    
+    Args:
+        text: Text to cut
+        max_tokens: Token limit
+    
+    Returns:
+        The text itself if it fits, else its longest fitting prefix
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+    
+    encoding = _encoding(settings.prompt_tokenizer)
+    if encoding is None:
+        prefix = text[:max(0, max_tokens - 1) * 4]
+    else:
+        prefix = encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+    
+    # Prefer a sentence boundary in the second half, then any word boundary
+    sentence_end = max(prefix.rfind('. '), prefix.rfind('! '), prefix.rfind('? '))
+    if sentence_end > len(prefix) // 2:
+        return prefix[:sentence_end + 1]
+    space_pos = prefix.rfind(' ')
+    if space_pos > 0:
+        return prefix[:space_pos]
+    return prefix
+
+
+def _overlap_merge(first: str, second: str) -> Optional[str]:
+    """
+    Join two texts if the end of ``first`` is the start of ``second``.
+    
+    Returns:
+        The joined text, ``first`` if it already contains ``second``, or
+        None if the texts do not overlap
+    """
+    if second in first:
+        return first
+    
+    probe = second[:OVERLAP_PROBE_CHARS]
+    pos = first.find(probe)
+    while pos != -1:
+        if second.startswith(first[pos:]):
+            return first + second[len(first) - pos:]
+        pos = first.find(probe, pos + 1)
+    return None
+
+
+def _page_span(metadata: Dict):
+    """(first, last) page of a chunk, or None when unknown."""
+    page = metadata.get('page')
+    if not page or page <= 0:
+        return None
+    end_page = metadata.get('end_page')
+    return page, end_page if end_page and end_page > page else page
+
+
+def _join_blocks(kept: Dict, other: Dict, text: str) -> Dict:
+    """Block covering two blocks, labelled with both source numbers."""
+    metadata = dict(kept['metadata'])
+    spans = [span for span in (_page_span(kept['metadata']), _page_span(other['metadata'])) if span]
+    if spans:
+        metadata['page'] = min(span[0] for span in spans)
+        metadata['end_page'] = max(span[1] for span in spans)
+    return {
+        **kept,
+        'text': text,
+        'metadata': metadata,
+        'source_numbers': sorted(kept['source_numbers'] + other['source_numbers'])
+    }
+
+
+def merge_overlapping(chunks: Sequence[Dict]) -> List[Dict]:
+    """
+    Merge chunks of the same source whose texts overlap.
+    
+    Neighbouring chunks share up to ``chunk_overlap`` characters, so two
+    retrieved neighbours are joined into one block without the repeated
+    text. Blocks keep the position of their best-ranked chunk and list the
+    1-based retrieval positions they cover in ``source_numbers``.
+    
+    Args:
+        chunks: Retrieved chunks, in rank order
+    
+    Returns:
+        Merged blocks, in rank order
+    """
+    blocks: List[Dict] = []
+    for number, chunk in enumerate(chunks, 1):
+        block = {**chunk, 'metadata': chunk.get('metadata', {}), 'source_numbers': [number]}
+        source = block['metadata'].get('source')
+        
+        # A new block can bridge two earlier ones, so keep merging until stable
+        merged = True
+        while merged:
+            merged = False
+            for i, other in enumerate(blocks):
+                if other['metadata'].get('source') != source:
+                    continue
+                text = _overlap_merge(other['text'], block['text'])
+                if text is None:
+                    text = _overlap_merge(block['text'], other['text'])
+                if text is not None:
+                    block = _join_blocks(other, block, text)
+                    del blocks[i]
+                    merged = True
+                    break
+        
+        # Merged blocks take the rank of their best chunk
+        position = next(
+            (i for i, other in enumerate(blocks) if other['source_numbers'][0] > block['source_numbers'][0]),
+            len(blocks)
+        )
+        blocks.insert(position, block)
+    return blocks
+
+
+def _shingles(text: str, size: int = 3) -> set:
+    """Word n-grams of a text."""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < size:
+        return {tuple(words)}
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def remove_near_duplicates(blocks: Sequence[Dict], threshold: float = None) -> List[Dict]:
+    """
+    Drop blocks whose text is mostly contained in another block.
+    
+    Similarity is the share of the smaller block's word 3-grams found in the
+    larger one, so the same passage repeated across documents (or a short
+    chunk inside a longer one) is kept once. The larger block survives at
+    the better rank of the two and takes over both source numbers.
+    
+    Args:
+        blocks: Blocks from ``merge_overlapping``, in rank order
+        threshold: Similarity from which blocks are duplicates (default from
+            settings; above 1.0 disables deduplication)
+    
+    Returns:
+        Remaining blocks, in rank order
+    """
+    threshold = threshold if threshold is not None else settings.context_dedup_threshold
+    if threshold > 1.0:
+        return list(blocks)
+    
+    kept: List[Dict] = []
+    kept_shingles: List[set] = []
+    for block in blocks:
+        shingles = _shingles(block['text'])
+        for i, other in enumerate(kept_shingles):
+            smaller = min(len(shingles), len(other))
+            if smaller and len(shingles & other) / smaller >= threshold:
+                if len(shingles) > len(other):
+                    kept[i] = {**block, 'source_numbers': sorted(kept[i]['source_numbers'] + block['source_numbers'])}
+                    kept_shingles[i] = shingles
+                else:
+                    kept[i] = {**kept[i], 'source_numbers': sorted(kept[i]['source_numbers'] + block['source_numbers'])}
+                break
+        else:
+            kept.append(block)
+            kept_shingles.append(shingles)
+    return kept
+
+
+def fit_blocks(blocks: Sequence[Dict], max_tokens: int, format_block) -> List[str]:
+    """
+    Format blocks in rank order until the token budget is used up.
+    
+    The first block that does not fit is truncated if enough of it fits,
+    and packing stops there.
+    
+    Args:
+        blocks: Blocks to pack, in rank order
+        max_tokens: Token budget for the formatted blocks
+        format_block: Callable (block, text) -> formatted string
+    
+    Returns:
+        Formatted blocks that fit
+    """
+    parts = []
+    remaining = max_tokens
+    for block in blocks:
+        part = format_block(block, block['text'])
+        tokens = count_tokens(part) + 2  # blank line between parts
+        if tokens <= remaining:
+            parts.append(part)
+            remaining -= tokens
+            continue
+        
+        header_tokens = count_tokens(format_block(block, "")) + 2
+        if remaining - header_tokens >= MIN_TRUNCATED_TOKENS:
+            parts.append(format_block(block, truncate_to_tokens(block['text'], remaining - header_tokens)))
+        break
+    return parts
+
+
+def message_tokens(message: Dict) -> int:
+    """Tokens a chat message adds to the prompt."""
+    return count_tokens(message.get('content') or '') + MESSAGE_OVERHEAD_TOKENS
+
+
+def trim_history(chat_history: Optional[Sequence[Dict]], max_tokens: int) -> List[Dict]:
+    """
+    Keep the most recent chat messages that fit a token budget.
+    
+    Older messages are dropped first. A history that would start with an
+    assistant reply loses it too, so the kept history opens with a user
+    turn; when not even the newest message fits, it is truncated instead.
+    
+    Args:
+        chat_history: Conversation history, oldest first
+        max_tokens: Token budget for the history
+    
+    Returns:
+        Kept messages, oldest first
+    """
+    if not chat_history or max_tokens <= 0:
+        return []
+    
+    kept: List[Dict] = []
+    remaining = max_tokens
+    for message in reversed(chat_history):
+        tokens = message_tokens(message)
+        if tokens > remaining:
+            break
+        kept.append(message)
+        remaining -= tokens
+    kept.reverse()
+    
+    if kept:
+        while kept and kept[0].get('role') == 'assistant':
+            kept.pop(0)
+    else:
+        newest = chat_history[-1]
+        budget = max_tokens - MESSAGE_OVERHEAD_TOKENS
+        if budget >= MIN_TRUNCATED_TOKENS:
+            kept = [{**newest, 'content': truncate_to_tokens(newest.get('content') or '', budget)}]
+    return kept
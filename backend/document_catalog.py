@@ -0,0 +1,319 @@
+"""Persistent catalog of indexed documents, kept in step with the vector store."""
+
+import hashlib
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from metadata_filter import filter_conditions
+
+
+# Ids per IN (...) query, well below SQLite's bound-parameter limit
+QUERY_BATCH = 500
+
+# Chunk metadata kept in indexed columns, so filters on it can be answered here
+FILTER_COLUMNS = ("source", "start_page", "end_page", "created_at")
+SQL_OPERATORS = {"$eq": "=", "$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+
+def document_id(source: str) -> str:
+    """Stable id of a document, derived from its source filename."""
+    return str(uuid.UUID(bytes=hashlib.sha256(source.encode("utf-8")).digest()[:16]))
+
+
+def chunk_digest(chunk_id: str, text: str) -> int:
+    """63-bit digest of a chunk, XOR-ed into its document's content hash."""
+    digest = hashlib.sha256(f"{chunk_id}\0{text}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") >> 1
+
+
+class DocumentCatalog:
+    """
+    One row per indexed document, stored in SQLite.
+    
+    Each document row holds its id, chunk count, text size in bytes,
+    creation and update times and a content hash. A per-chunk table records
+    which document every chunk belongs to, so upserts that overwrite a chunk
+    and deletions by chunk id adjust the right totals. Each call updates
+    both tables in one transaction. The content hash is the XOR of the chunk
+    digests, so it is maintained without reading the rest of the document.
+    
+    The chunk table also holds each chunk's page span and creation time,
+    indexed so ``match_chunk_ids`` can resolve a metadata filter without
+    touching the vector store.
+    """
+    
+    def __init__(self, path: str):
+        """
+        Open (or create) a catalog file.
+        
+        Args:
+            path: SQLite database file
+        """
+        self.path = path
+        
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                source TEXT PRIMARY KEY,
+                document_id TEXT NOT NULL,
+                num_chunks INTEGER NOT NULL,
+                num_bytes INTEGER NOT NULL,
+                content_digest INTEGER NOT NULL,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS chunks (
+                chunk_id TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                num_bytes INTEGER NOT NULL,
+                digest INTEGER NOT NULL,
+                start_page INTEGER,
+                end_page INTEGER,
+                created_at TEXT
+            );
+            CREATE INDEX IF NOT EXISTS chunks_source ON chunks (source);
+            """
+        )
+        
+        # Catalogs written before the filter columns existed get them added
+        # empty; ``needs_rebuild`` tells the store to fill them in
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(chunks)")}
+        self.needs_rebuild = "created_at" not in columns
+        if self.needs_rebuild:
+            for column in ("start_page INTEGER", "end_page INTEGER", "created_at TEXT"):
+                self._conn.execute(f"ALTER TABLE chunks ADD COLUMN {column}")
+        self._conn.executescript(
+            """
+            CREATE INDEX IF NOT EXISTS chunks_start_page ON chunks (start_page);
+            CREATE INDEX IF NOT EXISTS chunks_created_at ON chunks (created_at);
+            """
+        )
+        self._conn.commit()
+    
+    def _existing(self, chunk_ids: List[str]) -> List[Tuple[str, str, int, int]]:
+        """Rows of the given chunks that are catalogued. Caller holds the lock."""
+        rows = []
+        for start in range(0, len(chunk_ids), QUERY_BATCH):
+            batch = chunk_ids[start:start + QUERY_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows.extend(self._conn.execute(
+                f"SELECT chunk_id, source, num_bytes, digest FROM chunks WHERE chunk_id IN ({placeholders})",
+                batch
+            ))
+        return rows
+    
+    def _apply(self, deltas: Dict[str, List[int]], created: Dict[str, str]):
+        """
+        Add per-document changes to the document rows. Caller holds the lock.
+        
+        Args:
+            deltas: Source -> [chunk count change, byte change, digest XOR]
+            created: Source -> creation time used if the document is new
+        """
+        now = datetime.now().isoformat()
+        for source, (num_chunks, num_bytes, digest) in deltas.items():
+            row = self._conn.execute(
+                "SELECT num_chunks, num_bytes, content_digest FROM documents WHERE source = ?", (source,)
+            ).fetchone()
+            if row is not None:
+                num_chunks, num_bytes, digest = row[0] + num_chunks, row[1] + num_bytes, row[2] ^ digest
+            
+            if num_chunks <= 0:
+                self._conn.execute("DELETE FROM documents WHERE source = ?", (source,))
+            elif row is None:
+                self._conn.execute(
+                    "INSERT INTO documents (source, document_id, num_chunks, num_bytes, content_digest, "
+                    "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (source, document_id(source), num_chunks, num_bytes, digest, created.get(source, now), now)
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE documents SET num_chunks = ?, num_bytes = ?, content_digest = ?, updated_at = ? "
+                    "WHERE source = ?",
+                    (num_chunks, num_bytes, digest, now, source)
+                )
+    
+    def _remove_rows(self, rows: List[Tuple[str, str, int, int]]) -> Dict[str, List[int]]:
+        """Delete chunk rows and return the resulting document deltas. Caller holds the lock."""
+        deltas: Dict[str, List[int]] = {}
+        for _, source, num_bytes, digest in rows:
+            delta = deltas.setdefault(source, [0, 0, 0])
+            delta[0] -= 1
+            delta[1] -= num_bytes
+            delta[2] ^= digest
+        self._conn.executemany("DELETE FROM chunks WHERE chunk_id = ?", [(row[0],) for row in rows])
+        return deltas
+    
+    def add(self, entries: Iterable[Tuple[str, str, Dict]]):
+        """
+        Catalogue (or re-catalogue) chunks.
+        
+        Args:
+            entries: Tuples of (chunk id, text, flat metadata); a chunk id
+                that is already catalogued replaces the earlier version
+        """
+        # Later entries for the same chunk id win
+        latest = {chunk_id: (text, metadata) for chunk_id, text, metadata in entries}
+        if not latest:
+            return
+        
+        with self._lock, self._conn:
+            deltas = self._remove_rows(self._existing(list(latest)))
+            
+            created: Dict[str, str] = {}
+            chunks = []
+            for chunk_id, (text, metadata) in latest.items():
+                source = metadata.get("source", "Unknown")
+                num_bytes = len(text.encode("utf-8"))
+                digest = chunk_digest(chunk_id, text)
+                chunks.append((
+                    chunk_id, source, num_bytes, digest,
+                    metadata.get("start_page"), metadata.get("end_page"), metadata.get("created_at")
+                ))
+                
+                delta = deltas.setdefault(source, [0, 0, 0])
+                delta[0] += 1
+                delta[1] += num_bytes
+                delta[2] ^= digest
+                if metadata.get("created_at"):
+                    created[source] = min(created.get(source, metadata["created_at"]), metadata["created_at"])
+            
+            self._conn.executemany(
+                "INSERT INTO chunks (chunk_id, source, num_bytes, digest, start_page, end_page, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                chunks
+            )
+            self._apply(deltas, created)
+    
+    def remove(self, chunk_ids: List[str]) -> int:
+        """Remove chunks by id, returning how many were catalogued."""
+        with self._lock, self._conn:
+            rows = self._existing(list(chunk_ids))
+            self._apply(self._remove_rows(rows), {})
+            return len(rows)
+    
+    def remove_source(self, source: str) -> int:
+        """Remove a document and all its chunks, returning how many chunks it had."""
+        with self._lock, self._conn:
+            removed = self._conn.execute("DELETE FROM chunks WHERE source = ?", (source,)).rowcount
+            self._conn.execute("DELETE FROM documents WHERE source = ?", (source,))
+            return removed
+    
+    def rebuild(self, entries: Iterable[Tuple[str, str, Dict]], batch_size: int = 1000):
+        """
+        Replace the catalog with the given chunks.
+        
+        Args:
+            entries: Tuples of (chunk id, text, flat metadata) for every stored chunk
+            batch_size: Chunks catalogued per transaction
+        """
+        self.clear()
+        self.needs_rebuild = False
+        batch = []
+        for entry in entries:
+            batch.append(entry)
+            if len(batch) == batch_size:
+                self.add(batch)
+                batch = []
+        self.add(batch)
+    
+    def list_documents(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        """
+        List documents ordered by filename.
+        
+        Args:
+            offset: Number of documents to skip
+            limit: Maximum number of documents to return (None for all)
+        
+        Returns:
+            Document rows with id, filename, chunk count, byte size,
+            content hash and creation/update times
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT document_id, source, num_chunks, num_bytes, content_digest, created_at, updated_at "
+                "FROM documents ORDER BY source LIMIT ? OFFSET ?",
+                (-1 if limit is None else limit, offset)
+            ).fetchall()
+        
+        return [
+            {
+                'document_id': doc_id,
+                'filename': source,
+                'num_chunks': num_chunks,
+                'num_bytes': num_bytes,
+                'content_hash': f"{digest:016x}",
+                'created_at': created_at,
+                'updated_at': updated_at
+            }
+            for doc_id, source, num_chunks, num_bytes, digest, created_at, updated_at in rows
+        ]
+    
+    def chunk_ids(self, source: str) -> List[str]:
+        """Ids of the catalogued chunks of a document."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_id FROM chunks WHERE source = ? ORDER BY chunk_id", (source,)
+            ).fetchall()
+        return [row[0] for row in rows]
+    
+    def match_chunk_ids(self, where: Dict, limit: int) -> Optional[List[str]]:
+        """
+        Resolve a metadata filter to the ids of the chunks it matches.
+        
+        Args:
+            where: Chroma-style ``where`` filter
+            limit: Most ids to return
+        
+        Returns:
+            Matching chunk ids, or None if the filter has conditions on
+            metadata the catalog does not hold or matches more than ``limit``
+            chunks
+        """
+        clauses, params = [], []
+        for key, op, operand in filter_conditions(where):
+            if key not in FILTER_COLUMNS:
+                return None
+            if op == "$in":
+                values = list(operand)
+                clauses.append(f"{key} IN ({','.join('?' * len(values))})")
+                params.extend(values)
+            else:
+                clauses.append(f"{key} {SQL_OPERATORS[op]} ?")
+                params.append(operand)
+        
+        sql = "SELECT chunk_id FROM chunks"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        with self._lock:
+            rows = self._conn.execute(f"{sql} LIMIT ?", (*params, limit + 1)).fetchall()
+        if len(rows) > limit:
+            return None
+        return [row[0] for row in rows]
+    
+    def get_stats(self) -> Dict:
+        """Document, chunk and byte totals."""
+        with self._lock:
+            documents, chunks, num_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(num_chunks), 0), COALESCE(SUM(num_bytes), 0) FROM documents"
+            ).fetchone()
+        return {'total_documents': documents, 'total_chunks': chunks, 'total_bytes': num_bytes}
+    
+    def clear(self):
+        """Remove every document."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.execute("DELETE FROM documents")
+    
+    def close(self):
+        """Close the underlying SQLite connection."""
+        with self._lock:
+            self._conn.close()
@@ -1,8 +1,18 @@
 """Document processing pipeline for text extraction and chunking."""
 
+import hashlib
+import io
+import mmap
+import multiprocessing
+import os
+import threading
 import uuid
+from bisect import bisect_right
+from collections import Counter, deque
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
 from pathlib import Path
-from typing import List, Tuple
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple, Union
 import re
 
 # PDF processing
@@ -21,21 +31,125 @@ from models import DocumentChunk, ChunkMetadata
 from config import settings
 
 
+def make_chunk_id(source: str, text: str, occurrence: int = 0) -> str:
+    """
+    Deterministic chunk id for a chunk of a document.
+    
+    The same text in the same source always maps to the same id, so
+    re-uploading a document overwrites its chunks instead of duplicating
+    them. ``occurrence`` numbers repeats of identical text in one document.
+    
+    Args:
+        source: Source filename
+        text: Chunk text
+        occurrence: How many earlier chunks of the source have the same text
+        
+    Returns:
+        UUID-formatted id built from a SHA-256 of the inputs
+    """
+    digest = hashlib.sha256(f"{source}\0{occurrence}\0{text}".encode("utf-8")).digest()
+    return str(uuid.UUID(bytes=digest[:16]))
+
+
+@contextmanager
+def _open_mapped(file_path: Union[str, BinaryIO]) -> Iterator[BinaryIO]:
+    """
+    Open a PDF for ``PdfReader`` without copying it into memory.
+    
+    Given a path, pypdf reads the whole file into a private buffer; a
+    read-only memory map instead lets every process share the page cache.
+    File objects are passed through unchanged.
+    """
+    if not isinstance(file_path, str):
+        yield file_path
+        return
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # Empty files cannot be mapped; pypdf reports them itself
+            yield f
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            yield view
+
+
+def _extract_pdf_page_range(file_path: str, start: int, stop: int) -> List[str]:
+    """Extract the text of pages ``[start, stop)`` of a PDF (runs in a worker process)."""
+    with _open_mapped(file_path) as stream:
+        reader = PdfReader(stream)
+        return [reader.pages[i].extract_text() for i in range(start, stop)]
+
+
+def _process_document_in_worker(
+    file_path: str,
+    chunk_size: int,
+    chunk_overlap: int
+) -> Tuple[List[DocumentChunk], dict]:
+    """Run the full pipeline for one file serially (runs in a worker process)."""
+    processor = DocumentProcessor(chunk_size, chunk_overlap, extraction_workers=1)
+    return processor.process_document(file_path)
+
+
+def _process_bytes_in_worker(
+    data: bytes,
+    filename: str,
+    chunk_size: int,
+    chunk_overlap: int
+) -> Tuple[List[DocumentChunk], dict]:
+    """Run the full pipeline for one in-memory file serially (runs in a worker process)."""
+    processor = DocumentProcessor(chunk_size, chunk_overlap, extraction_workers=1)
+    return processor.process_bytes(data, filename)
+
+
 class DocumentProcessor:
     """Handles document text extraction and chunking."""
     
     SUPPORTED_EXTENSIONS = {'.pdf', '.docx', '.txt'}
     
-    def __init__(self, chunk_size: int = None, chunk_overlap: int = None):
+    # Characters read per block when streaming plain text files
+    TXT_BLOCK_SIZE = 64 * 1024
+    
+    def __init__(
+        self,
+        chunk_size: int = None,
+        chunk_overlap: int = None,
+        extraction_workers: int = None
+    ):
         """
         Initialize document processor.
         
         Args:
             chunk_size: Size of text chunks (default from settings)
             chunk_overlap: Overlap between chunks (default from settings)
+            extraction_workers: Processes used for extraction; 1 disables the
+                pool (default from settings, 0 meaning the CPU count)
         """
         self.chunk_size = chunk_size or settings.chunk_size
         self.chunk_overlap = chunk_overlap or settings.chunk_overlap
+        self.extraction_workers = (
+            extraction_workers or settings.extraction_workers or os.cpu_count() or 1
+        )
+        
+        # Created on first use; shared by every document this processor handles
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+    
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Return the extraction process pool, starting it if needed."""
+        with self._pool_lock:
+            if self._pool is None:
+                # Spawn rather than fork: the server process runs threads
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.extraction_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+    
+    def close(self):
+        """Shut down the extraction process pool."""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
     
     def validate_file(self, filename: str) -> Tuple[bool, str]:
         """
@@ -61,6 +175,21 @@ class DocumentProcessor:
         
         return True, ""
     
+    def validate_extraction(self, text: str) -> Tuple[bool, str]:
+        """
+        Validate that extraction produced usable text.
+        
+        Args:
+            text: Extracted text
+            
+        Returns:
+            Tuple of (is_valid, error_message)
+        """
+        if len(text.strip()) < 10:
+            return False, f"Extracted text too short ({len(text)} chars). Possible OCR or extraction issue."
+        
+        return True, ""
+    
     def extract_text(self, file_path: str) -> Tuple[str, dict]:
         """
         Extract text from a document file.
@@ -85,48 +214,155 @@ class DocumentProcessor:
     
     def _extract_pdf(self, file_path: str) -> Tuple[str, dict]:
         """Extract text from PDF file."""
-        reader = PdfReader(file_path)
+        metadata = {}
         text_parts = []
         page_map = {}  # Track which text came from which page
         
         current_pos = 0
-        for page_num, page in enumerate(reader.pages, 1):
-            page_text = page.extract_text()
+        for page_num, page_text in self._iter_pdf_pages(file_path, metadata):
             text_parts.append(page_text)
             page_map[current_pos] = page_num
-            current_pos += len(page_text)
+            # Offsets are positions in the joined text, separators included
+            current_pos += len(page_text) + len("\n\n")
         
         full_text = "\n\n".join(text_parts)
-        metadata = {
-            'num_pages': len(reader.pages),
-            'page_map': page_map
-        }
+        metadata['page_map'] = page_map
         
         return full_text, metadata
     
     def _extract_docx(self, file_path: str) -> Tuple[str, dict]:
         """Extract text from DOCX file."""
-        doc = DocxDocument(file_path)
-        text_parts = [paragraph.text for paragraph in doc.paragraphs if paragraph.text.strip()]
+        metadata = {}
+        text_parts = [text for _, text in self._iter_docx_paragraphs(file_path, metadata)]
         full_text = "\n\n".join(text_parts)
         
-        metadata = {
-            'num_paragraphs': len(doc.paragraphs)
-        }
-        
         return full_text, metadata
     
     def _extract_txt(self, file_path: str) -> Tuple[str, dict]:
         """Extract text from TXT file."""
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            text = f.read()
-        
-        metadata = {
-            'encoding': 'utf-8'
-        }
+        metadata = {}
+        text = "".join(block for _, block in self._iter_txt_blocks(file_path, metadata))
         
         return text, metadata
     
+    def _iter_pdf_pages(self, file_path: Union[str, BinaryIO], metadata: dict) -> Iterator[Tuple[int, str]]:
+        """
+        Yield (page_number, text) for each PDF page, in page order.
+        
+        Large PDFs on disk are split into page ranges extracted on the
+        process pool; only a few ranges per worker are in flight at once.
+        PDFs read from a file object are extracted in this process. Files
+        are read through a memory map rather than copied into memory.
+        """
+        with _open_mapped(file_path) as stream:
+            reader = PdfReader(stream)
+            num_pages = len(reader.pages)
+            metadata['num_pages'] = num_pages
+            
+            if (
+                not isinstance(file_path, str)
+                or self.extraction_workers <= 1
+                or num_pages < settings.parallel_extraction_min_pages
+            ):
+                for page_num, page in enumerate(reader.pages, 1):
+                    yield page_num, page.extract_text()
+                return
+            
+            # The workers map the file themselves
+            del reader
+        yield from self._iter_pdf_pages_parallel(file_path, num_pages)
+    
+    def _iter_pdf_pages_parallel(self, file_path: str, num_pages: int) -> Iterator[Tuple[int, str]]:
+        """Extract page ranges on the process pool and yield pages in order."""
+        pool = self._get_pool()
+        pages_per_task = max(1, settings.extraction_pages_per_task)
+        ranges = deque(
+            (start, min(start + pages_per_task, num_pages))
+            for start in range(0, num_pages, pages_per_task)
+        )
+        in_flight = deque()
+        
+        try:
+            while ranges or in_flight:
+                while ranges and len(in_flight) < self.extraction_workers * 2:
+                    start, stop = ranges.popleft()
+                    future = pool.submit(_extract_pdf_page_range, file_path, start, stop)
+                    in_flight.append((start, future))
+                
+                start, future = in_flight.popleft()
+                for offset, page_text in enumerate(future.result()):
+                    yield start + offset + 1, page_text
+        finally:
+            for _, future in in_flight:
+                future.cancel()
+    
+    def _iter_docx_paragraphs(self, file_path: Union[str, BinaryIO], metadata: dict) -> Iterator[Tuple[None, str]]:
+        """Yield (None, text) for each non-empty DOCX paragraph."""
+        doc = DocxDocument(file_path)
+        metadata['num_paragraphs'] = len(doc.paragraphs)
+        
+        for paragraph in doc.paragraphs:
+            if paragraph.text.strip():
+                yield None, paragraph.text
+    
+    def _iter_txt_blocks(self, file_path: Union[str, BinaryIO], metadata: dict) -> Iterator[Tuple[None, str]]:
+        """Yield (None, text) blocks of a TXT file without reading it whole."""
+        metadata['encoding'] = 'utf-8'
+        
+        if isinstance(file_path, str):
+            f = open(file_path, 'r', encoding='utf-8', errors='ignore')
+        else:
+            f = io.TextIOWrapper(file_path, encoding='utf-8', errors='ignore')
+        try:
+            while True:
+                block = f.read(self.TXT_BLOCK_SIZE)
+                if not block:
+                    break
+                yield None, block
+        finally:
+            if isinstance(file_path, str):
+                f.close()
+            else:
+                # Leave the caller's file object open
+                f.detach()
+    
+    def iter_segments(
+        self,
+        file_path: Union[str, BinaryIO],
+        metadata: dict = None,
+        filename: str = None
+    ) -> Iterator[Tuple[Optional[int], str]]:
+        """
+        Stream raw text segments of a document.
+        
+        Concatenating the segments gives the same text as ``extract_text``;
+        pages and paragraphs carry their ``"\\n\\n"`` separator as a prefix.
+        
+        Args:
+            file_path: Path to the document, or a seekable binary file object
+            metadata: Optional dict filled with extraction metadata as pages are read
+            filename: Name whose extension gives the file type (default: ``file_path``)
+            
+        Yields:
+            Tuples of (page_number or None, raw_text)
+        """
+        if metadata is None:
+            metadata = {}
+        extension = Path(filename or file_path).suffix.lower()
+        
+        if extension == '.pdf':
+            parts = self._iter_pdf_pages(file_path, metadata)
+        elif extension == '.docx':
+            parts = self._iter_docx_paragraphs(file_path, metadata)
+        elif extension == '.txt':
+            yield from self._iter_txt_blocks(file_path, metadata)
+            return
+        else:
+            raise ValueError(f"Unsupported file type: {extension}")
+        
+        for i, (page, text) in enumerate(parts):
+            yield page, text if i == 0 else "\n\n" + text
+    
     def chunk_text(self, text: str, source: str, page_map: dict = None) -> List[DocumentChunk]:
         """
         Split text into overlapping chunks.
@@ -134,109 +370,378 @@ class DocumentProcessor:
         Args:
             text: Text to chunk
             source: Source filename
-            page_map: Optional mapping of text positions to page numbers
+            page_map: Optional mapping of positions in ``text`` to the page
+                starting there
             
         Returns:
             List of DocumentChunk objects
         """
-        # Clean text
-        text = self._clean_text(text)
+        # Split at page starts; cleaning then remaps each page's offset
+        segments = [(None, text)]
+        if page_map:
+            offsets = sorted(page_map)
+            segments = [(None, text[:offsets[0]])]
+            for pos, next_pos in zip(offsets, offsets[1:] + [len(text)]):
+                segments.append((page_map[pos], text[pos:next_pos]))
+        
+        return list(self._make_chunks(self._iter_chunk_spans(segments), source))
+    
+    def iter_chunks(
+        self,
+        segments: Iterable[Tuple[Optional[int], str]],
+        source: str,
+        min_length: int = 0
+    ) -> Iterator[DocumentChunk]:
+        """
+        Lazily split streamed text segments into overlapping chunks.
+        
+        Only about one chunk plus the current segment is held in memory, and
+        each chunk is attributed to the page it starts on and the page span
+        it covers.
+        
+        Args:
+            segments: Iterable of (page_number or None, raw_text)
+            source: Source filename
+            min_length: Minimum cleaned text length before the document is rejected
+            
+        Yields:
+            DocumentChunk objects in document order
+        """
+        yield from self._make_chunks(self._iter_chunk_spans(segments, min_length), source)
+    
+    def iter_document_chunks(
+        self,
+        file_path: str,
+        source: str = None,
+        metadata: dict = None
+    ) -> Iterator[DocumentChunk]:
+        """
+        Stream a document as chunks, page by page.
         
-        if len(text) == 0:
-            raise ValueError("Extracted text is empty")
+        Args:
+            file_path: Path to document file
+            source: Source name recorded on chunks (default: file name)
+            metadata: Optional dict filled with extraction metadata
+            
+        Yields:
+            DocumentChunk objects in document order
+        """
+        filename = Path(file_path).name
+        is_valid, error = self.validate_file(filename)
+        if not is_valid:
+            raise ValueError(error)
         
-        chunks = []
+        segments = self.iter_segments(file_path, metadata)
+        yield from self.iter_chunks(segments, source or filename, min_length=10)
+    
+    def iter_stream_chunks(
+        self,
+        stream: BinaryIO,
+        filename: str,
+        metadata: dict = None
+    ) -> Iterator[DocumentChunk]:
+        """
+        Stream a document read from a file object as chunks.
+        
+        Args:
+            stream: Seekable binary file object holding the document
+            filename: Document filename, recorded as the chunk source
+            metadata: Optional dict filled with extraction metadata
+            
+        Yields:
+            DocumentChunk objects in document order
+        """
+        is_valid, error = self.validate_file(filename)
+        if not is_valid:
+            raise ValueError(error)
+        
+        segments = self.iter_segments(stream, metadata, filename)
+        yield from self.iter_chunks(segments, filename, min_length=10)
+    
+    def _make_chunks(
+        self,
+        spans: Iterable[Tuple[int, str, Optional[int], Optional[int]]],
+        source: str
+    ) -> Iterator[DocumentChunk]:
+        """Build chunks for spans, numbering repeated texts so their ids stay distinct."""
+        # Keyed by digest so a long document does not keep every chunk text
+        occurrences = Counter()
+        for _, chunk_text, start_page, end_page in spans:
+            key = hashlib.sha256(chunk_text.encode("utf-8")).digest()
+            occurrence = occurrences[key]
+            occurrences[key] += 1
+            yield self._make_chunk(chunk_text, source, start_page, end_page, occurrence)
+    
+    def _make_chunk(
+        self,
+        text: str,
+        source: str,
+        start_page: Optional[int],
+        end_page: Optional[int],
+        occurrence: int = 0
+    ) -> DocumentChunk:
+        """Build a chunk whose id is derived from its source and content."""
+        chunk_id = make_chunk_id(source, text, occurrence)
+        metadata = ChunkMetadata(
+            source=source,
+            page=start_page,
+            start_page=start_page,
+            end_page=end_page,
+            chunk_id=chunk_id
+        )
+        
+        return DocumentChunk(
+            chunk_id=chunk_id,
+            text=text,
+            metadata=metadata
+        )
+    
+    def _iter_chunk_spans(
+        self,
+        segments: Iterable[Tuple[Optional[int], str]],
+        min_length: int = 0
+    ) -> Iterator[Tuple[int, str, Optional[int], Optional[int]]]:
+        """
+        Incrementally clean and chunk streamed text.
+        
+        Produces the same chunks as collapsing every whitespace run of the
+        concatenated segments to one space, stripping the ends and splitting
+        the result, but only buffers text from the current chunk window onwards.
+        
+        Args:
+            segments: Iterable of (page_number or None, raw_text)
+            min_length: Minimum cleaned text length before the document is rejected
+            
+        Yields:
+            Tuples of (start offset in cleaned text, chunk text, start page, end page)
+        """
+        segments = iter(segments)
+        buffer = ""          # cleaned text from offset `base` onwards
+        base = 0
+        total = 0            # length of cleaned text seen so far
+        pending_space = False
+        eof = False
+        page_offsets = []    # cleaned offsets where each segment's text begins (sorted)
+        page_numbers = []
         start = 0
         
-        while start < len(text):
+        while True:
+            # Read ahead until the chunk window is complete (or the text ends)
+            while not eof and total <= start + self.chunk_size:
+                try:
+                    page, raw = next(segments)
+                except StopIteration:
+                    eof = True
+                    if total < min_length:
+                        raise ValueError(
+                            f"Extracted text too short ({total} chars). Possible OCR or extraction issue."
+                        )
+                    if total == 0:
+                        raise ValueError("Extracted text is empty")
+                    break
+                
+                # Collapse whitespace runs to one space, also across segment boundaries
+                collapsed = re.sub(r'\s+', ' ', raw)
+                core = collapsed.strip(' ')
+                if not core:
+                    pending_space = pending_space or bool(collapsed)
+                    continue
+                if total and (pending_space or collapsed[0] == ' '):
+                    buffer += ' '
+                    total += 1
+                page_offsets.append(total)
+                page_numbers.append(page)
+                buffer += core
+                total += len(core)
+                pending_space = collapsed[-1] == ' '
+            
+            if start >= total:
+                break
+            
             # Calculate end position
             end = start + self.chunk_size
             
             # If not at the end, try to break at a sentence or word boundary
-            if end < len(text):
+            if end < total:
+                window_start, window_end = start - base, end - base
                 # Look for sentence boundary (. ! ?)
                 sentence_end = max(
-                    text.rfind('. ', start, end),
-                    text.rfind('! ', start, end),
-                    text.rfind('? ', start, end)
+                    buffer.rfind('. ', window_start, window_end),
+                    buffer.rfind('! ', window_start, window_end),
+                    buffer.rfind('? ', window_start, window_end)
                 )
                 
-                if sentence_end > start:
-                    end = sentence_end + 1
+                if sentence_end > window_start:
+                    end = base + sentence_end + 1
                 else:
                     # Fall back to word boundary
-                    space_pos = text.rfind(' ', start, end)
-                    if space_pos > start:
-                        end = space_pos
+                    space_pos = buffer.rfind(' ', window_start, window_end)
+                    if space_pos > window_start:
+                        end = base + space_pos
             
             # Extract chunk
-            chunk_text = text[start:end].strip()
+            chunk_text = buffer[start - base:end - base].strip()
             
             if chunk_text:
-                # Determine page number if page_map provided
-                page = None
-                if page_map:
-                    for pos, page_num in sorted(page_map.items(), reverse=True):
-                        if start >= pos:
-                            page = page_num
-                            break
-                
-                chunk_id = str(uuid.uuid4())
-                metadata = ChunkMetadata(
-                    source=source,
-                    page=page,
-                    chunk_id=chunk_id
-                )
-                
-                chunk = DocumentChunk(
-                    chunk_id=chunk_id,
-                    text=chunk_text,
-                    metadata=metadata
-                )
-                chunks.append(chunk)
+                # Binary search the page offsets for the first and last character
+                start_page = page_numbers[max(0, bisect_right(page_offsets, start) - 1)]
+                end_page = page_numbers[max(0, bisect_right(page_offsets, end - 1) - 1)]
+                yield start, chunk_text, start_page, end_page
             
-            # Move to next chunk with overlap
-            start = end - self.chunk_overlap
+            # Move to next chunk with overlap; when an early break leaves the
+            # overlap reaching back to (or before) this start, skip it instead
+            next_start = end - self.chunk_overlap
+            start = end if next_start <= start else next_start
             
-            # Ensure we make progress
-            if start <= chunks[-1].text.find(chunks[-1].text[:50]) if chunks else 0:
-                start = end
+            # Drop consumed text; later chunks never start before start - overlap.
+            # Trimming only once half the buffer is stale keeps this amortized O(n).
+            cut = start - self.chunk_overlap - base
+            if cut > 0 and cut * 2 > len(buffer):
+                buffer = buffer[cut:]
+                base += cut
+                keep = max(0, bisect_right(page_offsets, base) - 1)
+                del page_offsets[:keep]
+                del page_numbers[:keep]
+    
+    def process_directory(
+        self,
+        directory: str,
+        recursive: bool = False
+    ) -> Iterator[Tuple[str, List[DocumentChunk], dict, Optional[str]]]:
+        """
+        Process every supported file in a directory in parallel.
+        
+        Each file runs through ``process_document`` in its own worker
+        process; results are yielded as soon as each file finishes.
+        
+        Args:
+            directory: Directory to scan
+            recursive: Whether to include subdirectories
+            
+        Yields:
+            Tuples of (file_path, chunks, extraction_metadata, error); on
+            failure chunks is empty and error holds the message
+        """
+        pattern = "**/*" if recursive else "*"
+        file_paths = sorted(
+            str(path) for path in Path(directory).glob(pattern)
+            if path.is_file() and self.validate_file(path.name)[0]
+        )
         
-        return chunks
+        if self.extraction_workers <= 1:
+            for file_path in file_paths:
+                try:
+                    chunks, metadata = self.process_document(file_path)
+                except Exception as e:
+                    yield file_path, [], {}, str(e)
+                else:
+                    yield file_path, chunks, metadata, None
+            return
+        
+        pool = self._get_pool()
+        futures = {
+            pool.submit(_process_document_in_worker, file_path, self.chunk_size, self.chunk_overlap): file_path
+            for file_path in file_paths
+        }
+        
+        for future in as_completed(futures):
+            try:
+                chunks, metadata = future.result()
+            except Exception as e:
+                yield futures[future], [], {}, str(e)
+            else:
+                yield futures[future], chunks, metadata, None
     
-    def _clean_text(self, text: str) -> str:
-        """Clean extracted text."""
-        # Remove excessive whitespace
-        text = re.sub(r'\s+', ' ', text)
-        # Remove excessive newlines
-        text = re.sub(r'\n{3,}', '\n\n', text)
-        return text.strip()
+    def process_documents(
+        self,
+        documents: Iterable[Tuple[str, bytes]]
+    ) -> Iterator[Tuple[str, List[DocumentChunk], dict, Optional[str]]]:
+        """
+        Process in-memory documents in parallel.
+        
+        Each document runs through ``process_bytes`` in a worker process.
+        ``documents`` is consumed lazily, keeping about two documents per
+        worker in flight, so a large archive is never held in memory whole.
+        
+        Args:
+            documents: Iterable of (filename, file contents)
+            
+        Yields:
+            Tuples of (filename, chunks, extraction_metadata, error) as each
+            document finishes; on failure chunks is empty and error holds
+            the message
+        """
+        if self.extraction_workers <= 1:
+            for filename, data in documents:
+                try:
+                    chunks, metadata = self.process_bytes(data, filename)
+                except Exception as e:
+                    yield filename, [], {}, str(e)
+                else:
+                    yield filename, chunks, metadata, None
+            return
+        
+        pool = self._get_pool()
+        pending = iter(documents)
+        in_flight = {}
+        
+        def submit_next() -> bool:
+            for filename, data in pending:
+                future = pool.submit(
+                    _process_bytes_in_worker, data, filename, self.chunk_size, self.chunk_overlap
+                )
+                in_flight[future] = filename
+                return True
+            return False
+        
+        try:
+            while len(in_flight) < self.extraction_workers * 2 and submit_next():
+                pass
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    filename = in_flight.pop(future)
+                    try:
+                        chunks, metadata = future.result()
+                    except Exception as e:
+                        yield filename, [], {}, str(e)
+                    else:
+                        yield filename, chunks, metadata, None
+                    submit_next()
+        finally:
+            for future in in_flight:
+                future.cancel()
     
-    def process_document(self, file_path: str) -> Tuple[List[DocumentChunk], dict]:
+    def process_document(self, file_path: str, source: str = None) -> Tuple[List[DocumentChunk], dict]:
         """
         Complete pipeline: extract and chunk document.
         
+        Thin wrapper that materializes ``iter_document_chunks``.
+        
         Args:
             file_path: Path to document file
+            source: Source name recorded on chunks (default: file name)
             
         Returns:
             Tuple of (chunks, extraction_metadata)
         """
-        # Validate
-        filename = Path(file_path).name
-        is_valid, error = self.validate_file(filename)
-        if not is_valid:
-            raise ValueError(error)
-        
-        # Extract
-        text, metadata = self.extract_text(file_path)
+        metadata = {}
+        chunks = list(self.iter_document_chunks(file_path, source, metadata))
         
-        # Validate extraction
-        if len(text.strip()) < 10:
-            raise ValueError(f"Extracted text too short ({len(text)} chars). Possible OCR or extraction issue.")
+        return chunks, metadata
+    
+    def process_bytes(self, data: bytes, filename: str) -> Tuple[List[DocumentChunk], dict]:
+        """
+        Complete pipeline for a document held in memory.
         
-        # Chunk
-        page_map = metadata.get('page_map')
-        chunks = self.chunk_text(text, filename, page_map)
+        Args:
+            data: File contents
+            filename: Document filename, recorded as the chunk source
+            
+        Returns:
+            Tuple of (chunks, extraction_metadata)
+        """
+        metadata = {}
+        chunks = list(self.iter_stream_chunks(io.BytesIO(data), filename, metadata))
         
         return chunks, metadata
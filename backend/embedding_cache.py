@@ -0,0 +1,183 @@
+"""Content-addressed, persistent cache for text embeddings."""
+
+import hashlib
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+from config import settings
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache keyed by (embedding_model, sha256(text)).
+    
+    Vectors are stored as float32 blobs in a local SQLite file, fronted by an
+    in-process LRU tier that is evicted by total vector size in bytes.
+    """
+    
+    def __init__(self, path: str = None, max_memory_bytes: int = None):
+        """
+        Initialize the cache and its SQLite store.
+        
+        Args:
+            path: SQLite file path (default from settings)
+            max_memory_bytes: Size bound of the in-process LRU tier (default from settings)
+        """
+        self.path = path or settings.embedding_cache_path
+        self.max_memory_bytes = (
+            max_memory_bytes if max_memory_bytes is not None
+            else settings.embedding_cache_memory_bytes
+        )
+        
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+            """
+        )
+        self._conn.commit()
+        
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[Tuple[str, str], array]" = OrderedDict()
+        self._memory_bytes = 0
+        
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.memory_hits = 0
+    
+    @staticmethod
+    def hash_text(text: str) -> str:
+        """Content hash used as the cache key for a text."""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+    
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """
+        Look up embeddings for several texts.
+        
+        Args:
+            model: Embedding model name
+            texts: Texts to look up
+            
+        Returns:
+            List aligned with ``texts``; ``None`` marks a cache miss
+        """
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        pending = {}  # text_hash -> positions still missing after the memory tier
+        
+        with self._lock:
+            for i, text in enumerate(texts):
+                key = (model, self.hash_text(text))
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    results[i] = vector.tolist()
+                    self.memory_hits += 1
+                else:
+                    pending.setdefault(key[1], []).append(i)
+            
+            if pending:
+                hashes = list(pending)
+                # Stay well below SQLite's bound-parameter limit
+                for start in range(0, len(hashes), 500):
+                    batch = hashes[start:start + 500]
+                    placeholders = ",".join("?" * len(batch))
+                    rows = self._conn.execute(
+                        f"SELECT text_hash, vector FROM embeddings "
+                        f"WHERE model = ? AND text_hash IN ({placeholders})",
+                        [model, *batch]
+                    ).fetchall()
+                    for text_hash, blob in rows:
+                        vector = array("f")
+                        vector.frombytes(blob)
+                        self._remember((model, text_hash), vector)
+                        for i in pending[text_hash]:
+                            results[i] = vector.tolist()
+            
+            found = sum(1 for r in results if r is not None)
+            self.hits += found
+            self.misses += len(texts) - found
+        
+        return results
+    
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        """Look up the embedding for a single text."""
+        return self.get_many(model, [text])[0]
+    
+    def put_many(self, model: str, texts: Sequence[str], embeddings: Sequence[Sequence[float]]):
+        """
+        Store embeddings for several texts.
+        
+        Args:
+            model: Embedding model name
+            texts: Texts that were embedded
+            embeddings: Corresponding embedding vectors
+        """
+        if len(texts) != len(embeddings):
+            raise ValueError("Number of texts must match number of embeddings")
+        
+        rows = []
+        with self._lock:
+            for text, embedding in zip(texts, embeddings):
+                key = (model, self.hash_text(text))
+                vector = array("f", embedding)
+                self._remember(key, vector)
+                rows.append((model, key[1], vector.tobytes()))
+            
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+    
+    def put(self, model: str, text: str, embedding: Sequence[float]):
+        """Store the embedding for a single text."""
+        self.put_many(model, [text], [embedding])
+    
+    def _remember(self, key: Tuple[str, str], vector: array):
+        """Insert into the LRU tier and evict least recently used entries. Caller holds the lock."""
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= previous.itemsize * len(previous)
+        
+        size = vector.itemsize * len(vector)
+        if size > self.max_memory_bytes:
+            return
+        
+        self._memory[key] = vector
+        self._memory_bytes += size
+        
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.itemsize * len(evicted)
+    
+    def get_stats(self) -> dict:
+        """Get cache hit/miss counters and tier sizes."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'memory_hits': self.memory_hits,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_bytes,
+                'max_memory_bytes': self.max_memory_bytes,
+                'path': self.path
+            }
+    
+    def close(self):
+        """Close the underlying SQLite connection."""
+        with self._lock:
+            self._conn.close()
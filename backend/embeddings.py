@@ -1,31 +1,94 @@
 """Embedding generation service using OpenRouter API."""
 
-from typing import List
+import asyncio
+from typing import List, Optional
+import httpx
 import openai
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 from config import settings
+from metrics import count_retry
+from batch_embedder import BatchEmbedder
+from embedding_cache import EmbeddingCache
 
 
 class EmbeddingService:
     """Service for generating text embeddings using OpenRouter."""
     
-    def __init__(self):
-        """Initialize embedding service with OpenRouter client."""
+    def __init__(
+        self,
+        cache: Optional[EmbeddingCache] = None,
+        http_client: Optional[httpx.Client] = None,
+        async_http_client: Optional[httpx.AsyncClient] = None
+    ):
+        """
+        Initialize embedding service with OpenRouter client.
+        
+        Args:
+            cache: Optional embedding cache (default built from settings when enabled)
+            http_client: Optional shared HTTP connection pool for sync calls
+            async_http_client: Optional shared HTTP connection pool for async calls
+        """
+        # One shared client (and connection pool) for all batch workers. Retries
+        # are handled here so 429s reach the adaptive concurrency limiter.
         self.client = openai.OpenAI(
             api_key=settings.openrouter_api_key,
-            base_url=settings.openrouter_base_url
+            base_url=settings.openrouter_base_url,
+            max_retries=0,
+            http_client=http_client
+        )
+        self.async_client = openai.AsyncOpenAI(
+            api_key=settings.openrouter_api_key,
+            base_url=settings.openrouter_base_url,
+            max_retries=0,
+            http_client=async_http_client
         )
         self.model = settings.embedding_model
         self.dimension = settings.embedding_dimension
+        
+        if cache is None and settings.embedding_cache_enabled:
+            cache = EmbeddingCache()
+        self.cache = cache
+        
+        self.batch_embedder = BatchEmbedder(self._create_embeddings)
+    
+    def _create_embeddings(self, inputs: List[str]) -> List[List[float]]:
+        """
+        Make a single embeddings API call.
+        
+        Args:
+            inputs: Texts to embed in a single API call
+            
+        Returns:
+            Embedding vectors in input order
+        """
+        response = self.client.embeddings.create(
+            model=self.model,
+            input=inputs,
+            extra_headers={
+                "HTTP-Referer": "http://localhost:3000",
+                "X-Title": "RAG Chatbot"
+            }
+        )
+        return [item.embedding for item in response.data]
     
     @retry(
         stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10)
+        wait=wait_exponential(multiplier=1, min=2, max=10),
+        before_sleep=count_retry("embedding")
     )
-    def generate_embedding(self, text: str) -> List[float]:
+    def _request_embeddings(self, inputs: List[str]) -> List[List[float]]:
+        """Call the embeddings API with retry logic."""
+        return self._create_embeddings(inputs)
+    
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=2, max=10),
+        before_sleep=count_retry("embedding")
+    )
+    async def _arequest_embedding(self, text: str) -> List[float]:
         """
-        Generate embedding for a single text.
+        Call the embeddings API asynchronously with retry logic.
         
         Args:
             text: Text to embed
@@ -33,7 +96,7 @@ class EmbeddingService:
         Returns:
             Embedding vector
         """
-        response = self.client.embeddings.create(
+        response = await self.async_client.embeddings.create(
             model=self.model,
             input=text,
             extra_headers={
@@ -43,45 +106,100 @@ class EmbeddingService:
         )
         return response.data[0].embedding
     
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10)
-    )
-    def generate_embeddings_batch(self, texts: List[str], batch_size: int = 20) -> List[List[float]]:
+    def generate_embedding(self, text: str) -> List[float]:
         """
-        Generate embeddings for multiple texts in batches.
+        Generate embedding for a single text.
         
         Args:
-            texts: List of texts to embed
-            batch_size: Number of texts per API call (reduced for free tier)
+            text: Text to embed
             
         Returns:
-            List of embedding vectors
+            Embedding vector
+        """
+        if self.cache is not None:
+            cached = self.cache.get(self.model, text)
+            if cached is not None:
+                return cached
+        
+        embedding = self._request_embeddings([text])[0]
+        
+        if self.cache is not None:
+            self.cache.put(self.model, text, embedding)
+        return embedding
+    
+    async def agenerate_embedding(self, text: str) -> List[float]:
         """
-        all_embeddings = []
+        Generate embedding for a single text without blocking the event loop.
         
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i + batch_size]
+        Args:
+            text: Text to embed
             
-            response = self.client.embeddings.create(
-                model=self.model,
-                input=batch,
-                extra_headers={
-                    "HTTP-Referer": "http://localhost:3000",
-                    "X-Title": "RAG Chatbot"
-                }
-            )
+        Returns:
+            Embedding vector
+        """
+        # The cache reads and writes SQLite, so it runs in a worker thread
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self.cache.get, self.model, text)
+            if cached is not None:
+                return cached
+        
+        embedding = await self._arequest_embedding(text)
+        
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.put, self.model, text, embedding)
+        return embedding
+    
+    def generate_embeddings_batch(self, texts: List[str], batch_size: int = None) -> List[List[float]]:
+        """
+        Generate embeddings for multiple texts in concurrent batches.
+        
+        Only cache misses are sent upstream; batches are sized by token budget,
+        retried independently, and merged back in input order.
+        
+        Args:
+            texts: List of texts to embed
+            batch_size: Maximum number of texts per API call (default from settings)
             
-            # Extract embeddings in order
-            batch_embeddings = [item.embedding for item in response.data]
-            all_embeddings.extend(batch_embeddings)
+        Returns:
+            List of embedding vectors
+        """
+        if self.cache is not None:
+            all_embeddings = self.cache.get_many(self.model, texts)
+        else:
+            all_embeddings = [None] * len(texts)
+        
+        # Group positions of missing texts so duplicates are embedded once
+        missing = {}
+        for i, embedding in enumerate(all_embeddings):
+            if embedding is None:
+                missing.setdefault(texts[i], []).append(i)
+        missing_texts = list(missing)
+        
+        # Persist each batch as it completes so a later failure keeps the work done
+        on_batch = None
+        if self.cache is not None:
+            on_batch = lambda batch, embeddings: self.cache.put_many(self.model, batch, embeddings)
+        
+        missing_embeddings = self.batch_embedder.embed(
+            missing_texts,
+            max_batch_size=batch_size,
+            on_batch=on_batch
+        )
+        
+        for text, embedding in zip(missing_texts, missing_embeddings):
+            for position in missing[text]:
+                all_embeddings[position] = embedding
         
         return all_embeddings
     
     def get_embedding_info(self) -> dict:
         """Get information about the embedding model."""
-        return {
+        info = {
             'model': self.model,
             'dimension': self.dimension,
             'provider': 'OpenRouter (Free)'
         }
+        if self.cache is not None:
+            info['cache'] = self.cache.get_stats()
+        info['batching'] = self.batch_embedder.get_stats()
+        return info
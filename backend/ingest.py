@@ -0,0 +1,83 @@
+"""Bulk ingestion of a directory of documents from the command line."""
+
+import argparse
+from pathlib import Path
+
+from config import settings
+from document_processor import DocumentProcessor
+from embeddings import EmbeddingService
+from manifest import DocumentDiff, DocumentManifest, file_fingerprint
+from vector_store import VectorStore, create_vector_store
+
+
+def ingest_directory(directory: str, recursive: bool = False, workers: int = None) -> int:
+    """
+    Extract, chunk, embed and store every supported file in a directory.
+    
+    Files are extracted and chunked in parallel worker processes; each file
+    is embedded and stored as soon as its chunks are ready. With incremental
+    indexing, files indexed before are diffed against their manifest so only
+    changed chunks are embedded.
+    
+    Args:
+        directory: Directory to ingest
+        recursive: Whether to include subdirectories
+        workers: Number of worker processes (default from settings)
+        
+    Returns:
+        Number of files that failed
+    """
+    processor = DocumentProcessor(extraction_workers=workers)
+    embedding_service = EmbeddingService()
+    vector_store = create_vector_store()
+    manifest = None
+    if settings.incremental_indexing_enabled:
+        manifest = DocumentManifest()
+        VectorStore.add_change_listener(manifest.invalidate_sources)
+    failures = 0
+    
+    try:
+        for file_path, chunks, _, error in processor.process_directory(directory, recursive):
+            if error is not None:
+                failures += 1
+                print(f"FAILED  {file_path}: {error}")
+                continue
+            
+            if manifest is None:
+                changed, num_deleted = chunks, 0
+            else:
+                source = Path(file_path).name
+                fingerprint = file_fingerprint(file_path, processor.chunk_size, processor.chunk_overlap)
+                previous = manifest.chunks(source)
+                if previous and fingerprint == manifest.fingerprint(source):
+                    print(f"SKIPPED {file_path}: unchanged")
+                    continue
+                
+                diff = DocumentDiff(previous, () if previous else vector_store.get_document_chunk_ids(source))
+                changed = diff.changed(chunks)
+            
+            if changed:
+                embeddings = embedding_service.generate_embeddings_batch([chunk.text for chunk in changed])
+                vector_store.upsert_chunks(changed, embeddings)
+            if manifest is not None:
+                stale_ids = diff.stale_ids()
+                num_deleted = vector_store.delete_chunks(stale_ids) if stale_ids else 0
+                manifest.record(source, fingerprint, diff.current)
+            print(f"OK      {file_path}: {len(chunks)} chunks ({len(changed)} embedded, {num_deleted} removed)")
+    finally:
+        processor.close()
+        if manifest is not None:
+            VectorStore.remove_change_listener(manifest.invalidate_sources)
+            manifest.close()
+    
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index every PDF/DOCX/TXT file in a directory.")
+    parser.add_argument("directory", help="Directory containing documents")
+    parser.add_argument("-r", "--recursive", action="store_true", help="Include subdirectories")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Worker processes (default: one per CPU)")
+    args = parser.parse_args()
+    
+    raise SystemExit(1 if ingest_directory(args.directory, args.recursive, args.workers) else 0)
@@ -0,0 +1,412 @@
+"""IVF-PQ approximate nearest neighbour index implemented with NumPy."""
+
+import os
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+# Rows processed per distance computation when assigning to centroids
+ASSIGN_BLOCK_ROWS = 8192
+
+
+def nearest_centroids(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the nearest centroid (Euclidean) for each row, computed in blocks."""
+    centroid_norms = (centroids ** 2).sum(axis=1)
+    nearest = np.empty(len(vectors), dtype=np.int32)
+    
+    for start in range(0, len(vectors), ASSIGN_BLOCK_ROWS):
+        block = vectors[start:start + ASSIGN_BLOCK_ROWS]
+        # ||x - c||^2 up to the constant ||x||^2
+        distances = centroid_norms - 2 * block @ centroids.T
+        nearest[start:start + len(block)] = np.argmin(distances, axis=1)
+    
+    return nearest
+
+
+def kmeans(vectors: np.ndarray, k: int, iterations: int = 20, seed: int = 0) -> np.ndarray:
+    """
+    Lloyd's k-means with random initial centroids.
+    
+    Args:
+        vectors: Training rows (float32)
+        k: Number of centroids (at most the number of rows)
+        iterations: Number of assignment/update rounds
+        seed: Random seed for the initial centroids
+    
+    Returns:
+        Centroid matrix of shape (k, dimension)
+    """
+    rng = np.random.default_rng(seed)
+    k = min(k, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), k, replace=False)].copy()
+    
+    for _ in range(iterations):
+        assignments = nearest_centroids(vectors, centroids)
+        counts = np.bincount(assignments, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        
+        # Empty clusters keep their previous centroid
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+    
+    return centroids
+
+
+class IVFPQIndex:
+    """
+    Inverted-file index with product-quantized residuals.
+    
+    A k-means coarse quantizer splits vectors into ``nlist`` lists; each
+    vector's residual from its list centroid is encoded as ``num_subvectors``
+    one-byte product-quantizer codes. A query scans the ``nprobe`` closest
+    lists with lookup-table (ADC) inner products and re-ranks the best
+    ``rerank_candidates`` exactly against the original vectors.
+    
+    The trained model is saved to ``ivfpq_model.npz`` and codes are appended
+    to ``ivfpq_codes.bin``, so new vectors are added without a rebuild.
+    Re-encoded and removed rows leave dead records in the log; it is
+    rewritten with one record per encoded row once most records are dead.
+    Vectors are expected to be L2-normalized.
+    """
+    
+    MODEL_FILE = "ivfpq_model.npz"
+    CODES_FILE = "ivfpq_codes.bin"
+    
+    # Codebook size per subvector (codes are one byte)
+    PQ_CENTROIDS = 256
+    # The code log is compacted when more than this fraction of it is dead
+    COMPACT_DEAD_FRACTION = 0.5
+    
+    def __init__(
+        self,
+        directory: str,
+        nlist: int,
+        num_subvectors: int,
+        nprobe: int,
+        rerank_candidates: int
+    ):
+        """
+        Open (or create) an index stored in a directory.
+        
+        Args:
+            directory: Directory holding the model and code files
+            nlist: Number of inverted lists (coarse centroids) to train
+            num_subvectors: Number of PQ subvectors; must divide the dimension
+            nprobe: Default number of lists scanned per query
+            rerank_candidates: Approximate candidates re-ranked exactly per query
+        """
+        self.directory = Path(directory)
+        self.nlist = nlist
+        self.num_subvectors = num_subvectors
+        self.nprobe = nprobe
+        self.rerank_candidates = rerank_candidates
+        
+        self._model_path = self.directory / self.MODEL_FILE
+        self._codes_path = self.directory / self.CODES_FILE
+        self._load()
+    
+    @property
+    def trained(self) -> bool:
+        """Whether the quantizers have been trained."""
+        return self.centroids is not None
+    
+    def _record_dtype(self) -> np.dtype:
+        """On-disk layout of one encoded row."""
+        return np.dtype([
+            ("row", "<i8"),
+            ("list", "<i4"),
+            ("codes", "u1", (self.codebooks.shape[0],))
+        ])
+    
+    def _reset_codes(self):
+        """Forget every encoded row."""
+        self._assignments = np.full(0, -1, dtype=np.int32)
+        self._codes = np.zeros((0, self.codebooks.shape[0] if self.trained else 0), dtype=np.uint8)
+        # (rows grouped by list, list offsets), set in one assignment so
+        # concurrent searches never see half of it
+        self._list_cache: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._log_records = 0
+    
+    def _load(self):
+        """Load the trained model and replay the code log."""
+        self.centroids: Optional[np.ndarray] = None
+        self.codebooks: Optional[np.ndarray] = None
+        
+        if self._model_path.exists():
+            with np.load(self._model_path) as model:
+                self.centroids = model["centroids"]
+                self.codebooks = model["codebooks"]
+        
+        self._reset_codes()
+        if not self.trained or not self._codes_path.exists():
+            return
+        
+        records = np.fromfile(self._codes_path, dtype=self._record_dtype())
+        if len(records):
+            # Later records for the same row win; removals are list -1
+            self._store(records["row"], records["list"], records["codes"])
+        self._log_records = len(records)
+        self._maybe_compact()
+    
+    def _store(self, rows: np.ndarray, assignments: np.ndarray, codes: np.ndarray):
+        """Record codes for rows in memory."""
+        needed = int(rows.max()) + 1
+        if needed > len(self._assignments):
+            capacity = max(needed, len(self._assignments) * 2)
+            grown_assignments = np.full(capacity, -1, dtype=np.int32)
+            grown_assignments[:len(self._assignments)] = self._assignments
+            grown_codes = np.zeros((capacity, codes.shape[1]), dtype=np.uint8)
+            grown_codes[:len(self._codes)] = self._codes
+            self._assignments, self._codes = grown_assignments, grown_codes
+        
+        self._assignments[rows] = assignments
+        self._codes[rows] = codes
+        self._list_cache = None
+    
+    def train(self, vectors: np.ndarray, seed: int = 0):
+        """
+        Train the coarse quantizer and PQ codebooks, discarding existing codes.
+        
+        Args:
+            vectors: Normalized training vectors
+            seed: Random seed for k-means initialisation
+        """
+        self.install(*self.fit(vectors, seed=seed))
+    
+    def fit(self, vectors: np.ndarray, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Train a coarse quantizer and PQ codebooks without changing the index.
+        
+        Args:
+            vectors: Normalized training vectors
+            seed: Random seed for k-means initialisation
+        
+        Returns:
+            Tuple of (centroids, codebooks) for ``encode`` and ``install``
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        dimension = vectors.shape[1]
+        if dimension % self.num_subvectors:
+            raise ValueError(
+                f"Dimension {dimension} is not divisible by {self.num_subvectors} PQ subvectors"
+            )
+        
+        centroids = kmeans(vectors, self.nlist, seed=seed)
+        residuals = vectors - centroids[nearest_centroids(vectors, centroids)]
+        
+        sub_dim = dimension // self.num_subvectors
+        codebooks = np.zeros((self.num_subvectors, self.PQ_CENTROIDS, sub_dim), dtype=np.float32)
+        for j in range(self.num_subvectors):
+            trained = kmeans(residuals[:, j * sub_dim:(j + 1) * sub_dim], self.PQ_CENTROIDS, seed=seed + j + 1)
+            codebooks[j, :len(trained)] = trained
+        
+        return centroids, codebooks
+    
+    def install(
+        self,
+        centroids: np.ndarray,
+        codebooks: np.ndarray,
+        rows: Optional[np.ndarray] = None,
+        assignments: Optional[np.ndarray] = None,
+        codes: Optional[np.ndarray] = None
+    ):
+        """
+        Swap in a model from ``fit``, replacing every existing code.
+        
+        Args:
+            centroids: Coarse centroids
+            codebooks: PQ codebooks
+            rows: Optional rows already encoded with this model
+            assignments: List assignments aligned with ``rows``
+            codes: PQ codes aligned with ``rows``
+        """
+        self.centroids, self.codebooks = centroids, codebooks
+        
+        tmp_path = self._model_path.with_suffix(".tmp.npz")
+        np.savez(tmp_path, centroids=centroids, codebooks=codebooks)
+        os.replace(tmp_path, self._model_path)
+        
+        self._reset_codes()
+        if rows is not None and len(rows):
+            self._store(np.asarray(rows, dtype=np.int64), assignments, codes)
+        self.compact()
+    
+    def encode(
+        self,
+        vectors: np.ndarray,
+        model: Optional[Tuple[np.ndarray, np.ndarray]] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Assign vectors to lists and PQ-encode their residuals.
+        
+        Args:
+            vectors: Normalized vectors
+            model: Optional (centroids, codebooks) from ``fit`` to encode with
+                instead of the installed model
+        
+        Returns:
+            Tuple of (list assignments, codes of shape (n, num_subvectors))
+        """
+        centroids, codebooks = model or (self.centroids, self.codebooks)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        assignments = nearest_centroids(vectors, centroids)
+        residuals = vectors - centroids[assignments]
+        
+        num_subvectors, _, sub_dim = codebooks.shape
+        codes = np.empty((len(vectors), num_subvectors), dtype=np.uint8)
+        for j in range(num_subvectors):
+            codes[:, j] = nearest_centroids(residuals[:, j * sub_dim:(j + 1) * sub_dim], codebooks[j])
+        
+        return assignments, codes
+    
+    def add(self, rows: np.ndarray, vectors: np.ndarray):
+        """
+        Encode and add (or re-encode) vectors for the given row numbers.
+        
+        Args:
+            rows: Row numbers of the vectors in the backing matrix
+            vectors: Normalized vectors aligned with ``rows``
+        """
+        if len(rows) == 0:
+            return
+        
+        rows = np.asarray(rows, dtype=np.int64)
+        assignments, codes = self.encode(vectors)
+        self._append(rows, assignments, codes)
+    
+    def remove(self, rows: np.ndarray):
+        """
+        Drop the codes of deleted rows so searches no longer scan them.
+        
+        Args:
+            rows: Row numbers to forget
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        rows = rows[rows < len(self._assignments)]
+        rows = rows[self._assignments[rows] >= 0]
+        if len(rows) == 0:
+            return
+        
+        self._append(
+            rows,
+            np.full(len(rows), -1, dtype=np.int32),
+            np.zeros((len(rows), self.codebooks.shape[0]), dtype=np.uint8)
+        )
+    
+    def _append(self, rows: np.ndarray, assignments: np.ndarray, codes: np.ndarray):
+        """Log codes for rows (list -1 marks a removal) and record them in memory."""
+        records = np.empty(len(rows), dtype=self._record_dtype())
+        records["row"], records["list"], records["codes"] = rows, assignments, codes
+        with open(self._codes_path, "ab") as f:
+            records.tofile(f)
+        self._log_records += len(records)
+        
+        self._store(rows, assignments, codes)
+        self._maybe_compact()
+    
+    def _maybe_compact(self):
+        """Rewrite the code log once most of its records are dead."""
+        live = int(np.count_nonzero(self._assignments >= 0))
+        if self._log_records - live > self.COMPACT_DEAD_FRACTION * self._log_records:
+            self.compact()
+    
+    def compact(self):
+        """Rewrite the code log with one record per encoded row."""
+        rows = np.flatnonzero(self._assignments >= 0)
+        records = np.empty(len(rows), dtype=self._record_dtype())
+        records["row"], records["list"], records["codes"] = rows, self._assignments[rows], self._codes[rows]
+        
+        tmp_path = self._codes_path.with_suffix(".bin.tmp")
+        records.tofile(tmp_path)
+        os.replace(tmp_path, self._codes_path)
+        self._log_records = len(records)
+    
+    def renumber(self, rows: np.ndarray):
+        """
+        Keep only the codes of ``rows``, renumbered 0..n-1 in that order.
+        
+        Args:
+            rows: Old row numbers, in their new order (the store's live rows
+                when it compacts)
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        encoded = rows < len(self._assignments)
+        assignments = np.full(len(rows), -1, dtype=np.int32)
+        codes = np.zeros((len(rows), self.codebooks.shape[0]), dtype=np.uint8)
+        assignments[encoded] = self._assignments[rows[encoded]]
+        codes[encoded] = self._codes[rows[encoded]]
+        
+        self._reset_codes()
+        if len(rows):
+            self._store(np.arange(len(rows)), assignments, codes)
+        self.compact()
+    
+    def _lists(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows grouped by list, and the start offset of each list."""
+        cache = self._list_cache
+        if cache is None:
+            order = np.argsort(self._assignments, kind="stable")
+            bounds = np.searchsorted(self._assignments[order], np.arange(len(self.centroids) + 1))
+            cache = self._list_cache = (order, bounds)
+        return cache
+    
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int,
+        matrix: np.ndarray,
+        mask: np.ndarray,
+        nprobe: int = None
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Approximate top-k inner-product search with exact re-ranking.
+        
+        Args:
+            queries: Normalized query vectors, shape (nq, dimension)
+            k: Number of results per query
+            matrix: Original vectors, indexed by row (may be memory-mapped)
+            mask: Boolean mask of rows allowed in the results
+            nprobe: Lists scanned per query (default: the index setting)
+        
+        Returns:
+            Per query, a tuple of (rows, exact scores) sorted by score
+        """
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        order, bounds = self._lists()
+        coarse = queries @ self.centroids.T
+        
+        num_subvectors, _, sub_dim = self.codebooks.shape
+        subspaces = np.arange(num_subvectors)
+        
+        results = []
+        for q, query in enumerate(queries):
+            probe = np.argpartition(-coarse[q], nprobe - 1)[:nprobe]
+            rows = np.concatenate([order[bounds[l]:bounds[l + 1]] for l in probe])
+            rows = rows[rows < len(mask)]
+            rows = rows[mask[rows]]
+            if len(rows) == 0:
+                results.append((rows, np.zeros(0, dtype=np.float32)))
+                continue
+            
+            # ADC: q.x ~= q.centroid + sum over subvectors of q_j.codeword_j
+            table = np.einsum("md,mkd->mk", query.reshape(num_subvectors, sub_dim), self.codebooks)
+            approx = coarse[q, self._assignments[rows]] + table[subspaces, self._codes[rows]].sum(axis=1)
+            
+            shortlist = min(len(rows), max(k, self.rerank_candidates))
+            candidates = np.sort(rows[np.argpartition(-approx, shortlist - 1)[:shortlist]])
+            
+            exact = matrix[candidates].astype(np.float32, copy=False) @ query
+            top = np.argsort(-exact, kind="stable")[:k]
+            results.append((candidates[top], exact[top]))
+        
+        return results
+    
+    def reset(self):
+        """Delete the trained model and all codes."""
+        for path in (self._model_path, self._codes_path):
+            if path.exists():
+                path.unlink()
+        self._load()
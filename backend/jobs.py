@@ -0,0 +1,822 @@
+"""Background ingestion job queue with on-disk job state."""
+
+import io
+import os
+import queue
+import re
+import shutil
+import tarfile
+import threading
+import time
+import uuid
+import zipfile
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar, Union
+
+from archives import iter_upload_documents
+from config import settings
+from document_processor import DocumentProcessor
+from embeddings import EmbeddingService
+from metrics import INGEST_STAGE_SECONDS, INGEST_THROUGHPUT, INGESTED_CHUNKS
+from manifest import DocumentDiff, DocumentManifest, bytes_fingerprint, file_fingerprint
+from models import DocumentChunk, DocumentUploadResponse, FileIngestionResult, IngestionJob
+from tenants import TenantRegistry
+from vector_store import VectorStore
+
+
+T = TypeVar("T")
+
+# Stored uploads are named after their job id: "<uuid><suffix>" files and
+# "<uuid>" directories of bulk parts
+UPLOAD_NAME_PATTERN = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}(\.\w+)?")
+
+
+class QueueFullError(Exception):
+    """Raised when the ingestion queue has reached its maximum depth."""
+
+
+def iter_batches(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    """Group an iterable into lists of at most ``size`` items."""
+    batch: List[T] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def prefetch(items: Iterable[T], depth: int) -> Iterator[T]:
+    """
+    Iterate ``items`` on a background thread, staying up to ``depth`` ahead.
+    
+    The producer blocks once ``depth`` items are waiting, which bounds memory.
+    Exceptions raised by the producer are re-raised to the consumer, and
+    closing the returned generator stops the producer.
+    
+    Args:
+        items: Iterable to consume in the background
+        depth: Maximum number of items buffered ahead of the consumer
+        
+    Yields:
+        Items of ``items`` in order
+    """
+    buffer: "queue.Queue" = queue.Queue(maxsize=depth)
+    stopped = threading.Event()
+    done = object()
+    
+    def put(entry) -> bool:
+        while not stopped.is_set():
+            try:
+                buffer.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def produce():
+        try:
+            for item in items:
+                if not put((item, None)):
+                    return
+            put((done, None))
+        except BaseException as e:
+            put((done, e))
+    
+    producer = threading.Thread(target=produce, name="ingest-prefetch", daemon=True)
+    producer.start()
+    
+    try:
+        while True:
+            item, error = buffer.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stopped.set()
+        producer.join()
+
+
+class IngestionJobQueue:
+    """
+    Runs the extract → chunk → embed → store pipeline on a worker pool.
+    
+    Documents are streamed page by page into fixed-size chunk batches, so
+    memory stays bounded and embedding starts before extraction finishes.
+    
+    With incremental indexing, a re-upload is diffed against the document's
+    manifest: only new or moved chunks are embedded and stored, chunks the
+    new version dropped are deleted, and an identical file is skipped
+    without being extracted.
+    
+    Each job's state is written to ``jobs_directory`` as JSON and its upload
+    is kept in ``upload_directory`` until the job finishes, so queued and
+    interrupted jobs are picked up again after a restart. Small uploads may
+    instead be handed over in memory; they skip the disk entirely but are
+    lost (and their jobs failed) on restart. Uploads left behind by a crash
+    are removed on startup.
+    
+    Jobs of the default tenant go to ``vector_store``; other tenants' jobs
+    lease their tenant's store and manifests from ``tenants``.
+    
+    Bulk jobs index many documents (several files and zip/tar archives) at
+    once: archives are decompressed one member at a time, documents are
+    extracted in parallel, and their chunks are merged into large embed and
+    store batches. Each document gets its own result in ``job.files``.
+    
+    Finished jobs are forgotten, and their state files deleted, once they
+    are older than ``job_retention_seconds`` or more than
+    ``max_finished_jobs`` newer jobs have finished.
+    """
+    
+    FINISHED_STATUSES = {"completed", "failed"}
+    
+    def __init__(
+        self,
+        processor: DocumentProcessor,
+        embedding_service: EmbeddingService,
+        vector_store: VectorStore,
+        jobs_dir: str = None,
+        upload_dir: str = None,
+        max_concurrent_jobs: int = None,
+        max_queue_depth: int = None,
+        ingest_batch_size: int = None,
+        ingest_prefetch_batches: int = None,
+        manifest_path: str = None,
+        tenants: Optional[TenantRegistry] = None,
+        bulk_batch_size: int = None,
+        bulk_max_documents: int = None,
+        bulk_max_document_bytes: int = None,
+        job_retention_seconds: int = None,
+        max_finished_jobs: int = None
+    ):
+        """
+        Initialize the job queue.
+        
+        Args:
+            processor: Document processor used for extraction and chunking
+            embedding_service: Service used to embed chunks
+            vector_store: Store that receives the chunks
+            jobs_dir: Directory for job state files (default from settings)
+            upload_dir: Directory holding uploads awaiting processing (default from settings)
+            max_concurrent_jobs: Number of worker threads (default from settings)
+            max_queue_depth: Maximum number of queued jobs (default from settings)
+            ingest_batch_size: Chunks embedded and stored per pipeline batch (default from settings)
+            ingest_prefetch_batches: Chunk batches prepared ahead of embedding (default from settings)
+            manifest_path: SQLite file of document manifests (default from settings)
+            tenants: Registry opening other tenants' stores (None accepts
+                only default-tenant jobs)
+            bulk_batch_size: Chunks embedded and stored per merged batch of a bulk job (default from settings)
+            bulk_max_documents: Documents accepted per bulk job (default from settings)
+            bulk_max_document_bytes: Largest document of a bulk job (default from settings)
+            job_retention_seconds: Age at which finished jobs are forgotten, 0 for
+                never (default from settings)
+            max_finished_jobs: Finished jobs remembered, 0 for no limit (default from settings)
+        """
+        self.processor = processor
+        self.embedding_service = embedding_service
+        self.vector_store = vector_store
+        self.tenants = tenants
+        self.jobs_dir = Path(jobs_dir or settings.jobs_directory)
+        self.upload_dir = Path(upload_dir or settings.upload_directory)
+        self.max_concurrent_jobs = max_concurrent_jobs or settings.max_concurrent_jobs
+        self.max_queue_depth = max_queue_depth or settings.max_queue_depth
+        self.ingest_batch_size = ingest_batch_size or settings.ingest_batch_size
+        self.ingest_prefetch_batches = ingest_prefetch_batches or settings.ingest_prefetch_batches
+        self.bulk_batch_size = bulk_batch_size or settings.bulk_batch_size
+        self.bulk_max_documents = bulk_max_documents or settings.bulk_max_documents
+        self.bulk_max_document_bytes = bulk_max_document_bytes or settings.bulk_max_document_bytes
+        self.job_retention_seconds = (
+            job_retention_seconds if job_retention_seconds is not None
+            else settings.job_retention_seconds
+        )
+        self.max_finished_jobs = (
+            max_finished_jobs if max_finished_jobs is not None
+            else settings.max_finished_jobs
+        )
+        
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        self.upload_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Manifests are dropped whenever their document changes outside a job
+        self.manifest: Optional[DocumentManifest] = None
+        if settings.incremental_indexing_enabled:
+            self.manifest = DocumentManifest(manifest_path)
+            VectorStore.add_change_listener(self.manifest.invalidate_sources)
+        
+        self._jobs: Dict[str, IngestionJob] = {}
+        # Finish time of each finished job, oldest first, for pruning
+        self._finished: "OrderedDict[str, datetime]" = OrderedDict()
+        # Jobs waiting for a worker
+        self._queued = 0
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._workers: List[threading.Thread] = []
+        # Contents of uploads handed over in memory, by job id
+        self._payloads: Dict[str, bytes] = {}
+    
+    def upload_path(self, job_id: str, filename: str) -> Path:
+        """Location of the stored upload for a job."""
+        return self.upload_dir / f"{job_id}{Path(filename).suffix.lower()}"
+    
+    def bulk_upload_dir(self, job_id: str) -> Path:
+        """Directory holding the stored parts of a bulk job."""
+        return self.upload_dir / job_id
+    
+    def bulk_part_path(self, job_id: str, index: int, filename: str) -> Path:
+        """
+        Location of one stored part of a bulk upload.
+        
+        Parts are numbered so they are processed in upload order and
+        keep their original filename after the number.
+        """
+        return self.bulk_upload_dir(job_id) / f"{index:04d}_{Path(filename).name}"
+    
+    def _upload_location(self, job: IngestionJob) -> Path:
+        """Stored upload of a job: its file, or the directory of a bulk job's parts."""
+        if job.bulk:
+            return self.bulk_upload_dir(job.job_id)
+        return self.upload_path(job.job_id, job.filename)
+    
+    def start(self):
+        """Reload persisted jobs and start the worker threads."""
+        if self._workers:
+            return
+        
+        self._recover()
+        self.sweep_uploads()
+        
+        for i in range(self.max_concurrent_jobs):
+            worker = threading.Thread(target=self._worker, name=f"ingest-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+    
+    def stop(self):
+        """Signal the workers to exit after their current job."""
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join(timeout=5)
+        self._workers = []
+    
+    def close(self):
+        """Stop the workers, unsubscribe and close the manifest."""
+        self.stop()
+        if self.manifest is not None:
+            VectorStore.remove_change_listener(self.manifest.invalidate_sources)
+            self.manifest.close()
+    
+    def new_job_id(self) -> str:
+        """Allocate an id for a job about to be submitted."""
+        return str(uuid.uuid4())
+    
+    def submit(
+        self,
+        job_id: str,
+        filename: str,
+        tenant_id: Optional[str] = None,
+        bulk: bool = False,
+        data: Optional[bytes] = None
+    ) -> IngestionJob:
+        """
+        Queue an uploaded file for ingestion.
+        
+        The file must already be stored at ``upload_path(job_id, filename)``;
+        for a bulk job, its parts at ``bulk_part_path(job_id, ...)``. Or its
+        contents are passed as ``data`` and indexed from memory.
+        
+        Args:
+            job_id: Id from ``new_job_id``
+            filename: Original filename, used as the chunk source (for bulk
+                jobs only a label; documents are indexed under their own names)
+            tenant_id: Tenant whose store receives the chunks (None for the default tenant)
+            bulk: Whether the upload is a set of files and archives
+            data: Contents of the upload, when it is not stored on disk
+            
+        Returns:
+            The queued job
+            
+        Raises:
+            QueueFullError: If the queue is at its maximum depth
+        """
+        with self._lock:
+            if self.queued_count() >= self.max_queue_depth:
+                raise QueueFullError(
+                    f"Ingestion queue is full ({self.max_queue_depth} jobs). Try again later."
+                )
+            
+            job = IngestionJob(job_id=job_id, filename=filename, tenant_id=tenant_id, bulk=bulk)
+            self._jobs[job_id] = job
+            if data is not None:
+                self._payloads[job_id] = data
+            self._persist(job)
+            self._queued += 1
+        
+        self._queue.put(job_id)
+        return job
+    
+    def queued_count(self) -> int:
+        """Number of jobs waiting for a worker."""
+        return self._queued
+    
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        """Get a job by id, or None if unknown or expired."""
+        with self._lock:
+            self._prune()
+            job = self._jobs.get(job_id)
+            # Deep, so a bulk job's file results are not shared with the worker
+            return job.model_copy(deep=True) if job else None
+    
+    def _recover(self):
+        """Load job state from disk and re-queue unfinished jobs."""
+        for path in sorted(self.jobs_dir.glob("*.json")):
+            try:
+                job = IngestionJob.model_validate_json(path.read_text(encoding="utf-8"))
+            except ValueError:
+                continue
+            # Jobs still in memory (a restart after stop) are already queued
+            if job.job_id in self._jobs:
+                continue
+            
+            self._jobs[job.job_id] = job
+            if job.status in self.FINISHED_STATUSES:
+                continue
+            
+            if not self._upload_location(job).exists():
+                self._update(job, status="failed", stage=None, error="Upload was lost before processing")
+                continue
+            
+            # Interrupted jobs restart from the beginning
+            self._update(job, status="queued", stage=None)
+            with self._lock:
+                self._queued += 1
+            self._queue.put(job.job_id)
+        
+        with self._lock:
+            finished = sorted(
+                (job for job in self._jobs.values() if job.status in self.FINISHED_STATUSES),
+                key=lambda job: job.updated_at
+            )
+            self._finished = OrderedDict((job.job_id, job.updated_at) for job in finished)
+            self._prune()
+    
+    def _prune(self):
+        """Forget expired finished jobs and delete their state files. Caller holds the lock."""
+        cutoff = None
+        if self.job_retention_seconds:
+            cutoff = datetime.now() - timedelta(seconds=self.job_retention_seconds)
+        
+        while self._finished:
+            job_id, finished_at = next(iter(self._finished.items()))
+            over_limit = self.max_finished_jobs and len(self._finished) > self.max_finished_jobs
+            if not over_limit and (cutoff is None or finished_at >= cutoff):
+                break
+            del self._finished[job_id]
+            self._jobs.pop(job_id, None)
+            (self.jobs_dir / f"{job_id}.json").unlink(missing_ok=True)
+    
+    def sweep_uploads(self) -> int:
+        """
+        Remove stored uploads and partial job state that no job will read.
+        
+        Uploads of finished or unknown jobs are left behind when the server
+        stops between storing an upload and submitting it, or while a job
+        runs. Only entries named like stored uploads are touched.
+        
+        Returns:
+            Number of uploads removed
+        """
+        with self._lock:
+            keep = {
+                self._upload_location(job).name
+                for job in self._jobs.values()
+                if job.status not in self.FINISHED_STATUSES
+            }
+        
+        removed = 0
+        for path in self.upload_dir.iterdir():
+            if path.name in keep or not UPLOAD_NAME_PATTERN.fullmatch(path.name):
+                continue
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink(missing_ok=True)
+            removed += 1
+        for path in self.jobs_dir.glob("*.json.tmp"):
+            path.unlink(missing_ok=True)
+        return removed
+    
+    def _persist(self, job: IngestionJob):
+        """Atomically write a job's state file. Caller holds the lock or owns the job."""
+        path = self.jobs_dir / f"{job.job_id}.json"
+        tmp_path = path.with_suffix(".json.tmp")
+        tmp_path.write_text(job.model_dump_json(), encoding="utf-8")
+        os.replace(tmp_path, path)
+    
+    def _update(self, job: IngestionJob, **changes):
+        """Apply changes to a job and persist them."""
+        with self._lock:
+            for field, value in changes.items():
+                setattr(job, field, value)
+            job.updated_at = datetime.now()
+            self._persist(job)
+            if changes.get("status") in self.FINISHED_STATUSES:
+                self._finished[job.job_id] = job.updated_at
+                self._finished.move_to_end(job.job_id)
+                self._prune()
+    
+    def _worker(self):
+        """Worker loop: process queued jobs until told to stop."""
+        while True:
+            job_id = self._queue.get()
+            if job_id is None:
+                return
+            
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None or job.status != "queued":
+                    continue
+                self._queued -= 1
+            self._run(job)
+    
+    @contextmanager
+    def _tenant_store(
+        self,
+        tenant_id: Optional[str]
+    ) -> Iterator[Tuple[VectorStore, Optional[DocumentManifest]]]:
+        """Store and manifests receiving a tenant's jobs, leased while in use."""
+        if tenant_id is None:
+            yield self.vector_store, self.manifest
+            return
+        if self.tenants is None:
+            raise ValueError(f"Cannot index for tenant '{tenant_id}': tenants are not enabled")
+        with self.tenants.lease(tenant_id) as tenant:
+            yield tenant.vector_store, tenant.manifest
+    
+    def _run(self, job: IngestionJob):
+        """Run one job in its tenant's store and remove its upload."""
+        file_path = self._upload_location(job)
+        data = self._payloads.pop(job.job_id, None)
+        try:
+            with self._tenant_store(job.tenant_id) as (vector_store, manifest):
+                if job.bulk:
+                    self._index_bulk(job, file_path, vector_store, manifest)
+                else:
+                    self._index(job, file_path if data is None else data, vector_store, manifest)
+        except Exception as e:
+            # The pipeline marks the job running first, so a queued job failed to start
+            action = "Error opening tenant store" if job.status == "queued" else "Error processing upload"
+            self._update(job, status="failed", error=self._error_message(job, e, action))
+        finally:
+            # Clean up the stored upload once the job is finished
+            if file_path.is_dir():
+                shutil.rmtree(file_path, ignore_errors=True)
+            elif file_path.exists():
+                file_path.unlink()
+    
+    def _index(
+        self,
+        job: IngestionJob,
+        upload: Union[Path, bytes],
+        vector_store: VectorStore,
+        manifest: Optional[DocumentManifest]
+    ):
+        """Run the ingestion pipeline for one job's stored or in-memory upload, recording progress."""
+        stored_ids: List[str] = []
+        added_ids: List[str] = []
+        started = time.perf_counter()
+        
+        try:
+            self._update(
+                job, status="running", stage="extract",
+                num_chunks=0, chunks_embedded=0, chunks_stored=0,
+                chunks_skipped=0, chunks_deleted=0
+            )
+            
+            diff = None
+            if manifest is not None:
+                if isinstance(upload, bytes):
+                    fingerprint = bytes_fingerprint(
+                        upload, self.processor.chunk_size, self.processor.chunk_overlap
+                    )
+                else:
+                    fingerprint = file_fingerprint(
+                        str(upload), self.processor.chunk_size, self.processor.chunk_overlap
+                    )
+                previous = manifest.chunks(job.filename)
+                if previous and fingerprint == manifest.fingerprint(job.filename):
+                    self._update(job, num_chunks=len(previous), chunks_skipped=len(previous))
+                    self._complete(job, len(previous), f"{job.filename} is unchanged; nothing to index")
+                    return
+                # Without a manifest, chunks stored by an older upload are found in the store
+                diff = DocumentDiff(
+                    previous,
+                    () if previous else vector_store.get_document_chunk_ids(job.filename)
+                )
+            
+            # Extraction and chunking run on a producer thread, a few batches
+            # ahead of embedding and storage, so the stages overlap
+            if isinstance(upload, bytes):
+                chunks = self.processor.iter_stream_chunks(io.BytesIO(upload), job.filename)
+            else:
+                chunks = self.processor.iter_document_chunks(str(upload), job.filename)
+            batches = prefetch(
+                iter_batches(chunks, self.ingest_batch_size),
+                self.ingest_prefetch_batches
+            )
+            
+            try:
+                # Time spent waiting on the producer is the extract stage
+                wait_start = time.perf_counter()
+                for batch in batches:
+                    INGEST_STAGE_SECONDS.observe(time.perf_counter() - wait_start, stage="extract")
+                    self._update(job, stage="embed", num_chunks=job.num_chunks + len(batch))
+                    if diff is not None:
+                        batch = diff.changed(batch)
+                        self._update(job, chunks_skipped=diff.skipped)
+                        if not batch:
+                            wait_start = time.perf_counter()
+                            continue
+                    
+                    with INGEST_STAGE_SECONDS.time(stage="embed"):
+                        embeddings = self.embedding_service.generate_embeddings_batch(
+                            [chunk.text for chunk in batch]
+                        )
+                    
+                    self._update(job, stage="store", chunks_embedded=job.chunks_embedded + len(batch))
+                    with INGEST_STAGE_SECONDS.time(stage="store"):
+                        vector_store.upsert_chunks(batch, embeddings)
+                    stored_ids.extend(chunk.chunk_id for chunk in batch)
+                    added_ids.extend(
+                        chunk.chunk_id for chunk in batch
+                        if diff is None or chunk.chunk_id not in diff.stored_ids
+                    )
+                    self._update(job, chunks_stored=len(stored_ids))
+                    wait_start = time.perf_counter()
+            finally:
+                batches.close()
+            
+            message = f"Successfully indexed {len(stored_ids)} chunks from {job.filename}"
+            if diff is not None:
+                stale_ids = diff.stale_ids()
+                if stale_ids:
+                    self._update(job, stage="store")
+                    self._update(job, chunks_deleted=vector_store.delete_chunks(stale_ids))
+                manifest.record(job.filename, fingerprint, diff.current)
+                message += f" ({job.chunks_skipped} unchanged, {job.chunks_deleted} removed)"
+            
+            INGESTED_CHUNKS.inc(len(stored_ids))
+            if stored_ids:
+                INGEST_THROUGHPUT.observe(len(stored_ids) / (time.perf_counter() - started))
+            self._complete(job, job.num_chunks, message)
+        
+        except ValueError as e:
+            self._discard(vector_store, added_ids)
+            self._update(job, status="failed", error=str(e))
+        except Exception as e:
+            self._discard(vector_store, added_ids)
+            self._update(job, status="failed", error=self._error_message(job, e, "Error processing document"))
+    
+    def _iter_bulk_documents(
+        self,
+        job: IngestionJob,
+        parts_dir: Path,
+        manifest: Optional[DocumentManifest],
+        found: Dict[str, Tuple[FileIngestionResult, Optional[str]]]
+    ) -> Iterator[Tuple[str, bytes]]:
+        """
+        Documents of a bulk job that need extracting, in upload order.
+        
+        Adds a result to ``job.files`` for every document found. Unsupported,
+        oversized and duplicate documents are marked failed, and documents
+        unchanged since they were last indexed are marked skipped; neither
+        is yielded. Yielded documents are added to ``found`` with their
+        result and fingerprint.
+        
+        Raises:
+            ValueError: If the upload holds more than ``bulk_max_documents`` documents
+        """
+        seen = set()
+        for part in sorted(parts_dir.iterdir()):
+            part_name = part.name.partition("_")[2]
+            try:
+                for name, data, error in iter_upload_documents(part, part_name, self.bulk_max_document_bytes):
+                    if len(job.files) >= self.bulk_max_documents:
+                        raise ValueError(f"Upload holds more than {self.bulk_max_documents} documents")
+                    
+                    result = FileIngestionResult(filename=name)
+                    if error is None:
+                        is_valid, message = self.processor.validate_file(name)
+                        if not is_valid:
+                            error = message
+                        elif name in seen:
+                            error = f"Duplicate filename {name} in upload"
+                    
+                    fingerprint = None
+                    if error is not None:
+                        result.status, result.error = "failed", error
+                    elif manifest is not None:
+                        fingerprint = bytes_fingerprint(
+                            data, self.processor.chunk_size, self.processor.chunk_overlap
+                        )
+                        previous = manifest.chunks(name)
+                        if previous and fingerprint == manifest.fingerprint(name):
+                            result.status = "skipped"
+                            result.num_chunks = result.chunks_skipped = len(previous)
+                    
+                    seen.add(name)
+                    with self._lock:
+                        job.files.append(result)
+                    if result.status == "queued":
+                        found[name] = (result, fingerprint)
+                        yield name, data
+            except (zipfile.BadZipFile, tarfile.TarError, EOFError) as e:
+                with self._lock:
+                    job.files.append(FileIngestionResult(
+                        filename=part_name, status="failed", error=f"Unreadable archive: {str(e)}"
+                    ))
+    
+    def _index_bulk(
+        self,
+        job: IngestionJob,
+        parts_dir: Path,
+        vector_store: VectorStore,
+        manifest: Optional[DocumentManifest]
+    ):
+        """
+        Run the ingestion pipeline for a bulk job, recording per-file results.
+        
+        Documents are extracted on the processor's pool a few at a time.
+        Changed chunks from all of them are merged into ``bulk_batch_size``
+        batches, each embedded in one call and stored in one upsert; a
+        document is finished (stale chunks deleted, manifest recorded) once
+        its last chunk is stored.
+        """
+        found: Dict[str, Tuple[FileIngestionResult, Optional[str]]] = {}
+        diffs: Dict[str, Optional[DocumentDiff]] = {}
+        # Chunks of each unfinished document still waiting to be stored,
+        # and the ids it added (removed again if the job fails)
+        remaining: Dict[str, int] = {}
+        added_ids: Dict[str, List[str]] = {}
+        pending: List[DocumentChunk] = []
+        started = time.perf_counter()
+        
+        def finish(name: str):
+            result, fingerprint = found[name]
+            diff = diffs.pop(name)
+            del remaining[name], added_ids[name]
+            if diff is not None:
+                stale_ids = diff.stale_ids()
+                if stale_ids:
+                    result.chunks_deleted = vector_store.delete_chunks(stale_ids)
+                manifest.record(name, fingerprint, diff.current)
+            result.status = "completed"
+            self._update(job, chunks_deleted=job.chunks_deleted + result.chunks_deleted)
+        
+        def flush(batch: List[DocumentChunk]):
+            self._update(job, stage="embed")
+            with INGEST_STAGE_SECONDS.time(stage="embed"):
+                embeddings = self.embedding_service.generate_embeddings_batch(
+                    [chunk.text for chunk in batch]
+                )
+            
+            self._update(job, stage="store", chunks_embedded=job.chunks_embedded + len(batch))
+            with INGEST_STAGE_SECONDS.time(stage="store"):
+                vector_store.upsert_chunks(batch, embeddings)
+            
+            for chunk in batch:
+                name = chunk.metadata.source
+                found[name][0].chunks_stored += 1
+                if diffs[name] is None or chunk.chunk_id not in diffs[name].stored_ids:
+                    added_ids[name].append(chunk.chunk_id)
+                remaining[name] -= 1
+            self._update(job, chunks_stored=job.chunks_stored + len(batch))
+            for name in [name for name, count in remaining.items() if count == 0]:
+                finish(name)
+        
+        try:
+            self._update(
+                job, status="running", stage="extract", files=[],
+                num_chunks=0, chunks_embedded=0, chunks_stored=0,
+                chunks_skipped=0, chunks_deleted=0
+            )
+            
+            # Reading the upload and extraction run on a producer thread,
+            # ahead of the merged batches being embedded and stored
+            documents = prefetch(
+                self.processor.process_documents(
+                    self._iter_bulk_documents(job, parts_dir, manifest, found)
+                ),
+                self.ingest_prefetch_batches
+            )
+            try:
+                wait_start = time.perf_counter()
+                for name, chunks, metadata, error in documents:
+                    INGEST_STAGE_SECONDS.observe(time.perf_counter() - wait_start, stage="extract")
+                    result = found[name][0]
+                    if error is not None:
+                        result.status, result.error = "failed", error
+                        wait_start = time.perf_counter()
+                        continue
+                    
+                    # Without a manifest, chunks stored by an older upload are found in the store
+                    diff = None
+                    if manifest is not None:
+                        previous = manifest.chunks(name)
+                        diff = DocumentDiff(
+                            previous,
+                            () if previous else vector_store.get_document_chunk_ids(name)
+                        )
+                        changed = diff.changed(chunks)
+                        result.chunks_skipped = diff.skipped
+                    else:
+                        changed = chunks
+                    result.num_chunks = len(chunks)
+                    diffs[name], remaining[name], added_ids[name] = diff, len(changed), []
+                    self._update(
+                        job,
+                        num_chunks=job.num_chunks + len(chunks),
+                        chunks_skipped=job.chunks_skipped + result.chunks_skipped
+                    )
+                    
+                    if not changed:
+                        finish(name)
+                    pending.extend(changed)
+                    while len(pending) >= self.bulk_batch_size:
+                        flush(pending[:self.bulk_batch_size])
+                        pending = pending[self.bulk_batch_size:]
+                    wait_start = time.perf_counter()
+            finally:
+                documents.close()
+            if pending:
+                flush(pending)
+            
+            if not job.files:
+                raise ValueError("No documents found in the upload")
+            
+            skipped = [result for result in job.files if result.status == "skipped"]
+            failed = [result for result in job.files if result.status == "failed"]
+            completed = len(job.files) - len(skipped) - len(failed)
+            self._update(
+                job,
+                num_chunks=job.num_chunks + sum(result.num_chunks for result in skipped),
+                chunks_skipped=job.chunks_skipped + sum(result.chunks_skipped for result in skipped)
+            )
+            
+            INGESTED_CHUNKS.inc(job.chunks_stored)
+            if job.chunks_stored:
+                INGEST_THROUGHPUT.observe(job.chunks_stored / (time.perf_counter() - started))
+            self._complete(
+                job,
+                job.num_chunks,
+                f"Indexed {completed} of {len(job.files)} documents from {job.filename} "
+                f"({len(skipped)} unchanged, {len(failed)} failed; "
+                f"{job.chunks_stored} chunks stored, {job.chunks_deleted} removed)"
+            )
+        
+        except Exception as e:
+            error = str(e) if isinstance(e, ValueError) else self._error_message(job, e, "Error processing documents")
+            # Unfinished documents are rolled back; finished ones stay indexed
+            for name, chunk_ids in added_ids.items():
+                self._discard(vector_store, chunk_ids)
+                found[name][0].chunks_stored = 0
+            for result in job.files:
+                if result.status == "queued":
+                    result.status, result.error = "failed", error
+            self._update(job, status="failed", error=error)
+    
+    @staticmethod
+    def _error_message(job: IngestionJob, error: Exception, action: str) -> str:
+        """Failure message naming the stage the job was in and the exception raised."""
+        stage = f" during {job.stage}" if job.stage else ""
+        return f"{action}{stage}: {type(error).__name__}: {error}"
+    
+    def _complete(self, job: IngestionJob, num_chunks: int, message: str):
+        """Mark a job as completed with its result."""
+        self._update(
+            job,
+            status="completed",
+            stage=None,
+            result=DocumentUploadResponse(
+                document_id=job.job_id,
+                filename=job.filename,
+                num_chunks=num_chunks,
+                message=message
+            )
+        )
+    
+    def _discard(self, vector_store: VectorStore, chunk_ids: List[str]):
+        """Remove chunks a job added before it failed part-way through."""
+        if not chunk_ids:
+            return
+        try:
+            vector_store.delete_chunks(chunk_ids)
+        except Exception:
+            # Report the original failure rather than the cleanup error
+            pass
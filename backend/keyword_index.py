@@ -0,0 +1,403 @@
+"""On-disk BM25 keyword index with compressed postings."""
+
+import json
+import math
+import re
+import sqlite3
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from metadata_filter import matches_filter
+from rwlock import ReadWriteLock
+
+
+# Words, plus identifiers joined by - _ . / : such as part numbers and error codes
+TOKEN_PATTERN = re.compile(r"[^\W_]+(?:[-_./:][^\W_]+)*")
+TOKEN_SEPARATORS = re.compile(r"[-_./:]")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase index terms.
+    
+    Compound identifiers like ``E-4032`` or ``v2.1.0`` are kept whole so an
+    exact code matches strongly, and are also indexed by their parts.
+    
+    Args:
+        text: Text to tokenize
+    
+    Returns:
+        List of terms (with repeats)
+    """
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(text.lower()):
+        token = match.group()
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(TOKEN_SEPARATORS.split(token))
+    return tokens
+
+
+def encode_postings(doc_ids: Sequence[int], tfs: Sequence[int]) -> bytes:
+    """
+    Encode a postings list as varint (doc id gap, term frequency) pairs.
+    
+    Args:
+        doc_ids: Ascending doc ids
+        tfs: Term frequency in each document
+    
+    Returns:
+        Compressed postings; gaps within a batch usually take one byte
+    """
+    out = bytearray()
+    previous = 0
+    for doc_id, tf in zip(doc_ids, tfs):
+        for value in (int(doc_id) - previous, int(tf)):
+            while value >= 0x80:
+                out.append((value & 0x7F) | 0x80)
+                value >>= 7
+            out.append(value)
+        previous = int(doc_id)
+    return bytes(out)
+
+
+def decode_postings(blob: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    """Inverse of :func:`encode_postings`, vectorized over the whole blob."""
+    data = np.frombuffer(blob, dtype=np.uint8)
+    # A byte without the continuation bit ends a value
+    ends = (data & 0x80) == 0
+    starts = np.flatnonzero(np.concatenate(([True], ends[:-1])))
+    group = np.cumsum(ends) - ends
+    shifts = 7 * (np.arange(len(data)) - starts[group])
+    values = np.add.reduceat((data & 0x7F).astype(np.int64) << shifts, starts)
+    return np.cumsum(values[0::2]), values[1::2]
+
+
+class BM25Index:
+    """
+    Inverted index scored with Okapi BM25, stored in SQLite.
+    
+    Each added batch writes one postings block per term: doc id gaps and
+    term frequencies are varint-encoded, usually one byte each. Doc
+    ids are never reused, so deletions only remove the document row and
+    stale postings are skipped at query time. A write that leaves a term
+    with more than ``MAX_BLOCKS`` blocks merges them (dropping deleted
+    documents), so searches only read and share the lock.
+    
+    Chunk text and metadata are kept with the document row, so keyword
+    results are returned without touching the vector store.
+    """
+    
+    # Blocks per term before a write merges them into one
+    MAX_BLOCKS = 16
+    # Candidate rows fetched per query while applying metadata filters
+    FETCH_ROWS = 100
+    
+    def __init__(self, path: str, k1: float = 1.2, b: float = 0.75):
+        """
+        Open (or create) an index file.
+        
+        Args:
+            path: SQLite database file
+            k1: BM25 term-frequency saturation
+            b: BM25 document-length normalisation
+        """
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = ReadWriteLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS docs (
+                doc_id INTEGER PRIMARY KEY,
+                chunk_id TEXT UNIQUE NOT NULL,
+                source TEXT,
+                length INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                metadata TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS docs_source ON docs (source);
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL,
+                data BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS postings_term ON postings (term);
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+        self._load()
+    
+    def _load(self):
+        """Read document lengths into memory."""
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'next_doc'").fetchone()
+        self._next_doc = row[0] if row else 0
+        
+        self._lengths = np.zeros(max(self._next_doc, 1), dtype=np.float32)
+        self._live = np.zeros(len(self._lengths), dtype=bool)
+        self._total_length = 0
+        self._count = 0
+        for doc_id, length in self._conn.execute("SELECT doc_id, length FROM docs"):
+            self._lengths[doc_id] = length
+            self._live[doc_id] = True
+            self._total_length += length
+            self._count += 1
+    
+    def count(self) -> int:
+        """Number of indexed documents."""
+        with self._lock.read():
+            return self._count
+    
+    def add(self, entries: Iterable[Tuple[str, str, Dict]]):
+        """
+        Index (or re-index) chunks.
+        
+        Args:
+            entries: Tuples of (chunk id, text, flat metadata); a chunk id
+                that is already indexed replaces the earlier version
+        """
+        # Later entries for the same chunk id win
+        latest = {chunk_id: (text, metadata) for chunk_id, text, metadata in entries}
+        if not latest:
+            return
+        
+        with self._lock.write():
+            self._remove_where("chunk_id", list(latest))
+            
+            first_doc = self._next_doc
+            docs = []
+            postings: Dict[str, Tuple[List[int], List[int]]] = {}
+            for doc_id, (chunk_id, (text, metadata)) in enumerate(latest.items(), start=first_doc):
+                terms = tokenize(text)
+                for term, tf in Counter(terms).items():
+                    doc_ids, tfs = postings.setdefault(term, ([], []))
+                    doc_ids.append(doc_id)
+                    tfs.append(tf)
+                docs.append((
+                    doc_id, chunk_id, metadata.get("source"), len(terms), text, json.dumps(metadata)
+                ))
+            self._next_doc = first_doc + len(docs)
+            
+            self._conn.executemany(
+                "INSERT INTO docs (doc_id, chunk_id, source, length, text, metadata) VALUES (?, ?, ?, ?, ?, ?)",
+                docs
+            )
+            self._conn.executemany(
+                "INSERT INTO postings (term, data) VALUES (?, ?)",
+                [(term, encode_postings(doc_ids, tfs)) for term, (doc_ids, tfs) in postings.items()]
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('next_doc', ?)",
+                (self._next_doc,)
+            )
+            self._conn.commit()
+            
+            if self._next_doc > len(self._lengths):
+                capacity = max(self._next_doc, len(self._lengths) * 2)
+                self._lengths = np.resize(self._lengths, capacity)
+                self._live = np.resize(self._live, capacity)
+                self._lengths[first_doc:] = 0
+                self._live[first_doc:] = False
+            for doc in docs:
+                self._lengths[doc[0]] = doc[3]
+                self._live[doc[0]] = True
+                self._total_length += doc[3]
+            self._count += len(docs)
+            
+            # Merged here, not on read, so searches never write
+            self._merge_blocks(list(postings))
+            self._conn.commit()
+    
+    def remove(self, chunk_ids: List[str]) -> int:
+        """Remove chunks by id, returning how many were indexed."""
+        with self._lock.write():
+            removed = self._remove_where("chunk_id", chunk_ids)
+            self._conn.commit()
+            return removed
+    
+    def remove_source(self, source: str) -> int:
+        """Remove every chunk of a source document, returning how many were indexed."""
+        with self._lock.write():
+            removed = self._remove_where("source", [source])
+            self._conn.commit()
+            return removed
+    
+    def _remove_where(self, column: str, values: List[str]) -> int:
+        """Delete document rows whose column is in values. Caller holds the lock and commits."""
+        removed = 0
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(values), 500):
+            batch = values[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT doc_id, length FROM docs WHERE {column} IN ({placeholders})", batch
+            ).fetchall()
+            if not rows:
+                continue
+            
+            self._conn.executemany("DELETE FROM docs WHERE doc_id = ?", [(doc_id,) for doc_id, _ in rows])
+            for doc_id, length in rows:
+                self._live[doc_id] = False
+                self._lengths[doc_id] = 0
+                self._total_length -= length
+            self._count -= len(rows)
+            removed += len(rows)
+        
+        return removed
+    
+    def _blocks(self, term: str) -> List[Tuple[int, bytes]]:
+        """(rowid, data) of each postings block of a term. Caller holds the lock."""
+        return self._conn.execute("SELECT rowid, data FROM postings WHERE term = ?", (term,)).fetchall()
+    
+    def _live_postings(self, blocks: List[Tuple[int, bytes]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Doc ids and term frequencies of blocks, without deleted documents."""
+        if not blocks:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        
+        decoded = [decode_postings(data) for _, data in blocks]
+        doc_ids = np.concatenate([ids for ids, _ in decoded])
+        tfs = np.concatenate([freqs for _, freqs in decoded])
+        live = self._live[doc_ids]
+        return doc_ids[live], tfs[live]
+    
+    def _postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Live postings of a term. Caller holds the lock (shared is enough)."""
+        return self._live_postings(self._blocks(term))
+    
+    def _merge_blocks(self, terms: List[str]):
+        """
+        Merge the blocks of terms that have more than ``MAX_BLOCKS``.
+        
+        Caller holds the write lock and commits.
+        """
+        for start in range(0, len(terms), 500):
+            batch = terms[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            crowded = self._conn.execute(
+                f"SELECT term FROM postings WHERE term IN ({placeholders}) GROUP BY term HAVING COUNT(*) > ?",
+                (*batch, self.MAX_BLOCKS)
+            ).fetchall()
+            
+            for term, in crowded:
+                blocks = self._blocks(term)
+                doc_ids, tfs = self._live_postings(blocks)
+                order = np.argsort(doc_ids, kind="stable")
+                self._conn.executemany("DELETE FROM postings WHERE rowid = ?", [(block[0],) for block in blocks])
+                if len(doc_ids):
+                    self._conn.execute(
+                        "INSERT INTO postings (term, data) VALUES (?, ?)",
+                        (term, encode_postings(doc_ids[order].tolist(), tfs[order].tolist()))
+                    )
+    
+    def search(self, query: str, top_k: int = 5, where: Optional[Dict] = None) -> List[Dict]:
+        """
+        Rank chunks against a keyword query with BM25.
+        
+        Args:
+            query: Free-text query
+            top_k: Number of results to return
+            where: Optional Chroma-style metadata filter
+        
+        Returns:
+            Results with text, metadata, ``bm25_score`` and ``keyword_coverage``
+            (the IDF-weighted share of query terms the chunk contains, 0-1),
+            best first
+        """
+        terms = set(tokenize(query))
+        
+        with self._lock.read():
+            if not terms or self._count == 0:
+                return []
+            
+            average_length = self._total_length / self._count
+            matched_ids, matched_scores, matched_idfs = [], [], []
+            # Terms missing from the index still count towards the query's weight
+            total_idf = 0.0
+            for term in terms:
+                doc_ids, tfs = self._postings(term)
+                df = len(doc_ids)
+                idf = math.log(1 + (self._count - df + 0.5) / (df + 0.5))
+                total_idf += idf
+                if df == 0:
+                    continue
+                
+                tf = tfs.astype(np.float32)
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_ids] / average_length)
+                matched_ids.append(doc_ids)
+                matched_scores.append(idf * tf * (self.k1 + 1) / (tf + norm))
+                matched_idfs.append(np.full(df, idf))
+            
+            if not matched_ids:
+                return []
+            
+            doc_ids, inverse = np.unique(np.concatenate(matched_ids), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(matched_scores))
+            coverage = np.bincount(inverse, weights=np.concatenate(matched_idfs)) / total_idf
+            order = np.argsort(-scores, kind="stable")
+            
+            results = []
+            for start in range(0, len(order), self.FETCH_ROWS):
+                page = order[start:start + self.FETCH_ROWS]
+                rows = self._fetch([int(doc_ids[i]) for i in page])
+                for i in page:
+                    chunk_id, text, metadata = rows[int(doc_ids[i])]
+                    if not matches_filter(metadata, where):
+                        continue
+                    results.append({
+                        'chunk_id': chunk_id,
+                        'text': text,
+                        'metadata': metadata,
+                        'bm25_score': float(scores[i]),
+                        'keyword_coverage': min(1.0, float(coverage[i]))
+                    })
+                    if len(results) == top_k:
+                        break
+                if len(results) == top_k:
+                    break
+        
+        return results
+    
+    def _fetch(self, doc_ids: List[int]) -> Dict[int, Tuple[str, str, Dict]]:
+        """Load chunk id, text and metadata for documents. Caller holds the lock."""
+        placeholders = ",".join("?" * len(doc_ids))
+        rows = self._conn.execute(
+            f"SELECT doc_id, chunk_id, text, metadata FROM docs WHERE doc_id IN ({placeholders})",
+            doc_ids
+        ).fetchall()
+        return {doc_id: (chunk_id, text, json.loads(metadata)) for doc_id, chunk_id, text, metadata in rows}
+    
+    def clear(self):
+        """Remove every document and posting."""
+        with self._lock.write():
+            self._conn.executescript("DELETE FROM docs; DELETE FROM postings; DELETE FROM meta;")
+            self._conn.commit()
+            self._load()
+    
+    def get_stats(self) -> Dict:
+        """Describe the index."""
+        with self._lock.read():
+            terms, blocks = self._conn.execute(
+                "SELECT COUNT(DISTINCT term), COUNT(*) FROM postings"
+            ).fetchone()
+            return {
+                'documents': self._count,
+                'terms': terms,
+                'posting_blocks': blocks,
+                'average_length': round(self._total_length / self._count, 2) if self._count else 0.0,
+                'path': self.path
+            }
+    
+    def close(self):
+        """Close the underlying SQLite connection."""
+        with self._lock.write():
+            self._conn.close()
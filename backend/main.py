@@ -1,17 +1,36 @@
 """FastAPI application entry point."""
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
 from config import settings
-from routes import documents, chat
+from routes import documents, chat, metrics
+from services import ServiceContainer
+from upload_limit import UploadSizeLimitMiddleware
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build shared services and start workers on startup; release them on shutdown."""
+    # Tests may install a container with fakes before startup
+    if getattr(app.state, "services", None) is None:
+        app.state.services = ServiceContainer()
+    services = app.state.services
+    services.start()
+    yield
+    await services.aclose()
+    app.state.services = None
+
 
 # Create FastAPI app
 app = FastAPI(
     title="RAG Chatbot API",
     description="Production-grade chatbot with RAG capabilities",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -23,9 +42,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Cap upload bodies while they stream in, before FastAPI spools them
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    paths=["/api/documents/upload", "/api/documents/bulk"]
+)
+
 # Include routers
 app.include_router(documents.router)
 app.include_router(chat.router)
+app.include_router(metrics.router)
 
 
 @app.get("/")
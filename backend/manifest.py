@@ -0,0 +1,198 @@
+"""Per-document manifests used to re-index only the chunks that changed."""
+
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import settings
+from models import DocumentChunk
+
+
+# (start_page, end_page) recorded for each chunk id
+PageSpan = Tuple[Optional[int], Optional[int]]
+
+
+def file_fingerprint(file_path: str, chunk_size: int, chunk_overlap: int) -> str:
+    """
+    Hash of a file's bytes and the chunking settings applied to it.
+    
+    Two uploads with the same fingerprint produce the same chunks, so the
+    second one needs no extraction at all.
+    
+    Args:
+        file_path: Path to the uploaded file
+        chunk_size: Chunk size used by the processor
+        chunk_overlap: Chunk overlap used by the processor
+    
+    Returns:
+        Hex SHA-256 digest
+    """
+    digest = hashlib.sha256(f"{chunk_size}:{chunk_overlap}:".encode("utf-8"))
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def bytes_fingerprint(data: bytes, chunk_size: int, chunk_overlap: int) -> str:
+    """Fingerprint of a document held in memory, equal to ``file_fingerprint`` of the same bytes."""
+    digest = hashlib.sha256(f"{chunk_size}:{chunk_overlap}:".encode("utf-8"))
+    digest.update(data)
+    return digest.hexdigest()
+
+
+class DocumentDiff:
+    """
+    Compares a re-uploaded document's chunks with what is already stored.
+    
+    Chunks are fed in as they are produced; a chunk needs embedding only if
+    its id is not stored yet or its page span moved. Once every chunk has
+    been seen, ``stale_ids`` lists stored chunks the new version no longer has.
+    """
+    
+    def __init__(self, previous: Dict[str, PageSpan], stored_ids: Iterable[str] = ()):
+        """
+        Start a diff against a document's previous version.
+        
+        Args:
+            previous: Chunk ids and page spans from the manifest
+            stored_ids: Extra stored chunk ids of the document (e.g. chunks
+                written before it had a manifest), always re-embedded
+        """
+        self.previous = previous
+        self.stored_ids = set(previous) | set(stored_ids)
+        self.current: Dict[str, PageSpan] = {}
+        self.skipped = 0
+    
+    def changed(self, chunks: List[DocumentChunk]) -> List[DocumentChunk]:
+        """
+        Record a batch of new chunks and return those that must be stored.
+        
+        Args:
+            chunks: Next chunks of the document, in order
+        
+        Returns:
+            Chunks that are new or whose page span changed
+        """
+        changed = []
+        for chunk in chunks:
+            span = (chunk.metadata.start_page, chunk.metadata.end_page)
+            self.current[chunk.chunk_id] = span
+            if self.previous.get(chunk.chunk_id, False) == span:
+                self.skipped += 1
+            else:
+                changed.append(chunk)
+        return changed
+    
+    def stale_ids(self) -> List[str]:
+        """Stored chunk ids that are not part of the new version."""
+        return sorted(self.stored_ids - set(self.current))
+
+
+class DocumentManifest:
+    """
+    SQLite record of each indexed document's fingerprint and chunk ids.
+    
+    Entries are dropped whenever the vector store reports a change to their
+    source (deletes, clears, or upserts by anyone), so a manifest is only
+    trusted when it was written after the document's last change.
+    """
+    
+    def __init__(self, path: str = None):
+        """
+        Open (or create) the manifest database.
+        
+        Args:
+            path: SQLite file path (default from settings)
+        """
+        self.path = path or settings.manifest_path
+        
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                source TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                num_chunks INTEGER NOT NULL,
+                updated_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS chunks (
+                source TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                start_page INTEGER,
+                end_page INTEGER,
+                PRIMARY KEY (source, chunk_id)
+            );
+            """
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._closed = False
+    
+    def fingerprint(self, source: str) -> Optional[str]:
+        """Fingerprint of the last indexed version of a source, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fingerprint FROM documents WHERE source = ?", (source,)
+            ).fetchone()
+        return row[0] if row else None
+    
+    def chunks(self, source: str) -> Dict[str, PageSpan]:
+        """Chunk ids and page spans of the last indexed version of a source."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_id, start_page, end_page FROM chunks WHERE source = ?", (source,)
+            ).fetchall()
+        return {chunk_id: (start_page, end_page) for chunk_id, start_page, end_page in rows}
+    
+    def record(self, source: str, fingerprint: str, chunks: Dict[str, PageSpan]):
+        """
+        Replace the manifest of a source after it was indexed.
+        
+        Args:
+            source: Source filename
+            fingerprint: ``file_fingerprint`` of the indexed file
+            chunks: Chunk ids and page spans now stored for the source
+        """
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM chunks WHERE source = ?", (source,))
+                self._conn.executemany(
+                    "INSERT INTO chunks (source, chunk_id, start_page, end_page) VALUES (?, ?, ?, ?)",
+                    [(source, chunk_id, start, end) for chunk_id, (start, end) in chunks.items()]
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO documents (source, fingerprint, num_chunks, updated_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (source, fingerprint, len(chunks), datetime.now().isoformat())
+                )
+    
+    def invalidate_sources(self, sources: Optional[Iterable[str]] = None):
+        """
+        Forget the manifests of changed sources.
+        
+        Args:
+            sources: Changed source filenames; None forgets every manifest
+        """
+        with self._lock:
+            if self._closed:
+                return
+            with self._conn:
+                if sources is None:
+                    self._conn.execute("DELETE FROM chunks")
+                    self._conn.execute("DELETE FROM documents")
+                    return
+                for source in sources:
+                    self._conn.execute("DELETE FROM chunks WHERE source = ?", (source,))
+                    self._conn.execute("DELETE FROM documents WHERE source = ?", (source,))
+    
+    def close(self):
+        """Close the underlying SQLite connection."""
+        with self._lock:
+            self._closed = True
+            self._conn.close()
@@ -0,0 +1,126 @@
+"""Chroma-style ``where`` filters on chunk metadata, and the chat API's retrieval filters."""
+
+import operator
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from models import RetrievalFilter
+
+
+# Comparison operators, applied as ``metadata value <op> operand``
+COMPARISONS = {
+    "$eq": operator.eq,
+    "$gt": operator.gt,
+    "$gte": operator.ge,
+    "$lt": operator.lt,
+    "$lte": operator.le,
+}
+
+
+def filter_conditions(where: Optional[Dict]) -> List[Tuple[str, str, Any]]:
+    """
+    Flatten a ``where`` filter into conditions that must all hold.
+    
+    Keys are implicitly ANDed and ``$and`` clauses are flattened; a bare
+    value means ``$eq``. Supported operators are ``$eq``, ``$in``, ``$gt``,
+    ``$gte``, ``$lt`` and ``$lte``.
+    
+    Args:
+        where: Filter such as ``{"$and": [{"source": {"$in": [...]}}, {"end_page": {"$gte": 3}}]}``
+    
+    Returns:
+        (metadata key, operator, operand) triples
+    
+    Raises:
+        ValueError: On an unsupported operator
+    """
+    conditions = []
+    for key, condition in (where or {}).items():
+        if key == "$and":
+            for clause in condition:
+                conditions.extend(filter_conditions(clause))
+            continue
+        
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for op, operand in condition.items():
+            if op != "$in" and op not in COMPARISONS:
+                raise ValueError(f"Unsupported filter operator: {op}")
+            conditions.append((key, op, operand))
+    return conditions
+
+
+def matches_condition(value: Any, op: str, operand: Any) -> bool:
+    """Whether a metadata value satisfies one condition (a missing value never does)."""
+    if value is None:
+        return False
+    if op == "$in":
+        return value in operand
+    try:
+        return COMPARISONS[op](value, operand)
+    except TypeError:
+        # e.g. a page number compared with a string
+        return False
+
+
+def matches_filter(metadata: Dict, where: Optional[Dict]) -> bool:
+    """Whether metadata satisfies a Chroma-style ``where`` filter."""
+    return all(
+        matches_condition(metadata.get(key), op, operand)
+        for key, op, operand in filter_conditions(where)
+    )
+
+
+def to_timestamp(value: str) -> float:
+    """POSIX timestamp of a stored ``created_at`` value (naive local time)."""
+    return datetime.fromisoformat(value).timestamp()
+
+
+def _local_isoformat(value: datetime) -> str:
+    """Format a time like stored ``created_at`` values: naive, in local time."""
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value.isoformat()
+
+
+def build_where(filters: Optional[RetrievalFilter]) -> Optional[Dict]:
+    """
+    Translate the chat API's retrieval filters into a ``where`` filter.
+    
+    A page range keeps chunks whose ``start_page``-``end_page`` span
+    overlaps it, so chunks with unknown pages (stored as -1) are excluded.
+    Time bounds are inclusive and compared with the chunks' ``created_at``.
+    
+    Args:
+        filters: Retrieval filters from a chat request
+    
+    Returns:
+        ``where`` filter, or None when no filter is set
+    
+    Raises:
+        ValueError: If a range is inverted
+    """
+    if filters is None:
+        return None
+    created_after = _local_isoformat(filters.created_after) if filters.created_after else None
+    created_before = _local_isoformat(filters.created_before) if filters.created_before else None
+    if filters.page_from is not None and filters.page_to is not None and filters.page_from > filters.page_to:
+        raise ValueError("page_from must not be after page_to")
+    if created_after and created_before and created_after > created_before:
+        raise ValueError("created_after must not be after created_before")
+    
+    clauses = []
+    if filters.sources is not None:
+        clauses.append({"source": {"$in": list(filters.sources)}})
+    if filters.page_from is not None or filters.page_to is not None:
+        clauses.append({"end_page": {"$gte": filters.page_from or 1}})
+    if filters.page_to is not None:
+        clauses.append({"start_page": {"$lte": filters.page_to}})
+    if created_after:
+        clauses.append({"created_at": {"$gte": created_after}})
+    if created_before:
+        clauses.append({"created_at": {"$lte": created_before}})
+    
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
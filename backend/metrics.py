@@ -0,0 +1,299 @@
+"""Process-wide metrics in the Prometheus text format, and per-request stage timings."""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+
+# Bucket upper bounds in seconds, as used by the Prometheus client libraries
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0, 30.0)
+TOKEN_BUCKETS = (250, 500, 1000, 2000, 3000, 4000, 6000, 8000, 16000, 32000)
+THROUGHPUT_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# (metric name, type, help, [(labels, value)]) as rendered by ``render_family``
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    """Render a label set as ``{name="value",...}``."""
+    if not labels:
+        return ""
+    pairs = []
+    for name, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value the way Prometheus parses it."""
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_family(name: str, kind: str, help_text: str, samples: Iterable[Tuple[Dict[str, str], float]]) -> str:
+    """
+    Render one metric family in the Prometheus text exposition format.
+    
+    Args:
+        name: Metric name
+        kind: "counter", "gauge" or "histogram"
+        help_text: One-line description
+        samples: (labels, value) pairs; histogram samples carry their own
+            ``_bucket``/``_sum``/``_count`` suffix in a ``__name__`` label
+    
+    Returns:
+        Text block ending with a newline
+    """
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        labels = dict(labels)
+        sample_name = labels.pop("__name__", name)
+        lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class Counter:
+    """Monotonic count, optionally split by labels."""
+    
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        """
+        Initialize the counter.
+        
+        Args:
+            name: Metric name
+            help_text: One-line description
+            labelnames: Label names every series must be given
+        """
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, amount: float = 1, **labels: str):
+        """Add ``amount`` to the series selected by ``labels``."""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def value(self, **labels: str) -> float:
+        """Current value of one series."""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0)
+    
+    def render(self) -> str:
+        """Render the counter's series."""
+        with self._lock:
+            samples = [(dict(zip(self.labelnames, key)), value) for key, value in sorted(self._values.items())]
+        return render_family(self.name, "counter", self.help_text, samples)
+
+
+class Histogram:
+    """Distribution of observed values over fixed buckets, optionally split by labels."""
+    
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        """
+        Initialize the histogram.
+        
+        Args:
+            name: Metric name
+            help_text: One-line description
+            labelnames: Label names every series must be given
+            buckets: Upper bounds of the buckets (+Inf is added)
+        """
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per series: non-cumulative bucket counts (last one is +Inf), sum
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float, **labels: str):
+        """Record one observation in the series selected by ``labels``."""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+    
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the wall time of the ``with`` block, in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+    
+    def count(self, **labels: str) -> int:
+        """Number of observations in one series."""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            return sum(series[0]) if series else 0
+    
+    def render(self) -> str:
+        """Render the histogram's cumulative buckets, sums and counts."""
+        samples = []
+        with self._lock:
+            for key, (counts, total) in sorted(self._series.items()):
+                labels = dict(zip(self.labelnames, key))
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else _format_value(float(bound))
+                    samples.append(({"__name__": f"{self.name}_bucket", **labels, "le": le}, cumulative))
+                samples.append(({"__name__": f"{self.name}_sum", **labels}, total))
+                samples.append(({"__name__": f"{self.name}_count", **labels}, cumulative))
+        return render_family(self.name, "histogram", self.help_text, samples)
+
+
+class MetricsRegistry:
+    """The metrics exposed on ``/metrics``."""
+    
+    def __init__(self):
+        self._metrics: List = []
+    
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Create and register a counter."""
+        metric = Counter(name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+    
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        """Create and register a histogram."""
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+    
+    def render(self, families: Iterable[Family] = ()) -> str:
+        """
+        Render every registered metric.
+        
+        Args:
+            families: Extra metric families collected at scrape time, such as
+                counters read from a service's ``get_stats()``
+        
+        Returns:
+            Prometheus text exposition (version 0.0.4)
+        """
+        blocks = [metric.render() for metric in self._metrics]
+        blocks.extend(render_family(*family) for family in families)
+        return "".join(blocks)
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "rag_stage_duration_seconds",
+    "Latency of each query stage (embed, retrieve, rerank, prompt, llm)",
+    ["stage"]
+)
+LLM_TOKENS = REGISTRY.counter(
+    "rag_llm_tokens_total",
+    "Tokens sent to (prompt) and generated by (completion) the LLM, counted locally",
+    ["kind"]
+)
+PROMPT_TOKENS = REGISTRY.histogram(
+    "rag_prompt_tokens",
+    "Prompt size per LLM call in tokens",
+    buckets=TOKEN_BUCKETS
+)
+RETRIES = REGISTRY.counter(
+    "rag_retries_total",
+    "Retried upstream calls by operation",
+    ["operation"]
+)
+INGEST_STAGE_SECONDS = REGISTRY.histogram(
+    "rag_ingest_stage_duration_seconds",
+    "Time per ingested batch in each stage (extract, embed, store)",
+    ["stage"]
+)
+INGESTED_CHUNKS = REGISTRY.counter(
+    "rag_ingested_chunks_total",
+    "Chunks embedded and stored by ingestion jobs"
+)
+INGEST_THROUGHPUT = REGISTRY.histogram(
+    "rag_ingest_throughput_chunks_per_second",
+    "Stored chunks per second of each completed ingestion job",
+    buckets=THROUGHPUT_BUCKETS
+)
+
+
+# Stage durations of the current request, when it is being timed
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def request_timings() -> Iterator[Dict[str, float]]:
+    """
+    Collect the stage durations of the enclosed request.
+    
+    Yields:
+        Dict of stage name -> seconds, filled in by ``timed`` blocks that run
+        in this context (or in a copy of it, e.g. on an executor thread)
+    """
+    timings: Dict[str, float] = {}
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Time a query stage into ``STAGE_SECONDS`` and the current request's timings."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+def record_stage(stage: str, seconds: float):
+    """
+    Record a stage duration measured by the caller, as ``timed`` does.
+    
+    Args:
+        stage: Stage name
+        seconds: Total time spent in the stage
+    """
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+def server_timing(timings: Dict[str, float]) -> str:
+    """Format stage durations as a ``Server-Timing`` header value (milliseconds)."""
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
+
+
+def count_retry(operation: str):
+    """tenacity ``before_sleep`` hook counting retries of ``operation``."""
+    def before_sleep(retry_state):
+        RETRIES.inc(operation=operation)
+    return before_sleep
@@ -7,6 +7,8 @@ class ChunkMetadata(BaseModel):
     """Metadata for a document chunk."""
     source: str
     page: Optional[int] = None
+    start_page: Optional[int] = None
+    end_page: Optional[int] = None
     chunk_id: str
     created_at: datetime = Field(default_factory=datetime.now)
 
@@ -26,12 +28,46 @@ class DocumentUploadResponse(BaseModel):
     message: str
 
 
+class FileIngestionResult(BaseModel):
+    """Outcome for one document of a bulk ingestion job."""
+    filename: str
+    status: str = "queued"  # queued | completed | skipped | failed
+    num_chunks: int = 0
+    chunks_stored: int = 0
+    chunks_skipped: int = 0
+    chunks_deleted: int = 0
+    error: Optional[str] = None
+
+
+class IngestionJob(BaseModel):
+    """Status of a background document ingestion job."""
+    job_id: str
+    filename: str  # for bulk jobs, the single part's name or "<n> files"
+    tenant_id: Optional[str] = None  # None for the default tenant
+    bulk: bool = False
+    files: List[FileIngestionResult] = Field(default_factory=list)  # per-document results of bulk jobs
+    status: str = "queued"  # queued | running | completed | failed
+    stage: Optional[str] = None  # extract | chunk | embed | store
+    num_chunks: int = 0
+    chunks_embedded: int = 0
+    chunks_stored: int = 0
+    chunks_skipped: int = 0  # unchanged since the document was last indexed
+    chunks_deleted: int = 0  # stale chunks of the previous version
+    error: Optional[str] = None
+    result: Optional[DocumentUploadResponse] = None
+    created_at: datetime = Field(default_factory=datetime.now)
+    updated_at: datetime = Field(default_factory=datetime.now)
+
+
 class DocumentInfo(BaseModel):
     """Information about an indexed document."""
     document_id: str
     filename: str
     num_chunks: int
-    created_at: datetime
+    num_bytes: int = 0  # UTF-8 size of the chunk texts
+    content_hash: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
 
 
 class Source(BaseModel):
@@ -40,7 +76,18 @@ class Source(BaseModel):
     text: str
     source: str
     page: Optional[int] = None
-    similarity_score: float
+    end_page: Optional[int] = None  # Last page when the chunk spans several
+    similarity_score: Optional[float] = None  # Cosine similarity; None in sparse retrieval
+    bm25_score: Optional[float] = None  # Set when the keyword index matched the chunk
+
+
+class RetrievalFilter(BaseModel):
+    """Restricts retrieval to chunks matching every condition that is set."""
+    sources: Optional[List[str]] = Field(None, min_length=1)  # Document filenames
+    page_from: Optional[int] = Field(None, ge=1)  # Chunks overlapping this page range
+    page_to: Optional[int] = Field(None, ge=1)
+    created_after: Optional[datetime] = None  # Upload time range, inclusive
+    created_before: Optional[datetime] = None
 
 
 class ChatRequest(BaseModel):
@@ -48,6 +95,7 @@ class ChatRequest(BaseModel):
     query: str
     chat_history: List[dict] = Field(default_factory=list)
     top_k: int = 5
+    filters: Optional[RetrievalFilter] = None
 
 
 class ChatResponse(BaseModel):
@@ -58,6 +106,24 @@ class ChatResponse(BaseModel):
     prompt_used: Optional[str] = None  # For developer mode
 
 
+class BatchChatRequest(BaseModel):
+    """Request for the batch chat endpoint."""
+    queries: List[str]
+    top_k: int = 5
+    retrieval_only: bool = False  # Return sources only, without generating answers
+    filters: Optional[RetrievalFilter] = None  # Applied to every query
+
+
+class BatchChatResult(BaseModel):
+    """One line of a batch chat response, identified by its position in the request."""
+    index: int
+    answer: Optional[str] = None  # None for retrieval-only batches
+    sources: List[Source] = Field(default_factory=list)
+    confidence: Optional[float] = None
+    prompt_used: Optional[str] = None
+    error: Optional[str] = None
+
+
 class ErrorResponse(BaseModel):
     """Error response."""
     error: str
@@ -0,0 +1,841 @@
+"""In-process vector store backed by a memory-mapped NumPy matrix."""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from config import settings
+from ivf_index import IVFPQIndex
+from metadata_filter import filter_conditions, matches_condition, to_timestamp
+from models import DocumentChunk
+from quantization import QuantizedVectors
+from rwlock import ReadWriteLock
+from topk import empty_top_k, merge_top_k, sorted_top_k
+from vector_store import VectorStore
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    Exact cosine search over a memory-mapped embedding matrix.
+    
+    Normalized embeddings live in ``embeddings.npy`` (float32 or float16),
+    opened with ``mmap_mode`` so a cold open only maps the file. Chunk ids,
+    texts and metadata go to an append-only ``rows.jsonl`` sidecar that is
+    replayed on open. A query is one matrix-vector product per block of
+    rows followed by ``argpartition``. ``where`` filters on ``source`` use
+    cached per-source row masks and those on pages or ``created_at`` compare
+    numeric columns, so a selective filter narrows the rows before any
+    vector is scored.
+    
+    With ``index="ivfpq"`` an IVF-PQ index is trained once the store holds
+    ``ivf_train_min_rows`` chunks; later adds are encoded incrementally and
+    queries scan ``nprobe`` lists before an exact re-rank. Training runs on
+    a snapshot outside the lock, so searches and writes continue meanwhile.
+    
+    With ``quantization="int8"`` or ``"binary"`` exact search scans a compact
+    code matrix instead of the float one and rescores the best candidates
+    exactly, so the float matrix stays on disk apart from those rows. The
+    int8 range is recalibrated outside the lock, like index training.
+    
+    Deleted rows are tombstoned and not reused until the store is cleared
+    or compacted. ``compact`` renumbers the live rows and rewrites the matrix
+    and sidecar without the dead ones; it runs on open once more than
+    ``numpy_store_compact_fraction`` of the sidecar is dead.
+    The BM25 keyword index lives in ``keywords.sqlite3`` in the same directory.
+    """
+    
+    MATRIX_FILE = "embeddings.npy"
+    ROWS_FILE = "rows.jsonl"
+    KEYWORD_FILE = "keywords.sqlite3"
+    CATALOG_FILE = "catalog.sqlite3"
+    
+    # Rows and queries scored per matrix product; only a running top-k is
+    # kept between blocks, so the score working set is bounded by both
+    SEARCH_BLOCK_ROWS = 65536
+    SEARCH_BLOCK_QUERIES = 64
+    MIN_CAPACITY = 1024
+    
+    # Metadata mirrored in float64 columns (NaN when missing) for vectorized
+    # filters; created_at is held as a POSIX timestamp
+    FILTER_COLUMNS = ("page", "start_page", "end_page", "created_at")
+    COLUMN_OPERATORS = {
+        "$eq": np.equal,
+        "$gt": np.greater,
+        "$gte": np.greater_equal,
+        "$lt": np.less,
+        "$lte": np.less_equal,
+    }
+    
+    def __init__(
+        self,
+        directory: str = None,
+        dtype: str = None,
+        index: str = None,
+        keyword_index: Optional[bool] = None,
+        quantization: str = None,
+        tenant_id: Optional[str] = None
+    ):
+        """
+        Open (or create) a store directory.
+        
+        Args:
+            directory: Directory holding the matrix and sidecar (default from settings)
+            dtype: Storage dtype, "float32" or "float16" (default from settings)
+            index: Search index, "exact" or "ivfpq" (default from settings)
+            keyword_index: Maintain a BM25 keyword index (default from settings)
+            quantization: "none", "int8" or "binary" codes for exact search
+                (default from settings)
+            tenant_id: Tenant owning the directory (None for the default tenant)
+        """
+        self.tenant_id = tenant_id
+        self.directory = Path(directory or settings.numpy_store_directory)
+        self.dtype = np.dtype(dtype or settings.numpy_store_dtype)
+        if self.dtype not in (np.float32, np.float16):
+            raise ValueError(f"Unsupported dtype for NumpyVectorStore: {self.dtype}")
+        
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._matrix_path = self.directory / self.MATRIX_FILE
+        self._rows_path = self.directory / self.ROWS_FILE
+        
+        # Searches share the lock; writes take it exclusively, so growth can
+        # remap the matrix without pausing other searches
+        self._lock = ReadWriteLock()
+        self._generation = 0
+        self._load()
+        
+        index = (index or settings.numpy_store_index).lower()
+        if index not in ("exact", "ivfpq"):
+            raise ValueError(f"Unknown index type: {index}. Supported: exact, ivfpq")
+        self.ann_index: Optional[IVFPQIndex] = None
+        if index == "ivfpq":
+            self.ann_index = IVFPQIndex(
+                str(self.directory),
+                nlist=settings.ivf_nlist,
+                num_subvectors=settings.pq_num_subvectors,
+                nprobe=settings.ivf_nprobe,
+                rerank_candidates=settings.ivf_rerank_candidates
+            )
+        
+        quantization = (quantization or settings.numpy_store_quantization).lower()
+        self.quantized: Optional[QuantizedVectors] = None
+        if quantization != "none":
+            self.quantized = QuantizedVectors(
+                str(self.directory),
+                quantization,
+                rescore_candidates=settings.quantization_rescore_candidates
+            )
+        
+        if self._recovered_compaction:
+            # The codes may not have been renumbered before the interruption
+            for derived in (self.ann_index, self.quantized):
+                if derived is not None:
+                    derived.reset()
+        dead = self._log_entries - len(self._row_of)
+        if dead and dead > settings.numpy_store_compact_fraction * self._log_entries:
+            self.compact()
+        
+        # Existing stores (or codes written for another mode) are encoded on open
+        if self.quantized is not None and self._matrix is not None:
+            if not self.quantized.covers(self._count, self._matrix.shape[1]):
+                self.rebuild_quantization()
+        
+        if settings.keyword_index_enabled if keyword_index is None else keyword_index:
+            self._open_keyword_index(str(self.directory / self.KEYWORD_FILE), len(self._row_of))
+        self._open_catalog(str(self.directory / self.CATALOG_FILE), len(self._row_of))
+    
+    def _reset(self):
+        """Forget all in-memory state, abandoning any rebuild in progress."""
+        self._generation += 1
+        # Rows written while the index is rebuilt, re-encoded when it is swapped in
+        self._index_changes: Optional[Set[int]] = None
+        self._code_changes: Optional[Set[int]] = None
+        self._matrix: Optional[np.ndarray] = None
+        self._count = 0
+        self._ids: List[Optional[str]] = []
+        self._texts: List[Optional[str]] = []
+        self._metadatas: List[Optional[Dict]] = []
+        self._alive = np.zeros(0, dtype=bool)
+        self._row_of: Dict[str, int] = {}
+        self._source_rows: Dict[str, Set[int]] = {}
+        self._source_masks: Dict[str, np.ndarray] = {}
+        self._columns: Dict[str, np.ndarray] = {key: np.zeros(0) for key in self.FILTER_COLUMNS}
+        self._log_entries = 0
+    
+    def _load(self):
+        """Map the matrix and replay the row sidecar."""
+        self._reset()
+        self._recovered_compaction = self._finish_compaction()
+        
+        if self._matrix_path.exists():
+            self._matrix = np.load(self._matrix_path, mmap_mode="r+")
+            if self._matrix.dtype != self.dtype:
+                raise ValueError(
+                    f"Index at {self.directory} stores {self._matrix.dtype}, not {self.dtype}"
+                )
+        
+        if not self._rows_path.exists():
+            return
+        
+        with open(self._rows_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                self._log_entries += 1
+                row = entry["row"]
+                self._ensure_rows(row + 1)
+                
+                if entry.get("deleted"):
+                    self._drop_row(row)
+                else:
+                    self._set_row(row, entry["id"], entry["text"], entry["metadata"])
+    
+    def _ensure_rows(self, count: int):
+        """Grow the per-row bookkeeping to ``count`` rows."""
+        if count <= self._count:
+            return
+        
+        extra = count - self._count
+        self._ids.extend([None] * extra)
+        self._texts.extend([None] * extra)
+        self._metadatas.extend([None] * extra)
+        self._alive = np.concatenate([self._alive, np.zeros(extra, dtype=bool)])
+        for key, column in self._columns.items():
+            self._columns[key] = np.concatenate([column, np.full(extra, np.nan)])
+        self._count = count
+    
+    def _set_row(self, row: int, chunk_id: str, text: str, metadata: Dict):
+        """Record a live row, replacing whatever it held."""
+        self._drop_row(row)
+        
+        self._ids[row] = chunk_id
+        self._texts[row] = text
+        self._metadatas[row] = metadata
+        self._alive[row] = True
+        self._row_of[chunk_id] = row
+        for key, column in self._columns.items():
+            try:
+                column[row] = self._column_operand(key, metadata.get(key))
+            except (TypeError, ValueError):
+                column[row] = np.nan
+        
+        source = metadata.get("source", "Unknown")
+        self._source_rows.setdefault(source, set()).add(row)
+        self._source_masks.pop(source, None)
+    
+    def _drop_row(self, row: int):
+        """Tombstone a row if it is live."""
+        if not self._alive[row]:
+            return
+        
+        source = self._metadatas[row].get("source", "Unknown")
+        rows = self._source_rows[source]
+        rows.discard(row)
+        if not rows:
+            del self._source_rows[source]
+        self._source_masks.pop(source, None)
+        
+        del self._row_of[self._ids[row]]
+        self._ids[row] = None
+        self._texts[row] = None
+        self._metadatas[row] = None
+        self._alive[row] = False
+    
+    def _append_log(self, entries: List[Dict]):
+        """Append row changes to the sidecar."""
+        with open(self._rows_path, "a", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+        self._log_entries += len(entries)
+    
+    def _ensure_capacity(self, rows: int, dimension: int):
+        """Make the matrix hold at least ``rows`` rows, doubling when it grows."""
+        if self._matrix is not None:
+            if self._matrix.shape[1] != dimension:
+                raise ValueError(
+                    f"Embedding dimension {dimension} does not match index dimension {self._matrix.shape[1]}"
+                )
+            if rows <= self._matrix.shape[0]:
+                return
+        
+        capacity = max(self.MIN_CAPACITY, rows)
+        if self._matrix is not None:
+            capacity = max(capacity, self._matrix.shape[0] * 2)
+        
+        # Write the larger matrix beside the old one, then swap it in. Maps are
+        # released before the rename so this also works where open files cannot
+        # be replaced.
+        tmp_path = self._matrix_path.with_suffix(".npy.tmp")
+        grown = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=self.dtype, shape=(capacity, dimension))
+        if self._matrix is not None:
+            grown[:self._count] = self._matrix[:self._count]
+        grown.flush()
+        del grown
+        self._matrix = None
+        
+        os.replace(tmp_path, self._matrix_path)
+        self._matrix = np.load(self._matrix_path, mmap_mode="r+")
+    
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        """Scale rows to unit length so a dot product is cosine similarity."""
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+    
+    def upsert_chunks(self, chunks: List[DocumentChunk], embeddings: List[List[float]]):
+        """
+        Insert or update document chunks with their embeddings.
+        
+        Args:
+            chunks: List of document chunks
+            embeddings: Corresponding embedding vectors
+        """
+        if len(chunks) != len(embeddings):
+            raise ValueError("Number of chunks must match number of embeddings")
+        if not chunks:
+            return
+        
+        vectors = self._normalize(np.asarray(embeddings, dtype=np.float32))
+        
+        with self._lock.write():
+            # Existing ids are overwritten in place; new ids are appended
+            rows = []
+            assigned = {}
+            next_row = self._count
+            for chunk in chunks:
+                row = assigned.get(chunk.chunk_id, self._row_of.get(chunk.chunk_id))
+                if row is None:
+                    row = next_row
+                    next_row += 1
+                assigned[chunk.chunk_id] = row
+                rows.append(row)
+            
+            self._ensure_capacity(next_row, vectors.shape[1])
+            self._matrix[rows] = vectors.astype(self.dtype)
+            self._matrix.flush()
+            
+            # The sidecar is written after the vectors, so replay never sees
+            # a row whose vector is missing
+            entries = []
+            self._ensure_rows(next_row)
+            for chunk, row in zip(chunks, rows):
+                metadata = self._chunk_metadata(chunk)
+                self._set_row(row, chunk.chunk_id, chunk.text, metadata)
+                entries.append({"row": row, "id": chunk.chunk_id, "text": chunk.text, "metadata": metadata})
+            self._append_log(entries)
+            self._index_keywords(chunks, [entry["metadata"] for entry in entries])
+            self._catalog_chunks(chunks, [entry["metadata"] for entry in entries])
+            
+            train_index = None
+            if self.ann_index is not None:
+                if self._index_changes is not None:
+                    self._index_changes.update(rows)
+                if self.ann_index.trained:
+                    self.ann_index.add(np.asarray(rows), vectors)
+                elif self._index_changes is None and len(self._row_of) >= settings.ivf_train_min_rows:
+                    # Claimed here so concurrent upserts do not train it again
+                    train_index = self._index_changes = set()
+            
+            recalibrate = None
+            if self.quantized is not None:
+                if self._code_changes is not None:
+                    self._code_changes.update(rows)
+                if self.quantized.can_encode:
+                    self.quantized.add(np.asarray(rows), vectors)
+                if self._code_changes is None and self.quantized.needs_calibration(len(self._row_of)):
+                    recalibrate = self._code_changes = set()
+        
+        if train_index is not None:
+            self._rebuild_index(train_index)
+        if recalibrate is not None:
+            self._rebuild_quantization(recalibrate)
+        self._notify_change({chunk.metadata.source for chunk in chunks})
+    
+    def _read_vectors(self, rows: np.ndarray) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Yield (rows, float32 vectors) a block at a time, holding the lock only
+        while each block is copied. Stops early if the store is cleared.
+        """
+        generation = self._generation
+        for start in range(0, len(rows), self.SEARCH_BLOCK_ROWS):
+            block = rows[start:start + self.SEARCH_BLOCK_ROWS]
+            with self._lock.read():
+                if self._generation != generation:
+                    return
+                vectors = self._matrix[block].astype(np.float32)
+            yield block, vectors
+    
+    def rebuild_index(self, seed: int = 0):
+        """
+        (Re)train the IVF-PQ index on a sample of live rows and encode them all.
+        
+        The current index keeps serving searches until the new one is swapped in.
+        
+        Args:
+            seed: Random seed for sampling and k-means
+        """
+        if self.ann_index is None:
+            raise ValueError("This store has no approximate index configured")
+        
+        with self._lock.write():
+            changes = self._index_changes = set()
+        self._rebuild_index(changes, seed)
+    
+    def _rebuild_index(self, changes: Set[int], seed: int = 0):
+        """
+        Train and encode outside the lock, then swap the index in.
+        
+        Args:
+            changes: Set claimed as ``_index_changes`` for this rebuild; rows
+                written meanwhile are collected in it and re-encoded at the swap
+            seed: Random seed for sampling and k-means
+        """
+        with self._lock.write():
+            if self._index_changes is not changes:
+                return
+            live = np.flatnonzero(self._alive)
+            if len(live) == 0:
+                self._index_changes = None
+                self.ann_index.reset()
+                return
+            
+            rng = np.random.default_rng(seed)
+            sample = np.sort(rng.choice(live, min(len(live), settings.ivf_train_sample), replace=False))
+            sample = self._matrix[sample].astype(np.float32)
+        
+        model = self.ann_index.fit(sample, seed=seed)
+        encoded = [(rows, *self.ann_index.encode(vectors, model)) for rows, vectors in self._read_vectors(live)]
+        
+        with self._lock.write():
+            # Cleared, or superseded by a newer rebuild
+            if self._index_changes is not changes:
+                return
+            self._index_changes = None
+            
+            rows, assignments, codes = (np.concatenate(parts) for parts in zip(*encoded))
+            alive = self._alive[rows]
+            self.ann_index.install(*model, rows[alive], assignments[alive], codes[alive])
+            redo = np.asarray(sorted(row for row in changes if self._alive[row]), dtype=np.int64)
+            if len(redo):
+                self.ann_index.add(redo, self._matrix[redo].astype(np.float32))
+    
+    def rebuild_quantization(self, seed: int = 0):
+        """
+        Recalibrate the quantizer on a sample of live rows and re-encode them all.
+        
+        The current codes keep serving searches until the new ones are swapped in.
+        
+        Args:
+            seed: Random seed for sampling
+        """
+        if self.quantized is None:
+            raise ValueError("This store has no quantization configured")
+        
+        with self._lock.write():
+            changes = self._code_changes = set()
+        self._rebuild_quantization(changes, seed)
+    
+    def _rebuild_quantization(self, changes: Set[int], seed: int = 0):
+        """
+        Calibrate and encode outside the lock, then swap the codes in.
+        
+        Args:
+            changes: Set claimed as ``_code_changes`` for this rebuild; rows
+                written meanwhile are collected in it and re-encoded at the swap
+            seed: Random seed for sampling
+        """
+        with self._lock.write():
+            if self._code_changes is not changes:
+                return
+            live = np.flatnonzero(self._alive)
+            if len(live) == 0:
+                self._code_changes = None
+                self.quantized.reset()
+                return
+            
+            rng = np.random.default_rng(seed)
+            sample = np.sort(rng.choice(live, min(len(live), QuantizedVectors.CALIBRATION_ROWS), replace=False))
+            sample = self._matrix[sample].astype(np.float32)
+            rows, dimension = self._count, self._matrix.shape[1]
+        
+        bound = self.quantized.fit(sample)
+        path = self.quantized.write_codes(self._read_vectors(live), rows, dimension, bound)
+        
+        with self._lock.write():
+            # Cleared, or superseded by a newer rebuild
+            if self._code_changes is not changes:
+                path.unlink()
+                return
+            self._code_changes = None
+            
+            self.quantized.install(path, bound, len(live))
+            redo = np.asarray(sorted(row for row in changes if self._alive[row]), dtype=np.int64)
+            if len(redo):
+                self.quantized.add(redo, self._matrix[redo].astype(np.float32))
+    
+    def compact(self) -> int:
+        """
+        Drop dead rows, renumbering the live ones, and rewrite the sidecar.
+        
+        The new matrix and sidecar are written beside the old ones; renaming
+        the sidecar into place commits the compaction, and a store opened
+        after an interruption past that point finishes it.
+        
+        Returns:
+            Number of rows removed
+        """
+        with self._lock.write():
+            live = np.flatnonzero(self._alive)
+            removed = self._count - len(live)
+            if self._matrix is None or self._log_entries == len(live):
+                return 0
+            
+            pending_matrix, pending_rows = self._pending_paths()
+            capacity = max(self.MIN_CAPACITY, len(live))
+            compacted = np.lib.format.open_memmap(
+                pending_matrix, mode="w+", dtype=self.dtype, shape=(capacity, self._matrix.shape[1])
+            )
+            for start in range(0, len(live), self.SEARCH_BLOCK_ROWS):
+                rows = live[start:start + self.SEARCH_BLOCK_ROWS]
+                compacted[start:start + len(rows)] = self._matrix[rows]
+            compacted.flush()
+            del compacted
+            
+            tmp_path = pending_rows.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for new_row, row in enumerate(live):
+                    entry = {"row": new_row, "id": self._ids[row], "text": self._texts[row], "metadata": self._metadatas[row]}
+                    f.write(json.dumps(entry) + "\n")
+            os.replace(tmp_path, pending_rows)
+            
+            if self.ann_index is not None and self.ann_index.trained:
+                self.ann_index.renumber(live)
+            if self.quantized is not None and self.quantized.codes is not None:
+                self.quantized.renumber(live)
+            
+            self._matrix = None
+            self._load()
+        
+        return removed
+    
+    def _pending_paths(self) -> Tuple[Path, Path]:
+        """Matrix and sidecar files written by an unfinished compaction."""
+        return self._matrix_path.with_suffix(".npy.compact"), self._rows_path.with_suffix(".jsonl.compact")
+    
+    def _finish_compaction(self) -> bool:
+        """Swap in the files of a committed compaction; discard an uncommitted one."""
+        pending_matrix, pending_rows = self._pending_paths()
+        if not pending_rows.exists():
+            if pending_matrix.exists():
+                pending_matrix.unlink()
+            return False
+        
+        if pending_matrix.exists():
+            os.replace(pending_matrix, self._matrix_path)
+        os.replace(pending_rows, self._rows_path)
+        return True
+    
+    def _source_mask(self, source: str) -> np.ndarray:
+        """Cached boolean mask of the live rows of a source."""
+        mask = self._source_masks.get(source)
+        if mask is None or len(mask) != self._count:
+            mask = np.zeros(self._count, dtype=bool)
+            mask[list(self._source_rows.get(source, ()))] = True
+            self._source_masks[source] = mask
+        return mask
+    
+    @staticmethod
+    def _column_operand(key: str, value) -> float:
+        """
+        Numeric form of a value for the ``key`` column.
+        
+        Raises:
+            TypeError, ValueError: If the value has no numeric form, e.g. a
+                page compared with a string
+        """
+        if key == "created_at":
+            return to_timestamp(value)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise TypeError(f"Not a number: {value!r}")
+        return float(value)
+    
+    def _condition_mask(self, key: str, op: str, operand) -> np.ndarray:
+        """Boolean mask of rows whose metadata satisfies one filter condition."""
+        values = list(operand) if op == "$in" else [operand]
+        
+        if key == "source" and op in ("$eq", "$in"):
+            matched = np.zeros(self._count, dtype=bool)
+            for value in values:
+                matched |= self._source_mask(value)
+            return matched
+        
+        if key in self._columns:
+            try:
+                numbers = [self._column_operand(key, value) for value in values]
+            except (TypeError, ValueError):
+                numbers = None
+            if numbers is not None:
+                column = self._columns[key]
+                if op == "$in":
+                    return np.isin(column, numbers)
+                return self.COLUMN_OPERATORS[op](column, numbers[0])
+        
+        return np.fromiter(
+            (
+                metadata is not None and matches_condition(metadata.get(key), op, operand)
+                for metadata in self._metadatas
+            ),
+            dtype=bool,
+            count=self._count
+        )
+    
+    def _row_mask(self, filter_metadata: Optional[Dict]) -> np.ndarray:
+        """
+        Boolean mask of live rows matching a Chroma-style ``where`` filter.
+        
+        Supports ``$eq``, ``$in``, ``$gt``, ``$gte``, ``$lt`` and ``$lte`` on
+        any metadata key (implicitly ANDed) and ``$and``. Conditions on
+        ``source`` use the cached masks and those on pages and ``created_at``
+        the numeric columns; other keys scan the row metadata.
+        """
+        mask = self._alive.copy()
+        for key, op, operand in filter_conditions(filter_metadata):
+            mask &= self._condition_mask(key, op, operand)
+        return mask
+    
+    def _score_blocks(
+        self,
+        queries: np.ndarray,
+        rows: Optional[np.ndarray],
+        mask: Optional[np.ndarray]
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Yield (row numbers, cosine scores) a block of ``rows`` (or all rows) at a time."""
+        if rows is not None:
+            for start in range(0, len(rows), self.SEARCH_BLOCK_ROWS):
+                block_rows = rows[start:start + self.SEARCH_BLOCK_ROWS]
+                yield block_rows, queries @ self._matrix[block_rows].astype(np.float32, copy=False).T
+            return
+        
+        for start in range(0, self._count, self.SEARCH_BLOCK_ROWS):
+            stop = min(start + self.SEARCH_BLOCK_ROWS, self._count)
+            scores = queries @ self._matrix[start:stop].astype(np.float32, copy=False).T
+            scores[:, ~mask[start:stop]] = -np.inf
+            yield np.arange(start, stop), scores
+    
+    def _exact_top_k(
+        self,
+        queries: np.ndarray,
+        k: int,
+        rows: Optional[np.ndarray],
+        mask: Optional[np.ndarray] = None
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Exact top-k over ``rows`` (or all rows allowed by ``mask``) per query.
+        
+        Queries are taken ``SEARCH_BLOCK_QUERIES`` at a time and rows
+        ``SEARCH_BLOCK_ROWS`` at a time, keeping a running top-k, so no score
+        matrix larger than one block is built however large the batch.
+        """
+        hits = []
+        for start in range(0, len(queries), self.SEARCH_BLOCK_QUERIES):
+            group = queries[start:start + self.SEARCH_BLOCK_QUERIES]
+            best_rows, best_scores = empty_top_k(len(group))
+            for block_rows, block_scores in self._score_blocks(group, rows, mask):
+                best_rows, best_scores = merge_top_k(best_rows, best_scores, block_rows, block_scores, k)
+            hits.extend(sorted_top_k(best_rows, best_scores))
+        return hits
+    
+    def similarity_search(
+        self,
+        query_embedding: List[float],
+        top_k: int = 5,
+        filter_metadata: Optional[Dict] = None
+    ) -> List[Dict]:
+        """
+        Search for similar chunks using cosine similarity.
+        
+        Args:
+            query_embedding: Query vector
+            top_k: Number of results to return
+            filter_metadata: Optional metadata filters
+        
+        Returns:
+            List of results with text, metadata, and similarity scores
+        """
+        return self.similarity_search_batch([query_embedding], top_k, filter_metadata)[0]
+    
+    def similarity_search_batch(
+        self,
+        query_embeddings: List[List[float]],
+        top_k: int = 5,
+        filter_metadata: Optional[Dict] = None,
+        nprobe: int = None
+    ) -> List[List[Dict]]:
+        """
+        Search for several query embeddings with one matrix product.
+        
+        Args:
+            query_embeddings: Query vectors
+            top_k: Number of results per query
+            filter_metadata: Optional metadata filters applied to every query
+            nprobe: IVF lists scanned per query (default from settings; ignored
+                for exact search)
+        
+        Returns:
+            One result list per query, in query order
+        """
+        if not query_embeddings:
+            return []
+        
+        queries = self._normalize(np.asarray(query_embeddings, dtype=np.float32))
+        
+        with self._lock.read():
+            mask = self._row_mask(filter_metadata)
+            candidates = np.flatnonzero(mask)
+            k = min(top_k, len(candidates))
+            if k == 0:
+                return [[] for _ in query_embeddings]
+            
+            # Small candidate sets are gathered and scored exactly
+            if len(candidates) * 4 < self._count:
+                hits = self._exact_top_k(queries, k, candidates)
+            elif self.ann_index is not None and self.ann_index.trained:
+                hits = self.ann_index.search(queries, k, self._matrix, mask, nprobe)
+            elif self.quantized is not None and self.quantized.covers(self._count, self._matrix.shape[1]):
+                hits = self.quantized.search(queries, k, self._matrix, mask)
+            else:
+                hits = self._exact_top_k(queries, k, None, mask)
+            
+            all_results = [
+                [
+                    {
+                        'chunk_id': self._ids[row],
+                        'text': self._texts[row],
+                        'metadata': dict(self._metadatas[row]),
+                        'similarity_score': float(score)
+                    }
+                    for row, score in zip(rows, scores)
+                ]
+                for rows, scores in hits
+            ]
+        
+        return all_results
+    
+    def similarity_scores(self, query_embedding: List[float], chunk_ids: List[str]) -> Dict[str, float]:
+        """Cosine similarity of the query to each given chunk (unknown ids are left out)."""
+        query = self._normalize(np.asarray([query_embedding], dtype=np.float32))[0]
+        with self._lock.read():
+            known = [chunk_id for chunk_id in chunk_ids if chunk_id in self._row_of]
+            rows = [self._row_of[chunk_id] for chunk_id in known]
+            scores = self._matrix[rows].astype(np.float32) @ query if rows else []
+        return {chunk_id: float(score) for chunk_id, score in zip(known, scores)}
+    
+    def _iter_stored_chunks(self) -> Iterator[Tuple[str, str, Dict]]:
+        """Yield (chunk id, text, metadata) for every live row."""
+        with self._lock.read():
+            rows = [row for row in range(self._count) if self._alive[row]]
+            entries = [(self._ids[row], self._texts[row], self._metadatas[row]) for row in rows]
+        yield from entries
+    
+    def delete_document(self, filename: str) -> int:
+        """
+        Delete all chunks from a specific document.
+        
+        Args:
+            filename: Name of the document to delete
+        
+        Returns:
+            Number of chunks deleted
+        """
+        with self._lock.write():
+            rows = sorted(self._source_rows.get(filename, ()))
+            self._delete_rows(rows)
+            if rows and self.keyword_index is not None:
+                self.keyword_index.remove_source(filename)
+            if rows:
+                self.catalog.remove_source(filename)
+        
+        if rows:
+            self._notify_change({filename})
+        return len(rows)
+    
+    def delete_chunks(self, chunk_ids: List[str]) -> int:
+        """
+        Delete specific chunks by id.
+        
+        Args:
+            chunk_ids: Ids of the chunks to delete
+        
+        Returns:
+            Number of chunks deleted
+        """
+        with self._lock.write():
+            rows = [self._row_of[chunk_id] for chunk_id in chunk_ids if chunk_id in self._row_of]
+            sources = {self._metadatas[row].get("source", "Unknown") for row in rows}
+            if rows and self.keyword_index is not None:
+                self.keyword_index.remove([self._ids[row] for row in rows])
+            if rows:
+                self.catalog.remove([self._ids[row] for row in rows])
+            self._delete_rows(rows)
+        
+        if rows:
+            self._notify_change(sources)
+        return len(rows)
+    
+    def _delete_rows(self, rows: List[int]):
+        """Tombstone rows and log the deletions. Caller holds the lock."""
+        for row in rows:
+            self._drop_row(row)
+        if rows:
+            self._append_log([{"row": row, "deleted": True} for row in rows])
+            if self.ann_index is not None and self.ann_index.trained:
+                self.ann_index.remove(np.asarray(rows))
+    
+    def get_collection_info(self) -> Dict:
+        """Get information about the vector store."""
+        with self._lock.read():
+            return {
+                'collection_name': self.directory.name,
+                **self.catalog.get_stats(),
+                'persist_directory': str(self.directory),
+                'similarity_metric': 'cosine',
+                'backend': 'numpy',
+                'dtype': str(self.dtype),
+                'allocated_rows': self._count,
+                'index': 'ivfpq' if self.ann_index is not None else 'exact',
+                'index_trained': self.ann_index is not None and self.ann_index.trained,
+                'quantization': self.quantized.mode if self.quantized is not None else 'none',
+                'float_bytes': self._count * self._matrix.shape[1] * self.dtype.itemsize if self._matrix is not None else 0,
+                'quantized_bytes': self.quantized.nbytes(self._count) if self.quantized is not None else 0,
+                'keyword_index': self.keyword_index is not None
+            }
+    
+    def close(self):
+        """Flush and unmap the matrix and close the sidecar databases."""
+        with self._lock.write():
+            if self._matrix is not None:
+                self._matrix.flush()
+            self._reset()
+            super().close()
+    
+    def clear_collection(self):
+        """Delete all data from the store."""
+        with self._lock.write():
+            self._matrix = None
+            for path in (self._matrix_path, self._rows_path):
+                if path.exists():
+                    path.unlink()
+            self._reset()
+            if self.ann_index is not None:
+                self.ann_index.reset()
+            if self.quantized is not None:
+                self.quantized.reset()
+            if self.keyword_index is not None:
+                self.keyword_index.clear()
+            self.catalog.clear()
+        
+        self._notify_change(None)
@@ -1,5 +1,16 @@
 """Prompt templates for RAG system."""
 
+from config import settings
+from context_packer import (
+    MESSAGE_OVERHEAD_TOKENS,
+    count_tokens,
+    fit_blocks,
+    merge_overlapping,
+    message_tokens,
+    remove_near_duplicates,
+    trim_history,
+)
+
 SYSTEM_PROMPT = """You are a helpful AI assistant that answers questions based ONLY on the provided context.
 
 STRICT RULES:
@@ -16,27 +27,61 @@ Context:
 Remember: Accuracy and honesty are more important than providing an answer."""
 
 
-def build_rag_prompt(query: str, context_chunks: list[dict], chat_history: list[dict] = None) -> str:
+def _format_block(block: dict, text: str) -> str:
+    """Format one packed context block with its source label."""
+    source = block.get('metadata', {}).get('source', 'Unknown')
+    page = block.get('metadata', {}).get('page')
+    end_page = block.get('metadata', {}).get('end_page')
+    numbers = ", ".join(str(number) for number in block['source_numbers'])
+    
+    # Pages are stored as -1 when unknown
+    page_info = ""
+    if page and page > 0:
+        page_info = f", Page {page}"
+        if end_page and end_page > page:
+            page_info = f", Pages {page}-{end_page}"
+    return f"[Source {numbers}: {source}{page_info}]\n{text}"
+
+
+def build_rag_prompt(
+    query: str,
+    context_chunks: list[dict],
+    chat_history: list[dict] = None,
+    max_prompt_tokens: int = None
+) -> str:
     """
     Build the complete RAG prompt with context and query.
     
+    Overlapping chunks of the same source are merged and near-duplicates
+    dropped; source labels keep the chunks' retrieval positions, so a merged
+    block reads e.g. "[Source 1, 3: manual.pdf, Pages 4-5]". The system
+    prompt and query are always sent; the history gets up to
+    ``settings.max_history_tokens`` (newest messages first) and the context
+    fills the rest of the budget in rank order.
+    
     Args:
         query: User's question
         context_chunks: List of retrieved chunks with metadata
         chat_history: Optional chat history for context
+        max_prompt_tokens: Prompt-token budget (default from settings, 0 for
+            no limit)
         
     Returns:
         Formatted prompt string
     """
-    # Format context chunks
-    context_parts = []
-    for i, chunk in enumerate(context_chunks, 1):
-        source = chunk.get('metadata', {}).get('source', 'Unknown')
-        page = chunk.get('metadata', {}).get('page')
-        text = chunk.get('text', '')
-        
-        page_info = f", Page {page}" if page else ""
-        context_parts.append(f"[Source {i}: {source}{page_info}]\n{text}")
+    max_prompt_tokens = max_prompt_tokens if max_prompt_tokens is not None else settings.max_prompt_tokens
+    blocks = remove_near_duplicates(merge_overlapping(context_chunks))
+    
+    if max_prompt_tokens > 0:
+        fixed_tokens = (
+            count_tokens(SYSTEM_PROMPT.format(context="")) + count_tokens(query) + 2 * MESSAGE_OVERHEAD_TOKENS
+        )
+        available = max_prompt_tokens - fixed_tokens
+        chat_history = trim_history(chat_history, min(settings.max_history_tokens, available))
+        history_tokens = sum(message_tokens(message) for message in chat_history)
+        context_parts = fit_blocks(blocks, available - history_tokens, _format_block)
+    else:
+        context_parts = [_format_block(block, block['text']) for block in blocks]
     
     context_str = "\n\n".join(context_parts)
     
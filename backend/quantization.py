@@ -0,0 +1,321 @@
+"""Int8 and binary quantized embedding codes with exact float rescoring."""
+
+import os
+import uuid
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from topk import empty_top_k, merge_top_k
+
+
+# Number of set bits in every 16-bit value; two bytes per lookup halves the work
+POPCOUNT16 = np.array([bin(i).count("1") for i in range(1 << 16)], dtype=np.uint8)
+
+QUANTIZATION_MODES = ("int8", "binary")
+
+
+class QuantizedVectors:
+    """
+    Compact copy of a store's embedding matrix used to find candidates.
+    
+    ``int8`` keeps one signed byte per dimension (4x smaller than float32),
+    scaled by a per-dimension range calibrated on the stored vectors;
+    queries are scored with a float-by-int8 dot product. ``binary`` keeps
+    one sign bit per dimension (32x smaller) and ranks by Hamming distance.
+    The best ``rescore_candidates`` rows are then rescored exactly against
+    the float matrix, so only those rows of it are read from disk.
+    
+    Codes are stored in ``quantized.npy`` aligned with the store's rows. A
+    recalibration encodes into a new file that is then swapped in.
+    """
+    
+    CODES_FILE = "quantized.npy"
+    CALIBRATION_FILE = "quantized_calibration.npz"
+    
+    # Rows scored per block, bounding the float32 working set of int8 scans
+    SCAN_BLOCK_ROWS = 16384
+    MIN_CAPACITY = 1024
+    # The int8 range is recalibrated each time the store doubles, up to this size
+    CALIBRATION_ROWS = 100000
+    
+    def __init__(self, directory: str, mode: str, rescore_candidates: int):
+        """
+        Open (or create) quantized codes stored in a directory.
+        
+        Args:
+            directory: Directory holding the codes and calibration files
+            mode: "int8" or "binary"
+            rescore_candidates: Candidates rescored exactly per query
+        """
+        if mode not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization: {mode}. Supported: {', '.join(QUANTIZATION_MODES)}")
+        
+        self.directory = Path(directory)
+        self.mode = mode
+        self.rescore_candidates = rescore_candidates
+        
+        self._codes_path = self.directory / self.CODES_FILE
+        self._calibration_path = self.directory / self.CALIBRATION_FILE
+        self._load()
+    
+    @property
+    def dtype(self) -> np.dtype:
+        """Storage dtype of the codes."""
+        return np.dtype(np.int8 if self.mode == "int8" else np.uint8)
+    
+    def _width(self, dimension: int) -> int:
+        """Bytes per encoded row."""
+        return dimension if self.mode == "int8" else (dimension + 7) // 8
+    
+    def _load(self):
+        """Map the codes and read the int8 calibration."""
+        self.codes: Optional[np.ndarray] = None
+        self.bound: Optional[np.ndarray] = None
+        self.calibrated_rows = 0
+        
+        if self._codes_path.exists():
+            codes = np.load(self._codes_path, mmap_mode="r+")
+            # Codes written for another mode are rebuilt by the store
+            if codes.dtype == self.dtype:
+                self.codes = codes
+        
+        if self.mode == "int8" and self._calibration_path.exists():
+            with np.load(self._calibration_path) as calibration:
+                self.bound = calibration["bound"]
+                self.calibrated_rows = int(calibration["rows"])
+    
+    def covers(self, rows: int, dimension: int) -> bool:
+        """Whether codes exist for ``rows`` rows of the given dimension."""
+        if self.codes is None or self.codes.shape[1] != self._width(dimension):
+            return False
+        if self.mode == "int8" and (self.bound is None or len(self.bound) != dimension):
+            return False
+        return self.codes.shape[0] >= rows
+    
+    def needs_calibration(self, live_rows: int) -> bool:
+        """Whether the int8 range should be re-estimated for a store of this size."""
+        if self.mode != "int8":
+            return False
+        if self.bound is None:
+            return True
+        return self.calibrated_rows < self.CALIBRATION_ROWS and live_rows >= 2 * self.calibrated_rows
+    
+    def fit(self, sample: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Estimate the int8 range of each dimension without changing the codes.
+        
+        Args:
+            sample: Normalized vectors representative of the store
+        
+        Returns:
+            Per-dimension bound for ``encode`` and ``install`` (None for binary)
+        """
+        if self.mode != "int8":
+            return None
+        
+        bound = np.abs(sample).max(axis=0).astype(np.float32)
+        bound[bound == 0] = 1.0
+        return bound
+    
+    def encode(self, vectors: np.ndarray, bound: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Quantize normalized vectors (int8 values beyond the range are clipped).
+        
+        Args:
+            vectors: Normalized vectors
+            bound: Optional int8 range from ``fit`` to encode with instead of
+                the installed one
+        """
+        if self.mode == "binary":
+            return np.packbits(vectors > 0, axis=1)
+        bound = self.bound if bound is None else bound
+        return np.clip(np.rint(vectors * (127 / bound)), -127, 127).astype(np.int8)
+    
+    @property
+    def can_encode(self) -> bool:
+        """Whether codes can be added (int8 needs a calibrated range)."""
+        return self.mode == "binary" or self.bound is not None
+    
+    def write_codes(
+        self,
+        blocks: Iterable[Tuple[np.ndarray, np.ndarray]],
+        rows: int,
+        dimension: int,
+        bound: Optional[np.ndarray]
+    ) -> Path:
+        """
+        Encode blocks of vectors into a new code file beside the current one.
+        
+        Args:
+            blocks: (row numbers, normalized vectors) pairs
+            rows: Rows the new file must hold
+            dimension: Vector dimension
+            bound: Int8 range from ``fit`` (None for binary)
+        
+        Returns:
+            Path of the new file, for ``install``
+        """
+        capacity = max(self.MIN_CAPACITY, rows)
+        # Unique, so a rebuild superseded by another never shares its file
+        path = self.directory / f"{self.CODES_FILE}.{uuid.uuid4().hex}.tmp"
+        codes = np.lib.format.open_memmap(path, mode="w+", dtype=self.dtype, shape=(capacity, self._width(dimension)))
+        for block_rows, vectors in blocks:
+            codes[block_rows] = self.encode(vectors, bound)
+        codes.flush()
+        del codes
+        return path
+    
+    def install(self, path: Path, bound: Optional[np.ndarray], rows: int):
+        """
+        Swap in codes from ``write_codes`` and their calibration.
+        
+        Args:
+            path: File returned by ``write_codes``
+            bound: Int8 range the codes were encoded with (None for binary)
+            rows: Number of live rows the range was estimated from
+        """
+        # Released before the rename, as in _ensure_capacity
+        self.codes = None
+        os.replace(path, self._codes_path)
+        self.codes = np.load(self._codes_path, mmap_mode="r+")
+        
+        if bound is not None:
+            self.bound, self.calibrated_rows = bound, rows
+            tmp_path = self._calibration_path.with_suffix(".tmp.npz")
+            np.savez(tmp_path, bound=bound, rows=rows)
+            os.replace(tmp_path, self._calibration_path)
+    
+    def _ensure_capacity(self, rows: int, dimension: int):
+        """Make the code matrix hold at least ``rows`` rows, doubling when it grows."""
+        width = self._width(dimension)
+        if self.codes is not None and self.codes.shape[1] == width and rows <= self.codes.shape[0]:
+            return
+        
+        capacity = max(self.MIN_CAPACITY, rows)
+        keep = 0
+        if self.codes is not None and self.codes.shape[1] == width:
+            capacity = max(capacity, self.codes.shape[0] * 2)
+            keep = self.codes.shape[0]
+        
+        tmp_path = self._codes_path.with_suffix(".npy.tmp")
+        grown = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=self.dtype, shape=(capacity, width))
+        if keep:
+            grown[:keep] = self.codes[:keep]
+        grown.flush()
+        del grown
+        self.codes = None
+        
+        os.replace(tmp_path, self._codes_path)
+        self.codes = np.load(self._codes_path, mmap_mode="r+")
+    
+    def add(self, rows: np.ndarray, vectors: np.ndarray):
+        """
+        Encode and store (or overwrite) the codes of the given rows.
+        
+        Args:
+            rows: Row numbers of the vectors in the backing matrix
+            vectors: Normalized vectors aligned with ``rows``
+        """
+        if len(rows) == 0:
+            return
+        
+        rows = np.asarray(rows, dtype=np.int64)
+        self._ensure_capacity(int(rows.max()) + 1, vectors.shape[1])
+        self.codes[rows] = self.encode(vectors)
+        self.codes.flush()
+    
+    def renumber(self, rows: np.ndarray):
+        """
+        Keep only the codes of ``rows``, renumbered 0..n-1 in that order.
+        
+        Args:
+            rows: Old row numbers, in their new order (the store's live rows
+                when it compacts)
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        path = self.directory / f"{self.CODES_FILE}.{uuid.uuid4().hex}.tmp"
+        renumbered = np.lib.format.open_memmap(
+            path, mode="w+", dtype=self.dtype, shape=(max(self.MIN_CAPACITY, len(rows)), self.codes.shape[1])
+        )
+        for start in range(0, len(rows), self.SCAN_BLOCK_ROWS):
+            block = rows[start:start + self.SCAN_BLOCK_ROWS]
+            # Rows never encoded keep zero codes
+            encoded = block < len(self.codes)
+            renumbered[start:start + len(block)][encoded] = self.codes[block[encoded]]
+        renumbered.flush()
+        del renumbered
+        self.install(path, None, self.calibrated_rows)
+    
+    def _block_scores(self, queries: np.ndarray, start: int, stop: int) -> np.ndarray:
+        """Approximate scores of each query against rows ``start:stop`` (higher is closer)."""
+        block = self.codes[start:stop]
+        if self.mode == "int8":
+            # q.x ~= (q * bound / 127) . codes
+            return (queries * (self.bound / 127)) @ block.astype(np.float32).T
+        
+        query_bits = np.packbits(queries > 0, axis=1)
+        if block.shape[1] % 2:
+            # Pad to whole 16-bit words; zero bytes add no differing bits
+            block = np.pad(block, ((0, 0), (0, 1)))
+            query_bits = np.pad(query_bits, ((0, 0), (0, 1)))
+        
+        scores = np.empty((len(queries), stop - start), dtype=np.float32)
+        for q, bits in enumerate(query_bits):
+            differing = np.bitwise_xor(block, bits).view(np.uint16)
+            scores[q] = -POPCOUNT16[differing].sum(axis=1, dtype=np.int32)
+        return scores
+    
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int,
+        matrix: np.ndarray,
+        mask: np.ndarray,
+        rescore_candidates: int = None
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Top-k search over the codes with exact float rescoring.
+        
+        Args:
+            queries: Normalized query vectors, shape (nq, dimension)
+            k: Number of results per query
+            matrix: Float vectors, indexed by row (may be memory-mapped)
+            mask: Boolean mask of rows allowed in the results
+            rescore_candidates: Candidates rescored per query (default: the
+                configured number; ``k`` skips rescoring beyond reordering)
+        
+        Returns:
+            Per query, a tuple of (rows, exact scores) sorted by score
+        """
+        count = len(mask)
+        shortlist = min(int(mask.sum()), max(k, rescore_candidates or self.rescore_candidates))
+        
+        # Carry only the best ``shortlist`` rows per query from block to block
+        top, top_scores = empty_top_k(len(queries))
+        for start in range(0, count, self.SCAN_BLOCK_ROWS):
+            stop = min(start + self.SCAN_BLOCK_ROWS, count)
+            scores = self._block_scores(queries, start, stop)
+            scores[:, ~mask[start:stop]] = -np.inf
+            top, top_scores = merge_top_k(top, top_scores, np.arange(start, stop), scores, shortlist)
+        
+        results = []
+        for q, query in enumerate(queries):
+            candidates = np.sort(top[q])
+            exact = matrix[candidates].astype(np.float32, copy=False) @ query
+            best = np.argsort(-exact, kind="stable")[:k]
+            results.append((candidates[best], exact[best]))
+        return results
+    
+    def nbytes(self, rows: int) -> int:
+        """Bytes of codes scanned per query for ``rows`` rows."""
+        return 0 if self.codes is None else rows * self.codes.shape[1]
+    
+    def reset(self):
+        """Delete the codes and calibration."""
+        self.codes = None
+        for path in (self._codes_path, self._calibration_path):
+            if path.exists():
+                path.unlink()
+        self._load()
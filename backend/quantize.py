@@ -0,0 +1,142 @@
+"""Migrate embeddings to a quantized NumPy store and report memory saved and recall loss."""
+
+import argparse
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from config import settings
+from models import ChunkMetadata, DocumentChunk
+from numpy_store import NumpyVectorStore
+
+
+def _page(value) -> Optional[int]:
+    """Stored page number, or None for the -1 placeholder."""
+    return None if value in (None, -1) else value
+
+
+def chunk_from_record(chunk_id: str, text: str, metadata: Dict) -> DocumentChunk:
+    """Rebuild a DocumentChunk from a stored id, text and flat metadata."""
+    created_at = metadata.get('created_at')
+    return DocumentChunk(
+        chunk_id=chunk_id,
+        text=text,
+        metadata=ChunkMetadata(
+            source=metadata.get('source', 'Unknown'),
+            chunk_id=chunk_id,
+            page=_page(metadata.get('page')),
+            start_page=_page(metadata.get('start_page')),
+            end_page=_page(metadata.get('end_page')),
+            created_at=datetime.fromisoformat(created_at) if created_at else datetime.now()
+        )
+    )
+
+
+def copy_from_chroma(store: NumpyVectorStore, batch_size: int = 1000) -> int:
+    """
+    Copy every chunk and embedding of the configured Chroma collection into a store.
+    
+    Args:
+        store: Destination NumPy store
+        batch_size: Chunks read and written per batch
+    
+    Returns:
+        Number of chunks copied
+    """
+    from vector_store import ChromaVectorStore
+    collection = ChromaVectorStore(keyword_index=False).collection
+    
+    copied = 0
+    while True:
+        page = collection.get(
+            include=["documents", "metadatas", "embeddings"],
+            limit=batch_size,
+            offset=copied
+        )
+        if not len(page['ids']):
+            return copied
+        
+        chunks = [
+            chunk_from_record(chunk_id, text, metadata)
+            for chunk_id, text, metadata in zip(page['ids'], page['documents'], page['metadatas'])
+        ]
+        store.upsert_chunks(chunks, np.asarray(page['embeddings'], dtype=np.float32))
+        copied += len(chunks)
+
+
+def evaluate(store: NumpyVectorStore, num_queries: int = 200, k: int = 10, seed: int = 0) -> List[Dict]:
+    """
+    Compare quantized search with exact float search on a fixed query set.
+    
+    Queries are stored vectors (chosen with a fixed seed) plus Gaussian
+    noise, so the same store always yields the same report.
+    
+    Args:
+        store: Store with quantization configured
+        num_queries: Number of queries
+        k: Number of neighbours
+        seed: Random seed for choosing queries
+    
+    Returns:
+        One dict per configuration: exact float search, quantized codes
+        alone, and quantized codes with float rescoring
+    """
+    quantized = store.quantized
+    live = np.flatnonzero(store._alive)
+    rng = np.random.default_rng(seed)
+    picked = np.sort(rng.choice(live, min(num_queries, len(live)), replace=False))
+    queries = store._matrix[picked].astype(np.float32)
+    queries += rng.normal(scale=0.5 / np.sqrt(queries.shape[1]), size=queries.shape).astype(np.float32)
+    queries = store._normalize(queries)
+    
+    mask = store._row_mask(None)
+    
+    def run(search) -> Tuple[List[Set[int]], float]:
+        start = time.perf_counter()
+        found = [set(rows.tolist()) for rows, _ in search()]
+        latency_ms = (time.perf_counter() - start) / len(queries) * 1000
+        return found, round(latency_ms, 3)
+    
+    truth, exact_ms = run(lambda: store._exact_top_k(queries, k, None, mask))
+    float_bytes = store._count * store._matrix.shape[1] * store.dtype.itemsize
+    points = [{'search': 'float', 'recall_at_k': 1.0, 'latency_ms': exact_ms, 'scan_bytes': float_bytes}]
+    
+    for name, candidates in (('quantized', k), ('rescored', quantized.rescore_candidates)):
+        found, latency_ms = run(lambda: quantized.search(queries, k, store._matrix, mask, candidates))
+        recall = np.mean([len(truth[i] & found[i]) / k for i in range(len(queries))])
+        points.append({
+            'search': name,
+            'recall_at_k': round(float(recall), 4),
+            'latency_ms': latency_ms,
+            'scan_bytes': quantized.nbytes(store._count)
+        })
+    return points
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Quantize the NumPy vector store and report memory saved and recall loss."
+    )
+    parser.add_argument("--quantization", choices=["int8", "binary"], default="int8")
+    parser.add_argument("--directory", default=settings.numpy_store_directory)
+    parser.add_argument("--from-chroma", action="store_true", help="First copy the Chroma collection into the store")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+    
+    # Opening with quantization encodes any vectors already in the store
+    store = NumpyVectorStore(args.directory, quantization=args.quantization)
+    if args.from_chroma:
+        print(f"Copied {copy_from_chroma(store)} chunks from Chroma into {args.directory}")
+    
+    points = evaluate(store, args.queries, args.k)
+    saved = 1 - points[-1]['scan_bytes'] / points[0]['scan_bytes']
+    print(f"{len(store._row_of)} chunks, {args.quantization} codes scan {saved:.1%} fewer bytes than float vectors")
+    print(f"{'search':>10} {'recall@' + str(args.k):>10} {'ms/query':>10} {'MiB':>10}")
+    for point in points:
+        print(
+            f"{point['search']:>10} {point['recall_at_k']:>10.3f} "
+            f"{point['latency_ms']:>10.2f} {point['scan_bytes'] / 2 ** 20:>10.1f}"
+        )
@@ -1,32 +1,127 @@
 """RAG engine orchestrating retrieval and generation."""
 
-from typing import List, Dict, Optional
+import asyncio
+import contextvars
+import copy
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, AsyncIterator, Tuple
 import openai
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 from config import settings
+from answer_cache import SemanticAnswerCache
 from embeddings import EmbeddingService
-from vector_store import VectorStore
+from vector_store import VectorStore, create_vector_store
 from prompts import build_rag_prompt, get_prompt_for_display
-from models import Source, ChatResponse
+from context_packer import count_tokens, message_tokens
+from metrics import LLM_TOKENS, PROMPT_TOKENS, count_retry, record_stage, timed
+from reranker import Reranker, RerankStage, create_reranker
+from models import Source, ChatResponse, BatchChatResult
+
+
+RETRIEVAL_MODES = ("dense", "sparse", "hybrid")
+
+
+def reciprocal_rank_fusion(result_lists: List[List[Dict]], k: int = 60) -> List[Dict]:
+    """
+    Merge ranked result lists with reciprocal rank fusion.
+    
+    Each chunk scores ``sum(1 / (k + rank))`` over the lists it appears in.
+    For a chunk found by several retrievers, the first list's fields are kept
+    and later lists only add fields it lacks (e.g. ``bm25_score``), so pass
+    the dense results first to keep their cosine similarity.
+    
+    Args:
+        result_lists: Ranked results from each retriever
+        k: Rank offset damping the weight of the top ranks
+    
+    Returns:
+        Fused results, best first, each with a ``fusion_score``
+    """
+    fused: Dict[str, Dict] = {}
+    for results in result_lists:
+        for rank, result in enumerate(results, start=1):
+            entry = fused.get(result['chunk_id'])
+            if entry is None:
+                entry = fused[result['chunk_id']] = {**result, 'fusion_score': 0.0}
+            else:
+                for key, value in result.items():
+                    entry.setdefault(key, value)
+            entry['fusion_score'] += 1.0 / (k + rank)
+    
+    return sorted(fused.values(), key=lambda result: result['fusion_score'], reverse=True)
 
 
 class RAGEngine:
     """Orchestrates RAG pipeline: retrieval + generation."""
     
-    def __init__(self):
-        """Initialize RAG engine with dependencies."""
-        self.embedding_service = EmbeddingService()
-        self.vector_store = VectorStore()
-        self.llm_client = openai.OpenAI(
+    # Queries per store call in batch retrieval
+    BATCH_SEARCH_GROUP = 64
+    
+    def __init__(
+        self,
+        embedding_service: Optional[EmbeddingService] = None,
+        vector_store: Optional[VectorStore] = None,
+        llm_client: Optional[openai.OpenAI] = None,
+        async_llm_client: Optional[openai.AsyncOpenAI] = None,
+        retrieval_mode: Optional[str] = None,
+        reranker: Optional[Reranker] = None
+    ):
+        """
+        Initialize RAG engine with dependencies.
+        
+        Args:
+            embedding_service: Shared embedding service (default: a new one)
+            vector_store: Shared vector store (default: the configured backend)
+            llm_client: Shared sync LLM client (default: a new one)
+            async_llm_client: Shared async LLM client (default: a new one)
+            retrieval_mode: "dense", "sparse" or "hybrid" (default from settings)
+            reranker: Reranker applied to over-fetched candidates (default:
+                the configured ``rerank_method``; none disables reranking)
+        """
+        self.embedding_service = embedding_service or EmbeddingService()
+        self.vector_store = vector_store or create_vector_store()
+        self.llm_client = llm_client or openai.OpenAI(
+            api_key=settings.openrouter_api_key,
+            base_url=settings.openrouter_base_url,
+            max_retries=0
+        )
+        self.async_llm_client = async_llm_client or openai.AsyncOpenAI(
             api_key=settings.openrouter_api_key,
-            base_url=settings.openrouter_base_url
+            base_url=settings.openrouter_base_url,
+            max_retries=0
         )
         self.llm_model = settings.llm_model
+        
+        self.configured_retrieval_mode = (retrieval_mode or settings.retrieval_mode).lower()
+        if self.configured_retrieval_mode not in RETRIEVAL_MODES:
+            raise ValueError(
+                f"Unknown retrieval mode: {self.configured_retrieval_mode}. "
+                f"Supported: {', '.join(RETRIEVAL_MODES)}"
+            )
+        self.retrieval_mode = self._retrieval_mode_for(self.vector_store)
+        
+        # Bounded pool for blocking vector and keyword searches issued from async code
+        self._search_executor = ThreadPoolExecutor(
+            max_workers=settings.search_executor_workers,
+            thread_name_prefix="vector-search"
+        )
+        
+        # Optional rerank stage over a larger candidate set, under a latency budget
+        reranker = reranker or create_reranker()
+        self.rerank_stage = RerankStage(reranker) if reranker is not None else None
+        
+        # Answers for repeated questions, dropped when a cited source changes
+        self.answer_cache = None
+        if settings.answer_cache_enabled:
+            self.answer_cache = SemanticAnswerCache()
+            VectorStore.add_change_listener(self.answer_cache.invalidate_sources)
     
     @retry(
         stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10)
+        wait=wait_exponential(multiplier=1, min=2, max=10),
+        before_sleep=count_retry("llm")
     )
     def _call_llm(self, messages: List[Dict]) -> str:
         """
@@ -50,12 +145,287 @@ class RAGEngine:
         )
         return response.choices[0].message.content
     
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=2, max=10),
+        before_sleep=count_retry("llm")
+    )
+    async def _acall_llm(self, messages: List[Dict]) -> str:
+        """
+        Call LLM asynchronously with retry logic.
+        
+        Args:
+            messages: Chat messages
+            
+        Returns:
+            LLM response text
+        """
+        response = await self.async_llm_client.chat.completions.create(
+            model=self.llm_model,
+            messages=messages,
+            temperature=settings.temperature,
+            max_tokens=settings.max_tokens,
+            extra_headers={
+                "HTTP-Referer": "http://localhost:3000",
+                "X-Title": "RAG Chatbot"
+            }
+        )
+        return response.choices[0].message.content
+    
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=2, max=10),
+        before_sleep=count_retry("llm")
+    )
+    async def _aopen_llm_stream(self, messages: List[Dict]):
+        """
+        Open a streaming LLM completion with retry logic.
+        
+        Only opening the stream is retried; once deltas start flowing a
+        failure is surfaced to the caller instead of restarting the answer.
+        
+        Args:
+            messages: Chat messages
+            
+        Returns:
+            Async iterator of completion chunks
+        """
+        return await self.async_llm_client.chat.completions.create(
+            model=self.llm_model,
+            messages=messages,
+            temperature=settings.temperature,
+            max_tokens=settings.max_tokens,
+            stream=True,
+            extra_headers={
+                "HTTP-Referer": "http://localhost:3000",
+                "X-Title": "RAG Chatbot"
+            }
+        )
+    
+    def _retrieval_mode_for(self, vector_store: VectorStore) -> str:
+        """Configured retrieval mode, or dense when the store has no BM25 index."""
+        if getattr(vector_store, "keyword_index", None) is None:
+            return "dense"
+        return self.configured_retrieval_mode
+    
+    def scoped(
+        self,
+        vector_store: VectorStore,
+        answer_cache: Optional[SemanticAnswerCache] = None
+    ) -> "RAGEngine":
+        """
+        View of the engine that retrieves from another store, e.g. a tenant's.
+        
+        The view shares the LLM and embedding clients, search executor and
+        rerank stage with this engine; only the store and answer cache differ.
+        
+        Args:
+            vector_store: Store to retrieve from
+            answer_cache: Answer cache for that store (None disables caching)
+        
+        Returns:
+            The scoped engine (not to be closed on its own)
+        """
+        engine = copy.copy(self)
+        engine.vector_store = vector_store
+        engine.answer_cache = answer_cache
+        engine.retrieval_mode = self._retrieval_mode_for(vector_store)
+        return engine
+    
+    def _fetch_k(self, top_k: int) -> int:
+        """Candidates to retrieve so the rerank stage can choose ``top_k``."""
+        return self.rerank_stage.fetch_k(top_k) if self.rerank_stage is not None else top_k
+    
+    def _rerank(self, query: str, candidates: List[Dict], top_k: int) -> List[Dict]:
+        """Rerank candidates if a rerank stage is configured and keep ``top_k``."""
+        if self.rerank_stage is None:
+            return candidates[:top_k]
+        with timed("rerank"):
+            return self.rerank_stage.rerank(query, candidates, top_k)
+    
+    def _retrieve(
+        self,
+        query: str,
+        query_embedding: Optional[List[float]],
+        top_k: int,
+        filter_metadata: Optional[Dict] = None
+    ) -> List[Dict]:
+        """
+        Retrieve chunks with the configured retrieval mode, then rerank them.
+        
+        Args:
+            query: User's question (used by BM25)
+            query_embedding: Query vector, None in sparse mode
+            top_k: Number of chunks to retrieve
+            filter_metadata: Optional ``where`` filter on chunk metadata
+        
+        Returns:
+            Retrieved chunks, best first
+        """
+        with timed("retrieve"):
+            candidates = self._search(query, query_embedding, self._fetch_k(top_k), filter_metadata)
+        return self._rerank(query, candidates, top_k)
+    
+    def _search(
+        self,
+        query: str,
+        query_embedding: Optional[List[float]],
+        top_k: int,
+        filter_metadata: Optional[Dict] = None
+    ) -> List[Dict]:
+        """Run the configured retriever(s) for ``top_k`` chunks matching the filter."""
+        if self.retrieval_mode == "dense":
+            return self.vector_store.similarity_search(
+                query_embedding=query_embedding, top_k=top_k, filter_metadata=filter_metadata
+            )
+        if self.retrieval_mode == "sparse":
+            return self.vector_store.keyword_search(query, top_k=top_k, filter_metadata=filter_metadata)
+        
+        candidates = max(top_k, settings.hybrid_candidates)
+        dense = self.vector_store.similarity_search(
+            query_embedding=query_embedding, top_k=candidates, filter_metadata=filter_metadata
+        )
+        sparse = self.vector_store.keyword_search(query, top_k=candidates, filter_metadata=filter_metadata)
+        return self._fuse(dense, sparse, query_embedding, top_k)
+    
+    def _fuse(
+        self,
+        dense: List[Dict],
+        sparse: List[Dict],
+        query_embedding: List[float],
+        top_k: int
+    ) -> List[Dict]:
+        """
+        Fuse dense and keyword results with RRF, keeping the best ``top_k``.
+        
+        Chunks only the keyword search found are given their cosine similarity
+        to the query, so every hybrid result carries a comparable
+        ``similarity_score`` for citations and confidence.
+        """
+        fused = reciprocal_rank_fusion([dense, sparse], k=settings.rrf_k)[:top_k]
+        missing = [result['chunk_id'] for result in fused if 'similarity_score' not in result]
+        if missing:
+            scores = self.vector_store.similarity_scores(query_embedding, missing)
+            for result in fused:
+                if result['chunk_id'] in scores:
+                    result.setdefault('similarity_score', scores[result['chunk_id']])
+        return fused
+    
+    def _search_batch(
+        self,
+        query_embeddings: List[List[float]],
+        top_k: int,
+        filter_metadata: Optional[Dict] = None
+    ) -> List[List[Dict]]:
+        """
+        Dense search for a batch of queries, ``BATCH_SEARCH_GROUP`` per store call.
+        
+        Groups bound the work (and score matrix) of each multi-vector search
+        and let other searches and writes take the store between them.
+        """
+        results = []
+        for start in range(0, len(query_embeddings), self.BATCH_SEARCH_GROUP):
+            results.extend(self.vector_store.similarity_search_batch(
+                query_embeddings[start:start + self.BATCH_SEARCH_GROUP],
+                top_k=top_k,
+                filter_metadata=filter_metadata
+            ))
+        return results
+    
+    def _retrieve_batch(
+        self,
+        queries: List[str],
+        query_embeddings: List[Optional[List[float]]],
+        top_k: int,
+        filter_metadata: Optional[Dict] = None
+    ) -> List[List[Dict]]:
+        """
+        Retrieve chunks for several queries, with one multi-vector dense search.
+        
+        Args:
+            queries: User questions (used by BM25)
+            query_embeddings: Query vectors aligned with ``queries`` (None in sparse mode)
+            top_k: Number of chunks to retrieve per query
+            filter_metadata: Optional ``where`` filter applied to every query
+        
+        Returns:
+            Retrieved chunks per query, in query order
+        """
+        fetch_k = self._fetch_k(top_k)
+        with timed("retrieve"):
+            if self.retrieval_mode == "sparse":
+                retrieved = [
+                    self.vector_store.keyword_search(query, top_k=fetch_k, filter_metadata=filter_metadata)
+                    for query in queries
+                ]
+            elif self.retrieval_mode == "dense":
+                retrieved = self._search_batch(query_embeddings, fetch_k, filter_metadata)
+            else:
+                candidates = max(fetch_k, settings.hybrid_candidates)
+                dense = self._search_batch(query_embeddings, candidates, filter_metadata)
+                retrieved = [
+                    self._fuse(
+                        dense_results,
+                        self.vector_store.keyword_search(query, top_k=candidates, filter_metadata=filter_metadata),
+                        query_embedding,
+                        fetch_k
+                    )
+                    for query, query_embedding, dense_results in zip(queries, query_embeddings, dense)
+                ]
+        
+        return [self._rerank(query, chunks, top_k) for query, chunks in zip(queries, retrieved)]
+    
+    async def _aretrieve(
+        self,
+        query: str,
+        query_embedding: Optional[List[float]],
+        top_k: int,
+        filter_metadata: Optional[Dict] = None
+    ) -> List[Dict]:
+        """Run retrieval on the bounded search executor."""
+        loop = asyncio.get_running_loop()
+        # Carry the request's context over so its stage timings are recorded
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self._search_executor,
+            lambda: context.run(self._retrieve, query, query_embedding, top_k, filter_metadata)
+        )
+    
+    def _embed_query(self, query: str) -> Optional[List[float]]:
+        """Embed the query unless retrieval is keyword-only."""
+        if self.retrieval_mode == "sparse":
+            return None
+        with timed("embed"):
+            return self.embedding_service.generate_embedding(query)
+    
+    async def _aembed_query(self, query: str) -> Optional[List[float]]:
+        """Embed the query asynchronously unless retrieval is keyword-only."""
+        if self.retrieval_mode == "sparse":
+            return None
+        with timed("embed"):
+            return await self.embedding_service.agenerate_embedding(query)
+    
+    def _build_prompt(
+        self,
+        query: str,
+        retrieved_chunks: List[Dict],
+        chat_history: Optional[List[Dict]]
+    ) -> List[Dict]:
+        """Build the prompt messages, recording build time and prompt tokens."""
+        with timed("prompt"):
+            messages = build_rag_prompt(query, retrieved_chunks, chat_history)
+        prompt_tokens = sum(message_tokens(message) for message in messages)
+        PROMPT_TOKENS.observe(prompt_tokens)
+        LLM_TOKENS.inc(prompt_tokens, kind="prompt")
+        return messages
+    
     def query(
         self, 
         query: str, 
         chat_history: List[Dict] = None,
         top_k: int = None,
-        include_prompt: bool = False
+        include_prompt: bool = False,
+        filter_metadata: Optional[Dict] = None
     ) -> ChatResponse:
         """
         Process a query using RAG.
@@ -65,6 +435,7 @@ class RAGEngine:
             chat_history: Optional conversation history
             top_k: Number of chunks to retrieve
             include_prompt: Whether to include prompt in response (developer mode)
+            filter_metadata: Optional ``where`` filter restricting the chunks retrieved
             
         Returns:
             ChatResponse with answer, sources, and confidence
@@ -72,41 +443,405 @@ class RAGEngine:
         if top_k is None:
             top_k = settings.top_k
         
-        # Step 1: Convert query to embedding
-        query_embedding = self.embedding_service.generate_embedding(query)
+        # Step 1: Convert query to embedding (skipped for keyword-only retrieval)
+        query_embedding = self._embed_query(query)
         
         # Step 2: Retrieve relevant chunks
-        retrieved_chunks = self.vector_store.similarity_search(
-            query_embedding=query_embedding,
-            top_k=top_k
+        retrieved_chunks = self._retrieve(query, query_embedding, top_k, filter_metadata)
+        
+        # Handle empty retrieval
+        if not retrieved_chunks:
+            return self._empty_response(filter_metadata)
+        
+        # Serve repeated questions from the answer cache
+        cached = self._lookup_answer(query_embedding, retrieved_chunks, chat_history, include_prompt)
+        if cached is not None:
+            return cached
+        
+        # Step 3: Build prompt with context
+        messages = self._build_prompt(query, retrieved_chunks, chat_history)
+        
+        # Step 4: Generate answer
+        with timed("llm"):
+            answer = self._call_llm(messages)
+        LLM_TOKENS.inc(count_tokens(answer or ""), kind="completion")
+        
+        # Steps 5-7: Format sources, score confidence and prepare response
+        response = self._build_response(answer, retrieved_chunks, messages, include_prompt)
+        self._store_answer(query_embedding, retrieved_chunks, chat_history, response, messages)
+        return response
+    
+    async def aquery(
+        self, 
+        query: str, 
+        chat_history: List[Dict] = None,
+        top_k: int = None,
+        include_prompt: bool = False,
+        filter_metadata: Optional[Dict] = None
+    ) -> ChatResponse:
+        """
+        Process a query using RAG without blocking the event loop.
+        
+        Embedding and generation use the async OpenRouter client, while the
+        blocking vector and keyword searches run on a bounded thread pool.
+        
+        Args:
+            query: User's question
+            chat_history: Optional conversation history
+            top_k: Number of chunks to retrieve
+            include_prompt: Whether to include prompt in response (developer mode)
+            filter_metadata: Optional ``where`` filter restricting the chunks retrieved
+            
+        Returns:
+            ChatResponse with answer, sources, and confidence
+        """
+        if top_k is None:
+            top_k = settings.top_k
+        
+        # Step 1: Convert query to embedding (skipped for keyword-only retrieval)
+        query_embedding = await self._aembed_query(query)
+        
+        # Step 2: Retrieve relevant chunks
+        retrieved_chunks = await self._aretrieve(query, query_embedding, top_k, filter_metadata)
+        
+        # Steps 3-7: Generate and assemble the answer
+        return await self._aanswer(
+            query, query_embedding, retrieved_chunks, chat_history, include_prompt, filter_metadata
         )
+    
+    async def _aanswer(
+        self,
+        query: str,
+        query_embedding: Optional[List[float]],
+        retrieved_chunks: List[Dict],
+        chat_history: Optional[List[Dict]],
+        include_prompt: bool,
+        filter_metadata: Optional[Dict] = None
+    ) -> ChatResponse:
+        """
+        Generate the answer for already retrieved chunks.
+        
+        Args:
+            query: User's question
+            query_embedding: Embedding of the query (None skips the answer cache)
+            retrieved_chunks: Chunks retrieved for the query
+            chat_history: Optional conversation history
+            include_prompt: Whether to include prompt in response
+            filter_metadata: Filter the chunks were retrieved with, if any
         
+        Returns:
+            ChatResponse with answer, sources, and confidence
+        """
         # Handle empty retrieval
         if not retrieved_chunks:
-            return ChatResponse(
-                answer="I don't have any documents indexed yet. Please upload some documents first.",
-                sources=[],
-                confidence=0.0,
-                prompt_used=None
-            )
+            return self._empty_response(filter_metadata)
+        
+        # Serve repeated questions from the answer cache
+        cached = self._lookup_answer(query_embedding, retrieved_chunks, chat_history, include_prompt)
+        if cached is not None:
+            return cached
         
         # Step 3: Build prompt with context
-        messages = build_rag_prompt(query, retrieved_chunks, chat_history)
+        messages = self._build_prompt(query, retrieved_chunks, chat_history)
         
         # Step 4: Generate answer
-        answer = self._call_llm(messages)
+        with timed("llm"):
+            answer = await self._acall_llm(messages)
+        LLM_TOKENS.inc(count_tokens(answer or ""), kind="completion")
         
-        # Step 5: Format sources
-        sources = [
+        # Steps 5-7: Format sources, score confidence and prepare response
+        response = self._build_response(answer, retrieved_chunks, messages, include_prompt)
+        self._store_answer(query_embedding, retrieved_chunks, chat_history, response, messages)
+        return response
+    
+    async def abatch_query(
+        self,
+        queries: List[str],
+        top_k: int = None,
+        retrieval_only: bool = False,
+        include_prompt: bool = False,
+        filter_metadata: Optional[Dict] = None
+    ) -> AsyncIterator[BatchChatResult]:
+        """
+        Answer many independent questions, yielding each result as it completes.
+        
+        All queries are embedded in batched calls and retrieved with a single
+        multi-vector search; LLM calls then run concurrently, bounded by
+        ``settings.batch_llm_concurrency``. A failed question yields a result
+        with ``error`` set and does not stop the rest of the batch.
+        
+        Args:
+            queries: User questions (answered without chat history)
+            top_k: Number of chunks to retrieve per question
+            retrieval_only: Return sources and confidence without generating answers
+            include_prompt: Whether to include prompts in the results
+            filter_metadata: Optional ``where`` filter applied to every question
+        
+        Yields:
+            BatchChatResult per question, in completion order
+        """
+        if top_k is None:
+            top_k = settings.top_k
+        
+        # Step 1: Embed every query in batched calls (skipped for keyword-only retrieval)
+        query_embeddings = [None] * len(queries)
+        if self.retrieval_mode != "sparse":
+            with timed("embed"):
+                query_embeddings = await asyncio.to_thread(
+                    self.embedding_service.generate_embeddings_batch, queries
+                )
+        
+        # Step 2: Retrieve for all queries at once
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        retrieved = await loop.run_in_executor(
+            self._search_executor,
+            lambda: context.run(self._retrieve_batch, queries, query_embeddings, top_k, filter_metadata)
+        )
+        
+        if retrieval_only:
+            for index, chunks in enumerate(retrieved):
+                yield BatchChatResult(
+                    index=index,
+                    sources=self._format_sources(chunks),
+                    confidence=self._calculate_confidence(chunks)
+                )
+            return
+        
+        # Steps 3-7: Generate answers concurrently
+        semaphore = asyncio.Semaphore(settings.batch_llm_concurrency)
+        
+        async def answer(index: int) -> BatchChatResult:
+            async with semaphore:
+                try:
+                    response = await self._aanswer(
+                        queries[index], query_embeddings[index], retrieved[index], None, include_prompt,
+                        filter_metadata
+                    )
+                except Exception as e:
+                    return BatchChatResult(index=index, error=str(e))
+            return BatchChatResult(index=index, **response.model_dump())
+        
+        tasks = [asyncio.create_task(answer(index)) for index in range(len(queries))]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield await next_result
+        finally:
+            # Stop outstanding LLM calls if the consumer goes away
+            for task in tasks:
+                task.cancel()
+    
+    async def astream_query(
+        self,
+        query: str,
+        chat_history: List[Dict] = None,
+        top_k: int = None,
+        include_prompt: bool = False,
+        filter_metadata: Optional[Dict] = None
+    ) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        Process a query using RAG, streaming the answer as it is generated.
+        
+        Yields ``(event, data)`` pairs: a single ``sources`` event with the
+        retrieved sources and confidence, one ``token`` event per LLM delta,
+        and a final ``done`` event.
+        
+        Args:
+            query: User's question
+            chat_history: Optional conversation history
+            top_k: Number of chunks to retrieve
+            include_prompt: Whether to include prompt in the done event
+            filter_metadata: Optional ``where`` filter restricting the chunks retrieved
+            
+        Yields:
+            Tuples of (event name, JSON-serializable payload)
+        """
+        if top_k is None:
+            top_k = settings.top_k
+        
+        # Step 1: Convert query to embedding (skipped for keyword-only retrieval)
+        query_embedding = await self._aembed_query(query)
+        
+        # Step 2: Retrieve relevant chunks
+        retrieved_chunks = await self._aretrieve(query, query_embedding, top_k, filter_metadata)
+        
+        # Handle empty retrieval
+        if not retrieved_chunks:
+            empty = self._empty_response(filter_metadata)
+            yield "sources", {"sources": [], "confidence": empty.confidence}
+            yield "token", {"delta": empty.answer}
+            yield "done", {"prompt_used": None}
+            return
+        
+        # Serve repeated questions from the answer cache in a single delta
+        cached = self._lookup_answer(query_embedding, retrieved_chunks, chat_history, include_prompt)
+        if cached is not None:
+            yield "sources", {
+                "sources": [source.model_dump() for source in cached.sources],
+                "confidence": cached.confidence
+            }
+            yield "token", {"delta": cached.answer}
+            yield "done", {"prompt_used": cached.prompt_used}
+            return
+        
+        # Send sources first so the client can render citations immediately
+        sources = self._format_sources(retrieved_chunks)
+        yield "sources", {
+            "sources": [source.model_dump() for source in sources],
+            "confidence": self._calculate_confidence(retrieved_chunks)
+        }
+        
+        # Step 3: Build prompt with context
+        messages = self._build_prompt(query, retrieved_chunks, chat_history)
+        
+        # Step 4: Stream answer deltas
+        answer_parts = []
+        # Time only the waits on the upstream, not the client consuming each delta
+        llm_seconds = 0.0
+        try:
+            start = time.perf_counter()
+            try:
+                chunks = (await self._aopen_llm_stream(messages)).__aiter__()
+            finally:
+                llm_seconds += time.perf_counter() - start
+            
+            while True:
+                start = time.perf_counter()
+                try:
+                    chunk = await chunks.__anext__()
+                except StopAsyncIteration:
+                    break
+                finally:
+                    llm_seconds += time.perf_counter() - start
+                
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    answer_parts.append(delta)
+                    yield "token", {"delta": delta}
+        finally:
+            record_stage("llm", llm_seconds)
+        
+        answer = "".join(answer_parts)
+        LLM_TOKENS.inc(count_tokens(answer), kind="completion")
+        response = self._build_response(answer, retrieved_chunks, messages, False)
+        self._store_answer(query_embedding, retrieved_chunks, chat_history, response, messages)
+        
+        yield "done", {
+            "prompt_used": get_prompt_for_display(messages) if include_prompt else None
+        }
+    
+    def _lookup_answer(
+        self,
+        query_embedding: Optional[List[float]],
+        retrieved_chunks: List[Dict],
+        chat_history: Optional[List[Dict]],
+        include_prompt: bool
+    ) -> Optional[ChatResponse]:
+        """
+        Return a cached answer for a repeated question, if any.
+        
+        Args:
+            query_embedding: Embedding of the query (None skips the cache)
+            retrieved_chunks: Chunks retrieved for the query
+            chat_history: Conversation history (answers with history are never shared)
+            include_prompt: Whether to include prompt in response
+            
+        Returns:
+            Cached ChatResponse, or None on a miss
+        """
+        if self.answer_cache is None or chat_history or query_embedding is None:
+            return None
+        
+        entry = self.answer_cache.lookup(
+            query_embedding,
+            [chunk['chunk_id'] for chunk in retrieved_chunks]
+        )
+        if entry is None:
+            return None
+        
+        return entry['response'].model_copy(
+            update={'prompt_used': entry['prompt'] if include_prompt else None}
+        )
+    
+    def _store_answer(
+        self,
+        query_embedding: Optional[List[float]],
+        retrieved_chunks: List[Dict],
+        chat_history: Optional[List[Dict]],
+        response: ChatResponse,
+        messages: List[Dict]
+    ):
+        """Cache a freshly generated answer for later identical questions."""
+        if self.answer_cache is None or chat_history or query_embedding is None:
+            return
+        
+        self.answer_cache.store(
+            query_embedding,
+            chunk_ids=[chunk['chunk_id'] for chunk in retrieved_chunks],
+            sources={chunk['metadata'].get('source', 'Unknown') for chunk in retrieved_chunks},
+            response=response,
+            prompt=get_prompt_for_display(messages)
+        )
+    
+    def _empty_response(self, filter_metadata: Optional[Dict] = None) -> ChatResponse:
+        """Response returned when nothing is indexed yet, or nothing matches the filter."""
+        if filter_metadata:
+            answer = "No indexed documents match the given filters."
+        else:
+            answer = "I don't have any documents indexed yet. Please upload some documents first."
+        return ChatResponse(
+            answer=answer,
+            sources=[],
+            confidence=0.0,
+            prompt_used=None
+        )
+    
+    def _format_sources(self, chunks: List[Dict]) -> List[Source]:
+        """Convert retrieved chunks into source citations."""
+        return [
             Source(
                 chunk_id=chunk['chunk_id'],
                 text=chunk['text'][:200] + "..." if len(chunk['text']) > 200 else chunk['text'],
                 source=chunk['metadata'].get('source', 'Unknown'),
                 page=chunk['metadata'].get('page') if chunk['metadata'].get('page', -1) != -1 else None,
-                similarity_score=round(chunk['similarity_score'], 4)
+                end_page=self._end_page(chunk['metadata']),
+                similarity_score=round(chunk['similarity_score'], 4) if 'similarity_score' in chunk else None,
+                bm25_score=round(chunk['bm25_score'], 4) if 'bm25_score' in chunk else None
             )
-            for chunk in retrieved_chunks
+            for chunk in chunks
         ]
+    
+    def _end_page(self, metadata: Dict) -> Optional[int]:
+        """Last page of a chunk's span, or None when it stays on one page."""
+        start_page = metadata.get('page', -1)
+        end_page = metadata.get('end_page', -1)
+        if start_page == -1 or end_page in (-1, None) or end_page == start_page:
+            return None
+        return end_page
+    
+    def _build_response(
+        self,
+        answer: str,
+        retrieved_chunks: List[Dict],
+        messages: List[Dict],
+        include_prompt: bool
+    ) -> ChatResponse:
+        """
+        Assemble the final response from a generated answer.
+        
+        Args:
+            answer: LLM answer text
+            retrieved_chunks: Chunks used as context
+            messages: Prompt messages sent to the LLM
+            include_prompt: Whether to include prompt in response
+            
+        Returns:
+            ChatResponse with answer, sources, and confidence
+        """
+        # Step 5: Format sources
+        sources = self._format_sources(retrieved_chunks)
         
         # Step 6: Calculate confidence score
         confidence = self._calculate_confidence(retrieved_chunks)
@@ -123,16 +858,25 @@ class RAGEngine:
             prompt_used=prompt_used
         )
     
+    def close(self):
+        """Release the search and rerank thread pools and stop following store changes."""
+        self._search_executor.shutdown(wait=False)
+        if self.rerank_stage is not None:
+            self.rerank_stage.close()
+        if self.answer_cache is not None:
+            VectorStore.remove_change_listener(self.answer_cache.invalidate_sources)
+    
     def _calculate_confidence(self, chunks: List[Dict]) -> float:
         """
         Calculate confidence score based on retrieval quality.
         
         Heuristic approach:
-        - Average similarity score of top chunks
+        - Average cosine similarity of top chunks (in sparse mode, with no
+          embeddings, the share of the query's keywords each chunk contains)
         - Weighted more heavily toward top results
         
         Args:
-            chunks: Retrieved chunks with similarity scores
+            chunks: Retrieved chunks with similarity scores or keyword coverage
             
         Returns:
             Confidence score between 0 and 1
@@ -145,7 +889,7 @@ class RAGEngine:
         total_weight = sum(weights)
         
         weighted_score = sum(
-            chunk['similarity_score'] * weight 
+            chunk.get('similarity_score', chunk.get('keyword_coverage', 0.0)) * weight
             for chunk, weight in zip(chunks, weights)
         ) / total_weight
         
@@ -0,0 +1,243 @@
+"""Rerank retrieved candidates with a lexical scorer or a local cross-encoder."""
+
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config import settings
+from keyword_index import tokenize
+
+
+RERANK_METHODS = ("none", "lexical", "cross-encoder")
+
+
+class Reranker(ABC):
+    """Scores retrieval candidates against a query; higher is more relevant."""
+    
+    name: str
+    
+    @abstractmethod
+    def score(self, query: str, candidates: List[Dict]) -> List[float]:
+        """
+        Score candidates for a query.
+        
+        Args:
+            query: User's question
+            candidates: Retrieved chunks, in retrieval order
+        
+        Returns:
+            One score per candidate
+        """
+
+
+class LexicalReranker(Reranker):
+    """
+    Blends retrieval rank with how much of the query a chunk covers.
+    
+    Coverage is the IDF-weighted share of query terms present in the chunk,
+    with IDF computed over the candidate set, so rare terms such as codes
+    and names count most. The retrieval rank is kept as a prior, so chunks
+    with no query terms only move down.
+    """
+    
+    name = "lexical"
+    
+    def __init__(self, weight: float = None):
+        """
+        Initialize the scorer.
+        
+        Args:
+            weight: Share of the score given to term coverage (default from settings)
+        """
+        self.weight = weight if weight is not None else settings.rerank_lexical_weight
+    
+    def score(self, query: str, candidates: List[Dict]) -> List[float]:
+        query_terms = set(tokenize(query))
+        chunk_terms = [set(tokenize(candidate['text'])) for candidate in candidates]
+        
+        document_frequency = Counter(term for terms in chunk_terms for term in terms & query_terms)
+        idf = {
+            term: math.log(1 + len(candidates) / (1 + document_frequency[term]))
+            for term in query_terms
+        }
+        total = sum(idf.values()) or 1.0
+        
+        scores = []
+        for rank, terms in enumerate(chunk_terms):
+            coverage = sum(idf[term] for term in terms & query_terms) / total
+            prior = 1 - rank / len(candidates)
+            scores.append((1 - self.weight) * prior + self.weight * coverage)
+        return scores
+
+
+class CrossEncoderReranker(Reranker):
+    """
+    Scores (query, chunk) pairs with a local sentence-transformers cross-encoder.
+    
+    Requires the optional ``sentence-transformers`` package; the model is
+    downloaded on first use and runs on CPU.
+    """
+    
+    name = "cross-encoder"
+    
+    def __init__(self, model_name: str = None):
+        """
+        Load the cross-encoder.
+        
+        Args:
+            model_name: Hugging Face model id (default from settings)
+        """
+        try:
+            from sentence_transformers import CrossEncoder
+        except ImportError as e:
+            raise ImportError(
+                "RERANK_METHOD=cross-encoder requires sentence-transformers "
+                "(pip install sentence-transformers)"
+            ) from e
+        
+        self.model_name = model_name or settings.rerank_model
+        self.model = CrossEncoder(self.model_name, device="cpu")
+    
+    def score(self, query: str, candidates: List[Dict]) -> List[float]:
+        pairs = [(query, candidate['text']) for candidate in candidates]
+        return [float(score) for score in self.model.predict(pairs)]
+
+
+def create_reranker(method: str = None) -> Optional[Reranker]:
+    """
+    Create the reranker selected by ``settings.rerank_method``.
+    
+    Args:
+        method: "none", "lexical" or "cross-encoder" (default from settings)
+    
+    Returns:
+        The reranker, or None when reranking is disabled
+    """
+    method = (method or settings.rerank_method).lower()
+    if method == "none":
+        return None
+    if method == "lexical":
+        return LexicalReranker()
+    if method == "cross-encoder":
+        return CrossEncoderReranker()
+    raise ValueError(f"Unknown rerank method: {method}. Supported: {', '.join(RERANK_METHODS)}")
+
+
+class RerankStage:
+    """
+    Runs a reranker on a thread pool under a per-request latency budget.
+    
+    Retrieval over-fetches ``candidates`` chunks; the stage scores them and
+    keeps the best ``top_k``. If scoring fails or does not finish within
+    ``budget_ms``, the request keeps retrieval order instead. A timed-out
+    scoring call still finishes in the background, so a saturated pool
+    makes later requests fall back too rather than queue behind it.
+    """
+    
+    # Recent rerank latencies kept for percentiles
+    LATENCY_WINDOW = 1000
+    
+    def __init__(
+        self,
+        reranker: Reranker,
+        candidates: int = None,
+        budget_ms: float = None,
+        workers: int = None
+    ):
+        """
+        Initialize the stage.
+        
+        Args:
+            reranker: Scorer to run
+            candidates: Chunks retrieved per query for reranking (default from settings)
+            budget_ms: Latency budget per request in milliseconds (default from settings)
+            workers: Rerank threads (default from settings)
+        """
+        self.reranker = reranker
+        self.candidates = candidates or settings.rerank_candidates
+        self.budget_ms = budget_ms if budget_ms is not None else settings.rerank_budget_ms
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers or settings.rerank_workers,
+            thread_name_prefix="rerank"
+        )
+        
+        self._lock = threading.Lock()
+        self._latencies_ms: "deque[float]" = deque(maxlen=self.LATENCY_WINDOW)
+        
+        # Counters
+        self.reranked = 0
+        self.timeouts = 0
+        self.errors = 0
+    
+    def fetch_k(self, top_k: int) -> int:
+        """Number of candidates to retrieve for a request wanting ``top_k`` chunks."""
+        return max(top_k, self.candidates)
+    
+    def rerank(self, query: str, candidates: List[Dict], top_k: int) -> List[Dict]:
+        """
+        Reorder candidates and keep the best ``top_k``.
+        
+        Args:
+            query: User's question
+            candidates: Retrieved chunks, in retrieval order
+            top_k: Number of chunks to return
+        
+        Returns:
+            Best chunks with a ``rerank_score``, or the first ``top_k``
+            candidates if reranking failed or ran over budget
+        """
+        if len(candidates) <= 1:
+            return candidates[:top_k]
+        
+        start = time.perf_counter()
+        future = self._executor.submit(self.reranker.score, query, candidates)
+        try:
+            scores = future.result(timeout=self.budget_ms / 1000)
+        except FutureTimeoutError:
+            future.cancel()
+            self._record(start, timeouts=1)
+            return candidates[:top_k]
+        except Exception:
+            self._record(start, errors=1)
+            return candidates[:top_k]
+        self._record(start, reranked=1)
+        
+        order = np.argsort(-np.asarray(scores, dtype=np.float64), kind="stable")[:top_k]
+        return [{**candidates[i], 'rerank_score': float(scores[i])} for i in order]
+    
+    def _record(self, start: float, reranked: int = 0, timeouts: int = 0, errors: int = 0):
+        """Record the latency and outcome of one request."""
+        with self._lock:
+            self._latencies_ms.append((time.perf_counter() - start) * 1000)
+            self.reranked += reranked
+            self.timeouts += timeouts
+            self.errors += errors
+    
+    def get_stats(self) -> Dict:
+        """Get rerank outcome counters and latency percentiles."""
+        with self._lock:
+            latencies = np.asarray(self._latencies_ms)
+            requests = self.reranked + self.timeouts + self.errors
+            return {
+                'method': self.reranker.name,
+                'candidates': self.candidates,
+                'budget_ms': self.budget_ms,
+                'requests': requests,
+                'reranked': self.reranked,
+                'timeouts': self.timeouts,
+                'errors': self.errors,
+                'fallback_rate': round((self.timeouts + self.errors) / requests, 4) if requests else 0.0,
+                'latency_ms_p50': round(float(np.percentile(latencies, 50)), 3) if len(latencies) else 0.0,
+                'latency_ms_p95': round(float(np.percentile(latencies, 95)), 3) if len(latencies) else 0.0,
+                'latency_ms_max': round(float(latencies.max()), 3) if len(latencies) else 0.0
+            }
+    
+    def close(self):
+        """Release the rerank thread pool."""
+        self._executor.shutdown(wait=False)
@@ -1,42 +1,64 @@
 """Chat API routes."""
 
-from fastapi import APIRouter, HTTPException, Query
+import json
 
-from models import ChatRequest, ChatResponse
+from typing import Dict, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+
+from config import settings
+from metadata_filter import build_where
+from metrics import request_timings, server_timing
+from models import BatchChatRequest, ChatRequest, ChatResponse, RetrievalFilter
 from rag_engine import RAGEngine
+from services import get_rag_engine, get_tenant, hold_tenant
+from tenants import Tenant
 
 router = APIRouter(prefix="/api/chat", tags=["chat"])
 
-# Initialize RAG engine
-rag_engine = RAGEngine()
+
+def _filter_metadata(filters: Optional[RetrievalFilter]) -> Optional[Dict]:
+    """Translate a request's retrieval filters, rejecting invalid ones with 400."""
+    try:
+        return build_where(filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid filters: {str(e)}")
 
 
 @router.post("/", response_model=ChatResponse)
 async def chat(
     request: ChatRequest,
-    developer_mode: bool = Query(False, description="Include prompt in response for debugging")
+    http_response: Response,
+    developer_mode: bool = Query(False, description="Include prompt in response for debugging"),
+    rag_engine: RAGEngine = Depends(get_rag_engine)
 ):
     """
     Process a chat query using RAG.
     
     - Converts query to embedding
-    - Retrieves relevant chunks
+    - Retrieves relevant chunks (restricted by optional `filters`)
     - Generates grounded answer
     - Returns answer with sources and confidence
+    - Reports per-stage durations in a `Server-Timing` header
     """
     try:
         # Validate query
         if not request.query or not request.query.strip():
             raise HTTPException(status_code=400, detail="Query cannot be empty")
+        filter_metadata = _filter_metadata(request.filters)
         
-        # Process query
-        response = rag_engine.query(
-            query=request.query,
-            chat_history=request.chat_history,
-            top_k=request.top_k,
-            include_prompt=developer_mode
-        )
+        # Process query without blocking the event loop
+        with request_timings() as timings:
+            response = await rag_engine.aquery(
+                query=request.query,
+                chat_history=request.chat_history,
+                top_k=request.top_k,
+                include_prompt=developer_mode,
+                filter_metadata=filter_metadata
+            )
         
+        http_response.headers["Server-Timing"] = server_timing(timings)
         return response
     
     except HTTPException:
@@ -45,6 +67,141 @@ async def chat(
         raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
 
 
+def _format_sse(event: str, data: dict) -> str:
+    """Encode a single server-sent event frame."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/stream")
+async def chat_stream(
+    request: ChatRequest,
+    http_request: Request,
+    developer_mode: bool = Query(False, description="Include prompt in response for debugging"),
+    rag_engine: RAGEngine = Depends(get_rag_engine),
+    tenant: Optional[Tenant] = Depends(get_tenant)
+):
+    """
+    Process a chat query using RAG and stream the answer as server-sent events.
+    
+    - `sources` event: retrieved sources and confidence, sent before generation
+    - `token` events: answer deltas as the LLM produces them
+    - `done` event: end of answer (includes prompt in developer mode)
+    - `error` event: sent if processing fails mid-stream
+    """
+    # Validate query
+    if not request.query or not request.query.strip():
+        raise HTTPException(status_code=400, detail="Query cannot be empty")
+    filter_metadata = _filter_metadata(request.filters)
+    
+    release_tenant = hold_tenant(http_request, tenant)
+    
+    async def event_stream():
+        try:
+            async for event, data in rag_engine.astream_query(
+                query=request.query,
+                chat_history=request.chat_history,
+                top_k=request.top_k,
+                include_prompt=developer_mode,
+                filter_metadata=filter_metadata
+            ):
+                yield _format_sse(event, data)
+        except Exception as e:
+            yield _format_sse("error", {"detail": f"Error processing query: {str(e)}"})
+        finally:
+            release_tenant()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
+@router.post("/batch")
+async def chat_batch(
+    request: BatchChatRequest,
+    http_request: Request,
+    developer_mode: bool = Query(False, description="Include prompts in results for debugging"),
+    rag_engine: RAGEngine = Depends(get_rag_engine),
+    tenant: Optional[Tenant] = Depends(get_tenant)
+):
+    """
+    Process many independent queries and stream the results as NDJSON.
+    
+    - Embeds all queries in batched calls and retrieves with one multi-vector search
+    - Generates answers with bounded concurrency (skipped with `retrieval_only`)
+    - Writes one JSON line per query, in completion order, tagged with its `index`
+    - A failed query gets a line with `error`; a failure of the whole batch
+      gets a final line with `error` and no `index`
+    """
+    # Validate queries
+    if not request.queries:
+        raise HTTPException(status_code=400, detail="Queries cannot be empty")
+    if len(request.queries) > settings.max_batch_queries:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.max_batch_queries} queries per batch"
+        )
+    empty = [index for index, query in enumerate(request.queries) if not query or not query.strip()]
+    if empty:
+        raise HTTPException(status_code=400, detail=f"Query cannot be empty (index {empty[0]})")
+    filter_metadata = _filter_metadata(request.filters)
+    
+    release_tenant = hold_tenant(http_request, tenant)
+    
+    async def result_lines():
+        try:
+            async for result in rag_engine.abatch_query(
+                queries=request.queries,
+                top_k=request.top_k,
+                retrieval_only=request.retrieval_only,
+                include_prompt=developer_mode,
+                filter_metadata=filter_metadata
+            ):
+                yield result.model_dump_json(exclude_none=True) + "\n"
+        except Exception as e:
+            yield json.dumps({"error": f"Error processing batch: {str(e)}"}) + "\n"
+        finally:
+            release_tenant()
+    
+    return StreamingResponse(
+        result_lines(),
+        media_type="application/x-ndjson",
+        headers={"X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/cache")
+async def cache_stats(rag_engine: RAGEngine = Depends(get_rag_engine)):
+    """
+    Get answer cache hit-rate metrics.
+    """
+    if rag_engine.answer_cache is None:
+        return {"enabled": False}
+    
+    return {
+        "enabled": True,
+        **rag_engine.answer_cache.get_stats()
+    }
+
+
+@router.get("/rerank")
+async def rerank_stats(rag_engine: RAGEngine = Depends(get_rag_engine)):
+    """
+    Get rerank latency and fallback metrics.
+    """
+    if rag_engine.rerank_stage is None:
+        return {"enabled": False}
+    
+    return {
+        "enabled": True,
+        **rag_engine.rerank_stage.get_stats()
+    }
+
+
 @router.get("/health")
 async def health_check():
     """
@@ -1,38 +1,56 @@
 """Document management API routes."""
 
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from pathlib import Path
 import shutil
-import uuid
-from typing import List
+from typing import List, Optional
 
-from models import DocumentUploadResponse, DocumentInfo, ErrorResponse
+from archives import is_archive
+from config import settings
+from models import DocumentInfo, ErrorResponse, IngestionJob
 from document_processor import DocumentProcessor
 from embeddings import EmbeddingService
+from jobs import IngestionJobQueue, QueueFullError
+from services import get_doc_processor, get_embedding_service, get_job_queue, get_tenant_id, get_vector_store
 from vector_store import VectorStore
 
 router = APIRouter(prefix="/api/documents", tags=["documents"])
 
-# Initialize services
-doc_processor = DocumentProcessor()
-embedding_service = EmbeddingService()
-vector_store = VectorStore()
+# Types indexed straight from a small upload's buffer; PDFs always go to
+# disk so they can be memory-mapped and split across extraction workers
+IN_MEMORY_EXTENSIONS = {'.txt', '.docx'}
 
-# Temporary upload directory
-UPLOAD_DIR = Path("./uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
 
+def _store_upload(file: UploadFile, path: Path):
+    """Copy an upload's spooled body to disk (blocking; run in the threadpool)."""
+    with path.open("wb") as buffer:
+        shutil.copyfileobj(file.file, buffer)
 
-@router.post("/upload", response_model=DocumentUploadResponse)
-async def upload_document(file: UploadFile = File(...)):
+
+def _store_parts(files: List[UploadFile], job_queue: IngestionJobQueue, job_id: str):
+    """Copy the parts of a bulk upload to disk (blocking; run in the threadpool)."""
+    job_queue.bulk_upload_dir(job_id).mkdir(parents=True)
+    for index, file in enumerate(files):
+        _store_upload(file, job_queue.bulk_part_path(job_id, index, file.filename))
+
+
+@router.post("/upload", response_model=IngestionJob, status_code=202)
+async def upload_document(
+    file: UploadFile = File(...),
+    doc_processor: DocumentProcessor = Depends(get_doc_processor),
+    job_queue: IngestionJobQueue = Depends(get_job_queue),
+    tenant_id: Optional[str] = Depends(get_tenant_id)
+):
     """
-    Upload and index a document.
+    Upload a document and queue it for indexing.
     
-    - Validates file type
-    - Extracts text
-    - Chunks content
-    - Generates embeddings
-    - Stores in vector database
+    - Validates file type; bodies over `MAX_UPLOAD_BYTES` get 413
+    - Hands small TXT/DOCX uploads to the job in memory, stores others,
+      and returns a job id immediately
+    - A background worker extracts, chunks, embeds and stores it in the
+      tenant's collection
+    - Poll `GET /api/documents/jobs/{job_id}` for progress
     """
     try:
         # Validate file type
@@ -40,74 +58,131 @@ async def upload_document(file: UploadFile = File(...)):
         if not is_valid:
             raise HTTPException(status_code=400, detail=error_msg)
         
-        # Save uploaded file temporarily
-        file_id = str(uuid.uuid4())
-        file_extension = Path(file.filename).suffix
-        temp_path = UPLOAD_DIR / f"{file_id}{file_extension}"
+        # Reject early instead of storing an upload we cannot queue
+        if job_queue.queued_count() >= job_queue.max_queue_depth:
+            raise HTTPException(status_code=429, detail="Ingestion queue is full. Try again later.")
         
-        with temp_path.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        job_id = job_queue.new_job_id()
+        upload_path = job_queue.upload_path(job_id, file.filename)
+        data = None
+        if (
+            upload_path.suffix in IN_MEMORY_EXTENSIONS
+            and file.size is not None
+            and file.size <= settings.in_memory_upload_max_bytes
+        ):
+            data = await file.read()
+        else:
+            # Store upload until its job finishes, off the event loop
+            await run_in_threadpool(_store_upload, file, upload_path)
         
         try:
-            # Process document
-            chunks, metadata = doc_processor.process_document(str(temp_path))
-            
-            # Generate embeddings
-            chunk_texts = [chunk.text for chunk in chunks]
-            embeddings = embedding_service.generate_embeddings_batch(chunk_texts)
-            
-            # Store in vector database
-            vector_store.upsert_chunks(chunks, embeddings)
-            
-            return DocumentUploadResponse(
-                document_id=file_id,
-                filename=file.filename,
-                num_chunks=len(chunks),
-                message=f"Successfully indexed {len(chunks)} chunks from {file.filename}"
+            return await run_in_threadpool(
+                job_queue.submit, job_id, file.filename, tenant_id=tenant_id, data=data
             )
-        
-        finally:
-            # Clean up temporary file
-            if temp_path.exists():
-                temp_path.unlink()
+        except QueueFullError as e:
+            upload_path.unlink(missing_ok=True)
+            raise HTTPException(status_code=429, detail=str(e))
     
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error processing document: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error queuing document: {str(e)}")
 
 
-@router.get("/", response_model=List[DocumentInfo])
-async def list_documents():
+@router.post("/bulk", response_model=IngestionJob, status_code=202)
+async def upload_documents(
+    files: List[UploadFile] = File(...),
+    doc_processor: DocumentProcessor = Depends(get_doc_processor),
+    job_queue: IngestionJobQueue = Depends(get_job_queue),
+    tenant_id: Optional[str] = Depends(get_tenant_id)
+):
     """
-    Get list of all indexed documents.
+    Upload several documents and zip/tar archives of documents as one job.
+    
+    - Each part must be a supported document or a .zip, .tar, .tar.gz,
+      .tgz, .tar.bz2 or .tar.xz archive; archives are stored compressed
+      and read one member at a time during the job
+    - Bodies over `MAX_UPLOAD_BYTES` in total get 413
+    - Documents are extracted in parallel and their chunks embedded and
+      stored in large merged batches
+    - Poll `GET /api/documents/jobs/{job_id}` for progress; `files` holds
+      the result for each document
     """
     try:
-        documents = vector_store.get_documents()
+        for file in files:
+            if not is_archive(file.filename):
+                is_valid, error_msg = doc_processor.validate_file(file.filename)
+                if not is_valid:
+                    raise HTTPException(status_code=400, detail=f"{file.filename}: {error_msg}")
+        
+        # Reject early instead of storing an upload we cannot queue
+        if job_queue.queued_count() >= job_queue.max_queue_depth:
+            raise HTTPException(status_code=429, detail="Ingestion queue is full. Try again later.")
         
-        # Convert to DocumentInfo format
-        doc_infos = []
-        for doc in documents:
-            doc_infos.append(DocumentInfo(
-                document_id=doc['chunk_ids'][0] if doc['chunk_ids'] else "unknown",
-                filename=doc['filename'],
-                num_chunks=doc['num_chunks'],
-                created_at=None  # Would need to track this separately
-            ))
+        # Store the parts until the job finishes, off the event loop
+        job_id = job_queue.new_job_id()
+        await run_in_threadpool(_store_parts, files, job_queue, job_id)
         
-        return doc_infos
+        label = files[0].filename if len(files) == 1 else f"{len(files)} files"
+        try:
+            return await run_in_threadpool(job_queue.submit, job_id, label, tenant_id=tenant_id, bulk=True)
+        except QueueFullError as e:
+            shutil.rmtree(job_queue.bulk_upload_dir(job_id), ignore_errors=True)
+            raise HTTPException(status_code=429, detail=str(e))
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error queuing documents: {str(e)}")
+
+
+@router.get("/jobs/{job_id}", response_model=IngestionJob)
+async def get_job(
+    job_id: str,
+    job_queue: IngestionJobQueue = Depends(get_job_queue),
+    tenant_id: Optional[str] = Depends(get_tenant_id)
+):
+    """
+    Get the status of an ingestion job.
+    
+    Reports the current stage (extract/chunk/embed/store), chunk counts
+    and any error. Jobs of other tenants are not found.
+    """
+    job = job_queue.get(job_id)
+    if job is None or job.tenant_id != tenant_id:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    
+    return job
+
+
+@router.get("/", response_model=List[DocumentInfo])
+async def list_documents(
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    vector_store: VectorStore = Depends(get_vector_store)
+):
+    """
+    Get a page of indexed documents, ordered by filename.
+    
+    Served from the document catalog, so the cost depends on the page
+    size rather than the number of stored chunks.
+    """
+    try:
+        # Store calls block on SQLite and the store lock, so keep them off the event loop
+        documents = await run_in_threadpool(vector_store.get_documents, offset, limit)
+        return [DocumentInfo(**doc) for doc in documents]
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error listing documents: {str(e)}")
 
 
 @router.delete("/{filename}")
-async def delete_document(filename: str):
+async def delete_document(filename: str, vector_store: VectorStore = Depends(get_vector_store)):
     """
     Delete a document and all its chunks from the vector store.
     """
     try:
-        num_deleted = vector_store.delete_document(filename)
+        num_deleted = await run_in_threadpool(vector_store.delete_document, filename)
         
         if num_deleted == 0:
             raise HTTPException(status_code=404, detail=f"Document '{filename}' not found")
@@ -124,13 +199,16 @@ async def delete_document(filename: str):
 
 
 @router.get("/info")
-async def get_vector_store_info():
+async def get_vector_store_info(
+    vector_store: VectorStore = Depends(get_vector_store),
+    embedding_service: EmbeddingService = Depends(get_embedding_service)
+):
     """
     Get information about the vector store.
     """
     try:
-        info = vector_store.get_collection_info()
-        embedding_info = embedding_service.get_embedding_info()
+        info = await run_in_threadpool(vector_store.get_collection_info)
+        embedding_info = await run_in_threadpool(embedding_service.get_embedding_info)
         
         return {
             **info,
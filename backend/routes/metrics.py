@@ -0,0 +1,87 @@
+"""Prometheus metrics route."""
+
+from typing import List
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from metrics import REGISTRY, Family
+from services import ServiceContainer, get_services
+
+router = APIRouter(tags=["metrics"])
+
+
+def service_families(services: ServiceContainer) -> List[Family]:
+    """
+    Metric families read from the services' own counters at scrape time.
+    
+    Args:
+        services: The app's service container
+    
+    Returns:
+        Cache, rerank, embedding-batching and tenant families
+    """
+    caches = []
+    answer_cache = getattr(services.rag_engine, "answer_cache", None)
+    if answer_cache is not None:
+        caches.append(({"cache": "answer"}, answer_cache.get_stats()))
+    # Each open tenant has its own answer cache
+    for tenant_id, stats in services.tenants.answer_cache_stats().items():
+        caches.append(({"cache": "answer", "tenant": tenant_id}, stats))
+    embedding_cache = getattr(services.embedding_service, "cache", None)
+    if embedding_cache is not None:
+        caches.append(({"cache": "embedding"}, embedding_cache.get_stats()))
+    
+    families: List[Family] = [
+        ("rag_cache_hits_total", "counter", "Cache lookups that hit",
+         [(labels, stats['hits']) for labels, stats in caches]),
+        ("rag_cache_misses_total", "counter", "Cache lookups that missed",
+         [(labels, stats['misses']) for labels, stats in caches]),
+        ("rag_cache_hit_ratio", "gauge", "Share of cache lookups that hit since startup",
+         [(labels, stats['hit_rate']) for labels, stats in caches]),
+    ]
+    
+    rerank_stage = getattr(services.rag_engine, "rerank_stage", None)
+    if rerank_stage is not None:
+        stats = rerank_stage.get_stats()
+        families.append((
+            "rag_rerank_requests_total", "counter", "Rerank requests by outcome",
+            [({"outcome": outcome}, stats[key]) for outcome, key in
+             (("reranked", 'reranked'), ("timeout", 'timeouts'), ("error", 'errors'))]
+        ))
+    
+    batch_embedder = getattr(services.embedding_service, "batch_embedder", None)
+    if batch_embedder is not None:
+        stats = batch_embedder.get_stats()
+        families.append((
+            "rag_embedding_rate_limited_total", "counter", "Embedding batches rejected with HTTP 429",
+            [({}, stats['rate_limited'])]
+        ))
+        families.append((
+            "rag_embedding_concurrency_limit", "gauge", "Current adaptive embedding concurrency limit",
+            [({}, stats['concurrency_limit'])]
+        ))
+    
+    stats = services.tenants.get_stats()
+    families.append(("rag_tenants_open", "gauge", "Tenant stores currently open", [({}, stats['open'])]))
+    families.append(("rag_tenant_opens_total", "counter", "Tenant stores opened on demand", [({}, stats['opens'])]))
+    families.append((
+        "rag_tenant_closes_total", "counter", "Tenant stores closed when idle or least recently used",
+        [({}, stats['closes'])]
+    ))
+    return families
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics(services: ServiceContainer = Depends(get_services)):
+    """
+    Expose metrics in the Prometheus text format.
+    
+    - Per-stage query latency histograms (embed, retrieve, rerank, prompt, llm)
+    - LLM token counts, retry counts and cache hit rates
+    - Ingestion stage latency and throughput in chunks/s
+    """
+    return PlainTextResponse(
+        REGISTRY.render(service_families(services)),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
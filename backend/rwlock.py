@@ -0,0 +1,79 @@
+"""Reader/writer lock for stores searched far more often than written."""
+
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+
+class ReadWriteLock:
+    """
+    Any number of readers, or a single writer.
+    
+    Waiting writers block new readers so a steady stream of searches cannot
+    starve ingestion. Both sides are re-entrant per thread, and the thread
+    holding the write lock may also take the read lock. Upgrading a read lock
+    to a write lock is not supported.
+    """
+    
+    def __init__(self):
+        """Create an unlocked lock."""
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer: Optional[int] = None
+        self._write_depth = 0
+        self._waiting_writers = 0
+        self._local = threading.local()
+    
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        """Hold the lock shared for the duration of the block."""
+        depth = getattr(self._local, "read_depth", 0)
+        me = threading.get_ident()
+        if depth or self._writer == me:
+            # Re-entry never waits, or a queued writer would deadlock us
+            self._local.read_depth = depth + 1
+            try:
+                yield
+            finally:
+                self._local.read_depth = depth
+            return
+        
+        with self._condition:
+            while self._writer is not None or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        self._local.read_depth = 1
+        try:
+            yield
+        finally:
+            self._local.read_depth = 0
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+    
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        """Hold the lock exclusively for the duration of the block."""
+        me = threading.get_ident()
+        with self._condition:
+            if self._writer == me:
+                self._write_depth += 1
+            else:
+                if getattr(self._local, "read_depth", 0):
+                    raise RuntimeError("Cannot upgrade a read lock to a write lock")
+                self._waiting_writers += 1
+                try:
+                    while self._writer is not None or self._readers:
+                        self._condition.wait()
+                finally:
+                    self._waiting_writers -= 1
+                self._writer, self._write_depth = me, 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._write_depth -= 1
+                if not self._write_depth:
+                    self._writer = None
+                    self._condition.notify_all()
@@ -0,0 +1,169 @@
+"""Application-wide service container and FastAPI dependencies."""
+
+from typing import Callable, Iterator, Optional
+
+import httpx
+import openai
+from fastapi import Depends, HTTPException, Request
+
+from config import settings
+from context_packer import load_tokenizer
+from document_processor import DocumentProcessor
+from embeddings import EmbeddingService
+from jobs import IngestionJobQueue
+from rag_engine import RAGEngine
+from tenants import Tenant, TenantRegistry, normalize_tenant_id
+from vector_store import VectorStore, create_vector_store
+
+
+class ServiceContainer:
+    """
+    Owns the single instance of every shared service.
+    
+    Built once by the app lifespan: one vector store (and so one Chroma
+    client), one embedding service, and LLM/embedding clients that share
+    a keep-alive HTTP connection pool. Other tenants' stores are opened on
+    demand by the tenant registry. Any service can be passed in to replace
+    the default, which lets tests inject fakes.
+    """
+    
+    def __init__(
+        self,
+        vector_store: Optional[VectorStore] = None,
+        embedding_service: Optional[EmbeddingService] = None,
+        rag_engine: Optional[RAGEngine] = None,
+        doc_processor: Optional[DocumentProcessor] = None,
+        job_queue: Optional[IngestionJobQueue] = None,
+        tenants: Optional[TenantRegistry] = None
+    ):
+        """
+        Build the shared services.
+        
+        Args:
+            vector_store: Vector store to use (default: the configured backend)
+            embedding_service: Embedding service to use (default: a new one on the shared pool)
+            rag_engine: RAG engine to use (default: built on the shared services)
+            doc_processor: Document processor to use (default: a new one)
+            job_queue: Ingestion queue to use (default: built on the shared services)
+            tenants: Registry of other tenants' stores (default: a new one)
+        """
+        limits = httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections
+        )
+        self.http_client = openai.DefaultHttpxClient(limits=limits)
+        self.async_http_client = openai.DefaultAsyncHttpxClient(limits=limits)
+        
+        self.vector_store = vector_store or create_vector_store()
+        self.embedding_service = embedding_service or EmbeddingService(
+            http_client=self.http_client,
+            async_http_client=self.async_http_client
+        )
+        self.rag_engine = rag_engine or RAGEngine(
+            embedding_service=self.embedding_service,
+            vector_store=self.vector_store,
+            llm_client=openai.OpenAI(
+                api_key=settings.openrouter_api_key,
+                base_url=settings.openrouter_base_url,
+                max_retries=0,
+                http_client=self.http_client
+            ),
+            async_llm_client=openai.AsyncOpenAI(
+                api_key=settings.openrouter_api_key,
+                base_url=settings.openrouter_base_url,
+                max_retries=0,
+                http_client=self.async_http_client
+            )
+        )
+        self.doc_processor = doc_processor or DocumentProcessor()
+        self.tenants = tenants or TenantRegistry()
+        self.job_queue = job_queue or IngestionJobQueue(
+            self.doc_processor,
+            self.embedding_service,
+            self.vector_store,
+            tenants=self.tenants
+        )
+    
+    def start(self):
+        """Load the prompt tokenizer and start background workers."""
+        load_tokenizer()
+        self.job_queue.start()
+        self.tenants.start()
+    
+    async def aclose(self):
+        """Stop background workers and release pools and connections."""
+        self.job_queue.stop()
+        for service in (self.job_queue, self.doc_processor, self.rag_engine, self.tenants):
+            close = getattr(service, "close", None)
+            if close is not None:
+                close()
+        self.http_client.close()
+        await self.async_http_client.aclose()
+
+
+def get_services(request: Request) -> ServiceContainer:
+    """Dependency returning the app's service container."""
+    return request.app.state.services
+
+
+def get_tenant_id(request: Request) -> Optional[str]:
+    """Dependency returning the tenant named by the tenant header (None for the default tenant)."""
+    if not settings.tenant_header:
+        return None
+    try:
+        return normalize_tenant_id(request.headers.get(settings.tenant_header))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def get_tenant(request: Request, tenant_id: Optional[str] = Depends(get_tenant_id)) -> Iterator[Optional[Tenant]]:
+    """Dependency leasing the request's tenant while the request runs (None for the default tenant)."""
+    if tenant_id is None:
+        yield None
+        return
+    with get_services(request).tenants.lease(tenant_id) as tenant:
+        yield tenant
+
+
+def hold_tenant(request: Request, tenant: Optional[Tenant]) -> Callable[[], None]:
+    """
+    Take another lease on the request's tenant for a streamed response.
+    
+    A streamed body can outlive the request's dependencies, so the stream
+    keeps its own lease and calls the returned function when it ends.
+    """
+    if tenant is None:
+        return lambda: None
+    tenants = get_services(request).tenants
+    tenants.retain(tenant)
+    return lambda: tenants.release(tenant)
+
+
+def get_vector_store(request: Request, tenant: Optional[Tenant] = Depends(get_tenant)) -> VectorStore:
+    """Dependency returning the request tenant's vector store."""
+    if tenant is not None:
+        return tenant.vector_store
+    return get_services(request).vector_store
+
+
+def get_embedding_service(request: Request) -> EmbeddingService:
+    """Dependency returning the shared embedding service."""
+    return get_services(request).embedding_service
+
+
+def get_rag_engine(request: Request, tenant: Optional[Tenant] = Depends(get_tenant)) -> RAGEngine:
+    """Dependency returning the shared RAG engine, scoped to the request's tenant."""
+    rag_engine = get_services(request).rag_engine
+    if tenant is not None:
+        return rag_engine.scoped(tenant.vector_store, tenant.answer_cache)
+    return rag_engine
+
+
+def get_doc_processor(request: Request) -> DocumentProcessor:
+    """Dependency returning the shared document processor."""
+    return get_services(request).doc_processor
+
+
+def get_job_queue(request: Request) -> IngestionJobQueue:
+    """Dependency returning the shared ingestion job queue."""
+    return get_services(request).job_queue
@@ -0,0 +1,343 @@
+"""Per-tenant stores, opened on demand and kept in an LRU of open handles."""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+from answer_cache import SemanticAnswerCache
+from config import settings
+from manifest import DocumentManifest
+from vector_store import VectorStore, create_vector_store
+
+
+# Lowercase letters, digits, "-" and "_", starting and ending with a letter or
+# digit; at most 32 characters so it fits in a Chroma collection name
+TENANT_ID_PATTERN = re.compile(r"[a-z0-9](?:[a-z0-9_-]{0,30}[a-z0-9])?")
+
+
+def normalize_tenant_id(value: Optional[str]) -> Optional[str]:
+    """
+    Validate a tenant id taken from a request.
+    
+    Args:
+        value: Raw tenant id, e.g. a header value
+    
+    Returns:
+        The lowercased tenant id, or None for the default tenant (missing,
+        empty or equal to ``settings.default_tenant``)
+    
+    Raises:
+        ValueError: If the id is too long or has characters other than
+            letters, digits, "-" and "_"
+    """
+    if value is None or not value.strip():
+        return None
+    
+    tenant_id = value.strip().lower()
+    if tenant_id == settings.default_tenant.lower():
+        return None
+    if not TENANT_ID_PATTERN.fullmatch(tenant_id):
+        raise ValueError(
+            f"Invalid tenant id '{value}': use 1-32 letters, digits, '-' or '_', "
+            "starting and ending with a letter or digit"
+        )
+    return tenant_id
+
+
+class Tenant:
+    """Open handles on one tenant's data: its vector store, answer cache and manifest."""
+    
+    def __init__(
+        self,
+        tenant_id: str,
+        vector_store: VectorStore,
+        answer_cache: Optional[SemanticAnswerCache] = None,
+        manifest: Optional[DocumentManifest] = None
+    ):
+        """
+        Wrap a tenant's open handles.
+        
+        Args:
+            tenant_id: Tenant id
+            vector_store: The tenant's store
+            answer_cache: The tenant's answer cache (None when disabled)
+            manifest: The tenant's document manifests (None when disabled)
+        """
+        self.tenant_id = tenant_id
+        self.vector_store = vector_store
+        self.answer_cache = answer_cache
+        self.manifest = manifest
+        
+        # Requests and jobs using the handles; a leased tenant is never closed
+        self.leases = 0
+        self.last_used = time.monotonic()
+    
+    def _listeners(self) -> List[Callable]:
+        """Change listeners that keep the cache and manifests in step with the store."""
+        return [
+            service.invalidate_sources
+            for service in (self.answer_cache, self.manifest)
+            if service is not None
+        ]
+    
+    def subscribe(self):
+        """Follow changes to the tenant's store."""
+        for listener in self._listeners():
+            VectorStore.add_change_listener(listener, self.tenant_id)
+    
+    def close(self):
+        """Stop following changes and close the store and manifest."""
+        for listener in self._listeners():
+            VectorStore.remove_change_listener(listener, self.tenant_id)
+        if self.manifest is not None:
+            self.manifest.close()
+        close = getattr(self.vector_store, "close", None)
+        if close is not None:
+            close()
+
+
+def open_tenant(tenant_id: str) -> Tenant:
+    """
+    Open a tenant's store, answer cache and manifests.
+    
+    The store is a Chroma collection or NumPy directory of its own (see
+    ``create_vector_store``); manifests live in
+    ``<tenants_directory>/<tenant_id>/manifest.sqlite3``.
+    
+    Args:
+        tenant_id: Tenant id (not the default tenant)
+    
+    Returns:
+        The open tenant, subscribed to its store's changes
+    """
+    manifest = None
+    if settings.incremental_indexing_enabled:
+        manifest = DocumentManifest(str(Path(settings.tenants_directory) / tenant_id / "manifest.sqlite3"))
+    
+    tenant = Tenant(
+        tenant_id,
+        create_vector_store(tenant_id),
+        answer_cache=SemanticAnswerCache() if settings.answer_cache_enabled else None,
+        manifest=manifest
+    )
+    tenant.subscribe()
+    return tenant
+
+
+class TenantRegistry:
+    """
+    Tenants opened on first use, with at most ``max_open`` kept open.
+    
+    Open tenants are kept in least recently used order. Opening one beyond
+    ``max_open`` closes the least recently used, and a janitor thread closes
+    those idle for ``idle_seconds``. Requests and jobs lease a tenant while
+    they use it and leased tenants are never closed, so the registry may run
+    over ``max_open`` while many tenants are busy at once.
+    
+    Closing frees a NumPy store's memory maps; a Chroma collection stays
+    loaded in the shared client, bounded by ``chroma_memory_limit_bytes``.
+    
+    Lookups of open tenants only take a short lock; opening and closing are
+    serialized on a separate lock, so a slow cold open does not hold up
+    requests to tenants that are already open.
+    """
+    
+    def __init__(
+        self,
+        max_open: int = None,
+        idle_seconds: float = None,
+        opener: Callable[[str], Tenant] = None
+    ):
+        """
+        Initialize the registry.
+        
+        Args:
+            max_open: Open tenants kept (default from settings)
+            idle_seconds: Idle time after which a tenant is closed (default from settings)
+            opener: Opens a tenant by id (default: ``open_tenant``)
+        """
+        self.max_open = max(1, max_open or settings.max_open_tenants)
+        self.idle_seconds = idle_seconds if idle_seconds is not None else settings.tenant_idle_seconds
+        self.opener = opener or open_tenant
+        
+        self._tenants: "OrderedDict[str, Tenant]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._open_lock = threading.Lock()
+        
+        # Janitor closing idle tenants
+        self.sweep_seconds = min(60.0, max(1.0, self.idle_seconds / 4))
+        self._stopped = threading.Event()
+        self._janitor: Optional[threading.Thread] = None
+        
+        # Counters
+        self.hits = 0
+        self.opens = 0
+        self.closes = 0
+    
+    def _take(self, tenant_id: str) -> Optional[Tenant]:
+        """Lease an open tenant, or return None. Caller holds the lock."""
+        tenant = self._tenants.get(tenant_id)
+        if tenant is not None:
+            tenant.leases += 1
+            tenant.last_used = time.monotonic()
+            self._tenants.move_to_end(tenant_id)
+        return tenant
+    
+    def acquire(self, tenant_id: str) -> Tenant:
+        """
+        Lease a tenant, opening it if needed.
+        
+        Every ``acquire`` must be paired with a ``release``; ``lease`` does both.
+        
+        Args:
+            tenant_id: Tenant id (see ``normalize_tenant_id``)
+        
+        Returns:
+            The open tenant
+        """
+        with self._lock:
+            tenant = self._take(tenant_id)
+            if tenant is not None:
+                self.hits += 1
+                return tenant
+        
+        with self._open_lock:
+            # Another request may have opened it while we waited
+            with self._lock:
+                tenant = self._take(tenant_id)
+                if tenant is not None:
+                    self.hits += 1
+                    return tenant
+            
+            tenant = self.opener(tenant_id)
+            with self._lock:
+                tenant.leases = 1
+                tenant.last_used = time.monotonic()
+                self._tenants[tenant_id] = tenant
+                self.opens += 1
+                stale = self._over_capacity()
+            self._close(stale)
+        return tenant
+    
+    def retain(self, tenant: Tenant):
+        """Take another lease on a tenant that is already leased."""
+        with self._lock:
+            tenant.leases += 1
+    
+    def release(self, tenant: Tenant):
+        """Return a lease taken with ``acquire`` or ``retain``."""
+        with self._lock:
+            tenant.leases -= 1
+            tenant.last_used = time.monotonic()
+    
+    @contextmanager
+    def lease(self, tenant_id: str) -> Iterator[Tenant]:
+        """Lease a tenant for the duration of a ``with`` block."""
+        tenant = self.acquire(tenant_id)
+        try:
+            yield tenant
+        finally:
+            self.release(tenant)
+    
+    def _over_capacity(self) -> List[Tenant]:
+        """Remove unleased tenants beyond ``max_open``, oldest first. Caller holds the lock."""
+        excess = len(self._tenants) - self.max_open
+        stale = []
+        for tenant_id, tenant in list(self._tenants.items()):
+            if excess <= 0:
+                break
+            if tenant.leases == 0:
+                del self._tenants[tenant_id]
+                stale.append(tenant)
+                excess -= 1
+        return stale
+    
+    def _close(self, tenants: List[Tenant]):
+        """Close removed tenants. Caller holds the open lock."""
+        for tenant in tenants:
+            try:
+                tenant.close()
+            except Exception:
+                # A failed close must not stop the others from closing
+                pass
+            self.closes += 1
+    
+    def close_idle(self) -> int:
+        """
+        Close unleased tenants idle for ``idle_seconds``, and any left over
+        ``max_open`` once their leases ended.
+        
+        Returns:
+            Number of tenants closed
+        """
+        with self._open_lock:
+            with self._lock:
+                deadline = time.monotonic() - self.idle_seconds
+                stale = [
+                    tenant for tenant in self._tenants.values()
+                    if tenant.leases == 0 and tenant.last_used <= deadline
+                ]
+                for tenant in stale:
+                    del self._tenants[tenant.tenant_id]
+                stale.extend(self._over_capacity())
+            self._close(stale)
+        return len(stale)
+    
+    def _sweep(self):
+        """Janitor loop: close idle tenants until stopped."""
+        while not self._stopped.wait(self.sweep_seconds):
+            self.close_idle()
+    
+    def start(self):
+        """Start the janitor thread."""
+        if self._janitor is not None:
+            return
+        self._stopped.clear()
+        self._janitor = threading.Thread(target=self._sweep, name="tenant-janitor", daemon=True)
+        self._janitor.start()
+    
+    def close(self):
+        """Stop the janitor and close every open tenant."""
+        self._stopped.set()
+        if self._janitor is not None:
+            self._janitor.join(timeout=5)
+            self._janitor = None
+        
+        with self._open_lock:
+            with self._lock:
+                tenants = list(self._tenants.values())
+                self._tenants.clear()
+            self._close(tenants)
+    
+    def open_tenants(self) -> List[str]:
+        """Ids of the open tenants, least recently used first."""
+        with self._lock:
+            return list(self._tenants)
+    
+    def answer_cache_stats(self) -> Dict[str, Dict]:
+        """Answer-cache stats of the open tenants, by tenant id."""
+        with self._lock:
+            caches = {
+                tenant_id: tenant.answer_cache for tenant_id, tenant in self._tenants.items()
+                if tenant.answer_cache is not None
+            }
+        return {tenant_id: cache.get_stats() for tenant_id, cache in caches.items()}
+    
+    def get_stats(self) -> Dict:
+        """Get open-handle counts and hit-rate metrics."""
+        with self._lock:
+            lookups = self.hits + self.opens
+            return {
+                'open': len(self._tenants),
+                'leased': sum(1 for tenant in self._tenants.values() if tenant.leases),
+                'max_open': self.max_open,
+                'idle_seconds': self.idle_seconds,
+                'hits': self.hits,
+                'opens': self.opens,
+                'closes': self.closes,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,50 @@
+"""Helpers shared by the backend tests."""
+
+from typing import List
+
+from backend.document_processor import DocumentProcessor
+from backend.jobs import IngestionJobQueue
+from backend.models import ChunkMetadata, DocumentChunk
+
+
+def make_chunks(count, start=0, source="doc.txt", prefix="", **metadata) -> List[DocumentChunk]:
+    """
+    Build chunks numbered ``start`` to ``start + count - 1``.
+    
+    Args:
+        count: Number of chunks
+        start: Number of the first chunk
+        source: Source filename, or a function of the chunk number
+        prefix: Prefix of the chunk ids, which end in the chunk number
+        metadata: Further ``ChunkMetadata`` fields, each a value or a
+            function of the chunk number
+    
+    Returns:
+        Chunks with ids ``f"{prefix}{i}"`` and text ``f"Chunk {i} of {source}"``
+    """
+    def value(field, i):
+        return field(i) if callable(field) else field
+    
+    chunks = []
+    for i in range(start, start + count):
+        chunk_id, chunk_source = f"{prefix}{i}", value(source, i)
+        fields = {name: value(field, i) for name, field in metadata.items()}
+        chunks.append(DocumentChunk(
+            chunk_id=chunk_id,
+            text=f"Chunk {i} of {chunk_source}",
+            metadata=ChunkMetadata(source=chunk_source, chunk_id=chunk_id, **fields)
+        ))
+    return chunks
+
+
+def make_queue(tmp_path, store, embedding_service, **kwargs) -> IngestionJobQueue:
+    """Create a job queue rooted in a temporary directory."""
+    return IngestionJobQueue(
+        DocumentProcessor(chunk_size=100, chunk_overlap=20, extraction_workers=1),
+        embedding_service,
+        store,
+        jobs_dir=str(tmp_path / "jobs"),
+        upload_dir=str(tmp_path / "uploads"),
+        manifest_path=str(tmp_path / "manifest.sqlite3"),
+        **kwargs
+    )
@@ -0,0 +1,92 @@
+"""Unit tests for the semantic answer cache."""
+
+import pytest
+from backend.answer_cache import SemanticAnswerCache
+from backend.models import ChatResponse
+from backend.numpy_store import NumpyVectorStore
+from backend.rag_engine import RAGEngine, settings
+
+
+def make_response(answer: str) -> ChatResponse:
+    """Create a minimal chat response."""
+    return ChatResponse(answer=answer, sources=[], confidence=0.9, prompt_used="prompt")
+
+
+@pytest.fixture
+def cache():
+    """Create a cache with a permissive threshold."""
+    return SemanticAnswerCache(similarity_threshold=0.95, ttl_seconds=60, max_entries=3)
+
+
+def test_near_duplicate_hit(cache):
+    """Test that a near-identical query with the same chunks is served from cache."""
+    cache.store([1.0, 0.0, 0.0], ["c1", "c2"], ["a.pdf"], make_response("cached"), prompt="p")
+    
+    entry = cache.lookup([0.99, 0.05, 0.0], ["c2", "c1"])
+    
+    assert entry is not None
+    assert entry['response'].answer == "cached"
+    assert entry['response'].prompt_used is None
+    assert entry['prompt'] == "p"
+
+
+def test_miss_on_different_chunks_or_query(cache):
+    """Test that changed retrieval or a dissimilar query misses."""
+    cache.store([1.0, 0.0, 0.0], ["c1"], ["a.pdf"], make_response("cached"))
+    
+    assert cache.lookup([1.0, 0.0, 0.0], ["c1", "c3"]) is None
+    assert cache.lookup([0.0, 1.0, 0.0], ["c1"]) is None
+    
+    stats = cache.get_stats()
+    assert stats['hits'] == 0
+    assert stats['misses'] == 2
+
+
+def test_invalidate_by_source(cache):
+    """Test that changing a cited source drops its entries only."""
+    cache.store([1.0, 0.0], ["c1"], ["a.pdf"], make_response("a"))
+    cache.store([0.0, 1.0], ["c2"], ["b.pdf"], make_response("b"))
+    
+    cache.invalidate_sources({"a.pdf"})
+    
+    assert cache.lookup([1.0, 0.0], ["c1"]) is None
+    assert cache.lookup([0.0, 1.0], ["c2"]) is not None
+    
+    cache.invalidate_sources(None)
+    assert cache.get_stats()['entries'] == 0
+
+
+def test_ttl_and_max_entries():
+    """Test expiry and the max-entries bound."""
+    expired = SemanticAnswerCache(similarity_threshold=0.95, ttl_seconds=0, max_entries=3)
+    expired.store([1.0, 0.0], ["c1"], ["a.pdf"], make_response("a"))
+    assert expired.lookup([1.0, 0.0], ["c1"]) is None
+    
+    bounded = SemanticAnswerCache(similarity_threshold=0.95, ttl_seconds=60, max_entries=2)
+    for i in range(3):
+        bounded.store([1.0, float(i)], [f"c{i}"], ["a.pdf"], make_response(str(i)))
+    
+    stats = bounded.get_stats()
+    assert stats['entries'] == 2
+    assert stats['evictions'] == 1
+
+
+def test_engine_close_stops_invalidation(tmp_path, monkeypatch):
+    """Test that closing the engine unsubscribes its answer cache from store changes."""
+    monkeypatch.setattr(settings, "answer_cache_enabled", True)
+    engine = RAGEngine(
+        embedding_service=object(),
+        vector_store=NumpyVectorStore(str(tmp_path), keyword_index=False),
+        llm_client=object(),
+        async_llm_client=object(),
+        retrieval_mode="dense"
+    )
+    listener = engine.answer_cache.invalidate_sources
+    assert listener in NumpyVectorStore._change_listeners[None]
+    
+    engine.close()
+    assert listener not in NumpyVectorStore._change_listeners[None]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,102 @@
+"""Unit tests for concurrent batch embedding."""
+
+import threading
+import time
+
+import httpx
+import openai
+import pytest
+from backend.batch_embedder import AdaptiveConcurrencyLimiter, BatchEmbedder, plan_batches
+
+
+def rate_limit_error(retry_after: str = "0") -> openai.RateLimitError:
+    """Build a 429 error carrying a Retry-After header."""
+    response = httpx.Response(
+        429,
+        headers={"retry-after": retry_after},
+        request=httpx.Request("POST", "http://test/embeddings")
+    )
+    return openai.RateLimitError("rate limited", response=response, body=None)
+
+
+def test_plan_batches_token_budget():
+    """Test that batches respect both the token budget and the item limit."""
+    texts = ["x" * 400] * 5 + ["y"] * 5  # ~101 tokens each, then ~1 token each
+    
+    batches = plan_batches(texts, max_tokens=250, max_items=4)
+    
+    assert [i for batch in batches for i in batch] == list(range(10))
+    assert batches[0] == [0, 1]
+    assert all(len(batch) <= 4 for batch in batches)
+
+
+def test_results_in_input_order():
+    """Test that concurrent batches are merged back in input order."""
+    embedder = BatchEmbedder(
+        lambda batch: [[float(text)] for text in batch],
+        max_concurrency=4,
+        max_tokens_per_batch=10_000
+    )
+    texts = [str(i) for i in range(50)]
+    
+    embeddings = embedder.embed(texts, max_batch_size=3)
+    
+    assert embeddings == [[float(i)] for i in range(50)]
+
+
+def test_only_failed_batch_is_retried():
+    """Test that a transient failure re-sends only the failing batch."""
+    calls = []
+    failed = threading.Event()
+    
+    def request(batch):
+        calls.append(list(batch))
+        if batch == ["c", "d"] and not failed.is_set():
+            failed.set()
+            raise rate_limit_error()
+        return [[1.0] for _ in batch]
+    
+    embedder = BatchEmbedder(request, max_concurrency=2, max_tokens_per_batch=10_000, max_attempts=3)
+    embedder.embed(["a", "b", "c", "d", "e", "f"], max_batch_size=2)
+    
+    assert sorted(map(tuple, calls)) == [("a", "b"), ("c", "d"), ("c", "d"), ("e", "f")]
+    assert embedder.get_stats()['retries'] == 1
+    assert embedder.get_stats()['rate_limited'] == 1
+
+
+def test_failure_cancels_pending_batches():
+    """Test that batches not yet started are dropped after the first failure."""
+    calls = []
+    
+    def request(batch):
+        calls.append(list(batch))
+        if batch == ["0"]:
+            raise ValueError("bad input")
+        time.sleep(0.01)
+        return [[1.0] for _ in batch]
+    
+    embedder = BatchEmbedder(request, max_concurrency=1, max_tokens_per_batch=10_000, max_attempts=1)
+    with pytest.raises(ValueError):
+        embedder.embed([str(i) for i in range(20)], max_batch_size=1)
+    
+    assert len(calls) < 5
+
+
+def test_limiter_aimd():
+    """Test multiplicative decrease on 429 and additive recovery."""
+    limiter = AdaptiveConcurrencyLimiter(max_limit=8)
+    
+    limiter.on_rate_limit()
+    assert limiter.limit == 4
+    
+    for _ in range(4):
+        limiter.on_success()
+    assert 4 < limiter.limit <= 5
+    
+    for _ in range(100):
+        limiter.on_success()
+    assert limiter.limit == 8
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
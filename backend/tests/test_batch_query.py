@@ -0,0 +1,189 @@
+"""Tests for the batch query API."""
+
+import asyncio
+import json
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from backend import rag_engine as rag_engine_module
+from backend.main import app
+from backend.models import ChunkMetadata, DocumentChunk
+from backend.numpy_store import NumpyVectorStore
+from backend.rag_engine import RAGEngine
+from backend.services import ServiceContainer
+
+
+DIMENSION = 8
+
+
+class FakeEmbeddingService:
+    """Embeds "question N" as the N-th unit vector and records batch calls."""
+    
+    def __init__(self):
+        self.batch_calls = []
+    
+    def generate_embeddings_batch(self, texts, batch_size=None):
+        self.batch_calls.append(list(texts))
+        return [np.eye(DIMENSION)[int(text.split()[-1]) % DIMENSION].tolist() for text in texts]
+
+
+class FakeAsyncLLMClient:
+    """Async OpenAI-style client; earlier questions take longer to answer."""
+    
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+    
+    async def _create(self, messages, **kwargs):
+        self.calls += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        number = int(messages[-1]['content'].rsplit("question ", 1)[1].split()[0])
+        await asyncio.sleep(0.01 * (10 - number))
+        self.active -= 1
+        message = SimpleNamespace(content=f"answer {number}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class FakeJobQueue:
+    """Job queue with no-op lifecycle."""
+    
+    def start(self):
+        pass
+    
+    def stop(self):
+        pass
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    """Dense RAG engine over one chunk per embedding dimension."""
+    monkeypatch.setattr(rag_engine_module.settings, "batch_llm_concurrency", 2)
+    store = NumpyVectorStore(str(tmp_path), keyword_index=False)
+    store.upsert_chunks(
+        [
+            DocumentChunk(
+                chunk_id=f"c{i}",
+                text=f"Fact {i}",
+                metadata=ChunkMetadata(source="facts.txt", chunk_id=f"c{i}")
+            )
+            for i in range(DIMENSION)
+        ],
+        np.eye(DIMENSION).tolist()
+    )
+    
+    search_calls = []
+    search_batch = store.similarity_search_batch
+    
+    def counting_search_batch(query_embeddings, **kwargs):
+        search_calls.append(len(query_embeddings))
+        return search_batch(query_embeddings, **kwargs)
+    
+    store.similarity_search_batch = counting_search_batch
+    
+    engine = RAGEngine(
+        embedding_service=FakeEmbeddingService(),
+        vector_store=store,
+        llm_client=object(),
+        async_llm_client=FakeAsyncLLMClient(),
+        retrieval_mode="dense"
+    )
+    engine.search_calls = search_calls
+    yield engine
+    engine.close()
+
+
+@pytest.fixture
+def client(engine):
+    """Test client whose services use the engine under test."""
+    app.state.services = ServiceContainer(
+        vector_store=engine.vector_store,
+        embedding_service=engine.embedding_service,
+        rag_engine=engine,
+        doc_processor=object(),
+        job_queue=FakeJobQueue()
+    )
+    with TestClient(app) as client:
+        yield client
+
+
+def read_lines(response):
+    """Parse an NDJSON response body."""
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+def test_batch_streams_results_in_completion_order(engine, client):
+    """Test one embedding call, one vector query and bounded LLM fan-out."""
+    queries = [f"question {i}" for i in range(6)]
+    response = client.post("/api/chat/batch", json={"queries": queries, "top_k": 1})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    
+    results = read_lines(response)
+    assert sorted(result['index'] for result in results) == list(range(6))
+    assert [result['index'] for result in results] != list(range(6))
+    for result in results:
+        assert result['answer'] == f"answer {result['index']}"
+        assert result['sources'][0]['chunk_id'] == f"c{result['index']}"
+    
+    assert engine.embedding_service.batch_calls == [queries]
+    assert engine.search_calls == [6]
+    assert engine.async_llm_client.max_active == 2
+
+
+def test_retrieval_only_skips_generation(engine, client):
+    """Test that retrieval-only batches return sources without LLM calls."""
+    response = client.post(
+        "/api/chat/batch",
+        json={"queries": ["question 3", "question 5"], "top_k": 2, "retrieval_only": True}
+    )
+    
+    results = read_lines(response)
+    assert [result['index'] for result in results] == [0, 1]
+    assert all('answer' not in result for result in results)
+    assert results[1]['sources'][0]['chunk_id'] == "c5"
+    assert engine.async_llm_client.calls == 0
+
+
+def test_batch_retrieval_is_timed_for_the_request(engine):
+    """Test that retrieval on the search executor records into the request's timings."""
+    # The engine imports metrics as a top-level module, not as backend.metrics
+    metrics = sys.modules[rag_engine_module.timed.__module__]
+    
+    async def consume():
+        return [result async for result in engine.abatch_query(["question 3"], top_k=1, retrieval_only=True)]
+    
+    with metrics.request_timings() as timings:
+        results = asyncio.run(consume())
+    
+    assert results[0].sources[0].chunk_id == "c3"
+    assert "retrieve" in timings
+
+
+def test_failed_query_does_not_stop_batch(engine, client):
+    """Test that one failing generation is reported on its own line."""
+    call_llm = engine._acall_llm
+    
+    async def flaky_llm(messages):
+        if "question 1" in messages[-1]['content']:
+            raise RuntimeError("upstream error")
+        return await call_llm(messages)
+    
+    engine._acall_llm = flaky_llm
+    response = client.post("/api/chat/batch", json={"queries": ["question 0", "question 1", "question 2"]})
+    results = {result['index']: result for result in read_lines(response)}
+    
+    assert results[1]['error'] == "upstream error"
+    assert results[0]['answer'] == "answer 0" and results[2]['answer'] == "answer 2"
+
+
+def test_batch_validation(client):
+    """Test that empty batches and empty questions are rejected."""
+    assert client.post("/api/chat/batch", json={"queries": []}).status_code == 400
+    response = client.post("/api/chat/batch", json={"queries": ["question 1", " "]})
+    assert response.status_code == 400
+    assert "index 1" in response.json()['detail']
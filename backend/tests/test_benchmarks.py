@@ -0,0 +1,81 @@
+"""Tests for the offline benchmark suite and its local stand-ins."""
+
+import json
+
+import numpy as np
+import openai
+from backend.benchmarks.__main__ import compare, main
+from backend.benchmarks.corpus import CorpusGenerator
+from backend.benchmarks.fake_openai import FakeOpenAIServer, hash_embedding
+from backend.document_processor import DocumentProcessor
+
+
+def test_hash_embeddings_are_deterministic_and_lexical():
+    """Test that shared words, not chance, make embeddings similar."""
+    first = hash_embedding("pump valve pressure", 64)
+    assert np.array_equal(first, hash_embedding("pump valve pressure", 64))
+    assert np.isclose(np.linalg.norm(first), 1.0)
+    assert first @ hash_embedding("valve pressure", 64) > first @ hash_embedding("invoice total due", 64)
+
+
+def test_fake_server_speaks_openai():
+    """Test embeddings and streamed completions through the OpenAI client."""
+    with FakeOpenAIServer(dimension=16, ttft_ms=1, token_ms=0, completion_tokens=5) as server:
+        client = openai.OpenAI(api_key="benchmark", base_url=server.base_url)
+        
+        response = client.embeddings.create(model="fake", input=["alpha beta", "gamma"])
+        assert np.allclose(response.data[0].embedding, hash_embedding("alpha beta", 16), atol=1e-6)
+        
+        messages = [{"role": "user", "content": "one two three"}]
+        stream = client.chat.completions.create(model="fake", messages=messages, stream=True)
+        streamed = "".join(chunk.choices[0].delta.content or "" for chunk in stream if chunk.choices)
+        answer = client.chat.completions.create(model="fake", messages=messages).choices[0].message.content
+        
+        assert streamed == answer == " ".join(server.answer_words(messages))
+        assert server.embedding_requests == 1 and server.completion_requests == 2
+
+
+def test_corpus_is_reproducible(tmp_path):
+    """Test that a seed fixes the corpus and every format is extractable."""
+    first = CorpusGenerator(seed=3).generate(str(tmp_path / "a"), 3, pages_per_document=2)
+    second = CorpusGenerator(seed=3).generate(str(tmp_path / "b"), 3, pages_per_document=2)
+    
+    assert [path.suffix for path in first] == [".pdf", ".docx", ".txt"]
+    assert first[0].read_bytes() == second[0].read_bytes()
+    assert first[2].read_text() == second[2].read_text()
+    
+    processor = DocumentProcessor()
+    for path in first:
+        chunks, _ = processor.process_document(str(path), path.name)
+        assert chunks
+    pdf_chunks, metadata = processor.process_document(str(first[0]), first[0].name)
+    assert metadata['num_pages'] == 2
+
+
+def test_suite_writes_json_report(tmp_path):
+    """Test a minimal run of every scenario."""
+    output = tmp_path / "report.json"
+    assert main([
+        "run", "--output", str(output), "--documents", "3", "--pages", "2", "--dimension", "32",
+        "--embedding-latency-ms", "0", "--ttft-ms", "1", "--token-ms", "0", "--completion-tokens", "5",
+        "--clients", "2", "--requests", "2", "--stream", "--catalog-chunks", "1000"
+    ]) == 0
+    
+    report = json.loads(output.read_text())
+    results = report['results']
+    assert set(results) == {"ingest", "chat", "chat_stream", "catalog_1000"}
+    assert results['ingest']['failed'] == 0 and results['ingest']['chunks'] > 0
+    assert results['chat']['errors'] == 0 and results['chat_stream']['errors'] == 0
+    assert set(results['chat']['stages_ms']) >= {"embed", "retrieve", "prompt", "llm"}
+    assert results['catalog_1000']['chunks_after_deletes'] == 0
+
+
+def test_compare_flags_regressions():
+    """Test that slower latency and lower throughput are flagged, counts are not."""
+    baseline = {'results': {'chat': {'latency_ms': {'p95': 100.0}, 'requests_per_second': 50.0, 'requests': 10}}}
+    candidate = {'results': {'chat': {'latency_ms': {'p95': 130.0}, 'requests_per_second': 40.0, 'requests': 20}}}
+    
+    rows, regressions = compare(baseline, candidate, threshold=0.1)
+    assert len(rows) == 3
+    assert regressions == ["chat.latency_ms.p95", "chat.requests_per_second"]
+    assert compare(baseline, baseline, threshold=0.1)[1] == []
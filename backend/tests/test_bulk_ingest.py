@@ -0,0 +1,238 @@
+"""Tests for bulk ingestion of several files and zip/tar archives as one job."""
+
+import io
+import tarfile
+import time
+import zipfile
+
+from fastapi.testclient import TestClient
+from backend.archives import is_archive, iter_upload_documents
+from backend.document_processor import DocumentProcessor
+from backend.main import app
+from backend.services import ServiceContainer
+from backend.tests.conftest import make_queue
+
+
+def text(name, sentences=30):
+    """Distinct document text for a filename."""
+    return "".join(f"Sentence {i} of {name} about bulk ingestion. " for i in range(sentences)).encode("utf-8")
+
+
+def make_zip(path, members):
+    """Write a zip archive of (name, bytes) members."""
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+
+
+def make_tar(path, members):
+    """Write a gzipped tar archive of (name, bytes) members."""
+    with tarfile.open(path, "w:gz") as archive:
+        for name, data in members:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+
+
+class FakeEmbeddingService:
+    """Embedding service recording the size of every batch."""
+    
+    def __init__(self):
+        self.batches = []
+    
+    def generate_embeddings_batch(self, texts):
+        self.batches.append(len(texts))
+        return [[0.1, 0.2, 0.3] for _ in texts]
+
+
+class FailingEmbeddingService:
+    """Embedding service that fails after a number of batches."""
+    
+    def __init__(self, fail_after):
+        self.fail_after = fail_after
+        self.calls = 0
+    
+    def generate_embeddings_batch(self, texts):
+        self.calls += 1
+        if self.calls > self.fail_after:
+            raise RuntimeError("embedding backend unavailable")
+        return [[0.1, 0.2, 0.3] for _ in texts]
+
+
+class FakeVectorStore:
+    """Vector store recording upserted chunks and upsert sizes."""
+    
+    def __init__(self):
+        self.chunks = []
+        self.upserts = []
+    
+    def upsert_chunks(self, chunks, embeddings):
+        self.upserts.append(len(chunks))
+        ids = {chunk.chunk_id for chunk in chunks}
+        self.chunks = [chunk for chunk in self.chunks if chunk.chunk_id not in ids] + list(chunks)
+    
+    def get_document_chunk_ids(self, filename):
+        return [chunk.chunk_id for chunk in self.chunks if chunk.metadata.source == filename]
+    
+    def delete_chunks(self, chunk_ids):
+        self.chunks = [chunk for chunk in self.chunks if chunk.chunk_id not in chunk_ids]
+        return len(chunk_ids)
+    
+    def sources(self):
+        return sorted({chunk.metadata.source for chunk in self.chunks})
+
+
+def submit_parts(job_queue, parts):
+    """Store the parts of a bulk upload, given as {filename: path}, and queue it."""
+    job_id = job_queue.new_job_id()
+    job_queue.bulk_upload_dir(job_id).mkdir(parents=True)
+    for index, (filename, path) in enumerate(parts.items()):
+        job_queue.bulk_part_path(job_id, index, filename).write_bytes(path.read_bytes())
+    return job_queue.submit(job_id, f"{len(parts)} files", bulk=True)
+
+
+def wait_for(job_queue, job_id, timeout=10.0):
+    """Poll until a job finishes."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = job_queue.get(job_id)
+        if job.status in ("completed", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+def test_iter_upload_documents(tmp_path):
+    """Test that archive members are read one by one under their base names."""
+    make_zip(tmp_path / "docs.zip", [
+        ("reports/a.txt", b"alpha"),
+        ("reports/", b""),
+        (".hidden.txt", b"x"),
+        ("__MACOSX/reports/._a.txt", b"x"),
+        ("big.txt", b"y" * 50),
+    ])
+    make_tar(tmp_path / "docs.tgz", [("nested/dir/b.txt", b"beta")])
+    (tmp_path / "c.txt").write_bytes(b"gamma")
+    
+    assert list(iter_upload_documents(tmp_path / "docs.zip", "docs.zip", 10)) == [
+        ("a.txt", b"alpha", None),
+        ("big.txt", None, "big.txt is larger than 10 bytes"),
+    ]
+    assert list(iter_upload_documents(tmp_path / "docs.tgz", "docs.tgz", 10)) == [("b.txt", b"beta", None)]
+    assert list(iter_upload_documents(tmp_path / "c.txt", "c.txt", 10)) == [("c.txt", b"gamma", None)]
+    assert is_archive("Docs.TAR.GZ") and not is_archive("notes.txt")
+
+
+def test_process_documents_matches_serial(tmp_path):
+    """Test that in-memory documents are chunked like files, in parallel or not."""
+    documents = [(f"doc{i}.txt", text(f"doc{i}")) for i in range(5)] + [("empty.txt", b"  ")]
+    serial = DocumentProcessor(chunk_size=100, chunk_overlap=20, extraction_workers=1)
+    parallel = DocumentProcessor(chunk_size=100, chunk_overlap=20, extraction_workers=2)
+    try:
+        def results(processor):
+            return {
+                name: ([chunk.chunk_id for chunk in chunks], error is not None)
+                for name, chunks, _, error in processor.process_documents(iter(documents))
+            }
+        
+        expected = results(serial)
+        assert results(parallel) == expected
+        assert expected["empty.txt"] == ([], True)
+        
+        (tmp_path / "doc0.txt").write_bytes(text("doc0"))
+        chunks, _ = serial.process_document(str(tmp_path / "doc0.txt"))
+        assert expected["doc0.txt"] == ([chunk.chunk_id for chunk in chunks], False)
+    finally:
+        parallel.close()
+
+
+def test_bulk_job_merges_batches_and_reports_each_file(tmp_path):
+    """Test archives and plain files indexed as one job with per-file results."""
+    make_zip(tmp_path / "docs.zip", [("a.txt", text("a")), ("b.txt", text("b")), ("data.csv", b"x,y")])
+    make_tar(tmp_path / "more.tar.gz", [("sub/c.txt", text("c")), ("a.txt", text("other a"))])
+    (tmp_path / "d.txt").write_bytes(text("d"))
+    parts = {"docs.zip": tmp_path / "docs.zip", "more.tar.gz": tmp_path / "more.tar.gz", "d.txt": tmp_path / "d.txt"}
+    
+    store = FakeVectorStore()
+    embedding_service = FakeEmbeddingService()
+    job_queue = make_queue(tmp_path, store, embedding_service, bulk_batch_size=1000)
+    job_queue.start()
+    
+    job = wait_for(job_queue, submit_parts(job_queue, parts).job_id)
+    assert job.status == "completed"
+    assert [(result.filename, result.status) for result in job.files] == [
+        ("a.txt", "completed"), ("b.txt", "completed"), ("data.csv", "failed"),
+        ("c.txt", "completed"), ("a.txt", "failed"), ("d.txt", "completed"),
+    ]
+    assert job.files[4].error == "Duplicate filename a.txt in upload"
+    assert "Unsupported file type" in job.files[2].error
+    assert job.result.message.startswith("Indexed 4 of 6 documents")
+    assert store.sources() == ["a.txt", "b.txt", "c.txt", "d.txt"]
+    
+    # Chunks of all documents are embedded and stored in one merged batch
+    assert embedding_service.batches == store.upserts == [len(store.chunks)]
+    assert job.num_chunks == job.chunks_stored == len(store.chunks)
+    assert sum(result.chunks_stored for result in job.files) == len(store.chunks)
+    assert not job_queue.bulk_upload_dir(job.job_id).exists()
+    
+    # Unchanged documents are skipped on the next upload
+    again = wait_for(job_queue, submit_parts(job_queue, {"d.txt": tmp_path / "d.txt"}).job_id)
+    job_queue.stop()
+    assert [(result.status, result.chunks_skipped) for result in again.files] == [
+        ("skipped", job.files[-1].num_chunks)
+    ]
+    assert len(embedding_service.batches) == 1
+
+
+def test_failed_bulk_job_rolls_back_unfinished_documents(tmp_path):
+    """Test that a failing batch removes the chunks of documents it left unfinished."""
+    for name in ("a.txt", "b.txt"):
+        (tmp_path / name).write_bytes(text(name, sentences=60))
+    store = FakeVectorStore()
+    job_queue = make_queue(tmp_path, store, FailingEmbeddingService(fail_after=1), bulk_batch_size=8)
+    job_queue.start()
+    
+    job = wait_for(job_queue, submit_parts(job_queue, {"a.txt": tmp_path / "a.txt", "b.txt": tmp_path / "b.txt"}).job_id)
+    job_queue.stop()
+    
+    assert job.status == "failed"
+    assert "embedding backend unavailable" in job.error
+    assert [result.status for result in job.files] == ["failed", "failed"]
+    assert store.chunks == []
+
+
+def test_bulk_upload_endpoint(tmp_path):
+    """Test the bulk endpoint: validation, one job for all parts and its file results."""
+    make_zip(tmp_path / "docs.zip", [("a.txt", text("a")), ("b.txt", text("b"))])
+    store = FakeVectorStore()
+    job_queue = make_queue(tmp_path, store, FakeEmbeddingService())
+    app.state.services = ServiceContainer(
+        vector_store=store,
+        embedding_service=job_queue.embedding_service,
+        rag_engine=object(),
+        doc_processor=job_queue.processor,
+        job_queue=job_queue
+    )
+    
+    with TestClient(app) as client:
+        response = client.post(
+            "/api/documents/bulk",
+            files=[
+                ("files", ("docs.zip", (tmp_path / "docs.zip").read_bytes(), "application/zip")),
+                ("files", ("c.txt", text("c"), "text/plain")),
+            ]
+        )
+        assert response.status_code == 202
+        job = response.json()
+        assert job['bulk'] and job['filename'] == "2 files"
+        
+        job = wait_for(job_queue, job['job_id'])
+        assert [(result.filename, result.status) for result in job.files] == [
+            ("a.txt", "completed"), ("b.txt", "completed"), ("c.txt", "completed")
+        ]
+        assert client.get(f"/api/documents/jobs/{job.job_id}").json()['files'][2]['num_chunks'] > 0
+        
+        response = client.post("/api/documents/bulk", files=[("files", ("data.csv", b"x,y", "text/csv"))])
+        assert response.status_code == 400
+    
+    assert store.sources() == ["a.txt", "b.txt", "c.txt"]
@@ -0,0 +1,182 @@
+"""Tests for the async and streaming chat paths."""
+
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from backend import rag_engine as rag_engine_module
+from backend.main import app
+from backend.models import ChunkMetadata, DocumentChunk
+from backend.numpy_store import NumpyVectorStore
+from backend.rag_engine import RAGEngine
+from backend.services import ServiceContainer
+
+
+DELTAS = ["The pump ", "restarts after ", "the valve opens."]
+
+
+class FakeEmbeddingService:
+    """Embeds every query as the first unit vector."""
+    
+    cache = None
+    
+    async def agenerate_embedding(self, text):
+        return [1.0, 0.0]
+
+
+class FakeAsyncOpenAI:
+    """
+    AsyncOpenAI-style client answering with ``DELTAS``.
+    
+    Each upstream wait yields to the event loop, and completions wait for
+    ``release`` so a test can check the loop keeps running meanwhile.
+    """
+    
+    def __init__(self, fail_after=None):
+        self.fail_after = fail_after
+        self.release = asyncio.Event()
+        self.release.set()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+    
+    async def _create(self, stream=False, **kwargs):
+        await self.release.wait()
+        if stream:
+            return self._stream()
+        message = SimpleNamespace(content="".join(DELTAS))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+    
+    async def _stream(self):
+        for i, delta in enumerate(DELTAS):
+            if i == self.fail_after:
+                raise ConnectionError("upstream reset")
+            await asyncio.sleep(0)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))])
+
+
+class FakeJobQueue:
+    """Job queue with no-op lifecycle."""
+    
+    def start(self):
+        pass
+    
+    def stop(self):
+        pass
+
+
+def make_engine(tmp_path, llm_client):
+    """Dense RAG engine over two chunks and a fake LLM."""
+    store = NumpyVectorStore(str(tmp_path), keyword_index=False)
+    store.upsert_chunks(
+        [
+            DocumentChunk(chunk_id=f"c{i}", text=f"Fact {i}", metadata=ChunkMetadata(source="facts.txt", chunk_id=f"c{i}"))
+            for i in range(2)
+        ],
+        np.eye(2).tolist()
+    )
+    return RAGEngine(
+        embedding_service=FakeEmbeddingService(),
+        vector_store=store,
+        llm_client=object(),
+        async_llm_client=llm_client,
+        retrieval_mode="dense"
+    )
+
+
+def stream_frames(tmp_path, llm_client):
+    """POST to /api/chat/stream and return the response and its (event, data) frames."""
+    engine = make_engine(tmp_path, llm_client)
+    app.state.services = ServiceContainer(
+        vector_store=engine.vector_store,
+        embedding_service=engine.embedding_service,
+        rag_engine=engine,
+        doc_processor=object(),
+        job_queue=FakeJobQueue()
+    )
+    with TestClient(app) as client:
+        response = client.post("/api/chat/stream", json={"query": "When does the pump restart?"})
+    
+    assert response.text.endswith("\n\n")
+    frames = []
+    for frame in response.text.split("\n\n")[:-1]:
+        event_line, data_line = frame.split("\n")
+        assert event_line.startswith("event: ") and data_line.startswith("data: ")
+        frames.append((event_line[len("event: "):], json.loads(data_line[len("data: "):])))
+    return response, frames
+
+
+def test_aquery_does_not_block_event_loop(tmp_path):
+    """Test that other tasks keep running while aquery waits on the LLM."""
+    llm_client = FakeAsyncOpenAI()
+    llm_client.release.clear()
+    engine = make_engine(tmp_path, llm_client)
+    ticks = []
+    
+    async def heartbeat():
+        # Only runs if aquery yields to the loop while it waits
+        for _ in range(10):
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.001)
+        llm_client.release.set()
+    
+    async def main():
+        return await asyncio.wait_for(
+            asyncio.gather(engine.aquery("When does the pump restart?"), heartbeat()),
+            timeout=5
+        )
+    
+    try:
+        response, _ = asyncio.run(main())
+    finally:
+        engine.close()
+    
+    assert len(ticks) == 10
+    assert response.answer == "".join(DELTAS)
+    assert response.sources[0].chunk_id == "c0"
+
+
+def test_stream_sends_sources_then_deltas_then_done(tmp_path):
+    """Test the SSE framing and event order of /api/chat/stream."""
+    response, frames = stream_frames(tmp_path, FakeAsyncOpenAI())
+    
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert [event for event, _ in frames] == ["sources", "token", "token", "token", "done"]
+    sources = frames[0][1]
+    assert sources["sources"][0]["chunk_id"] == "c0"
+    assert 0 <= sources["confidence"] <= 1
+    assert [data["delta"] for _, data in frames[1:-1]] == DELTAS
+    assert frames[-1][1] == {"prompt_used": None}
+
+
+def test_stream_reports_upstream_failure(tmp_path):
+    """Test that a failure mid-answer ends the stream with an error event."""
+    _, frames = stream_frames(tmp_path, FakeAsyncOpenAI(fail_after=1))
+    
+    assert [event for event, _ in frames] == ["sources", "token", "error"]
+    assert "upstream reset" in frames[-1][1]["detail"]
+
+
+def test_stream_times_only_upstream_waits(tmp_path, monkeypatch):
+    """Test that time the consumer spends between deltas is not counted as LLM time."""
+    engine = make_engine(tmp_path, FakeAsyncOpenAI())
+    recorded = {}
+    monkeypatch.setattr(rag_engine_module, "record_stage", lambda stage, seconds: recorded.update({stage: seconds}))
+    
+    async def consume():
+        async for event, _ in engine.astream_query("When does the pump restart?"):
+            if event == "token":
+                await asyncio.sleep(0.05)
+    
+    try:
+        asyncio.run(consume())
+    finally:
+        engine.close()
+    
+    assert 0 < recorded["llm"] < 0.05
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -1,5 +1,9 @@
 """Unit tests for document chunking."""
 
+import os
+import time
+from itertools import islice
+
 import pytest
 from backend.document_processor import DocumentProcessor
 from backend.models import DocumentChunk
@@ -91,5 +95,139 @@ def test_sentence_boundary_splitting():
     assert sentence_endings > 0
 
 
+def test_streamed_chunks_match_chunk_text():
+    """Test that chunking streamed segments matches chunking the joined text."""
+    processor = DocumentProcessor(chunk_size=60, chunk_overlap=15)
+    
+    pages = [
+        "First page text.  It has   two sentences.",
+        "\n\nSecond page, with a\nline break. And more words here.",
+        "\n\n   ",
+        "\n\nFourth page closes the document!"
+    ]
+    expected = [chunk.text for chunk in processor.chunk_text("".join(pages), "doc.pdf")]
+    
+    segments = [(page_num, text) for page_num, text in enumerate(pages, 1)]
+    streamed = list(processor.iter_chunks(segments, "doc.pdf"))
+    
+    assert [chunk.text for chunk in streamed] == expected
+    assert streamed[0].metadata.page == 1
+    assert streamed[-1].metadata.page == 4
+
+
+def test_early_sentence_break_still_advances():
+    """Test that a sentence break early in the window cannot stall or rewind chunking."""
+    processor = DocumentProcessor(chunk_size=1000, chunk_overlap=200)
+    text = "x" * 500 + ". " + "y" * 2000
+    
+    # Bounded read first, so a regression fails instead of hanging
+    spans = list(islice(processor._iter_chunk_spans([(None, text)]), 50))
+    assert len(spans) < 50
+    starts = [start for start, *_ in spans]
+    assert all(a < b for a, b in zip(starts, starts[1:]))
+    assert spans[-1][0] + len(spans[-1][1]) == len(text)
+    
+    expected = [chunk_text for _, chunk_text, _, _ in spans]
+    assert [chunk.text for chunk in processor.chunk_text(text, "doc.txt")] == expected
+    chunks, _ = processor.process_bytes(text.encode("utf-8"), "doc.txt")
+    assert [chunk.text for chunk in chunks] == expected
+    assert len({chunk.chunk_id for chunk in chunks}) == len(chunks)
+
+
+def test_chunk_ids_are_deterministic():
+    """Test that chunk ids depend only on source, text and repeat count."""
+    processor = DocumentProcessor(chunk_size=100, chunk_overlap=20)
+    text = "Repeated sentence here. " * 30
+    
+    first = processor.chunk_text(text, "a.txt")
+    again = processor.chunk_text(text, "a.txt")
+    other = processor.chunk_text(text, "b.txt")
+    
+    assert [chunk.chunk_id for chunk in first] == [chunk.chunk_id for chunk in again]
+    assert not {chunk.chunk_id for chunk in first} & {chunk.chunk_id for chunk in other}
+    # Identical chunk texts in one document still get distinct ids
+    assert len({chunk.text for chunk in first}) < len(first)
+    assert len({chunk.chunk_id for chunk in first}) == len(first)
+
+
+def test_iter_document_chunks_txt(tmp_path):
+    """Test that text files are streamed in blocks into the same chunks."""
+    processor = DocumentProcessor(chunk_size=100, chunk_overlap=20)
+    processor.TXT_BLOCK_SIZE = 37
+    
+    text = "This is a test sentence. " * 40
+    path = tmp_path / "notes.txt"
+    path.write_text(text, encoding="utf-8")
+    
+    streamed = [chunk.text for chunk in processor.iter_document_chunks(str(path))]
+    chunks, _ = processor.process_document(str(path))
+    
+    assert streamed == [chunk.text for chunk in processor.chunk_text(text, "notes.txt")]
+    assert [chunk.text for chunk in chunks] == streamed
+    assert all(chunk.metadata.source == "notes.txt" for chunk in chunks)
+
+
+def join_pages(pages):
+    """Join page texts the way PDF extraction does, returning (text, page_map)."""
+    page_map = {}
+    pos = 0
+    for page_num, page_text in enumerate(pages, 1):
+        page_map[pos] = page_num
+        pos += len(page_text) + 2
+    return "\n\n".join(pages), page_map
+
+
+def test_page_attribution_after_cleaning():
+    """Test that page offsets stay correct after whitespace is collapsed."""
+    processor = DocumentProcessor(chunk_size=40, chunk_overlap=5)
+    
+    # Heavy whitespace on early pages shifts every later offset when cleaned
+    pages = ["Alpha    \n\n\n   words.", "Bravo   \t\t  words here.", "Charlie words end."]
+    text, page_map = join_pages(pages)
+    chunks = processor.chunk_text(text, "doc.pdf", page_map)
+    
+    for chunk in chunks:
+        first_word = chunk.text.split()[0]
+        expected = next(i for i, page in enumerate(pages, 1) if first_word in page)
+        assert chunk.metadata.page == chunk.metadata.start_page == expected
+
+
+def test_chunk_page_span():
+    """Test that chunks crossing a page break record the pages they cover."""
+    processor = DocumentProcessor(chunk_size=1000, chunk_overlap=200)
+    
+    text, page_map = join_pages(["First page.", "Second page.", "Third page."])
+    chunks = processor.chunk_text(text, "doc.pdf", page_map)
+    
+    assert len(chunks) == 1
+    assert chunks[0].metadata.start_page == 1
+    assert chunks[0].metadata.end_page == 3
+
+
+@pytest.mark.skipif(not os.getenv("RUN_BENCHMARKS"), reason="RUN_BENCHMARKS not set")
+def test_benchmark_page_attribution():
+    """Benchmark page attribution on a 5,000-page document."""
+    processor = DocumentProcessor(chunk_size=1000, chunk_overlap=200)
+    text, page_map = join_pages([f"Page {n} sentence number one. " * 10 for n in range(5000)])
+    
+    start = time.perf_counter()
+    chunks = processor.chunk_text(text, "large.pdf", page_map)
+    bisect_seconds = time.perf_counter() - start
+    
+    # Previous approach: sort the page map and scan it for every chunk
+    start = time.perf_counter()
+    for chunk_start in range(0, len(text), 800):
+        for pos, page_num in sorted(page_map.items(), reverse=True):
+            if chunk_start >= pos:
+                break
+    scan_seconds = time.perf_counter() - start
+    
+    print(
+        f"\n5000 pages, {len(chunks)} chunks: chunk_text {bisect_seconds:.3f}s, "
+        f"page lookups alone with sorted scan {scan_seconds:.3f}s"
+    )
+    assert chunks[-1].metadata.end_page == 5000
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
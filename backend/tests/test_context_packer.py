@@ -0,0 +1,154 @@
+"""Unit tests and benchmark for prompt context packing."""
+
+import logging
+import os
+import sys
+
+import numpy as np
+import pytest
+from backend import context_packer
+from backend.context_packer import (
+    count_tokens,
+    merge_overlapping,
+    remove_near_duplicates,
+    trim_history,
+)
+from backend.document_processor import DocumentProcessor
+from backend.prompts import build_rag_prompt
+
+
+def sentences(count, start=0):
+    """Distinct sentences of a synthetic manual."""
+    return " ".join(
+        f"Step {i} sets valve {i} to position {i * 7 % 13} before pump {i % 5} restarts."
+        for i in range(start, start + count)
+    )
+
+
+def retrieved(source, chunks, pages=None):
+    """Chunks as returned by retrieval."""
+    return [
+        {
+            'chunk_id': chunk.chunk_id,
+            'text': chunk.text,
+            'metadata': {'source': source, 'page': (pages or {}).get(i, -1), 'end_page': (pages or {}).get(i, -1)},
+            'similarity_score': 0.9
+        }
+        for i, chunk in enumerate(chunks)
+    ]
+
+
+def test_merges_overlapping_neighbours():
+    """Test that neighbouring chunks are joined without their shared overlap."""
+    text = sentences(40)
+    chunks = DocumentProcessor(chunk_size=500, chunk_overlap=100).chunk_text(text, "manual.pdf")
+    results = retrieved("manual.pdf", chunks[:3], pages={0: 1, 1: 1, 2: 2})
+    
+    # Retrieved out of order, with another document in between
+    other = {'chunk_id': "x", 'text': "Unrelated text.", 'metadata': {'source': "other.pdf"}}
+    blocks = merge_overlapping([results[2], other, results[0], results[1]])
+    
+    assert [block['source_numbers'] for block in blocks] == [[1, 3, 4], [2]]
+    merged = blocks[0]
+    assert merged['text'] in text
+    assert merged['text'].startswith(chunks[0].text) and merged['text'].endswith(chunks[2].text)
+    assert (merged['metadata']['page'], merged['metadata']['end_page']) == (1, 2)
+
+
+def test_chunks_of_other_sources_are_not_merged():
+    """Test that identical text from two sources is deduplicated, not merged."""
+    passage = sentences(10)
+    chunks = [
+        {'text': passage, 'metadata': {'source': "a.pdf"}},
+        {'text': "Pump 3 is rated for 40 bar.", 'metadata': {'source': "b.pdf"}},
+        {'text': passage.replace("Step 9", "Step nine"), 'metadata': {'source': "c.pdf"}},
+    ]
+    blocks = merge_overlapping(chunks)
+    assert len(blocks) == 3
+    
+    deduplicated = remove_near_duplicates(blocks, threshold=0.8)
+    assert [block['source_numbers'] for block in deduplicated] == [[1, 3], [2]]
+    assert remove_near_duplicates(blocks, threshold=1.1) == blocks
+
+
+def test_history_keeps_newest_turns():
+    """Test that the oldest history is dropped first and a user turn leads."""
+    history = []
+    for i in range(10):
+        history.append({'role': "user", 'content': f"Question {i}? " + "detail " * 40})
+        history.append({'role': "assistant", 'content': f"Answer {i}. " + "detail " * 40})
+    per_message = count_tokens(history[0]['content']) + 4
+    
+    kept = trim_history(history, 3 * per_message + 10)
+    assert [message['content'][:10] for message in kept] == ["Question 9", "Answer 9. "]
+    assert trim_history(history, 0) == []
+    
+    # A single message over budget is truncated rather than dropped
+    long_question = [{'role': "user", 'content': "word " * 2000}]
+    kept = trim_history(long_question, 200)
+    assert count_tokens(kept[0]['content']) + 4 <= 200
+
+
+def test_prompt_fits_budget():
+    """Test that the assembled prompt stays within the token budget."""
+    chunks = [
+        {'text': sentences(30, start=i * 30), 'metadata': {'source': f"doc{i}.pdf", 'page': i + 1}}
+        for i in range(10)
+    ]
+    history = [{'role': "user", 'content': sentences(20)}, {'role': "assistant", 'content': sentences(20, 20)}] * 5
+    
+    messages = build_rag_prompt("What does step 3 do?", chunks, history, max_prompt_tokens=2000)
+    total = sum(count_tokens(message['content']) + 4 for message in messages)
+    
+    assert total <= 2000
+    assert "[Source 1: doc0.pdf, Page 1]" in messages[0]['content']
+    assert messages[-1] == {'role': "user", 'content': "What does step 3 do?"}
+    
+    unlimited = build_rag_prompt("What does step 3 do?", chunks, history, max_prompt_tokens=0)
+    assert len(unlimited) == len(history) + 2
+    assert "[Source 10: doc9.pdf, Page 10]" in unlimited[0]['content']
+
+
+def test_tokenizer_falls_back_with_warning(monkeypatch, caplog):
+    """Test that a missing tiktoken is logged once and counts ~4 characters per token."""
+    monkeypatch.setitem(sys.modules, "tiktoken", None)
+    context_packer._encoding.cache_clear()
+    try:
+        with caplog.at_level(logging.WARNING, logger=context_packer.__name__):
+            context_packer.load_tokenizer()
+            assert count_tokens("x" * 400) == 101
+        assert [record.message for record in caplog.records] == [
+            "tiktoken is not installed; estimating ~4 characters per prompt token"
+        ]
+    finally:
+        context_packer._encoding.cache_clear()
+
+
+@pytest.mark.skipif(not os.getenv("RUN_BENCHMARKS"), reason="set RUN_BENCHMARKS=1 to run")
+def test_benchmark_prompt_tokens():
+    """Compare prompt tokens with and without packing for neighbouring top-k chunks."""
+    rng = np.random.default_rng(0)
+    processor = DocumentProcessor(chunk_size=1000, chunk_overlap=200)
+    documents = {f"doc{d}.pdf": processor.chunk_text(sentences(300, start=d * 300), f"doc{d}.pdf") for d in range(3)}
+    history = [{'role': "user", 'content': sentences(15)}, {'role': "assistant", 'content': sentences(15, 15)}] * 10
+    
+    packed_tokens, raw_tokens, chunk_tokens, merged_tokens = [], [], [], []
+    for _ in range(100):
+        # Top-8 results cluster around a few passages, as they do for real queries
+        results = []
+        for source in rng.choice(list(documents), size=3):
+            chunks = documents[source]
+            start = int(rng.integers(0, len(chunks) - 3))
+            results.extend(retrieved(source, chunks[start:start + 3]))
+        results = results[:8]
+        
+        chunk_tokens.append(sum(count_tokens(result['text']) for result in results))
+        merged_tokens.append(sum(count_tokens(block['text']) for block in remove_near_duplicates(merge_overlapping(results))))
+        raw = build_rag_prompt("How is the pump restarted?", results, history, max_prompt_tokens=0)
+        packed = build_rag_prompt("How is the pump restarted?", results, history)
+        raw_tokens.append(sum(count_tokens(message['content']) for message in raw))
+        packed_tokens.append(sum(count_tokens(message['content']) for message in packed))
+    
+    print(f"\ncontext tokens: {np.mean(chunk_tokens):.0f} as retrieved, {np.mean(merged_tokens):.0f} merged")
+    print(f"prompt tokens: {np.mean(raw_tokens):.0f} unbudgeted, {np.mean(packed_tokens):.0f} within budget")
+    assert np.mean(packed_tokens) < np.mean(raw_tokens)
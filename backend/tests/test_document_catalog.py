@@ -0,0 +1,168 @@
+"""Unit tests and benchmark for the document catalog."""
+
+import os
+import sqlite3
+import time
+
+import numpy as np
+import pytest
+from backend.document_catalog import DocumentCatalog, document_id
+from backend.models import ChunkMetadata, DocumentChunk
+from backend.numpy_store import NumpyVectorStore
+
+
+def entries(source, texts, prefix=None, created_at="2026-01-01T00:00:00"):
+    """Catalog entries for texts of one source."""
+    prefix = prefix or source
+    return [
+        (f"{prefix}-{i}", text, {"source": source, "created_at": created_at})
+        for i, text in enumerate(texts)
+    ]
+
+
+def test_totals_follow_upserts_and_deletes(tmp_path):
+    """Test chunk counts, byte sizes and removal of emptied documents."""
+    catalog = DocumentCatalog(str(tmp_path / "catalog.sqlite3"))
+    catalog.add(entries("a.txt", ["one", "two", "héllo"]))
+    catalog.add(entries("b.txt", ["three"]))
+    
+    a, b = catalog.list_documents()
+    assert (a['filename'], a['num_chunks'], a['num_bytes']) == ("a.txt", 3, 3 + 3 + 6)
+    assert a['document_id'] == document_id("a.txt")
+    assert a['created_at'] == "2026-01-01T00:00:00"
+    
+    # Overwriting a chunk replaces its size instead of counting it twice
+    catalog.add([("a.txt-0", "longer text", {"source": "a.txt"})])
+    assert catalog.list_documents(limit=1)[0]['num_bytes'] == 11 + 3 + 6
+    
+    assert catalog.remove(["a.txt-1", "missing"]) == 1
+    assert catalog.remove_source("b.txt") == 1
+    assert catalog.get_stats() == {'total_documents': 1, 'total_chunks': 2, 'total_bytes': 17}
+    
+    catalog.remove(["a.txt-0", "a.txt-2"])
+    assert catalog.list_documents() == []
+
+
+def test_content_hash_tracks_content(tmp_path):
+    """Test that the content hash ignores insertion order and follows edits."""
+    first = DocumentCatalog(str(tmp_path / "first.sqlite3"))
+    second = DocumentCatalog(str(tmp_path / "second.sqlite3"))
+    chunks = entries("a.txt", ["one", "two", "three"])
+    
+    first.add(chunks)
+    for chunk in reversed(chunks):
+        second.add([chunk])
+    original = first.list_documents()[0]['content_hash']
+    assert second.list_documents()[0]['content_hash'] == original
+    
+    first.add([("a.txt-1", "edited", {"source": "a.txt"})])
+    assert first.list_documents()[0]['content_hash'] != original
+    first.add([("a.txt-1", "two", {"source": "a.txt"})])
+    assert first.list_documents()[0]['content_hash'] == original
+
+
+def test_pagination(tmp_path):
+    """Test that documents are listed page by page in filename order."""
+    catalog = DocumentCatalog(str(tmp_path / "catalog.sqlite3"))
+    for i in range(25):
+        catalog.add(entries(f"doc{i:02d}.txt", ["text"]))
+    
+    pages = [catalog.list_documents(offset, 10) for offset in (0, 10, 20)]
+    assert [len(page) for page in pages] == [10, 10, 5]
+    assert [doc['filename'] for page in pages for doc in page] == [f"doc{i:02d}.txt" for i in range(25)]
+
+
+def test_store_rebuilds_stale_catalog(tmp_path):
+    """Test that a store rebuilds a catalog that disagrees with its chunks on open."""
+    chunks = [
+        DocumentChunk(chunk_id=f"c{i}", text=f"Chunk {i}", metadata=ChunkMetadata(source=f"{i % 2}.txt", chunk_id=f"c{i}"))
+        for i in range(6)
+    ]
+    store = NumpyVectorStore(str(tmp_path), keyword_index=False)
+    store.upsert_chunks(chunks, np.eye(6).tolist())
+    store.delete_chunks(["c0"])
+    assert [(doc['filename'], doc['num_chunks']) for doc in store.get_documents()] == [("0.txt", 2), ("1.txt", 3)]
+    
+    # A crash between the store write and the catalog update leaves them out of step
+    store.catalog.remove(["c1", "c2"])
+    reopened = NumpyVectorStore(str(tmp_path), keyword_index=False)
+    info = reopened.get_collection_info()
+    assert (info['total_documents'], info['total_chunks']) == (2, 5)
+    assert [doc['num_chunks'] for doc in reopened.get_documents(offset=1)] == [3]
+    
+    reopened.clear_collection()
+    assert reopened.get_documents() == []
+
+
+def test_match_chunk_ids(tmp_path):
+    """Test resolving filters on source, pages and creation time to chunk ids."""
+    catalog = DocumentCatalog(str(tmp_path / "catalog.sqlite3"))
+    catalog.add(
+        (f"c{i}", "text", {"source": f"{i % 2}.txt", "start_page": i, "end_page": i + 1,
+                           "created_at": f"2026-01-0{i}T00:00:00"})
+        for i in range(1, 7)
+    )
+    
+    assert catalog.match_chunk_ids({"source": "1.txt"}, 10) == ["c1", "c3", "c5"]
+    where = {"$and": [{"end_page": {"$gte": 3}}, {"start_page": {"$lte": 4}}, {"source": {"$in": ["0.txt"]}}]}
+    assert sorted(catalog.match_chunk_ids(where, 10)) == ["c2", "c4"]
+    assert catalog.match_chunk_ids({"created_at": {"$gt": "2026-01-05T00:00:00"}}, 10) == ["c6"]
+    
+    # Too many matches, or metadata the catalog does not hold
+    assert catalog.match_chunk_ids({"source": "1.txt"}, 2) is None
+    assert catalog.match_chunk_ids({"page": 3}, 10) is None
+
+
+def test_store_upgrades_catalog_without_filter_columns(tmp_path):
+    """Test that a catalog from before the filter columns is migrated and refilled."""
+    chunks = [
+        DocumentChunk(chunk_id=f"c{i}", text=f"Chunk {i}", metadata=ChunkMetadata(
+            source="a.txt", chunk_id=f"c{i}", page=i + 1, start_page=i + 1, end_page=i + 1
+        ))
+        for i in range(3)
+    ]
+    store = NumpyVectorStore(str(tmp_path), keyword_index=False)
+    store.upsert_chunks(chunks, np.eye(3).tolist())
+    store.close()
+    
+    # Recreate the old chunk table, as written before pages and times were kept
+    conn = sqlite3.connect(str(tmp_path / NumpyVectorStore.CATALOG_FILE))
+    with conn:
+        conn.execute("DROP TABLE chunks")
+        conn.execute(
+            "CREATE TABLE chunks (chunk_id TEXT PRIMARY KEY, source TEXT NOT NULL, "
+            "num_bytes INTEGER NOT NULL, digest INTEGER NOT NULL)"
+        )
+    conn.close()
+    
+    reopened = NumpyVectorStore(str(tmp_path), keyword_index=False)
+    assert not reopened.catalog.needs_rebuild
+    assert reopened.catalog.match_chunk_ids({"start_page": {"$gte": 2}}, 10) == ["c1", "c2"]
+    assert reopened.get_collection_info()['total_chunks'] == 3
+
+
+@pytest.mark.skipif(not os.getenv("RUN_BENCHMARKS"), reason="set RUN_BENCHMARKS=1 to run")
+def test_benchmark_list_documents(tmp_path):
+    """Benchmark catalog maintenance and listing for 1M chunks in 10k documents."""
+    catalog = DocumentCatalog(str(tmp_path / "catalog.sqlite3"))
+    num_chunks, chunks_per_doc = 1_000_000, 100
+    
+    start = time.perf_counter()
+    for batch_start in range(0, num_chunks, 1000):
+        catalog.add(
+            (f"c{i}", f"chunk text {i}", {"source": f"doc{i // chunks_per_doc}.pdf"})
+            for i in range(batch_start, batch_start + 1000)
+        )
+    add_seconds = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    page = catalog.list_documents(offset=5000, limit=100)
+    page_ms = (time.perf_counter() - start) * 1000
+    
+    start = time.perf_counter()
+    stats = catalog.get_stats()
+    stats_ms = (time.perf_counter() - start) * 1000
+    
+    print(f"\ncatalogued {num_chunks} chunks in {add_seconds:.1f}s")
+    print(f"page of 100 documents: {page_ms:.2f} ms, totals: {stats_ms:.2f} ms")
+    assert len(page) == 100 and stats['total_chunks'] == num_chunks
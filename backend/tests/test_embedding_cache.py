@@ -0,0 +1,122 @@
+"""Unit tests for the embedding cache."""
+
+import asyncio
+import threading
+
+import pytest
+from backend.embedding_cache import EmbeddingCache
+from backend.batch_embedder import BatchEmbedder
+from backend.embeddings import EmbeddingService
+
+
+class FakeEmbeddingService(EmbeddingService):
+    """Embedding service that records upstream calls instead of hitting the API."""
+    
+    def __init__(self, cache):
+        self.model = "test-model"
+        self.dimension = 3
+        self.cache = cache
+        self.calls = []
+        self.batch_embedder = BatchEmbedder(self._create_embeddings, max_concurrency=1)
+    
+    def _create_embeddings(self, inputs):
+        self.calls.append(list(inputs))
+        return [[float(len(text)), 1.0, 0.5] for text in inputs]
+    
+    async def _arequest_embedding(self, text):
+        return self._create_embeddings([text])[0]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Create a cache backed by a temporary SQLite file."""
+    cache = EmbeddingCache(path=str(tmp_path / "cache.sqlite3"), max_memory_bytes=1024)
+    yield cache
+    cache.close()
+
+
+def test_round_trip(cache):
+    """Test that stored embeddings are returned as float32 values."""
+    cache.put("model", "hello", [0.25, 0.5, 0.75])
+    
+    assert cache.get("model", "hello") == [0.25, 0.5, 0.75]
+    assert cache.get("other-model", "hello") is None
+
+
+def test_persistence(tmp_path):
+    """Test that embeddings survive reopening the cache file."""
+    path = str(tmp_path / "cache.sqlite3")
+    cache = EmbeddingCache(path=path)
+    cache.put("model", "persisted", [1.0, 2.0])
+    cache.close()
+    
+    reopened = EmbeddingCache(path=path)
+    assert reopened.get("model", "persisted") == [1.0, 2.0]
+    reopened.close()
+
+
+def test_memory_tier_eviction(cache):
+    """Test that the LRU tier stays within its byte budget."""
+    for i in range(20):
+        cache.put("model", f"text {i}", [float(i)] * 32)  # 128 bytes each
+    
+    stats = cache.get_stats()
+    assert stats['memory_bytes'] <= 1024
+    assert stats['memory_entries'] == 8
+    
+    # Evicted entries are still served from disk
+    assert cache.get("model", "text 0") == [0.0] * 32
+
+
+def test_hit_miss_counters(cache):
+    """Test that lookups update the hit and miss counters."""
+    cache.put("model", "a", [1.0])
+    cache.get_many("model", ["a", "b", "c"])
+    
+    stats = cache.get_stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 2
+
+
+def test_batch_embeds_only_misses(cache):
+    """Test that batch calls send only cache misses upstream, in input order."""
+    service = FakeEmbeddingService(cache)
+    
+    first = service.generate_embeddings_batch(["one", "three", "one"], batch_size=2)
+    assert service.calls == [["one", "three"]]
+    assert first[0] == first[2]
+    
+    second = service.generate_embeddings_batch(["five", "one", "three"], batch_size=2)
+    assert service.calls[-1] == ["five"]
+    assert second[1:] == first[:2]
+    
+    # Re-embedding an unchanged corpus makes no API calls
+    service.calls.clear()
+    service.generate_embeddings_batch(["one", "three", "five"])
+    assert service.calls == []
+
+
+def test_async_lookup_runs_off_event_loop(cache):
+    """Test that the async path touches the SQLite cache only from worker threads."""
+    service = FakeEmbeddingService(cache)
+    threads = []
+    get, put = cache.get, cache.put
+    cache.get = lambda *args: threads.append(threading.get_ident()) or get(*args)
+    cache.put = lambda *args: threads.append(threading.get_ident()) or put(*args)
+    
+    async def embed_twice():
+        loop_thread = threading.get_ident()
+        first = await service.agenerate_embedding("pump")
+        second = await service.agenerate_embedding("pump")
+        return loop_thread, first, second
+    
+    loop_thread, first, second = asyncio.run(embed_twice())
+    
+    assert first == second == [4.0, 1.0, 0.5]
+    assert service.calls == [["pump"]]
+    assert len(threads) == 3
+    assert loop_thread not in threads
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,129 @@
+"""Unit tests and benchmark for the IVF-PQ index."""
+
+import os
+import threading
+
+import numpy as np
+import pytest
+from backend.ann_benchmark import build_store, measure, synthetic_corpus
+from backend.numpy_store import settings
+from backend.numpy_store import NumpyVectorStore
+from backend.tests.conftest import make_chunks
+
+
+@pytest.fixture
+def small_index(monkeypatch):
+    """Index settings sized for a few thousand 32-dimensional vectors."""
+    monkeypatch.setattr(settings, "ivf_nlist", 16)
+    monkeypatch.setattr(settings, "ivf_nprobe", 4)
+    monkeypatch.setattr(settings, "pq_num_subvectors", 8)
+    monkeypatch.setattr(settings, "ivf_rerank_candidates", 50)
+    monkeypatch.setattr(settings, "ivf_train_min_rows", 1000)
+
+
+def test_recall_and_exact_scores(tmp_path, small_index):
+    """Test recall@10 of the trained index and that scores are exact cosines."""
+    vectors = synthetic_corpus(2000, 32, num_clusters=20)
+    queries = synthetic_corpus(20, 32, num_clusters=20, seed=1)
+    store = build_store(str(tmp_path), vectors, batch_size=500)
+    assert store.get_collection_info()['index_trained']
+    
+    points = {p['nprobe']: p for p in measure(store, vectors, queries, k=10, nprobes=[2, 16])}
+    
+    assert points['exact']['recall_at_k'] == 1.0
+    assert points[16]['recall_at_k'] >= 0.95
+    assert points[2]['recall_at_k'] <= points[16]['recall_at_k']
+    
+    result = store.similarity_search(queries[0].tolist(), top_k=1)[0]
+    row = int(result['chunk_id'])
+    expected = vectors[row] @ queries[0] / np.linalg.norm(vectors[row]) / np.linalg.norm(queries[0])
+    assert result['similarity_score'] == pytest.approx(expected, abs=1e-4)
+
+
+def test_incremental_add_and_reopen(tmp_path, small_index):
+    """Test that vectors added after training are searchable, also after a reopen."""
+    vectors = synthetic_corpus(1500, 32, num_clusters=20)
+    store = NumpyVectorStore(str(tmp_path), index="ivfpq")
+    store.upsert_chunks(make_chunks(1200, 0), vectors[:1200])
+    assert store.ann_index.trained
+    
+    store.upsert_chunks(make_chunks(300, 1200, source="late.txt"), vectors[1200:])
+    store.delete_chunks(["1300"])
+    
+    reopened = NumpyVectorStore(str(tmp_path), index="ivfpq")
+    for row in (1250, 1499):
+        top = reopened.similarity_search(vectors[row].tolist(), top_k=1)
+        assert top[0]['chunk_id'] == str(row)
+    assert reopened.similarity_search(vectors[1300].tolist(), top_k=1)[0]['chunk_id'] != "1300"
+    
+    filtered = reopened.similarity_search(vectors[0].tolist(), top_k=5, filter_metadata={"source": "late.txt"})
+    assert all(r['metadata']['source'] == "late.txt" for r in filtered)
+
+
+def test_training_does_not_block_writes(tmp_path, small_index):
+    """Test that writes made while the index trains proceed and are indexed after the swap."""
+    vectors = synthetic_corpus(1300, 32, num_clusters=20)
+    store = NumpyVectorStore(str(tmp_path), index="ivfpq")
+    store.upsert_chunks(make_chunks(900, 0), vectors[:900])
+    fit = store.ann_index.fit
+    
+    def fit_while_writing(*args, **kwargs):
+        # Would deadlock if training held the store lock
+        def write():
+            store.upsert_chunks(make_chunks(300, 1000, source="late.txt"), vectors[1000:])
+            store.delete_chunks(["5"])
+            store.similarity_search(vectors[0].tolist(), top_k=1)
+        
+        writer = threading.Thread(target=write)
+        writer.start()
+        writer.join(timeout=10)
+        assert not writer.is_alive()
+        return fit(*args, **kwargs)
+    
+    store.ann_index.fit = fit_while_writing
+    store.upsert_chunks(make_chunks(100, 900), vectors[900:1000])
+    
+    assert store.ann_index.trained
+    assert int(np.count_nonzero(store.ann_index._assignments >= 0)) == 1299
+    for row in (950, 1250):
+        assert store.similarity_search(vectors[row].tolist(), top_k=1)[0]['chunk_id'] == str(row)
+    assert store.similarity_search(vectors[5].tolist(), top_k=1)[0]['chunk_id'] != "5"
+
+
+def test_code_log_is_compacted(tmp_path, small_index):
+    """Test that re-encoded and deleted rows do not grow the code log without bound."""
+    vectors = synthetic_corpus(1200, 32, num_clusters=20)
+    store = NumpyVectorStore(str(tmp_path), index="ivfpq")
+    store.upsert_chunks(make_chunks(1200, 0), vectors)
+    record_size = store.ann_index._record_dtype().itemsize
+    codes_path = tmp_path / store.ann_index.CODES_FILE
+    
+    for _ in range(5):
+        store.upsert_chunks(make_chunks(600, 0), vectors[:600])
+    store.delete_chunks([str(i) for i in range(600, 1000)])
+    
+    assert os.path.getsize(codes_path) <= 2 * 1200 * record_size
+    reopened = NumpyVectorStore(str(tmp_path), index="ivfpq")
+    assert int(np.count_nonzero(reopened.ann_index._assignments >= 0)) == 800
+    assert reopened.similarity_search(vectors[700].tolist(), top_k=1)[0]['chunk_id'] != "700"
+    assert reopened.similarity_search(vectors[100].tolist(), top_k=1)[0]['chunk_id'] == "100"
+
+
+@pytest.mark.skipif(not os.getenv("RUN_BENCHMARKS"), reason="RUN_BENCHMARKS not set")
+def test_benchmark_recall_vs_latency(tmp_path, monkeypatch):
+    """Report recall@10 and latency for several nprobe values on 50k vectors."""
+    monkeypatch.setattr(settings, "ivf_nlist", 256)
+    monkeypatch.setattr(settings, "pq_num_subvectors", 32)
+    monkeypatch.setattr(settings, "ivf_train_sample", 20000)
+    
+    vectors = synthetic_corpus(50000, 256)
+    queries = synthetic_corpus(100, 256, seed=1)
+    store = build_store(str(tmp_path), vectors)
+    
+    print()
+    for point in measure(store, vectors, queries, k=10, nprobes=[1, 4, 16, 64]):
+        print(f"nprobe={point['nprobe']}: recall@10={point['recall_at_k']:.3f}, {point['latency_ms']:.2f} ms/query")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
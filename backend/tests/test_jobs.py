@@ -0,0 +1,316 @@
+"""Unit tests for the background ingestion job queue."""
+
+import json
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from backend.jobs import (
+    INGEST_STAGE_SECONDS,
+    INGEST_THROUGHPUT,
+    INGESTED_CHUNKS,
+    QueueFullError,
+    VectorStore,
+    iter_batches,
+    prefetch,
+)
+from backend.tests.conftest import make_queue
+
+
+class FakeEmbeddingService:
+    """Embedding service returning constant vectors."""
+    
+    def __init__(self):
+        self.texts = []
+    
+    def generate_embeddings_batch(self, texts):
+        self.texts.extend(texts)
+        return [[0.1, 0.2, 0.3] for _ in texts]
+
+
+class FakeVectorStore:
+    """Vector store that records upserted chunks."""
+    
+    def __init__(self):
+        self.chunks = []
+    
+    def upsert_chunks(self, chunks, embeddings):
+        ids = {chunk.chunk_id for chunk in chunks}
+        self.chunks = [chunk for chunk in self.chunks if chunk.chunk_id not in ids] + list(chunks)
+    
+    def get_document_chunk_ids(self, filename):
+        return [chunk.chunk_id for chunk in self.chunks if chunk.metadata.source == filename]
+    
+    def delete_chunks(self, chunk_ids):
+        self.chunks = [chunk for chunk in self.chunks if chunk.chunk_id not in chunk_ids]
+        return len(chunk_ids)
+
+
+class FailingEmbeddingService:
+    """Embedding service that fails after a number of batches."""
+    
+    def __init__(self, fail_after):
+        self.fail_after = fail_after
+        self.calls = 0
+    
+    def generate_embeddings_batch(self, texts):
+        self.calls += 1
+        if self.calls > self.fail_after:
+            raise RuntimeError("embedding backend unavailable")
+        return [[0.1, 0.2, 0.3] for _ in texts]
+
+
+def submit_text(job_queue, filename, text):
+    """Store an upload and queue it."""
+    job_id = job_queue.new_job_id()
+    job_queue.upload_path(job_id, filename).write_text(text, encoding="utf-8")
+    return job_queue.submit(job_id, filename)
+
+
+def wait_for(job_queue, job_id, timeout=5.0):
+    """Poll until a job finishes."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = job_queue.get(job_id)
+        if job.status in ("completed", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+def test_job_completes(tmp_path):
+    """Test that a queued upload is indexed in the background."""
+    store = FakeVectorStore()
+    job_queue = make_queue(tmp_path, store, FakeEmbeddingService())
+    job_queue.start()
+    ingested = INGESTED_CHUNKS.value()
+    jobs_timed = INGEST_THROUGHPUT.count()
+    
+    job = submit_text(job_queue, "notes.txt", "This is a test sentence. " * 20)
+    assert job.status == "queued"
+    
+    job = wait_for(job_queue, job.job_id)
+    job_queue.stop()
+    
+    assert job.status == "completed"
+    assert job.num_chunks == job.chunks_stored == len(store.chunks) > 0
+    assert INGESTED_CHUNKS.value() - ingested == job.chunks_stored
+    assert INGEST_THROUGHPUT.count() == jobs_timed + 1
+    assert INGEST_STAGE_SECONDS.count(stage="embed") > 0
+    assert job.result.filename == "notes.txt"
+    assert all(chunk.metadata.source == "notes.txt" for chunk in store.chunks)
+    assert not job_queue.upload_path(job.job_id, "notes.txt").exists()
+
+
+def test_job_failure_is_reported(tmp_path):
+    """Test that extraction errors are recorded on the job."""
+    job_queue = make_queue(tmp_path, FakeVectorStore(), FakeEmbeddingService())
+    job_queue.start()
+    
+    job = wait_for(job_queue, submit_text(job_queue, "empty.txt", "   ").job_id)
+    job_queue.stop()
+    
+    assert job.status == "failed"
+    assert "too short" in job.error
+
+
+def test_queued_jobs_survive_restart(tmp_path):
+    """Test that jobs queued before a restart are processed afterwards."""
+    job = submit_text(make_queue(tmp_path, FakeVectorStore(), FakeEmbeddingService()), "later.txt", "Content that waits for a restart.")
+    
+    restarted = make_queue(tmp_path, FakeVectorStore(), FakeEmbeddingService())
+    restarted.start()
+    job = wait_for(restarted, job.job_id)
+    restarted.stop()
+    
+    assert job.status == "completed"
+
+
+def test_queue_depth_limit(tmp_path):
+    """Test that submissions beyond the queue depth are rejected."""
+    job_queue = make_queue(tmp_path, FakeVectorStore(), FakeEmbeddingService(), max_queue_depth=1)
+    job = submit_text(job_queue, "a.txt", "First document content.")
+    
+    with pytest.raises(QueueFullError):
+        submit_text(job_queue, "b.txt", "Second document content.")
+    assert job_queue.queued_count() == 1
+    
+    job_queue.start()
+    wait_for(job_queue, job.job_id)
+    job_queue.stop()
+    assert job_queue.queued_count() == 0
+
+
+def test_job_streams_in_batches(tmp_path):
+    """Test that a long document is embedded and stored batch by batch."""
+    store = FakeVectorStore()
+    job_queue = make_queue(tmp_path, store, FakeEmbeddingService(), ingest_batch_size=3, ingest_prefetch_batches=1)
+    job_queue.start()
+    
+    job = wait_for(job_queue, submit_text(job_queue, "long.txt", "This is a test sentence. " * 60).job_id)
+    job_queue.stop()
+    
+    assert job.status == "completed"
+    assert job.num_chunks == job.chunks_embedded == job.chunks_stored == len(store.chunks) > 3
+    assert job.result.num_chunks == len(store.chunks)
+
+
+def test_failed_job_discards_stored_chunks(tmp_path):
+    """Test that chunks stored before a failure are removed again."""
+    store = FakeVectorStore()
+    job_queue = make_queue(
+        tmp_path, store, FailingEmbeddingService(fail_after=1), ingest_batch_size=2
+    )
+    job_queue.start()
+    
+    job = wait_for(job_queue, submit_text(job_queue, "long.txt", "This is a test sentence. " * 60).job_id)
+    job_queue.stop()
+    
+    assert job.status == "failed"
+    assert job.error == "Error processing document during embed: RuntimeError: embedding backend unavailable"
+    assert store.chunks == []
+
+
+def test_finished_jobs_are_pruned(tmp_path):
+    """Test that finished jobs beyond the newest N or past the retention period are forgotten."""
+    job_queue = make_queue(tmp_path, FakeVectorStore(), FakeEmbeddingService(), max_finished_jobs=2)
+    job_queue.start()
+    jobs = [
+        wait_for(job_queue, submit_text(job_queue, f"doc{i}.txt", f"Document {i} content.").job_id)
+        for i in range(3)
+    ]
+    job_queue.stop()
+    
+    assert job_queue.get(jobs[0].job_id) is None
+    assert sorted(path.stem for path in (tmp_path / "jobs").glob("*.json")) == sorted(job.job_id for job in jobs[1:])
+    
+    # Age one job past the retention period; it is dropped when the queue restarts
+    path = tmp_path / "jobs" / f"{jobs[1].job_id}.json"
+    state = json.loads(path.read_text(encoding="utf-8"))
+    state["updated_at"] = (datetime.now() - timedelta(hours=2)).isoformat()
+    path.write_text(json.dumps(state), encoding="utf-8")
+    
+    restarted = make_queue(tmp_path, FakeVectorStore(), FakeEmbeddingService(), job_retention_seconds=3600)
+    restarted.start()
+    restarted.stop()
+    
+    assert restarted.get(jobs[1].job_id) is None
+    assert not path.exists()
+    assert restarted.get(jobs[2].job_id).status == "completed"
+
+
+def test_close_unsubscribes_manifest(tmp_path):
+    """Test that a closed queue's manifest no longer follows store changes."""
+    job_queue = make_queue(tmp_path, FakeVectorStore(), FakeEmbeddingService())
+    listener = job_queue.manifest.invalidate_sources
+    assert listener in VectorStore._change_listeners[None]
+    
+    job_queue.close()
+    assert listener not in VectorStore._change_listeners[None]
+
+
+def test_reupload_embeds_only_changed_chunks(tmp_path):
+    """Test that re-uploads are diffed against the manifest."""
+    store = FakeVectorStore()
+    embedding_service = FakeEmbeddingService()
+    job_queue = make_queue(tmp_path, store, embedding_service)
+    job_queue.start()
+    
+    sentences = [f"Sentence number {i} of the original document. " for i in range(20)]
+    first = wait_for(job_queue, submit_text(job_queue, "doc.txt", "".join(sentences)).job_id)
+    original_ids = {chunk.chunk_id for chunk in store.chunks}
+    
+    # Identical file: nothing is extracted, embedded or stored
+    embedding_service.texts.clear()
+    same = wait_for(job_queue, submit_text(job_queue, "doc.txt", "".join(sentences)).job_id)
+    assert same.status == "completed"
+    assert same.chunks_skipped == first.num_chunks and same.chunks_stored == 0
+    assert embedding_service.texts == []
+    
+    # Editing the end of the document re-embeds only the chunks around the edit
+    sentences[-1] = "A rewritten final sentence. "
+    edited = wait_for(job_queue, submit_text(job_queue, "doc.txt", "".join(sentences)).job_id)
+    job_queue.stop()
+    
+    assert edited.status == "completed"
+    assert 0 < edited.chunks_stored < edited.num_chunks
+    assert edited.chunks_skipped == edited.num_chunks - edited.chunks_stored
+    assert len(embedding_service.texts) == edited.chunks_stored
+    assert edited.chunks_deleted == len(original_ids - {chunk.chunk_id for chunk in store.chunks}) > 0
+    assert len(store.chunks) == edited.num_chunks
+
+
+def test_reupload_without_manifest_replaces_old_chunks(tmp_path):
+    """Test that chunks stored before the manifest existed are replaced, not duplicated."""
+    store = FakeVectorStore()
+    job_queue = make_queue(tmp_path, store, FakeEmbeddingService())
+    job_queue.start()
+    
+    wait_for(job_queue, submit_text(job_queue, "doc.txt", "Old content of the document. " * 10).job_id)
+    job_queue.manifest.invalidate_sources(None)
+    job = wait_for(job_queue, submit_text(job_queue, "doc.txt", "New content of the document. " * 10).job_id)
+    job_queue.stop()
+    
+    assert job.status == "completed"
+    assert job.chunks_deleted > 0
+    assert store.chunks and not any("Old" in chunk.text for chunk in store.chunks)
+
+
+def test_prefetch_preserves_order_and_errors():
+    """Test that prefetched items arrive in order and producer errors propagate."""
+    assert list(prefetch(iter_batches(range(7), 3), depth=1)) == [[0, 1, 2], [3, 4, 5], [6]]
+    
+    def broken():
+        yield 1
+        raise ValueError("bad page")
+    
+    items = prefetch(broken(), depth=2)
+    assert next(items) == 1
+    with pytest.raises(ValueError, match="bad page"):
+        next(items)
+
+
+
+def test_in_memory_upload_is_indexed_without_disk(tmp_path):
+    """Test that an upload handed over as bytes is indexed like a stored one."""
+    store = FakeVectorStore()
+    job_queue = make_queue(tmp_path, store, FakeEmbeddingService())
+    job_queue.start()
+    
+    job_id = job_queue.new_job_id()
+    job = job_queue.submit(job_id, "notes.txt", data=("This is a test sentence. " * 20).encode("utf-8"))
+    assert list((tmp_path / "uploads").iterdir()) == []
+    job = wait_for(job_queue, job.job_id)
+    job_queue.stop()
+    
+    assert job.status == "completed"
+    assert job.num_chunks == len(store.chunks) > 0
+    assert all(chunk.metadata.source == "notes.txt" for chunk in store.chunks)
+
+
+def test_startup_sweeps_orphaned_uploads(tmp_path):
+    """Test that uploads no queued job will read are removed on start."""
+    queued = submit_text(make_queue(tmp_path, FakeVectorStore(), FakeEmbeddingService()), "queued.txt", "Content that waits for a restart.")
+    uploads = tmp_path / "uploads"
+    orphan = uploads / "0b6ad0c4-6e1f-4c8e-9d7c-2a8f1c7e5b10.pdf"
+    orphan.write_bytes(b"%PDF")
+    orphan_parts = uploads / "5f0e9a52-3d43-4b8e-a0e4-9c1b2d3e4f50"
+    orphan_parts.mkdir()
+    (orphan_parts / "0000_a.txt").write_text("partial", encoding="utf-8")
+    unrelated = uploads / "README.txt"
+    unrelated.write_text("not an upload", encoding="utf-8")
+    (tmp_path / "jobs" / "partial.json.tmp").write_text("{", encoding="utf-8")
+    
+    restarted = make_queue(tmp_path, FakeVectorStore(), FakeEmbeddingService())
+    restarted.start()
+    job = wait_for(restarted, queued.job_id)
+    restarted.stop()
+    
+    assert job.status == "completed"
+    assert not orphan.exists() and not orphan_parts.exists()
+    assert unrelated.exists()
+    assert list((tmp_path / "jobs").glob("*.tmp")) == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
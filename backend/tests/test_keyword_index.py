@@ -0,0 +1,243 @@
+"""Unit tests and benchmark for the BM25 keyword index and hybrid retrieval."""
+
+import os
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from backend.keyword_index import BM25Index, decode_postings, encode_postings, tokenize
+from backend.models import ChunkMetadata, DocumentChunk
+from backend.numpy_store import NumpyVectorStore
+from backend.rag_engine import RAGEngine, reciprocal_rank_fusion
+
+
+CORPUS = [
+    ("c0", "The pump reports error E-4032 when the inlet valve is blocked.", "pump.txt"),
+    ("c1", "Replace filter part FLT-220B every six months.", "pump.txt"),
+    ("c2", "The inlet valve controls water flow into the pump.", "manual.txt"),
+    ("c3", "Error codes are listed in the appendix of the manual.", "manual.txt"),
+]
+
+
+def entries(corpus=CORPUS):
+    """Index entries for (chunk id, text, source) tuples."""
+    return [(chunk_id, text, {"source": source}) for chunk_id, text, source in corpus]
+
+
+class NoEmbeddingService:
+    """Embedding service that must not be called."""
+    
+    def generate_embedding(self, text):
+        raise AssertionError("sparse retrieval must not embed the query")
+
+
+class FakeLLMClient:
+    """OpenAI-style client returning a fixed answer."""
+    
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+    
+    def _create(self, **kwargs):
+        message = SimpleNamespace(content="answer")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def test_tokenize_keeps_codes_and_parts():
+    """Test that compound identifiers are indexed whole and by part."""
+    tokens = tokenize("Error E-4032 on v2.1, see FLT_220b.")
+    assert "e-4032" in tokens and "e" in tokens and "4032" in tokens
+    assert "v2.1" in tokens and "flt_220b" in tokens
+    assert "see" in tokens and "see." not in tokens
+
+
+def test_postings_round_trip():
+    """Test varint postings encoding, including multi-byte gaps."""
+    doc_ids = [0, 1, 127, 128, 300, 70000, 2 ** 33]
+    tfs = [1, 200, 3, 1, 40000, 2, 5]
+    decoded_ids, decoded_tfs = decode_postings(encode_postings(doc_ids, tfs))
+    assert decoded_ids.tolist() == doc_ids
+    assert decoded_tfs.tolist() == tfs
+    assert len(encode_postings(range(100, 200), [1] * 100)) == 200
+
+
+def test_exact_code_ranks_first(tmp_path):
+    """Test that an exact error code outranks documents sharing common words."""
+    index = BM25Index(str(tmp_path / "bm25.sqlite3"))
+    index.add(entries())
+    
+    results = index.search("what does error E-4032 mean", top_k=3)
+    assert results[0]['chunk_id'] == "c0"
+    assert 'similarity_score' not in results[0]
+    assert all(a['bm25_score'] >= b['bm25_score'] for a, b in zip(results, results[1:]))
+    # Coverage is absolute: a query whose rarest term matches nothing scores lower
+    assert 0 < results[0]['keyword_coverage'] < 1
+    assert index.search("E-4032", top_k=1)[0]['keyword_coverage'] == pytest.approx(1.0)
+    assert index.search("E-4032 zyzzyva", top_k=1)[0]['keyword_coverage'] < 0.9
+    
+    assert index.search("FLT-220B", top_k=1)[0]['chunk_id'] == "c1"
+    assert index.search("nothing matches this", top_k=3) == []
+
+
+def test_filter_delete_and_reopen(tmp_path):
+    """Test metadata filters, deletions, re-indexing and persistence."""
+    path = str(tmp_path / "bm25.sqlite3")
+    index = BM25Index(path)
+    index.add(entries())
+    
+    filtered = index.search("inlet valve", top_k=5, where={"source": "manual.txt"})
+    assert [r['chunk_id'] for r in filtered] == ["c2"]
+    
+    assert index.remove_source("pump.txt") == 2
+    assert index.remove(["c3", "missing"]) == 1
+    index.add([("c2", "Completely new text about gaskets.", {"source": "manual.txt"})])
+    assert index.count() == 1
+    
+    reopened = BM25Index(path)
+    assert reopened.count() == 1
+    assert reopened.search("inlet valve error", top_k=5) == []
+    assert reopened.search("gaskets", top_k=5)[0]['chunk_id'] == "c2"
+    
+    # Doc ids are not reused, so stale postings never match new chunks
+    reopened.add([("c9", "pump error", {"source": "x.txt"})])
+    assert [r['chunk_id'] for r in reopened.search("E-4032 pump", top_k=5)] == ["c9"]
+
+
+def test_posting_blocks_are_merged(tmp_path):
+    """Test that writes merge many small blocks into one and reads never write."""
+    index = BM25Index(str(tmp_path / "bm25.sqlite3"))
+    for i in range(BM25Index.MAX_BLOCKS + 4):
+        index.add([(f"c{i}", f"shared term number{i}", {"source": "a.txt"})])
+    index.remove(["c0", "c1"])
+    
+    # "shared" and "term" were merged by the write that passed MAX_BLOCKS,
+    # then gained one block per later write; each "number" term has one
+    blocks = index.get_stats()['posting_blocks']
+    assert blocks == (BM25Index.MAX_BLOCKS + 4) + 2 * 4
+    assert len(index.search("shared", top_k=100)) == BM25Index.MAX_BLOCKS + 2
+    assert index.get_stats()['posting_blocks'] == blocks
+
+
+def test_store_keeps_keyword_index_in_step(tmp_path):
+    """Test that upserts, deletes and reopening maintain the keyword index."""
+    chunks = [
+        DocumentChunk(chunk_id=chunk_id, text=text, metadata=ChunkMetadata(source=source, chunk_id=chunk_id))
+        for chunk_id, text, source in CORPUS
+    ]
+    vectors = np.random.default_rng(0).normal(size=(len(chunks), 8)).tolist()
+    
+    store = NumpyVectorStore(str(tmp_path), keyword_index=True)
+    store.upsert_chunks(chunks, vectors)
+    assert store.keyword_search("E-4032", top_k=1)[0]['chunk_id'] == "c0"
+    
+    store.delete_document("pump.txt")
+    assert store.keyword_search("E-4032", top_k=1) == []
+    
+    # A store opened without the index file backfills it from stored chunks
+    os.remove(tmp_path / NumpyVectorStore.KEYWORD_FILE)
+    reopened = NumpyVectorStore(str(tmp_path), keyword_index=True)
+    assert reopened.keyword_index.count() == 2
+    assert reopened.keyword_search("appendix", top_k=1)[0]['chunk_id'] == "c3"
+    
+    # So does one whose index fell out of step with the store
+    reopened.keyword_index.remove(["c3"])
+    reopened.close()
+    rebuilt = NumpyVectorStore(str(tmp_path), keyword_index=True)
+    assert rebuilt.keyword_index.count() == 2
+    assert rebuilt.keyword_search("appendix", top_k=1)[0]['chunk_id'] == "c3"
+
+
+def test_reciprocal_rank_fusion():
+    """Test that RRF favours chunks ranked well by both retrievers."""
+    dense = [{'chunk_id': "a", 'similarity_score': 0.9}, {'chunk_id': "b", 'similarity_score': 0.8}]
+    sparse = [{'chunk_id': "b", 'bm25_score': 7.5}, {'chunk_id': "c", 'bm25_score': 2.0}]
+    
+    fused = reciprocal_rank_fusion([dense, sparse], k=60)
+    assert [r['chunk_id'] for r in fused] == ["b", "a", "c"]
+    assert fused[0]['similarity_score'] == 0.8  # dense entry wins for shared chunks
+    assert fused[0]['bm25_score'] == 7.5  # and gains the keyword score
+    assert fused[0]['fusion_score'] == pytest.approx(1 / 62 + 1 / 61)
+
+
+def test_sparse_mode_skips_embedding(tmp_path):
+    """Test that sparse retrieval answers without embedding the query."""
+    store = NumpyVectorStore(str(tmp_path), keyword_index=True)
+    chunks = [
+        DocumentChunk(chunk_id=chunk_id, text=text, metadata=ChunkMetadata(source=source, chunk_id=chunk_id))
+        for chunk_id, text, source in CORPUS
+    ]
+    store.upsert_chunks(chunks, np.eye(len(chunks), 8).tolist())
+    
+    engine = RAGEngine(
+        embedding_service=NoEmbeddingService(),
+        vector_store=store,
+        llm_client=FakeLLMClient(),
+        async_llm_client=FakeLLMClient(),
+        retrieval_mode="sparse"
+    )
+    response = engine.query("FLT-220B", top_k=2)
+    engine.close()
+    
+    assert response.answer == "answer"
+    assert response.sources[0].chunk_id == "c1"
+    # No cosine without an embedding; confidence comes from keyword coverage
+    assert response.sources[0].similarity_score is None
+    assert response.sources[0].bm25_score > 0
+    assert 0 < response.confidence <= 1
+
+
+def test_hybrid_scores_keyword_only_hits_by_cosine(tmp_path):
+    """Test that chunks found only by BM25 get their cosine similarity after fusion."""
+    store = NumpyVectorStore(str(tmp_path), keyword_index=True)
+    chunks = [
+        DocumentChunk(chunk_id=chunk_id, text=text, metadata=ChunkMetadata(source=source, chunk_id=chunk_id))
+        for chunk_id, text, source in CORPUS
+    ]
+    store.upsert_chunks(chunks, np.eye(len(chunks), 8).tolist())
+    engine = RAGEngine(
+        embedding_service=NoEmbeddingService(),
+        vector_store=store,
+        llm_client=FakeLLMClient(),
+        async_llm_client=FakeLLMClient(),
+        retrieval_mode="hybrid"
+    )
+    
+    query_embedding = [0.6, 0.8, 0, 0, 0, 0, 0, 0]
+    dense = store.similarity_search(query_embedding, top_k=1)
+    sparse = store.keyword_search("appendix", top_k=2)
+    fused = engine._fuse(dense, sparse, query_embedding, top_k=4)
+    engine.close()
+    
+    scores = {result['chunk_id']: result['similarity_score'] for result in fused}
+    assert scores == pytest.approx({"c1": 0.8, "c3": 0.0})
+    assert [result.get('bm25_score') for result in fused][1] > 0
+
+
+@pytest.mark.skipif(not os.getenv("RUN_BENCHMARKS"), reason="set RUN_BENCHMARKS=1 to run")
+def test_benchmark_keyword_search(tmp_path):
+    """Benchmark BM25 indexing and query latency on a synthetic corpus."""
+    rng = np.random.default_rng(0)
+    vocabulary = np.array([f"word{i}" for i in range(20000)])
+    num_chunks = 100000
+    
+    index = BM25Index(str(tmp_path / "bm25.sqlite3"))
+    start = time.perf_counter()
+    for batch_start in range(0, num_chunks, 1000):
+        index.add(
+            (f"c{i}", " ".join(vocabulary[rng.integers(len(vocabulary), size=150)]) + f" ERR-{i}", {"source": f"doc{i // 100}.txt"})
+            for i in range(batch_start, batch_start + 1000)
+        )
+    index_seconds = time.perf_counter() - start
+    
+    queries = [f"{rng.choice(vocabulary)} {rng.choice(vocabulary)} ERR-{rng.integers(num_chunks)}" for _ in range(50)]
+    timings = []
+    for _ in range(2):  # the first pass also warms SQLite's page cache
+        start = time.perf_counter()
+        for query in queries:
+            results = index.search(query, top_k=5)
+        timings.append((time.perf_counter() - start) / len(queries) * 1000)
+    
+    print(f"\nindexed {num_chunks} chunks in {index_seconds:.1f}s")
+    print(f"first query {timings[0]:.2f} ms, warm {timings[1]:.2f} ms")
+    print(index.get_stats())
+    assert results
@@ -0,0 +1,195 @@
+"""Tests for retrieval filters: translation, evaluation and filtered search."""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from backend import vector_store as vector_store_module
+from backend.main import app
+from backend.metadata_filter import build_where, filter_conditions, matches_filter
+from backend.models import RetrievalFilter
+from backend.numpy_store import NumpyVectorStore
+from backend.rag_engine import RAGEngine
+from backend.services import ServiceContainer
+from backend.tests.conftest import make_chunks
+
+
+def make_filter_chunks(count):
+    """Chunks spread over 4 sources, pages 1-10 and 10 upload days."""
+    return make_chunks(
+        count,
+        prefix="c",
+        source=lambda i: f"doc{i % 4}.pdf",
+        page=lambda i: i % 10 + 1,
+        start_page=lambda i: i % 10 + 1,
+        end_page=lambda i: i % 10 + 2,
+        created_at=lambda i: datetime(2026, 1, 1 + i % 10, 12)
+    )
+
+
+def test_build_where():
+    """Test translation of request filters into a where filter."""
+    assert build_where(None) is None
+    assert build_where(RetrievalFilter()) is None
+    assert build_where(RetrievalFilter(sources=["a.pdf"])) == {"source": {"$in": ["a.pdf"]}}
+    
+    where = build_where(RetrievalFilter(page_to=4, created_after=datetime(2026, 1, 2)))
+    assert filter_conditions(where) == [
+        ("end_page", "$gte", 1),
+        ("start_page", "$lte", 4),
+        ("created_at", "$gte", "2026-01-02T00:00:00")
+    ]
+    
+    # Times with an offset are compared in local time, like stored ones
+    aware = datetime(2026, 1, 2, tzinfo=timezone.utc)
+    where = build_where(RetrievalFilter(created_before=aware))
+    assert where == {"created_at": {"$lte": aware.astimezone().replace(tzinfo=None).isoformat()}}
+    
+    with pytest.raises(ValueError):
+        build_where(RetrievalFilter(page_from=5, page_to=4))
+    with pytest.raises(ValueError):
+        build_where(RetrievalFilter(created_after=datetime(2026, 2, 1), created_before=datetime(2026, 1, 1)))
+
+
+def test_matches_filter():
+    """Test equality, membership and range conditions on metadata."""
+    metadata = {"source": "a.pdf", "start_page": 3, "end_page": 4, "created_at": "2026-01-05T12:00:00"}
+    
+    assert matches_filter(metadata, None)
+    assert matches_filter(metadata, {"source": "a.pdf", "start_page": {"$gte": 3, "$lt": 4}})
+    assert matches_filter(metadata, {"$and": [{"source": {"$in": ["a.pdf", "b.pdf"]}}, {"end_page": {"$gt": 3}}]})
+    assert matches_filter(metadata, {"created_at": {"$lte": "2026-01-05T12:00:00.5"}})
+    assert not matches_filter(metadata, {"created_at": {"$gt": "2026-01-05T12:00:00"}})
+    assert not matches_filter(metadata, {"page": {"$gte": 1}})
+    assert not matches_filter(metadata, {"start_page": {"$gte": "3"}})
+    with pytest.raises(ValueError):
+        matches_filter(metadata, {"source": {"$ne": "a.pdf"}})
+
+
+def brute_force(chunks, vectors, query, where, k):
+    """Reference: exact cosine ranking of the chunks passing the filter."""
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = normalized @ (query / np.linalg.norm(query))
+    allowed = [
+        i for i, chunk in enumerate(chunks)
+        if matches_filter(
+            {
+                'source': chunk.metadata.source,
+                'start_page': chunk.metadata.start_page,
+                'end_page': chunk.metadata.end_page,
+                'created_at': chunk.metadata.created_at.isoformat()
+            },
+            where
+        )
+    ]
+    return [chunks[i].chunk_id for i in sorted(allowed, key=lambda i: -scores[i])[:k]]
+
+
+FILTERS = [
+    {"source": "doc1.pdf"},
+    {"$and": [{"end_page": {"$gte": 3}}, {"start_page": {"$lte": 4}}]},
+    {"$and": [{"source": {"$in": ["doc0.pdf", "doc2.pdf"]}}, {"created_at": {"$gte": "2026-01-03T00:00:00"}}]},
+    {"created_at": {"$gte": "2026-01-04T12:00:00", "$lte": "2026-01-04T12:00:00"}},
+]
+
+
+@pytest.mark.parametrize("where", FILTERS)
+def test_numpy_filtered_search_is_exact(tmp_path, where):
+    """Test that filtered searches return the best matching chunks, top_k of them."""
+    rng = np.random.default_rng(0)
+    chunks = make_filter_chunks(400)
+    vectors = rng.normal(size=(400, 16)).astype(np.float32)
+    store = NumpyVectorStore(str(tmp_path), keyword_index=False)
+    store.upsert_chunks(chunks, vectors.tolist())
+    
+    query = rng.normal(size=16)
+    results = store.similarity_search(query.tolist(), top_k=10, filter_metadata=where)
+    assert [r['chunk_id'] for r in results] == brute_force(chunks, vectors, query, where, 10)
+    assert all(matches_filter(r['metadata'], where) for r in results)
+
+
+def test_chroma_prefilter_matches_native_search(tmp_path, monkeypatch):
+    """Test that the catalog pre-filter and Chroma's where agree, with top_k hits."""
+    pytest.importorskip("chromadb")
+    settings = vector_store_module.settings
+    monkeypatch.setattr(settings, "chroma_persist_directory", str(tmp_path / "chroma"))
+    monkeypatch.setattr(settings, "document_catalog_directory", str(tmp_path / "catalog"))
+    rng = np.random.default_rng(1)
+    chunks = make_filter_chunks(400)
+    vectors = rng.normal(size=(400, 16)).astype(np.float32)
+    store = vector_store_module.ChromaVectorStore(keyword_index=False)
+    store.upsert_chunks(chunks, vectors.tolist())
+    
+    query = rng.normal(size=16)
+    for where in FILTERS:
+        expected = brute_force(chunks, vectors, query, where, 10)
+        monkeypatch.setattr(settings, "filter_exact_max_candidates", 1000)
+        exact = store.similarity_search(query.tolist(), top_k=10, filter_metadata=where)
+        assert [r['chunk_id'] for r in exact] == expected
+        
+        # Too many matches for the exact path: Chroma's filtered search
+        monkeypatch.setattr(settings, "filter_exact_max_candidates", 0)
+        native = store.similarity_search(query.tolist(), top_k=10, filter_metadata=where)
+        assert len(native) == 10
+        assert all(matches_filter(r['metadata'], where) for r in native)
+    store.close()
+
+
+class FakeEmbeddingService:
+    """Embeds every query as the same vector."""
+    
+    def generate_embeddings_batch(self, texts, batch_size=None):
+        return [[1.0, 0.0] for _ in texts]
+
+
+class FakeJobQueue:
+    """Job queue with no-op lifecycle."""
+    
+    def start(self):
+        pass
+    
+    def stop(self):
+        pass
+
+
+def test_chat_filters_restrict_sources(tmp_path):
+    """Test that request filters reach retrieval and invalid ones are rejected."""
+    store = NumpyVectorStore(str(tmp_path), keyword_index=False)
+    store.upsert_chunks(make_filter_chunks(40), np.random.default_rng(2).normal(size=(40, 2)).tolist())
+    engine = RAGEngine(
+        embedding_service=FakeEmbeddingService(),
+        vector_store=store,
+        llm_client=object(),
+        async_llm_client=object(),
+        retrieval_mode="dense"
+    )
+    app.state.services = ServiceContainer(
+        vector_store=store,
+        embedding_service=engine.embedding_service,
+        rag_engine=engine,
+        doc_processor=object(),
+        job_queue=FakeJobQueue()
+    )
+    
+    def retrieve(filters):
+        return client.post(
+            "/api/chat/batch",
+            json={"queries": ["question"], "top_k": 5, "retrieval_only": True, "filters": filters}
+        )
+    
+    with TestClient(app) as client:
+        filters = {"sources": ["doc1.pdf", "doc3.pdf"], "page_from": 4, "page_to": 6}
+        sources = json.loads(retrieve(filters).text)['sources']
+        assert len(sources) == 5
+        assert {source['source'] for source in sources} <= {"doc1.pdf", "doc3.pdf"}
+        assert all(source['page'] <= 6 and source['end_page'] >= 4 for source in sources)
+        
+        day = (datetime(2026, 1, 3, 12) + timedelta(minutes=1)).isoformat()
+        assert json.loads(retrieve({"created_after": day, "created_before": day}).text)['sources'] == []
+        
+        assert retrieve({"page_from": 5, "page_to": 2}).status_code == 400
+        assert retrieve({"page_from": 0}).status_code == 422
+        assert retrieve({"sources": []}).status_code == 422
+    engine.close()
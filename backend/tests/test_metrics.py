@@ -0,0 +1,137 @@
+"""Tests for Prometheus metrics and Server-Timing instrumentation."""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from tenacity import retry, stop_after_attempt, wait_none
+from backend.main import app
+from backend.metrics import RETRIES, Counter, Histogram, count_retry
+from backend.models import ChunkMetadata, DocumentChunk
+from backend.numpy_store import NumpyVectorStore
+from backend.rag_engine import RAGEngine
+from backend.services import ServiceContainer
+
+
+class FakeEmbeddingService:
+    """Embeds every query as the first unit vector."""
+    
+    cache = None
+    
+    async def agenerate_embedding(self, text):
+        return [1.0, 0.0]
+
+
+class FakeAsyncLLMClient:
+    """Async OpenAI-style client returning a fixed answer."""
+    
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+    
+    async def _create(self, **kwargs):
+        message = SimpleNamespace(content="The pump restarts after the valve opens.")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class FakeJobQueue:
+    """Job queue with no-op lifecycle."""
+    
+    def start(self):
+        pass
+    
+    def stop(self):
+        pass
+
+
+@pytest.fixture
+def client(tmp_path):
+    """Test client over a small dense index and a fake LLM."""
+    store = NumpyVectorStore(str(tmp_path), keyword_index=False)
+    store.upsert_chunks(
+        [
+            DocumentChunk(chunk_id=f"c{i}", text=f"Fact {i}", metadata=ChunkMetadata(source="facts.txt", chunk_id=f"c{i}"))
+            for i in range(2)
+        ],
+        np.eye(2).tolist()
+    )
+    engine = RAGEngine(
+        embedding_service=FakeEmbeddingService(),
+        vector_store=store,
+        llm_client=object(),
+        async_llm_client=FakeAsyncLLMClient(),
+        retrieval_mode="dense"
+    )
+    app.state.services = ServiceContainer(
+        vector_store=store,
+        embedding_service=engine.embedding_service,
+        rag_engine=engine,
+        doc_processor=object(),
+        job_queue=FakeJobQueue()
+    )
+    with TestClient(app) as client:
+        yield client
+
+
+def sample(text, name):
+    """Value of one sample in a Prometheus exposition, 0 if absent."""
+    for line in text.splitlines():
+        if line.startswith(name + " "):
+            return float(line.split()[-1])
+    return 0.0
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Test the text exposition of a labelled histogram and counter."""
+    histogram = Histogram("test_seconds", "Test latency", ["stage"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value, stage="embed")
+    counter = Counter("test_total", "Test count", ["kind"])
+    counter.inc(3, kind='a"b')
+    
+    lines = histogram.render().splitlines()
+    assert lines[:2] == ["# HELP test_seconds Test latency", "# TYPE test_seconds histogram"]
+    assert lines[2:] == [
+        'test_seconds_bucket{stage="embed",le="0.1"} 1',
+        'test_seconds_bucket{stage="embed",le="1.0"} 3',
+        'test_seconds_bucket{stage="embed",le="+Inf"} 4',
+        'test_seconds_sum{stage="embed"} 4.25',
+        'test_seconds_count{stage="embed"} 4',
+    ]
+    assert counter.render().splitlines()[-1] == 'test_total{kind="a\\"b"} 3'
+
+
+def test_retries_are_counted():
+    """Test the tenacity hook used by the retrying upstream calls."""
+    attempts = []
+    
+    @retry(stop=stop_after_attempt(3), wait=wait_none(), before_sleep=count_retry("test"))
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ConnectionError("reset")
+        return "ok"
+    
+    before = RETRIES.value(operation="test")
+    assert flaky() == "ok"
+    assert RETRIES.value(operation="test") - before == 2
+
+
+def test_chat_reports_server_timing(client):
+    """Test the per-request Server-Timing header and the /metrics exposition."""
+    llm_calls = 'rag_stage_duration_seconds_count{stage="llm"}'
+    before = sample(client.get("/metrics").text, llm_calls)
+    
+    response = client.post("/api/chat/", json={"query": "When does the pump restart?"})
+    assert response.status_code == 200
+    
+    stages = [entry.split(";")[0] for entry in response.headers["Server-Timing"].split(", ")]
+    assert stages == ["embed", "retrieve", "prompt", "llm"]
+    assert all(float(entry.split("dur=")[1]) >= 0 for entry in response.headers["Server-Timing"].split(", "))
+    
+    metrics = client.get("/metrics")
+    assert sample(metrics.text, llm_calls) == before + 1
+    assert metrics.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'rag_stage_duration_seconds_count{stage="retrieve"}' in metrics.text
+    assert 'rag_llm_tokens_total{kind="completion"}' in metrics.text
+    assert 'rag_cache_misses_total{cache="answer"}' in metrics.text
@@ -0,0 +1,204 @@
+"""Unit tests and benchmark for the NumPy vector store backend."""
+
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+from backend.numpy_store import NumpyVectorStore, settings
+from backend.tests.conftest import make_chunks
+
+
+def brute_force(matrix, query, k):
+    """Reference cosine top-k over rows of ``matrix``."""
+    normalized = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+    scores = normalized @ (query / np.linalg.norm(query))
+    return list(np.argsort(-scores)[:k])
+
+
+def test_exact_top_k(tmp_path):
+    """Test that results match a brute-force cosine ranking."""
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(300, 16)).astype(np.float32)
+    store = NumpyVectorStore(str(tmp_path))
+    store.MIN_CAPACITY = 64  # exercise matrix growth
+    store.upsert_chunks(make_chunks(300, prefix="c"), vectors.tolist())
+    
+    query = rng.normal(size=16)
+    results = store.similarity_search(query.tolist(), top_k=5)
+    
+    assert [r['chunk_id'] for r in results] == [f"c{i}" for i in brute_force(vectors, query, 5)]
+    assert results[0]['similarity_score'] >= results[-1]['similarity_score']
+    assert results[0]['metadata']['source'] == "doc.txt"
+
+
+def test_batch_search_and_source_filter(tmp_path):
+    """Test batched queries and where filters on source."""
+    rng = np.random.default_rng(1)
+    store = NumpyVectorStore(str(tmp_path))
+    store.upsert_chunks(make_chunks(20, source="a.txt", prefix="a", page=lambda i: i + 1), rng.normal(size=(20, 8)).tolist())
+    store.upsert_chunks(make_chunks(20, source="b.txt", prefix="b", page=lambda i: i + 1), rng.normal(size=(20, 8)).tolist())
+    
+    queries = rng.normal(size=(3, 8)).tolist()
+    batched = store.similarity_search_batch(queries, top_k=4, filter_metadata={"source": "b.txt"})
+    
+    assert len(batched) == 3
+    for query, results in zip(queries, batched):
+        assert all(r['metadata']['source'] == "b.txt" for r in results)
+        single = store.similarity_search(query, top_k=4, filter_metadata={"source": "b.txt"})
+        assert [r['chunk_id'] for r in results] == [r['chunk_id'] for r in single]
+        assert [r['similarity_score'] for r in results] == pytest.approx([r['similarity_score'] for r in single])
+    
+    both = store.similarity_search(queries[0], top_k=40, filter_metadata={"source": {"$in": ["a.txt", "b.txt"]}})
+    assert len(both) == 40
+    assert store.similarity_search(queries[0], filter_metadata={"page": 3}, top_k=5)[0]['metadata']['page'] == 3
+
+
+def test_batch_search_in_blocks_matches_brute_force(tmp_path):
+    """Test that query groups and row blocks give the same top-k as a full scan."""
+    rng = np.random.default_rng(2)
+    vectors = rng.normal(size=(250, 8)).astype(np.float32)
+    store = NumpyVectorStore(str(tmp_path))
+    store.SEARCH_BLOCK_ROWS = 32
+    store.SEARCH_BLOCK_QUERIES = 7
+    store.upsert_chunks(make_chunks(250, prefix="c", page=lambda i: i + 1), vectors.tolist())
+    
+    queries = rng.normal(size=(30, 8))
+    batched = store.similarity_search_batch(queries.tolist(), top_k=6)
+    filtered = store.similarity_search_batch(queries.tolist(), top_k=6, filter_metadata={"page": {"$in": list(range(1, 100))}})
+    
+    assert len(batched) == 30
+    for query, results, subset in zip(queries, batched, filtered):
+        assert [r['chunk_id'] for r in results] == [f"c{i}" for i in brute_force(vectors, query, 6)]
+        assert [r['chunk_id'] for r in subset] == [f"c{i}" for i in brute_force(vectors[:99], query, 6)]
+
+
+def test_upsert_delete_and_reopen(tmp_path):
+    """Test that updates and deletions persist across a reopen."""
+    store = NumpyVectorStore(str(tmp_path), dtype="float16")
+    store.upsert_chunks(make_chunks(3, source="a.txt", prefix="a"), [[1, 0], [0, 1], [1, 1]])
+    store.upsert_chunks(make_chunks(2, source="b.txt", prefix="b"), [[1, 0], [0, 1]])
+    
+    # Overwrite a0 in place and delete a document
+    updated = make_chunks(1, source="a.txt", prefix="a")
+    store.upsert_chunks(updated, [[0, 1]])
+    assert store.delete_document("b.txt") == 2
+    assert store.delete_chunks(["a2", "missing"]) == 1
+    
+    reopened = NumpyVectorStore(str(tmp_path), dtype="float16")
+    
+    assert [(doc['filename'], doc['num_chunks']) for doc in reopened.get_documents()] == [("a.txt", 2)]
+    assert reopened.get_document_chunk_ids("a.txt") == ["a0", "a1"]
+    assert reopened.get_collection_info()['total_chunks'] == 2
+    top = reopened.similarity_search([0, 1], top_k=5)
+    assert [r['chunk_id'] for r in top] == ["a0", "a1"]
+    assert top[0]['similarity_score'] == pytest.approx(1.0, abs=1e-3)
+    
+    reopened.clear_collection()
+    assert reopened.similarity_search([0, 1]) == []
+
+
+def test_searches_run_concurrently(tmp_path):
+    """Test that a search does not wait for another search to finish."""
+    store = NumpyVectorStore(str(tmp_path), keyword_index=False)
+    store.upsert_chunks(make_chunks(3, prefix="c"), [[1, 0], [0, 1], [1, 1]])
+    inside, release = threading.Event(), threading.Event()
+    exact_top_k = store._exact_top_k
+    
+    def slow_top_k(queries, *args, **kwargs):
+        if queries[0][0] > 0.9:
+            inside.set()
+            release.wait(10)
+        return exact_top_k(queries, *args, **kwargs)
+    
+    store._exact_top_k = slow_top_k
+    slow = threading.Thread(target=store.similarity_search, args=([1, 0],))
+    slow.start()
+    assert inside.wait(10)
+    try:
+        assert store.similarity_search([0, 1], top_k=1)[0]['chunk_id'] == "c1"
+    finally:
+        release.set()
+        slow.join()
+
+
+def test_compact_drops_dead_rows(tmp_path, monkeypatch):
+    """Test that compaction renumbers live rows and rewrites the sidecar, also on open."""
+    rng = np.random.default_rng(3)
+    vectors = rng.normal(size=(40, 8)).astype(np.float32)
+    store = NumpyVectorStore(str(tmp_path), quantization="int8", keyword_index=False)
+    store.upsert_chunks(make_chunks(40, prefix="c"), vectors.tolist())
+    store.upsert_chunks(make_chunks(5, prefix="c"), vectors[:5].tolist())
+    store.delete_chunks([f"c{i}" for i in range(10, 30)])
+    before = store.similarity_search_batch(vectors[:5].tolist(), top_k=3)
+    
+    assert store.compact() == 20
+    assert store.compact() == 0
+    assert store.get_collection_info()['allocated_rows'] == 20
+    assert sum(1 for _ in open(tmp_path / store.ROWS_FILE)) == 20
+    assert store.similarity_search_batch(vectors[:5].tolist(), top_k=3) == before
+    
+    # Past the threshold the store compacts itself when opened
+    store.delete_chunks(["c0", "c1"])
+    monkeypatch.setattr(settings, "numpy_store_compact_fraction", 0.05)
+    reopened = NumpyVectorStore(str(tmp_path), quantization="int8", keyword_index=False)
+    assert reopened.get_collection_info()['allocated_rows'] == 18
+    assert reopened.quantized.covers(18, 8)
+    top = reopened.similarity_search(vectors[35].tolist(), top_k=1)[0]
+    assert top['chunk_id'] == "c35"
+    assert top['similarity_score'] == pytest.approx(1.0, abs=1e-5)
+
+
+def rss_bytes():
+    """Current resident set size of this process (Linux)."""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+@pytest.mark.skipif(not os.getenv("RUN_BENCHMARKS"), reason="RUN_BENCHMARKS not set")
+def test_benchmark_numpy_vs_chroma(tmp_path, monkeypatch):
+    """Compare query latency and resident memory of the NumPy and Chroma backends."""
+    from backend import vector_store as vector_store_module
+    
+    rng = np.random.default_rng(0)
+    num_chunks, dimension, num_queries = 20000, 1024, 100
+    vectors = rng.normal(size=(num_chunks, dimension)).astype(np.float32)
+    queries = rng.normal(size=(num_queries, dimension)).tolist()
+    chunks = make_chunks(num_chunks, prefix="c")
+    
+    # Patch the settings object the store reads, not backend.config's copy
+    settings = vector_store_module.settings
+    monkeypatch.setattr(settings, "chroma_persist_directory", str(tmp_path / "chroma"))
+    monkeypatch.setattr(settings, "document_catalog_directory", str(tmp_path / "catalog"))
+    monkeypatch.setattr(settings, "keyword_index_directory", str(tmp_path / "keyword_index"))
+    backends = {
+        "numpy": lambda: NumpyVectorStore(str(tmp_path / "numpy")),
+        "chroma": vector_store_module.ChromaVectorStore
+    }
+    
+    for name, factory in backends.items():
+        store = factory()
+        for start in range(0, num_chunks, 5000):
+            store.upsert_chunks(chunks[start:start + 5000], vectors[start:start + 5000].tolist())
+        del store
+        
+        before = rss_bytes()
+        start = time.perf_counter()
+        store = factory()
+        store.similarity_search(queries[0], top_k=5)
+        open_seconds = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        for query in queries:
+            store.similarity_search(query, top_k=5)
+        latency_ms = (time.perf_counter() - start) / num_queries * 1000
+        
+        print(
+            f"\n{name}: {num_chunks}x{dimension}, cold open + first query {open_seconds:.2f}s, "
+            f"{latency_ms:.2f} ms/query, RSS +{(rss_bytes() - before) / 2**20:.0f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,143 @@
+"""Unit tests and benchmark for quantized NumPy store search."""
+
+import os
+import threading
+
+import numpy as np
+import pytest
+from backend.ann_benchmark import synthetic_corpus
+from backend.numpy_store import NumpyVectorStore
+from backend.quantization import QuantizedVectors
+from backend.quantize import chunk_from_record, evaluate
+from backend.tests.conftest import make_chunks
+
+
+def fill(store, vectors, batch_size=500):
+    """Upsert vectors in batches so the int8 range is recalibrated as the store grows."""
+    for start in range(0, len(vectors), batch_size):
+        store.upsert_chunks(make_chunks(len(vectors[start:start + batch_size]), start), vectors[start:start + batch_size])
+
+
+@pytest.mark.parametrize("mode, min_recall", [("int8", 0.95), ("binary", 0.8)])
+def test_rescored_recall(tmp_path, mode, min_recall):
+    """Test that quantized search with rescoring finds the exact neighbours."""
+    vectors = synthetic_corpus(3000, 64)
+    store = NumpyVectorStore(str(tmp_path), quantization=mode, keyword_index=False)
+    fill(store, vectors)
+    
+    points = evaluate(store, num_queries=50, k=10)
+    float_point, quantized_point, rescored_point = points
+    assert rescored_point['recall_at_k'] >= min_recall
+    assert rescored_point['recall_at_k'] >= quantized_point['recall_at_k']
+    ratio = 4 if mode == "int8" else 32
+    assert rescored_point['scan_bytes'] * ratio == float_point['scan_bytes']
+    
+    # Returned scores are exact float cosine similarities
+    query = vectors[7] / np.linalg.norm(vectors[7])
+    top = store.similarity_search(query.tolist(), top_k=1)[0]
+    assert top['chunk_id'] == "7"
+    assert top['similarity_score'] == pytest.approx(1.0, abs=1e-5)
+
+
+def test_block_scan_matches_single_block(tmp_path):
+    """Test that the running per-block shortlist finds the same rows as one block."""
+    vectors = synthetic_corpus(1000, 32)
+    store = NumpyVectorStore(str(tmp_path), quantization="int8", keyword_index=False)
+    fill(store, vectors)
+    store.delete_chunks(["5", "500"])
+    queries = vectors[:20].tolist()
+    
+    whole = store.similarity_search_batch(queries, top_k=10)
+    store.quantized.SCAN_BLOCK_ROWS = 64
+    blocked = store.similarity_search_batch(queries, top_k=10)
+    
+    assert [[r['chunk_id'] for r in results] for results in blocked] == [[r['chunk_id'] for r in results] for results in whole]
+    assert all("5" not in [r['chunk_id'] for r in results] for results in blocked)
+
+
+def test_recalibration_does_not_block_writes(tmp_path):
+    """Test that writes made while codes are recalibrated proceed and are encoded after the swap."""
+    vectors = synthetic_corpus(1600, 32)
+    store = NumpyVectorStore(str(tmp_path), quantization="int8", keyword_index=False)
+    fill(store, vectors[:300])
+    fit = store.quantized.fit
+    
+    def fit_while_writing(sample):
+        # Would deadlock if recalibration held the store lock
+        def write():
+            store.upsert_chunks(make_chunks(1000, 600, source="late.txt"), vectors[600:])
+            store.delete_chunks(["7"])
+        
+        writer = threading.Thread(target=write)
+        writer.start()
+        writer.join(timeout=10)
+        assert not writer.is_alive()
+        return fit(sample)
+    
+    store.quantized.fit = fit_while_writing
+    store.upsert_chunks(make_chunks(300, 300), vectors[300:600])
+    
+    assert store.quantized.calibrated_rows == 600
+    assert store.quantized.covers(1600, 32)
+    assert list(tmp_path.glob("*.tmp")) == []
+    for row in (450, 1500):
+        query = vectors[row] / np.linalg.norm(vectors[row])
+        assert store.similarity_search(query.tolist(), top_k=1)[0]['chunk_id'] == str(row)
+    assert store.similarity_search(vectors[7].tolist(), top_k=1)[0]['chunk_id'] != "7"
+
+
+def test_migrate_existing_store_and_reopen(tmp_path):
+    """Test that opening an unquantized store with quantization encodes it."""
+    vectors = synthetic_corpus(1200, 32)
+    plain = NumpyVectorStore(str(tmp_path), keyword_index=False)
+    fill(plain, vectors)
+    plain.delete_chunks(["3"])
+    
+    store = NumpyVectorStore(str(tmp_path), quantization="int8", keyword_index=False)
+    assert store.quantized.covers(store._count, 32)
+    assert store.get_collection_info()['quantization'] == "int8"
+    
+    results = store.similarity_search(vectors[3].tolist(), top_k=5)
+    assert "3" not in [r['chunk_id'] for r in results]
+    
+    # Switching modes re-encodes; reopening with the same mode does not
+    binary = NumpyVectorStore(str(tmp_path), quantization="binary", keyword_index=False)
+    assert binary.quantized.codes.shape[1] == 4
+    mtime = os.path.getmtime(tmp_path / QuantizedVectors.CODES_FILE)
+    reopened = NumpyVectorStore(str(tmp_path), quantization="binary", keyword_index=False)
+    assert os.path.getmtime(tmp_path / QuantizedVectors.CODES_FILE) == mtime
+    assert reopened.similarity_search(vectors[10].tolist(), top_k=1)[0]['chunk_id'] == "10"
+
+
+def test_int8_calibration_follows_growth(tmp_path):
+    """Test that the int8 range is recalibrated as the store doubles."""
+    vectors = synthetic_corpus(2000, 16)
+    store = NumpyVectorStore(str(tmp_path), quantization="int8", keyword_index=False)
+    fill(store, vectors, batch_size=250)
+    assert store.quantized.calibrated_rows == 2000
+    
+    store.clear_collection()
+    assert store.quantized.bound is None
+    assert store.similarity_search(vectors[0].tolist()) == []
+
+
+def test_chunk_from_record():
+    """Test rebuilding chunks from flat stored metadata."""
+    chunk = chunk_from_record("a", "text", {
+        'source': "x.pdf", 'page': 2, 'start_page': 2, 'end_page': -1, 'created_at': "2024-01-02T03:04:05"
+    })
+    assert chunk.metadata.page == 2 and chunk.metadata.end_page is None
+    assert chunk.metadata.created_at.year == 2024
+
+
+@pytest.mark.skipif(not os.getenv("RUN_BENCHMARKS"), reason="set RUN_BENCHMARKS=1 to run")
+@pytest.mark.parametrize("mode", ["int8", "binary"])
+def test_benchmark_quantization(tmp_path, mode):
+    """Report scan memory, recall and latency of quantized search at 100k x 1024."""
+    vectors = synthetic_corpus(100000, 1024)
+    store = NumpyVectorStore(str(tmp_path), quantization=mode, keyword_index=False)
+    fill(store, vectors, batch_size=10000)
+    
+    print(f"\n{mode}:")
+    for point in evaluate(store, num_queries=100, k=10):
+        print(point)
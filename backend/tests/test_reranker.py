@@ -0,0 +1,160 @@
+"""Unit tests and benchmark for the rerank stage."""
+
+import os
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from backend.models import ChunkMetadata, DocumentChunk
+from backend.numpy_store import NumpyVectorStore
+from backend.rag_engine import RAGEngine
+from backend.reranker import LexicalReranker, Reranker, RerankStage, create_reranker
+
+
+def candidates(texts):
+    """Retrieval results in the given order."""
+    return [
+        {'chunk_id': f"c{i}", 'text': text, 'metadata': {}, 'similarity_score': 1 - i / 10}
+        for i, text in enumerate(texts)
+    ]
+
+
+class SlowReranker(Reranker):
+    """Reranker that reverses the order after a delay."""
+    
+    name = "slow"
+    
+    def __init__(self, delay):
+        self.delay = delay
+    
+    def score(self, query, candidates):
+        time.sleep(self.delay)
+        return list(range(len(candidates)))
+
+
+class BrokenReranker(Reranker):
+    """Reranker that always fails."""
+    
+    name = "broken"
+    
+    def score(self, query, candidates):
+        raise RuntimeError("model unavailable")
+
+
+class FixedEmbeddingService:
+    """Embedding service returning one fixed query vector."""
+    
+    def __init__(self, vector):
+        self.vector = vector
+    
+    def generate_embedding(self, text):
+        return self.vector
+
+
+class FakeLLMClient:
+    """OpenAI-style client returning a fixed answer."""
+    
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+    
+    def _create(self, **kwargs):
+        message = SimpleNamespace(content="answer")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def test_lexical_reranker_promotes_query_terms():
+    """Test that a chunk containing the rare query term moves to the top."""
+    results = candidates([
+        "General pump maintenance advice.",
+        "More general advice about pumps.",
+        "Error E-4032 means the inlet valve is blocked.",
+    ])
+    stage = RerankStage(LexicalReranker(weight=0.7), candidates=10, budget_ms=1000, workers=1)
+    
+    reranked = stage.rerank("what does error E-4032 mean", results, top_k=2)
+    stage.close()
+    
+    assert [r['chunk_id'] for r in reranked] == ["c2", "c0"]
+    assert reranked[0]['rerank_score'] > reranked[1]['rerank_score']
+    assert stage.get_stats()['reranked'] == 1
+
+
+def test_over_budget_keeps_retrieval_order():
+    """Test the fallback to retrieval order when scoring exceeds the budget."""
+    results = candidates(["a", "b", "c"])
+    stage = RerankStage(SlowReranker(delay=0.5), candidates=10, budget_ms=20, workers=1)
+    
+    start = time.perf_counter()
+    reranked = stage.rerank("query", results, top_k=2)
+    elapsed = time.perf_counter() - start
+    
+    assert [r['chunk_id'] for r in reranked] == ["c0", "c1"]
+    assert elapsed < 0.3
+    stats = stage.get_stats()
+    assert stats['timeouts'] == 1 and stats['fallback_rate'] == 1.0
+    
+    # Within budget the slow scorer's order is used
+    stage.budget_ms = 2000
+    assert [r['chunk_id'] for r in stage.rerank("query", results, top_k=2)] == ["c2", "c1"]
+    stage.close()
+
+
+def test_scorer_errors_keep_retrieval_order():
+    """Test that a failing reranker does not fail the request."""
+    stage = RerankStage(BrokenReranker(), candidates=10, budget_ms=1000, workers=1)
+    assert [r['chunk_id'] for r in stage.rerank("q", candidates(["a", "b"]), top_k=1)] == ["c0"]
+    assert stage.get_stats()['errors'] == 1
+    stage.close()
+
+
+def test_create_reranker():
+    """Test reranker selection by name."""
+    assert create_reranker("none") is None
+    assert isinstance(create_reranker("lexical"), LexicalReranker)
+    with pytest.raises(ValueError):
+        create_reranker("bogus")
+
+
+def test_engine_overfetches_and_reranks(tmp_path):
+    """Test that the engine reranks a larger candidate set down to top_k."""
+    texts = [f"Generic paragraph number {i} about maintenance." for i in range(9)]
+    texts.append("Part FLT-220B must be replaced every six months.")
+    chunks = [
+        DocumentChunk(chunk_id=f"c{i}", text=text, metadata=ChunkMetadata(source="manual.txt", chunk_id=f"c{i}"))
+        for i, text in enumerate(texts)
+    ]
+    # The matching chunk is the least similar to the query vector
+    vectors = np.linspace(1.0, 0.1, len(chunks))[:, None] * np.eye(2)[0] + np.eye(2)[1]
+    store = NumpyVectorStore(str(tmp_path), keyword_index=False)
+    store.upsert_chunks(chunks, vectors.tolist())
+    
+    engine = RAGEngine(
+        embedding_service=FixedEmbeddingService([1.0, 0.0]),
+        vector_store=store,
+        llm_client=FakeLLMClient(),
+        async_llm_client=FakeLLMClient(),
+        reranker=LexicalReranker(weight=0.8)
+    )
+    response = engine.query("When is FLT-220B replaced?", top_k=2)
+    engine.close()
+    
+    assert response.sources[0].chunk_id == "c9"
+    assert len(response.sources) == 2
+
+
+@pytest.mark.skipif(not os.getenv("RUN_BENCHMARKS"), reason="set RUN_BENCHMARKS=1 to run")
+def test_benchmark_lexical_rerank():
+    """Benchmark lexical reranking of 50 chunk-sized candidates."""
+    rng = np.random.default_rng(0)
+    vocabulary = np.array([f"word{i}" for i in range(5000)])
+    results = candidates([" ".join(rng.choice(vocabulary, size=160)) for _ in range(50)])
+    stage = RerankStage(LexicalReranker(), candidates=50, budget_ms=1000, workers=1)
+    
+    for _ in range(200):
+        stage.rerank(" ".join(rng.choice(vocabulary, size=8)), results, top_k=5)
+    stage.close()
+    
+    stats = stage.get_stats()
+    print(f"\nlexical rerank of 50 candidates: p50 {stats['latency_ms_p50']} ms, p95 {stats['latency_ms_p95']} ms")
+    assert stats['timeouts'] == 0
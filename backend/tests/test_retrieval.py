@@ -2,7 +2,7 @@
 
 import pytest
 from backend.embeddings import EmbeddingService
-from backend.vector_store import VectorStore
+from backend.vector_store import ChromaVectorStore
 from backend.models import DocumentChunk, ChunkMetadata
 from backend.config import settings
 import os
@@ -28,7 +28,7 @@ def vector_store():
     original_collection = settings.chroma_collection_name
     settings.chroma_collection_name = "test_collection"
     
-    store = VectorStore()
+    store = ChromaVectorStore()
     yield store
     
     # Cleanup
@@ -0,0 +1,134 @@
+"""Tests for the shared service container and dependency injection."""
+
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from backend import services as services_module
+from backend.main import app
+from backend.models import ChatResponse
+from backend.services import ServiceContainer
+
+
+class FakeVectorStore:
+    """Vector store holding a fixed document list."""
+    
+    def get_documents(self, offset=0, limit=None):
+        return [{'document_id': 'd1', 'filename': 'manual.pdf', 'num_chunks': 3}][offset:][:limit]
+    
+    def delete_document(self, filename):
+        return 3 if filename == 'manual.pdf' else 0
+
+
+class FakeRAGEngine:
+    """RAG engine returning a canned answer."""
+    
+    answer_cache = None
+    
+    async def aquery(self, query, chat_history=None, top_k=None, include_prompt=False, filter_metadata=None):
+        return ChatResponse(answer=f"echo: {query}", sources=[], confidence=1.0)
+
+
+class FakeJobQueue:
+    """Job queue that records lifecycle calls."""
+    
+    def __init__(self):
+        self.started = False
+        self.stopped = False
+    
+    def start(self):
+        self.started = True
+    
+    def stop(self):
+        self.stopped = True
+
+
+@pytest.fixture
+def services():
+    """Container built entirely from fakes."""
+    return ServiceContainer(
+        vector_store=FakeVectorStore(),
+        embedding_service=object(),
+        rag_engine=FakeRAGEngine(),
+        doc_processor=object(),
+        job_queue=FakeJobQueue()
+    )
+
+
+def test_routes_use_injected_services(services):
+    """Test that both routers are served by the one container."""
+    app.state.services = services
+    
+    with TestClient(app) as client:
+        assert services.job_queue.started
+        
+        documents = client.get("/api/documents/").json()
+        assert [doc['filename'] for doc in documents] == ['manual.pdf']
+        assert client.delete("/api/documents/missing.pdf").status_code == 404
+        
+        response = client.post("/api/chat/", json={"query": "hello"})
+        assert response.json()['answer'] == "echo: hello"
+        assert client.get("/api/chat/cache").json() == {"enabled": False}
+    
+    assert services.job_queue.stopped
+    assert services.http_client.is_closed
+
+
+def test_blocking_store_calls_leave_the_event_loop_free(services):
+    """Test that a delete waiting on the store does not stall other requests."""
+    entered, release = threading.Event(), threading.Event()
+    
+    def blocked_delete(filename):
+        entered.set()
+        release.wait(10)
+        return 3
+    
+    services.vector_store.delete_document = blocked_delete
+    app.state.services = services
+    
+    with TestClient(app) as client:
+        responses = {}
+        delete = threading.Thread(
+            target=lambda: responses.update(delete=client.delete("/api/documents/manual.pdf"))
+        )
+        delete.start()
+        try:
+            assert entered.wait(10)
+            health = threading.Thread(target=lambda: responses.update(health=client.get("/health")))
+            health.start()
+            health.join(5)
+            assert responses["health"].status_code == 200
+        finally:
+            release.set()
+            delete.join()
+        assert responses["delete"].json()["num_chunks_deleted"] == 3
+
+
+def test_default_services_are_shared(tmp_path, monkeypatch):
+    """Test that the RAG engine and job queue share one store and embedding service."""
+    # Patch the settings object the services read, not backend.config's copy
+    settings = services_module.settings
+    monkeypatch.setattr(settings, "jobs_directory", str(tmp_path / "jobs"))
+    monkeypatch.setattr(settings, "upload_directory", str(tmp_path / "uploads"))
+    monkeypatch.setattr(settings, "manifest_path", str(tmp_path / "manifests" / "manifest.sqlite3"))
+    monkeypatch.setattr(settings, "embedding_cache_path", str(tmp_path / "embedding_cache" / "embeddings.sqlite3"))
+    monkeypatch.setattr(settings, "tenants_directory", str(tmp_path / "tenants"))
+    
+    store = FakeVectorStore()
+    container = ServiceContainer(vector_store=store, doc_processor=object())
+    try:
+        assert container.rag_engine.vector_store is store
+        assert container.job_queue.vector_store is store
+        assert container.rag_engine.embedding_service is container.embedding_service
+        assert container.job_queue.embedding_service is container.embedding_service
+        assert container.embedding_service.client._client is container.http_client
+        assert container.rag_engine.llm_client._client is container.http_client
+    finally:
+        asyncio.run(container.aclose())
+    
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["embedding_cache", "jobs", "manifests", "uploads"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,309 @@
+"""Tests for tenant-scoped stores and the LRU of open tenant handles."""
+
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from backend import vector_store as vector_store_module
+from backend.answer_cache import SemanticAnswerCache
+from backend.document_processor import DocumentProcessor
+from backend.jobs import IngestionJobQueue
+from backend.main import app
+from backend.manifest import DocumentManifest
+from backend.models import ChatResponse
+from backend.numpy_store import NumpyVectorStore
+from backend.services import ServiceContainer
+from backend.tenants import Tenant, TenantRegistry, normalize_tenant_id
+from backend.tests.conftest import make_chunks
+
+
+class FakeStore:
+    """Store that records whether it was closed."""
+    
+    def __init__(self):
+        self.closed = False
+    
+    def close(self):
+        self.closed = True
+
+
+def fake_opener(opened):
+    """Opener building tenants around fake stores, recording the ids opened."""
+    def open_tenant(tenant_id):
+        opened.append(tenant_id)
+        return Tenant(tenant_id, FakeStore())
+    return open_tenant
+
+
+def test_normalize_tenant_id():
+    """Test that the default tenant maps to None and bad ids are rejected."""
+    assert normalize_tenant_id(None) is None
+    assert normalize_tenant_id("  ") is None
+    assert normalize_tenant_id("Default") is None
+    assert normalize_tenant_id(" Acme-EU_1 ") == "acme-eu_1"
+    for invalid in ("../etc", "acme-", "a" * 33, "acme corp"):
+        with pytest.raises(ValueError):
+            normalize_tenant_id(invalid)
+
+
+def test_least_recently_used_tenant_is_closed():
+    """Test lazy opening, reuse of open handles and LRU closing."""
+    opened = []
+    registry = TenantRegistry(max_open=2, idle_seconds=3600, opener=fake_opener(opened))
+    
+    with registry.lease("a") as a:
+        pass
+    with registry.lease("b"):
+        pass
+    with registry.lease("a") as again:
+        assert again is a
+    with registry.lease("c"):
+        pass
+    
+    assert opened == ["a", "b", "c"]
+    assert registry.open_tenants() == ["a", "c"]
+    assert registry.get_stats()['hits'] == 1
+    assert registry.get_stats()['closes'] == 1
+    assert not a.vector_store.closed
+
+
+def test_leased_tenants_stay_open():
+    """Test that busy tenants are neither evicted nor closed as idle."""
+    registry = TenantRegistry(max_open=1, idle_seconds=0, opener=fake_opener([]))
+    
+    busy = registry.acquire("busy")
+    with registry.lease("other") as other:
+        assert registry.open_tenants() == ["busy", "other"]
+        assert registry.close_idle() == 0
+    
+    assert registry.close_idle() == 1
+    assert other.vector_store.closed
+    assert registry.open_tenants() == ["busy"]
+    
+    registry.release(busy)
+    assert registry.close_idle() == 1
+    assert busy.vector_store.closed
+    assert registry.get_stats()['open'] == 0
+
+
+def test_chroma_tenants_are_closed_and_reopened(tmp_path, monkeypatch):
+    """Test LRU closing of Chroma tenants, whose client bounds the segments left loaded."""
+    pytest.importorskip("chromadb")
+    settings = vector_store_module.settings
+    monkeypatch.setattr(settings, "vector_store_backend", "chroma")
+    monkeypatch.setattr(settings, "chroma_persist_directory", str(tmp_path / "chroma"))
+    monkeypatch.setattr(settings, "chroma_memory_limit_bytes", 16 * 2**20)
+    monkeypatch.setattr(settings, "document_catalog_directory", str(tmp_path / "catalog"))
+    monkeypatch.setattr(settings, "keyword_index_directory", str(tmp_path / "keyword_index"))
+    monkeypatch.setattr(settings, "tenants_directory", str(tmp_path / "tenants"))
+    registry = TenantRegistry(max_open=1, idle_seconds=3600)
+    
+    with registry.lease("acme") as acme:
+        acme.vector_store.upsert_chunks(make_chunks(2, source="a.txt", prefix="a.txt-"), [[1.0, 0.0], [0.0, 1.0]])
+        client_settings = acme.vector_store.client.get_settings()
+        assert client_settings.chroma_segment_cache_policy == "LRU"
+        assert client_settings.chroma_memory_limit_bytes == 16 * 2**20
+    with registry.lease("globex") as globex:
+        globex.vector_store.upsert_chunks(make_chunks(2, source="g.txt", prefix="g.txt-"), [[1.0, 0.0], [0.0, 1.0]])
+    
+    assert registry.open_tenants() == ["globex"]
+    assert vector_store_module.VectorStore._change_listeners.get("acme", []) == []
+    with registry.lease("acme") as reopened:
+        assert reopened is not acme
+        assert [r['chunk_id'] for r in reopened.vector_store.similarity_search([0.0, 1.0], top_k=1)] == ["a.txt-1"]
+        assert [doc['filename'] for doc in reopened.vector_store.get_documents()] == ["a.txt"]
+    registry.close()
+
+
+def test_tenant_changes_reach_only_its_own_cache(tmp_path):
+    """Test that change listeners are scoped to the tenant whose store changed."""
+    tenants = {}
+    for tenant_id in ("acme", "globex"):
+        tenant = Tenant(
+            tenant_id,
+            NumpyVectorStore(str(tmp_path / tenant_id), keyword_index=False, tenant_id=tenant_id),
+            answer_cache=SemanticAnswerCache(),
+            manifest=DocumentManifest(str(tmp_path / tenant_id / "manifest.sqlite3"))
+        )
+        tenant.subscribe()
+        tenant.manifest.record("shared.txt", "fingerprint", {"x": (None, None)})
+        tenants[tenant_id] = tenant
+    
+    acme, globex = tenants["acme"], tenants["globex"]
+    acme.vector_store.upsert_chunks(make_chunks(2, source="shared.txt", prefix="shared.txt-"), [[1.0, 0.0], [0.0, 1.0]])
+    
+    assert acme.manifest.fingerprint("shared.txt") is None
+    assert globex.manifest.fingerprint("shared.txt") == "fingerprint"
+    assert globex.vector_store.get_documents() == []
+    
+    for tenant in tenants.values():
+        tenant.close()
+    assert NumpyVectorStore._change_listeners["acme"] == []
+
+
+class FakeRAGEngine:
+    """RAG engine that answers with the documents of the store it is scoped to."""
+    
+    answer_cache = None
+    
+    def __init__(self, vector_store):
+        self.vector_store = vector_store
+    
+    def scoped(self, vector_store, answer_cache=None):
+        return FakeRAGEngine(vector_store)
+    
+    async def aquery(self, query, chat_history=None, top_k=None, include_prompt=False, filter_metadata=None):
+        sources = ", ".join(doc['filename'] for doc in self.vector_store.get_documents())
+        return ChatResponse(answer=f"sources: {sources}", sources=[], confidence=1.0)
+
+
+class FakeJobQueue:
+    """Job queue holding nothing."""
+    
+    def start(self):
+        pass
+    
+    def stop(self):
+        pass
+    
+    def get(self, job_id):
+        return None
+
+
+def test_requests_are_routed_by_tenant_header(tmp_path):
+    """Test that each tenant only sees and answers from its own documents."""
+    default_store = NumpyVectorStore(str(tmp_path / "default"), keyword_index=False)
+    default_store.upsert_chunks(make_chunks(2, source="default.txt", prefix="default.txt-"), [[1.0, 0.0], [0.0, 1.0]])
+    
+    def open_tenant(tenant_id):
+        store = NumpyVectorStore(str(tmp_path / tenant_id), keyword_index=False, tenant_id=tenant_id)
+        return Tenant(tenant_id, store)
+    
+    registry = TenantRegistry(max_open=4, idle_seconds=3600, opener=open_tenant)
+    with registry.lease("acme") as acme:
+        acme.vector_store.upsert_chunks(make_chunks(2, source="acme.txt", prefix="acme.txt-"), [[1.0, 0.0], [0.0, 1.0]])
+    
+    app.state.services = ServiceContainer(
+        vector_store=default_store,
+        embedding_service=object(),
+        rag_engine=FakeRAGEngine(default_store),
+        doc_processor=object(),
+        job_queue=FakeJobQueue(),
+        tenants=registry
+    )
+    with TestClient(app) as client:
+        def filenames(headers):
+            return [doc['filename'] for doc in client.get("/api/documents/", headers=headers).json()]
+        
+        assert filenames({}) == ["default.txt"]
+        assert filenames({"X-Tenant-ID": "acme"}) == ["acme.txt"]
+        assert filenames({"X-Tenant-ID": "globex"}) == []
+        
+        answer = client.post("/api/chat/", json={"query": "hi"}, headers={"X-Tenant-ID": "ACME"}).json()
+        assert answer['answer'] == "sources: acme.txt"
+        
+        response = client.delete("/api/documents/default.txt", headers={"X-Tenant-ID": "acme"})
+        assert response.status_code == 404
+        assert client.get("/api/documents/", headers={"X-Tenant-ID": "../x"}).status_code == 400
+        
+        assert registry.open_tenants() == ["globex", "acme"]
+        assert registry.get_stats()['leased'] == 0
+    
+    assert registry.open_tenants() == []
+
+
+def test_metrics_include_open_tenant_answer_caches(tmp_path):
+    """Test that each open tenant's answer cache is exported under a tenant label."""
+    def open_tenant(tenant_id):
+        store = NumpyVectorStore(str(tmp_path / tenant_id), keyword_index=False, tenant_id=tenant_id)
+        return Tenant(tenant_id, store, answer_cache=SemanticAnswerCache())
+    
+    registry = TenantRegistry(max_open=4, idle_seconds=3600, opener=open_tenant)
+    with registry.lease("acme") as acme:
+        assert acme.answer_cache.lookup([1.0, 0.0], ["c0"]) is None
+    
+    app.state.services = ServiceContainer(
+        vector_store=NumpyVectorStore(str(tmp_path / "default"), keyword_index=False),
+        embedding_service=object(),
+        rag_engine=FakeRAGEngine(None),
+        doc_processor=object(),
+        job_queue=FakeJobQueue(),
+        tenants=registry
+    )
+    with TestClient(app) as client:
+        lines = client.get("/metrics").text.splitlines()
+    
+    assert 'rag_cache_misses_total{cache="answer",tenant="acme"} 1' in lines
+    assert 'rag_cache_hits_total{cache="answer",tenant="acme"} 0' in lines
+
+
+def test_jobs_are_indexed_into_their_tenant(tmp_path):
+    """Test that a tenant's upload lands in its own store and manifest."""
+    default_store = FakeChunkStore()
+    tenant_stores = {}
+    
+    def open_tenant(tenant_id):
+        tenant_stores[tenant_id] = FakeChunkStore()
+        manifest = DocumentManifest(str(tmp_path / tenant_id / "manifest.sqlite3"))
+        return Tenant(tenant_id, tenant_stores[tenant_id], manifest=manifest)
+    
+    registry = TenantRegistry(opener=open_tenant)
+    job_queue = IngestionJobQueue(
+        DocumentProcessor(chunk_size=100, chunk_overlap=20),
+        FakeEmbeddingService(),
+        default_store,
+        jobs_dir=str(tmp_path / "jobs"),
+        upload_dir=str(tmp_path / "uploads"),
+        manifest_path=str(tmp_path / "manifest.sqlite3"),
+        tenants=registry
+    )
+    job_queue.start()
+    
+    jobs = []
+    for tenant_id in ("acme", "globex", None):
+        job_id = job_queue.new_job_id()
+        job_queue.upload_path(job_id, "notes.txt").write_text("Same text everywhere. " * 20, encoding="utf-8")
+        jobs.append(job_queue.submit(job_id, "notes.txt", tenant_id=tenant_id))
+    jobs = [wait_for(job_queue, job.job_id) for job in jobs]
+    job_queue.close()
+    registry.close()
+    
+    # Identical files are indexed once per tenant, not skipped as unchanged
+    assert [job.status for job in jobs] == ["completed"] * 3
+    assert [job.tenant_id for job in jobs] == ["acme", "globex", None]
+    assert len(tenant_stores["acme"].chunks) == len(tenant_stores["globex"].chunks) == len(default_store.chunks) > 0
+    assert all(job.chunks_skipped == 0 for job in jobs)
+
+
+class FakeChunkStore:
+    """Vector store that records upserted chunks."""
+    
+    def __init__(self):
+        self.chunks = []
+    
+    def upsert_chunks(self, chunks, embeddings):
+        self.chunks.extend(chunks)
+    
+    def get_document_chunk_ids(self, filename):
+        return [chunk.chunk_id for chunk in self.chunks if chunk.metadata.source == filename]
+    
+    def delete_chunks(self, chunk_ids):
+        return 0
+
+
+class FakeEmbeddingService:
+    """Embedding service returning constant vectors."""
+    
+    def generate_embeddings_batch(self, texts):
+        return [[0.1, 0.2] for _ in texts]
+
+
+def wait_for(job_queue, job_id, timeout=5.0):
+    """Poll until a job finishes."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = job_queue.get(job_id)
+        if job.status in ("completed", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
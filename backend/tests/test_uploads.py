@@ -0,0 +1,121 @@
+"""Tests for the upload endpoint: in-memory hand-over and the streaming size limit."""
+
+import time
+
+from fastapi.testclient import TestClient
+from backend import upload_limit as upload_limit_module
+from backend.document_processor import DocumentProcessor
+from backend.jobs import IngestionJobQueue
+from backend.main import app
+from backend.services import ServiceContainer
+
+
+class FakeEmbeddingService:
+    """Embedding service returning constant vectors."""
+    
+    def generate_embeddings_batch(self, texts):
+        return [[0.1, 0.2, 0.3] for _ in texts]
+
+
+class FakeVectorStore:
+    """Vector store that records upserted chunks."""
+    
+    def __init__(self):
+        self.chunks = []
+    
+    def upsert_chunks(self, chunks, embeddings):
+        self.chunks.extend(chunks)
+    
+    def get_document_chunk_ids(self, filename):
+        return [chunk.chunk_id for chunk in self.chunks if chunk.metadata.source == filename]
+    
+    def delete_chunks(self, chunk_ids):
+        return 0
+
+
+class RecordingJobQueue(IngestionJobQueue):
+    """Job queue recording the upload directory's contents at each submit."""
+    
+    def submit(self, job_id, filename, **kwargs):
+        self.stored_at_submit = sorted(path.name for path in self.upload_dir.iterdir())
+        return super().submit(job_id, filename, **kwargs)
+
+
+def make_services(tmp_path, store):
+    """Container around a real job queue rooted in a temporary directory."""
+    job_queue = RecordingJobQueue(
+        DocumentProcessor(chunk_size=100, chunk_overlap=20, extraction_workers=1),
+        FakeEmbeddingService(),
+        store,
+        jobs_dir=str(tmp_path / "jobs"),
+        upload_dir=str(tmp_path / "uploads"),
+        manifest_path=str(tmp_path / "manifest.sqlite3")
+    )
+    return ServiceContainer(
+        vector_store=store,
+        embedding_service=job_queue.embedding_service,
+        rag_engine=object(),
+        doc_processor=job_queue.processor,
+        job_queue=job_queue
+    )
+
+
+def wait_for(client, job_id, timeout=5.0):
+    """Poll the job endpoint until the job finishes."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/api/documents/jobs/{job_id}").json()
+        if job['status'] in ("completed", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+def test_small_text_upload_skips_the_upload_directory(tmp_path):
+    """Test that a small TXT upload is indexed from memory, never stored."""
+    store = FakeVectorStore()
+    app.state.services = services = make_services(tmp_path, store)
+    
+    with TestClient(app) as client:
+        text = b"This is a test sentence. " * 20
+        response = client.post("/api/documents/upload", files={"file": ("notes.txt", text, "text/plain")})
+        assert response.status_code == 202
+        assert wait_for(client, response.json()['job_id'])['status'] == "completed"
+        assert services.job_queue.stored_at_submit == []
+        
+        # PDFs are stored for the job to memory-map
+        response = client.post("/api/documents/upload", files={"file": ("scan.pdf", b"%PDF-1.4", "application/pdf")})
+        assert response.status_code == 202
+        assert services.job_queue.stored_at_submit == [f"{response.json()['job_id']}.pdf"]
+        assert wait_for(client, response.json()['job_id'])['status'] == "failed"
+    
+    assert {chunk.metadata.source for chunk in store.chunks} == {"notes.txt"}
+    assert list((tmp_path / "uploads").iterdir()) == []
+
+
+def test_oversized_uploads_are_rejected(tmp_path, monkeypatch):
+    """Test the 413 for declared and streamed bodies over the limit."""
+    monkeypatch.setattr(upload_limit_module.settings, "max_upload_bytes", 1000)
+    app.state.services = make_services(tmp_path, FakeVectorStore())
+    
+    with TestClient(app) as client:
+        response = client.post("/api/documents/upload", files={"file": ("big.txt", b"x" * 2000, "text/plain")})
+        assert response.status_code == 413
+        assert "1000 byte limit" in response.json()['detail']
+        
+        # Without a Content-Length the body is counted as it streams in
+        def body():
+            for _ in range(20):
+                yield b"x" * 100
+        
+        response = client.post(
+            "/api/documents/bulk",
+            content=body(),
+            headers={"Content-Type": "multipart/form-data; boundary=abc"}
+        )
+        assert response.status_code == 413
+        
+        response = client.post("/api/documents/upload", files={"file": ("small.txt", b"Short but fine text.", "text/plain")})
+        assert response.status_code == 202
+    
+    assert list((tmp_path / "uploads").iterdir()) == []
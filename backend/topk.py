@@ -0,0 +1,54 @@
+"""Running top-k selection over blocks of scores."""
+
+from typing import List, Tuple
+
+import numpy as np
+
+
+def empty_top_k(num_queries: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Running (rows, scores) holding no candidates yet, for ``num_queries`` queries."""
+    return np.empty((num_queries, 0), dtype=np.int64), np.empty((num_queries, 0), dtype=np.float32)
+
+
+def merge_top_k(
+    best_rows: np.ndarray,
+    best_scores: np.ndarray,
+    block_rows: np.ndarray,
+    block_scores: np.ndarray,
+    k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fold one block of scores into each query's running top-k.
+    
+    Only ``k`` candidates per query are carried between blocks, so a scan
+    over any number of rows needs memory for one block of scores.
+    
+    Args:
+        best_rows: Running top rows, shape (nq, <= k)
+        best_scores: Their scores, aligned with ``best_rows``
+        block_rows: Row numbers of the block, shape (n,) shared by every
+            query or (nq, n)
+        block_scores: Scores of the block, shape (nq, n)
+        k: Candidates kept per query
+    
+    Returns:
+        Updated (rows, scores), unordered, at most ``k`` per query
+    """
+    if block_rows.ndim == 1:
+        block_rows = np.broadcast_to(block_rows, block_scores.shape)
+    rows = np.concatenate([best_rows, block_rows], axis=1)
+    scores = np.concatenate([best_scores, block_scores.astype(np.float32, copy=False)], axis=1)
+    if scores.shape[1] > k:
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        rows = np.take_along_axis(rows, top, axis=1)
+        scores = np.take_along_axis(scores, top, axis=1)
+    return rows, scores
+
+
+def sorted_top_k(rows: np.ndarray, scores: np.ndarray) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Per query, its (rows, scores) sorted by descending score."""
+    hits = []
+    for query_rows, query_scores in zip(rows, scores):
+        order = np.argsort(-query_scores, kind="stable")
+        hits.append((query_rows[order], query_scores[order]))
+    return hits
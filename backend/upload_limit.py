@@ -0,0 +1,85 @@
+"""ASGI middleware capping the size of upload request bodies as they stream in."""
+
+import json
+from typing import Iterable
+
+from config import settings
+
+
+class UploadTooLargeError(Exception):
+    """Raised to the app when an upload body grows past the limit."""
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Rejects uploads larger than ``settings.max_upload_bytes`` with 413.
+    
+    FastAPI parses (and spools) the whole multipart body before a route
+    runs, so the limit cannot be enforced in the route itself. A declared
+    ``Content-Length`` over the limit is rejected before any of the body is
+    read; otherwise bytes are counted as they arrive and the request is cut
+    off as soon as the count passes the limit.
+    """
+    
+    def __init__(self, app, paths: Iterable[str]):
+        """
+        Wrap an ASGI app.
+        
+        Args:
+            app: The wrapped application
+            paths: Request paths whose POST bodies are limited
+        """
+        self.app = app
+        self.paths = set(paths)
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        
+        max_bytes = settings.max_upload_bytes
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > max_bytes:
+            await self._reject(send, max_bytes)
+            return
+        
+        received = 0
+        exceeded = False
+        
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    exceeded = True
+                    raise UploadTooLargeError(f"Upload is larger than {max_bytes} bytes")
+            return message
+        
+        async def guarded_send(message):
+            # Whatever the app makes of the aborted body is replaced by the 413
+            if not exceeded:
+                await send(message)
+        
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not exceeded:
+                raise
+        if exceeded:
+            await self._reject(send, max_bytes)
+    
+    @staticmethod
+    async def _reject(send, max_bytes: int):
+        """Send a 413 response in the API's error format."""
+        body = json.dumps({"detail": f"Upload is larger than the {max_bytes} byte limit"}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
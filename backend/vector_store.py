@@ -1,31 +1,355 @@
-"""Vector store abstraction layer using ChromaDB."""
+"""Vector store abstraction layer with ChromaDB and local NumPy backends."""
 
-from typing import List, Dict, Optional
-import chromadb
-from chromadb.config import Settings as ChromaSettings
+import os
+from abc import ABC, abstractmethod
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, Tuple
+
+import numpy as np
 
 from config import settings
+from document_catalog import DocumentCatalog
+from keyword_index import BM25Index
+from metadata_filter import filter_conditions, to_timestamp
 from models import DocumentChunk
 
 
-class VectorStore:
-    """Vector database interface using ChromaDB."""
+class VectorStore(ABC):
+    """Vector database interface implemented by each storage backend."""
+    
+    # Callbacks notified with the changed source filenames (None means every
+    # source), per tenant (None is the default tenant). Shared by all
+    # instances of a tenant since they open the same persisted data.
+    _change_listeners: Dict[Optional[str], List[Callable[[Optional[Iterable[str]]], None]]] = {}
+    
+    # Tenant whose data the store holds (None for the default tenant)
+    tenant_id: Optional[str] = None
+    
+    @classmethod
+    def add_change_listener(
+        cls,
+        listener: Callable[[Optional[Iterable[str]]], None],
+        tenant_id: Optional[str] = None
+    ):
+        """
+        Register a callback for changes to indexed documents.
+        
+        Args:
+            listener: Called with the set of changed sources, or None after a clear
+            tenant_id: Tenant whose changes to follow (None for the default tenant)
+        """
+        cls._change_listeners.setdefault(tenant_id, []).append(listener)
+    
+    @classmethod
+    def remove_change_listener(
+        cls,
+        listener: Callable[[Optional[Iterable[str]]], None],
+        tenant_id: Optional[str] = None
+    ):
+        """Unregister a callback added with ``add_change_listener``."""
+        listeners = cls._change_listeners.get(tenant_id, [])
+        if listener in listeners:
+            listeners.remove(listener)
+    
+    # BM25 index kept in step with upserts and deletes (None when disabled)
+    keyword_index: Optional[BM25Index] = None
+    
+    # Chunks indexed per batch when backfilling the keyword index
+    KEYWORD_BACKFILL_BATCH = 1000
+    
+    # Per-document totals kept in step with upserts and deletes
+    catalog: DocumentCatalog
+    
+    def _notify_change(self, sources: Optional[Iterable[str]]):
+        """Notify listeners that the given sources changed."""
+        for listener in list(self._change_listeners.get(self.tenant_id, ())):
+            listener(sources)
+    
+    def _open_keyword_index(self, path: str, stored_chunks: int):
+        """
+        Open the BM25 index stored at ``path``.
+        
+        The index is rebuilt from the stored chunks when its document count
+        disagrees with the store's chunk count, e.g. when it is enabled on an
+        existing store (so no re-upload is needed) or after a crash between
+        a store write and its keyword update.
+        
+        Args:
+            path: SQLite file of the index
+            stored_chunks: Number of chunks in the store
+        """
+        self.keyword_index = BM25Index(path, k1=settings.bm25_k1, b=settings.bm25_b)
+        if self.keyword_index.count() == stored_chunks:
+            return
+        
+        self.keyword_index.clear()
+        batch = []
+        for entry in self._iter_stored_chunks():
+            batch.append(entry)
+            if len(batch) == self.KEYWORD_BACKFILL_BATCH:
+                self.keyword_index.add(batch)
+                batch = []
+        self.keyword_index.add(batch)
+    
+    def _index_keywords(self, chunks: List[DocumentChunk], metadatas: List[Dict]):
+        """Add upserted chunks to the keyword index, if enabled."""
+        if self.keyword_index is not None:
+            self.keyword_index.add(
+                (chunk.chunk_id, chunk.text, metadata)
+                for chunk, metadata in zip(chunks, metadatas)
+            )
+    
+    def _open_catalog(self, path: str, stored_chunks: int):
+        """
+        Open the document catalog stored at ``path``.
+        
+        The catalog is rebuilt from the stored chunks when its chunk count
+        disagrees with the store's, e.g. for a store that predates it or
+        after a crash between a store write and its catalog update, and when
+        it predates the columns used to resolve filters.
+        
+        Args:
+            path: SQLite file of the catalog
+            stored_chunks: Number of chunks in the store
+        """
+        self.catalog = DocumentCatalog(path)
+        if self.catalog.needs_rebuild or self.catalog.get_stats()['total_chunks'] != stored_chunks:
+            self.catalog.rebuild(self._iter_stored_chunks(), self.KEYWORD_BACKFILL_BATCH)
+    
+    def _catalog_chunks(self, chunks: List[DocumentChunk], metadatas: List[Dict]):
+        """Add upserted chunks to the document catalog."""
+        self.catalog.add(
+            (chunk.chunk_id, chunk.text, metadata)
+            for chunk, metadata in zip(chunks, metadatas)
+        )
+    
+    def keyword_search(
+        self,
+        query: str,
+        top_k: int = 5,
+        filter_metadata: Optional[Dict] = None
+    ) -> List[Dict]:
+        """
+        Rank chunks against the query text with BM25; no embedding is needed.
+        
+        Args:
+            query: Free-text query
+            top_k: Number of results to return
+            filter_metadata: Optional metadata filters
+        
+        Returns:
+            List of results with text, metadata, ``bm25_score`` and
+            ``keyword_coverage``; there is no ``similarity_score``
+        """
+        if self.keyword_index is None:
+            raise ValueError("Keyword index is disabled (set KEYWORD_INDEX_ENABLED=true)")
+        return self.keyword_index.search(query, top_k, filter_metadata)
+    
+    def _chunk_metadata(self, chunk: DocumentChunk) -> Dict:
+        """Flat metadata stored alongside a chunk (unknown pages are -1)."""
+        return {
+            'source': chunk.metadata.source,
+            'page': chunk.metadata.page if chunk.metadata.page else -1,
+            'start_page': chunk.metadata.start_page if chunk.metadata.start_page else -1,
+            'end_page': chunk.metadata.end_page if chunk.metadata.end_page else -1,
+            'created_at': chunk.metadata.created_at.isoformat()
+        }
+    
+    @abstractmethod
+    def upsert_chunks(self, chunks: List[DocumentChunk], embeddings: List[List[float]]):
+        """Insert or update document chunks with their embeddings."""
+    
+    @abstractmethod
+    def similarity_search(
+        self,
+        query_embedding: List[float],
+        top_k: int = 5,
+        filter_metadata: Optional[Dict] = None
+    ) -> List[Dict]:
+        """Return the top_k chunks most similar to a query embedding."""
+    
+    def similarity_search_batch(
+        self,
+        query_embeddings: List[List[float]],
+        top_k: int = 5,
+        filter_metadata: Optional[Dict] = None
+    ) -> List[List[Dict]]:
+        """
+        Search for several query embeddings at once.
+        
+        Args:
+            query_embeddings: Query vectors
+            top_k: Number of results per query
+            filter_metadata: Optional metadata filters applied to every query
+            
+        Returns:
+            One result list per query, in query order
+        """
+        return [
+            self.similarity_search(query_embedding, top_k, filter_metadata)
+            for query_embedding in query_embeddings
+        ]
+    
+    @abstractmethod
+    def similarity_scores(self, query_embedding: List[float], chunk_ids: List[str]) -> Dict[str, float]:
+        """Cosine similarity of the query to each given chunk (unknown ids are left out)."""
+    
+    @abstractmethod
+    def _iter_stored_chunks(self) -> Iterator[Tuple[str, str, Dict]]:
+        """Yield (chunk id, text, metadata) for every stored chunk."""
+    
+    def get_documents(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        """
+        List indexed documents from the catalog, ordered by filename.
+        
+        Args:
+            offset: Number of documents to skip
+            limit: Maximum number of documents to return (None for all)
+            
+        Returns:
+            Document information: id, filename, chunk count, byte size,
+            content hash and creation/update times
+        """
+        return self.catalog.list_documents(offset, limit)
+    
+    def get_document_chunk_ids(self, filename: str) -> List[str]:
+        """
+        Get the ids of all chunks of a specific document.
+        
+        Args:
+            filename: Name of the document
+            
+        Returns:
+            Chunk ids (empty if the document is not indexed)
+        """
+        return self.catalog.chunk_ids(filename)
+    
+    @abstractmethod
+    def delete_document(self, filename: str) -> int:
+        """Delete all chunks of a document, returning how many were removed."""
     
-    def __init__(self):
-        """Initialize ChromaDB client and collection."""
-        # Initialize persistent client
+    @abstractmethod
+    def delete_chunks(self, chunk_ids: List[str]) -> int:
+        """Delete chunks by id, returning how many were removed."""
+    
+    @abstractmethod
+    def get_collection_info(self) -> Dict:
+        """Describe the store."""
+    
+    @abstractmethod
+    def clear_collection(self):
+        """Delete all data from the store."""
+    
+    def close(self):
+        """Close the keyword index and catalog connections."""
+        if self.keyword_index is not None:
+            self.keyword_index.close()
+        self.catalog.close()
+
+
+class ChromaVectorStore(VectorStore):
+    """
+    Vector database backed by a persistent ChromaDB collection.
+    
+    Filtered searches are resolved against the document catalog first: a
+    filter matching at most ``filter_exact_max_candidates`` chunks has just
+    those chunks scored exactly, since Chroma's filtered HNSW search can
+    return fewer than ``top_k`` hits when few chunks pass the filter.
+    Broader filters use Chroma's ``where``, with ``created_at`` ranges
+    applied to the numeric ``created_ts`` stored alongside.
+    """
+    
+    def __init__(self, keyword_index: Optional[bool] = None, tenant_id: Optional[str] = None):
+        """
+        Initialize ChromaDB client and collection.
+        
+        Args:
+            keyword_index: Maintain a BM25 keyword index (default from settings)
+            tenant_id: Tenant owning the collection; each tenant gets its own
+                ``<chroma_collection_name>-<tenant_id>`` collection (None for
+                the default tenant's ``chroma_collection_name``)
+        """
+        self.tenant_id = tenant_id
+        self.collection_name = (
+            settings.chroma_collection_name if tenant_id is None
+            else f"{settings.chroma_collection_name}-{tenant_id}"
+        )
+        
+        # Imported here so the NumPy backend works without chromadb installed
+        import chromadb
+        from chromadb.config import Settings as ChromaSettings
+        
+        # Initialize persistent client, shared by all collections in the directory.
+        # Collections stay loaded in it after their store closes, so its own
+        # LRU of vector segments is what bounds memory across tenants.
+        segment_cache = {}
+        if settings.chroma_memory_limit_bytes > 0:
+            segment_cache = {
+                'chroma_segment_cache_policy': "LRU",
+                'chroma_memory_limit_bytes': settings.chroma_memory_limit_bytes
+            }
         self.client = chromadb.PersistentClient(
             path=settings.chroma_persist_directory,
             settings=ChromaSettings(
-                anonymized_telemetry=settings.anonymized_telemetry
+                anonymized_telemetry=settings.anonymized_telemetry,
+                **segment_cache
             )
         )
         
         # Get or create collection
         self.collection = self.client.get_or_create_collection(
-            name=settings.chroma_collection_name,
+            name=self.collection_name,
             metadata={"hnsw:space": "cosine"}  # Use cosine similarity
         )
+        self._backfill_created_ts()
+        
+        if settings.keyword_index_enabled if keyword_index is None else keyword_index:
+            self._open_keyword_index(
+                os.path.join(settings.keyword_index_directory, f"{self.collection_name}.sqlite3"),
+                self.collection.count()
+            )
+        self._open_catalog(
+            os.path.join(settings.document_catalog_directory, f"{self.collection_name}.sqlite3"),
+            self.collection.count()
+        )
+    
+    def close(self):
+        """
+        Close the keyword index and catalog connections.
+        
+        Chroma cannot unload a single collection, so its segments stay in the
+        shared client until ``chroma_memory_limit_bytes`` evicts them.
+        """
+        super().close()
+    
+    def _chunk_metadata(self, chunk: DocumentChunk) -> Dict:
+        """Flat metadata plus ``created_ts``, the creation time as a number Chroma can range-filter."""
+        metadata = super()._chunk_metadata(chunk)
+        metadata['created_ts'] = chunk.metadata.created_at.timestamp()
+        return metadata
+    
+    def _backfill_created_ts(self):
+        """Add ``created_ts`` to chunks stored before it was written."""
+        sample = self.collection.get(limit=1, include=["metadatas"])
+        if not sample['ids'] or 'created_ts' in sample['metadatas'][0]:
+            return
+        
+        offset = 0
+        while True:
+            page = self.collection.get(
+                include=["metadatas"],
+                limit=self.KEYWORD_BACKFILL_BATCH,
+                offset=offset
+            )
+            if not page['ids']:
+                return
+            self.collection.update(
+                ids=page['ids'],
+                metadatas=[
+                    {**metadata, 'created_ts': to_timestamp(metadata['created_at'])}
+                    for metadata in page['metadatas']
+                ]
+            )
+            offset += len(page['ids'])
     
     def upsert_chunks(self, chunks: List[DocumentChunk], embeddings: List[List[float]]):
         """
@@ -41,14 +365,7 @@ class VectorStore:
         # Prepare data for ChromaDB
         ids = [chunk.chunk_id for chunk in chunks]
         documents = [chunk.text for chunk in chunks]
-        metadatas = [
-            {
-                'source': chunk.metadata.source,
-                'page': chunk.metadata.page if chunk.metadata.page else -1,
-                'created_at': chunk.metadata.created_at.isoformat()
-            }
-            for chunk in chunks
-        ]
+        metadatas = [self._chunk_metadata(chunk) for chunk in chunks]
         
         # Upsert to collection
         self.collection.upsert(
@@ -57,6 +374,10 @@ class VectorStore:
             documents=documents,
             metadatas=metadatas
         )
+        self._index_keywords(chunks, metadatas)
+        self._catalog_chunks(chunks, metadatas)
+        
+        self._notify_change({chunk.metadata.source for chunk in chunks})
     
     def similarity_search(
         self, 
@@ -75,52 +396,134 @@ class VectorStore:
         Returns:
             List of results with text, metadata, and similarity scores
         """
-        # Query collection
+        return self._query([query_embedding], top_k, filter_metadata)[0]
+    
+    def similarity_search_batch(
+        self,
+        query_embeddings: List[List[float]],
+        top_k: int = 5,
+        filter_metadata: Optional[Dict] = None
+    ) -> List[List[Dict]]:
+        """
+        Search for several query embeddings in a single Chroma query.
+        
+        Args:
+            query_embeddings: Query vectors
+            top_k: Number of results per query
+            filter_metadata: Optional metadata filters applied to every query
+            
+        Returns:
+            One result list per query, in query order
+        """
+        if not query_embeddings:
+            return []
+        return self._query(query_embeddings, top_k, filter_metadata)
+    
+    def _query(
+        self,
+        query_embeddings: List[List[float]],
+        top_k: int,
+        filter_metadata: Optional[Dict]
+    ) -> List[List[Dict]]:
+        """Search for each query, scoring a selective filter's chunks exactly."""
+        if filter_metadata:
+            chunk_ids = self.catalog.match_chunk_ids(filter_metadata, settings.filter_exact_max_candidates)
+            if chunk_ids is not None:
+                return self._exact_search(query_embeddings, chunk_ids, top_k)
+        
         results = self.collection.query(
-            query_embeddings=[query_embedding],
+            query_embeddings=query_embeddings,
             n_results=top_k,
-            where=filter_metadata
+            where=self._chroma_where(filter_metadata)
         )
+        return [self._format_results(results, q) for q in range(len(query_embeddings))]
+    
+    @staticmethod
+    def _chroma_where(filter_metadata: Optional[Dict]) -> Optional[Dict]:
+        """
+        Rewrite a filter in the form Chroma accepts: one condition, or an
+        ``$and`` of them, with ``created_at`` conditions on ``created_ts``.
+        """
+        if not filter_metadata:
+            return None
+        
+        clauses = []
+        for key, op, operand in filter_conditions(filter_metadata):
+            if key == "created_at":
+                key = "created_ts"
+                operand = [to_timestamp(value) for value in operand] if op == "$in" else to_timestamp(operand)
+            clauses.append({key: {op: operand}})
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+    
+    def _exact_search(
+        self,
+        query_embeddings: List[List[float]],
+        chunk_ids: List[str],
+        top_k: int
+    ) -> List[List[Dict]]:
+        """Score only the given chunks, exactly, against each query."""
+        if not chunk_ids:
+            return [[] for _ in query_embeddings]
+        stored = self.collection.get(ids=chunk_ids, include=["embeddings", "documents", "metadatas"])
+        if not stored['ids']:
+            return [[] for _ in query_embeddings]
         
-        # Format results
+        vectors = np.asarray(stored['embeddings'], dtype=np.float32)
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        queries /= np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        scores = queries @ vectors.T
+        
+        k = min(top_k, len(stored['ids']))
+        all_results = []
+        for query_scores in scores:
+            top = np.argpartition(-query_scores, k - 1)[:k]
+            top = top[np.argsort(-query_scores[top], kind="stable")]
+            all_results.append([
+                {
+                    'chunk_id': stored['ids'][i],
+                    'text': stored['documents'][i],
+                    'metadata': stored['metadatas'][i],
+                    'similarity_score': float(query_scores[i])
+                }
+                for i in top
+            ])
+        return all_results
+    
+    def similarity_scores(self, query_embedding: List[float], chunk_ids: List[str]) -> Dict[str, float]:
+        """Cosine similarity of the query to each given chunk (unknown ids are left out)."""
+        results = self._exact_search([query_embedding], chunk_ids, len(chunk_ids))[0]
+        return {result['chunk_id']: result['similarity_score'] for result in results}
+    
+    def _format_results(self, results: Dict, q: int) -> List[Dict]:
+        """Format the results of query ``q`` from a Chroma query response."""
         formatted_results = []
         
-        if results['ids'] and len(results['ids'][0]) > 0:
-            for i in range(len(results['ids'][0])):
+        if results['ids'] and len(results['ids'][q]) > 0:
+            for i in range(len(results['ids'][q])):
                 result = {
-                    'chunk_id': results['ids'][0][i],
-                    'text': results['documents'][0][i],
-                    'metadata': results['metadatas'][0][i],
-                    'similarity_score': 1 - results['distances'][0][i]  # Convert distance to similarity
+                    'chunk_id': results['ids'][q][i],
+                    'text': results['documents'][q][i],
+                    'metadata': results['metadatas'][q][i],
+                    'similarity_score': 1 - results['distances'][q][i]  # Convert distance to similarity
                 }
                 formatted_results.append(result)
         
         return formatted_results
     
-    def get_documents(self) -> List[Dict]:
-        """
-        Get list of all indexed documents.
-        
-        Returns:
-            List of document information
-        """
-        # Get all items from collection
-        all_items = self.collection.get()
-        
-        # Group by source
-        documents = {}
-        for i, metadata in enumerate(all_items['metadatas']):
-            source = metadata.get('source', 'Unknown')
-            if source not in documents:
-                documents[source] = {
-                    'filename': source,
-                    'num_chunks': 0,
-                    'chunk_ids': []
-                }
-            documents[source]['num_chunks'] += 1
-            documents[source]['chunk_ids'].append(all_items['ids'][i])
-        
-        return list(documents.values())
+    def _iter_stored_chunks(self) -> Iterator[Tuple[str, str, Dict]]:
+        """Yield (chunk id, text, metadata) for every chunk in the collection."""
+        offset = 0
+        while True:
+            page = self.collection.get(
+                include=["documents", "metadatas"],
+                limit=self.KEYWORD_BACKFILL_BATCH,
+                offset=offset
+            )
+            if not page['ids']:
+                return
+            yield from zip(page['ids'], page['documents'], page['metadatas'])
+            offset += len(page['ids'])
     
     def delete_document(self, filename: str) -> int:
         """
@@ -140,25 +543,83 @@ class VectorStore:
         if results['ids']:
             # Delete chunks
             self.collection.delete(ids=results['ids'])
+            if self.keyword_index is not None:
+                self.keyword_index.remove_source(filename)
+            self.catalog.remove_source(filename)
+            self._notify_change({filename})
+            return len(results['ids'])
+        
+        return 0
+    
+    def delete_chunks(self, chunk_ids: List[str]) -> int:
+        """
+        Delete specific chunks by id.
+        
+        Args:
+            chunk_ids: Ids of the chunks to delete
+            
+        Returns:
+            Number of chunks deleted
+        """
+        results = self.collection.get(ids=chunk_ids)
+        
+        if results['ids']:
+            self.collection.delete(ids=results['ids'])
+            if self.keyword_index is not None:
+                self.keyword_index.remove(results['ids'])
+            self.catalog.remove(results['ids'])
+            self._notify_change({metadata.get('source') for metadata in results['metadatas']})
             return len(results['ids'])
         
         return 0
     
     def get_collection_info(self) -> Dict:
         """Get information about the vector store."""
-        count = self.collection.count()
         return {
-            'collection_name': settings.chroma_collection_name,
-            'total_chunks': count,
+            'collection_name': self.collection_name,
+            **self.catalog.get_stats(),
             'persist_directory': settings.chroma_persist_directory,
-            'similarity_metric': 'cosine'
+            'similarity_metric': 'cosine',
+            'backend': 'chroma',
+            'keyword_index': self.keyword_index is not None
         }
     
     def clear_collection(self):
         """Delete all data from the collection."""
         # Delete and recreate collection
-        self.client.delete_collection(name=settings.chroma_collection_name)
+        self.client.delete_collection(name=self.collection_name)
         self.collection = self.client.get_or_create_collection(
-            name=settings.chroma_collection_name,
+            name=self.collection_name,
             metadata={"hnsw:space": "cosine"}
         )
+        if self.keyword_index is not None:
+            self.keyword_index.clear()
+        self.catalog.clear()
+        self._notify_change(None)
+
+
+def create_vector_store(tenant_id: Optional[str] = None) -> VectorStore:
+    """
+    Create the vector store backend selected by ``settings.vector_store_backend``.
+    
+    Args:
+        tenant_id: Tenant whose store to open (None for the default tenant).
+            A tenant's NumPy store lives in ``<tenants_directory>/<tenant_id>``.
+    
+    Returns:
+        The tenant's vector store
+    """
+    backend = settings.vector_store_backend.lower()
+    
+    if backend == "chroma":
+        return ChromaVectorStore(tenant_id=tenant_id)
+    if backend == "numpy":
+        from numpy_store import NumpyVectorStore
+        if tenant_id is None:
+            return NumpyVectorStore()
+        return NumpyVectorStore(
+            os.path.join(settings.tenants_directory, tenant_id, "vector_index"),
+            tenant_id=tenant_id
+        )
+    
+    raise ValueError(f"Unknown vector store backend: {settings.vector_store_backend}. Supported: chroma, numpy")
@@ -37,23 +37,37 @@ export default function ChatPanel({ documents, developerMode }) {
                 content: msg.content,
             }));
 
-            const response = await chatAPI.sendMessage(
+            // Stream the answer: sources arrive first, then answer deltas
+            const assistantId = Date.now() + 1;
+            const updateAssistant = (update) => {
+                setMessages(prev => prev.map(msg => (
+                    msg.id === assistantId ? { ...msg, ...update(msg) } : msg
+                )));
+            };
+
+            await chatAPI.streamMessage(
                 input,
                 chatHistory,
                 5,
-                developerMode
+                developerMode,
+                {
+                    onSources: ({ sources, confidence }) => {
+                        setMessages(prev => [...prev, {
+                            id: assistantId,
+                            content: '',
+                            isUser: false,
+                            sources,
+                            confidence,
+                        }]);
+                    },
+                    onToken: (delta) => {
+                        updateAssistant(msg => ({ content: msg.content + delta }));
+                    },
+                    onDone: ({ prompt_used }) => {
+                        updateAssistant(() => ({ prompt_used }));
+                    },
+                }
             );
-
-            const assistantMessage = {
-                id: Date.now() + 1,
-                content: response.answer,
-                isUser: false,
-                sources: response.sources,
-                confidence: response.confidence,
-                prompt_used: response.prompt_used,
-            };
-
-            setMessages(prev => [...prev, assistantMessage]);
         } catch (error) {
             console.error('Error sending message:', error);
 
@@ -131,7 +145,7 @@ export default function ChatPanel({ documents, developerMode }) {
                         {messages.map(message => (
                             <Message key={message.id} message={message} isUser={message.isUser} />
                         ))}
-                        {isLoading && (
+                        {isLoading && messages[messages.length - 1]?.isUser && (
                             <div className="flex justify-start mb-4">
                                 <div className="flex items-center gap-3">
                                     <div className="p-2 bg-slate-700 rounded-full">
@@ -14,7 +14,8 @@ export default function Sidebar({ documents, onDocumentsChange, developerMode, o
 
         setUploading(true);
         try {
-            await documentAPI.upload(file);
+            const job = await documentAPI.upload(file);
+            await documentAPI.waitForJob(job.job_id);
             // Refresh document list
             const updatedDocs = await documentAPI.list();
             onDocumentsChange(updatedDocs);
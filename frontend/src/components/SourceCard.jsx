@@ -15,13 +15,17 @@ export default function SourceCard({ source, index }) {
                                 Source {index + 1}
                             </span>
                             <span className="text-xs px-2 py-0.5 bg-primary-600/20 text-primary-300 rounded-full">
-                                {(source.similarity_score * 100).toFixed(1)}% match
+                                {source.similarity_score != null
+                                    ? `${(source.similarity_score * 100).toFixed(1)}% match`
+                                    : `BM25 ${source.bm25_score.toFixed(2)}`}
                             </span>
                         </div>
 
                         <div className="text-slate-400 text-xs mb-2">
                             {source.source}
-                            {source.page && ` • Page ${source.page}`}
+                            {source.page && (source.end_page
+                                ? ` • Pages ${source.page}-${source.end_page}`
+                                : ` • Page ${source.page}`)}
                         </div>
 
                         <p className="text-slate-300 text-sm leading-relaxed">
@@ -23,6 +23,26 @@ export const documentAPI = {
         return response.data;
     },
 
+    getJob: async (jobId) => {
+        const response = await api.get(`/api/documents/jobs/${jobId}`);
+        return response.data;
+    },
+
+    waitForJob: async (jobId, { intervalMs = 1000, onProgress } = {}) => {
+        // Poll the ingestion job until it completes or fails
+        while (true) {
+            const job = await documentAPI.getJob(jobId);
+            onProgress?.(job);
+            if (job.status === 'completed') {
+                return job.result;
+            }
+            if (job.status === 'failed') {
+                throw new Error(job.error || 'Ingestion failed');
+            }
+            await new Promise(resolve => setTimeout(resolve, intervalMs));
+        }
+    },
+
     list: async () => {
         const response = await api.get('/api/documents/');
         return response.data;
@@ -54,6 +74,81 @@ export const chatAPI = {
         return response.data;
     },
 
+    streamMessage: async (
+        query,
+        chatHistory = [],
+        topK = 5,
+        developerMode = false,
+        { onSources, onToken, onDone } = {},
+    ) => {
+        // axios cannot read a streaming body in the browser, so use fetch
+        const url = new URL('/api/chat/stream', API_BASE_URL);
+        url.searchParams.set('developer_mode', developerMode);
+
+        const response = await fetch(url, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                Accept: 'text/event-stream',
+            },
+            body: JSON.stringify({
+                query,
+                chat_history: chatHistory,
+                top_k: topK,
+            }),
+        });
+
+        if (!response.ok) {
+            const error = await response.json().catch(() => ({}));
+            throw new Error(error.detail || `Request failed with status ${response.status}`);
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        const handleFrame = (frame) => {
+            let event = 'message';
+            const dataLines = [];
+            for (const line of frame.split('\n')) {
+                if (line.startsWith('event:')) {
+                    event = line.slice(6).trim();
+                } else if (line.startsWith('data:')) {
+                    dataLines.push(line.slice(5).trim());
+                }
+            }
+            if (dataLines.length === 0) return;
+
+            const data = JSON.parse(dataLines.join('\n'));
+            if (event === 'sources') {
+                onSources?.(data);
+            } else if (event === 'token') {
+                onToken?.(data.delta);
+            } else if (event === 'done') {
+                onDone?.(data);
+            } else if (event === 'error') {
+                throw new Error(data.detail);
+            }
+        };
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+
+            buffer += decoder.decode(value, { stream: true });
+            let boundary = buffer.indexOf('\n\n');
+            while (boundary !== -1) {
+                handleFrame(buffer.slice(0, boundary));
+                buffer = buffer.slice(boundary + 2);
+                boundary = buffer.indexOf('\n\n');
+            }
+        }
+
+        if (buffer.trim()) {
+            handleFrame(buffer);
+        }
+    },
+
     healthCheck: async () => {
         const response = await api.get('/api/chat/health');
         return response.data;